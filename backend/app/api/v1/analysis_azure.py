@@ -8,14 +8,17 @@ Enhanced with:
 - Structured logging with context
 - Input validation and sanitization
 """
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request, Query, Path as PathParam
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Request, Response, Query, Path as PathParam
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.json_response import FastJSONResponse, dumps, payload_response, cached_payload_response, get_payload_cache
+from typing import Optional, Tuple
 from loguru import logger
 import tempfile
 import os
 from pathlib import Path
 import uuid
+import json
+import hashlib
 import asyncio
 from datetime import datetime
 import traceback
@@ -25,7 +28,21 @@ import time
 from app.services.azure_storage import AzureStorageService
 from app.services.azure_vision import AzureVisionService
 from app.services.gait_analysis import GaitAnalysisService
-from app.core.database_azure_sql import AzureSQLService
+from app.services.artifact_janitor import get_artifact_janitor, TEMP_VIDEO_PREFIX
+from app.services.upload_ingest import UploadIngest, is_streaming_upload_enabled
+from app.services.upload_sessions import get_upload_session_store, parse_checksum
+from app.services.progressive_download import ProgressiveDownload, is_progressive_download_enabled
+from app.services.video_cache import get_video_cache, is_video_cache_enabled
+from app.services.checkpoint_writer import get_checkpoint_writer
+from app.core.progress_coalescer import get_progress_coalescer
+from app.core.status_cache import get_status_cache
+from app.core.progress_bus import get_progress_bus
+from app.services.frame_index import frame_index_path
+from app.services.pose_sample_cache import sample_detections_path
+from app.services.video_proxy import (
+    is_proxy_enabled, create_analysis_proxy, proxy_path_for, proxy_meta_path, proxy_blob_name
+)
+from app.core.database_azure_sql import AzureSQLService, ANALYSIS_FIELDS
 from app.core.exceptions import (
     GaitAnalysisError, VideoProcessingError, PoseEstimationError,
     GaitMetricsError, ValidationError, StorageError, DatabaseError, 
@@ -33,11 +50,21 @@ from app.core.exceptions import (
 )
 from app.core.schemas import (
     VideoUploadRequest, AnalysisResponse, AnalysisDetailResponse,
-    AnalysisListResponse, ErrorResponse, ViewType, AnalysisStatus
+    AnalysisListResponse, ErrorResponse, ViewType, AnalysisStatus,
+    AnalysisStatusBatchRequest, AnalysisStatusBatchResponse,
+    UploadSessionCreateRequest, UploadSessionResponse, TERMINAL_STATUSES
 )
 
 router = APIRouter()
 
+# Server-Sent Events progress stream (GET /{analysis_id}/events)
+SSE_REFRESH_SECONDS = float(os.getenv("SSE_REFRESH_SECONDS", "2.0"))
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15.0"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+# Conditional GET: seconds a finished analysis may be served from the browser cache
+ANALYSIS_TERMINAL_MAX_AGE_SECONDS = int(os.getenv("ANALYSIS_TERMINAL_MAX_AGE_SECONDS", "30"))
+
 # Initialize services with error handling
 storage_service: Optional[AzureStorageService] = None
 vision_service: Optional[AzureVisionService] = None
@@ -155,6 +182,8 @@ async def diagnostics():
         if db_service:
             if hasattr(db_service, '_use_mock') and db_service._use_mock:
                 db_status = f"mock (storage file: {getattr(db_service, '_mock_storage_file', 'unknown')})"
+            elif getattr(db_service, '_use_sqlite', False):
+                db_status = f"sqlite (database file: {getattr(db_service, '_sqlite_db_file', 'unknown')})"
             elif hasattr(db_service, '_use_table') and db_service._use_table:
                 db_status = "azure_table"
             else:
@@ -173,6 +202,17 @@ async def diagnostics():
                 "storage": storage_status,
                 "vision": vision_status
             },
+            "disk_artifacts": get_artifact_janitor().get_metrics(),
+            "checkpoint_writer": get_checkpoint_writer().get_metrics(),
+            "progress_coalescer": get_progress_coalescer().get_metrics() if get_progress_coalescer() else None,
+            "status_cache": get_status_cache().get_metrics() if get_status_cache() else None,
+            "progress_bus": get_progress_bus().get_metrics(),
+            "payload_cache": get_payload_cache().get_metrics(),
+            "upload_sessions": get_upload_session_store().get_metrics(),
+            "blob_downloads": storage_service.get_metrics() if storage_service else None,
+            "video_cache": get_video_cache().get_metrics(),
+            "table_updates": dict(db_service._table_update_stats) if db_service and getattr(db_service, '_use_table', False) else None,
+            "sql_pool": db_service._sql_pool.get_metrics() if db_service and getattr(db_service, '_sql_pool', None) else None,
             "environment": {
                 "WEBSITE_SITE_NAME": os.getenv("WEBSITE_SITE_NAME", "unknown"),
                 "REGION_NAME": os.getenv("REGION_NAME", "unknown")
@@ -185,14 +225,14 @@ async def diagnostics():
 
 @router.post("/upload")
 async def upload_video(
+    request: Request,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     patient_id: Optional[str] = Query(None, max_length=100, description="Patient identifier"),
     view_type: str = Query("front", description="Camera view type"),
     reference_length_mm: Optional[float] = Query(None, gt=0, le=10000, description="Reference length in mm"),
     fps: float = Query(30.0, gt=0, le=120, description="Video frames per second"),
-    processing_fps: Optional[float] = Query(None, gt=0, le=60, description="Processing frame rate (frames per second to process). Lower = faster analysis, higher = more accurate. Default: auto-detect based on video length."),
-    request: Request,
-    background_tasks: BackgroundTasks
+    processing_fps: Optional[float] = Query(None, gt=0, le=60, description="Processing frame rate (frames per second to process). Lower = faster analysis, higher = more accurate. Default: auto-detect based on video length.")
 ) -> JSONResponse:
     """
     Upload video for gait analysis using Azure native services
@@ -219,6 +259,7 @@ async def upload_video(
     request_id = str(uuid.uuid4())[:8]
     upload_request_start = time.time()
     tmp_path = None
+    proxy_source = None
     video_url = None
     file_size = 0
     analysis_id = None
@@ -310,8 +351,10 @@ async def upload_video(
             
             # Create temp file with proper error handling
             try:
-                tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_ext)
+                tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_ext, prefix=TEMP_VIDEO_PREFIX)
                 tmp_path = tmp_file.name
+                # Protect the upload from the artifact janitor while it is in use
+                get_artifact_janitor().track(path=tmp_path)
                 logger.debug(f"[{request_id}] Created temp file: {tmp_path}")
             except OSError as e:
                 logger.error(f"[{request_id}] Failed to create temp file: {e}", exc_info=True)
@@ -320,6 +363,13 @@ async def upload_video(
                     detail=f"Failed to create temporary file for upload: {str(e)}"
                 )
             
+            # Generate the analysis ID up front: the blob is named after it and is written
+            # while the request body is still arriving
+            analysis_id = str(uuid.uuid4())
+            blob_name = f"{analysis_id}{file_ext}"
+            ingest = UploadIngest(tmp_file, storage_service if is_streaming_upload_enabled() else None, blob_name)
+            streamed_video_url = None
+            
             # Read file in chunks with size validation
             # OPTIMIZED: Use larger chunks for faster upload while still preventing memory issues
             # Increased from 256KB to 1MB for better throughput, especially for small files
@@ -334,10 +384,11 @@ async def upload_video(
                     file_size += len(chunk)
                     chunk_count += 1
                     
-                    # Write chunk immediately to reduce memory usage
+                    # Local write happens off the event loop; blocks are staged to blob storage as they fill
                     try:
-                        tmp_file.write(chunk)
+                        await ingest.write(chunk)
                     except (OSError, IOError) as write_error:
+                        await ingest.abort()
                         tmp_file.close()
                         if os.path.exists(tmp_path):
                             try:
@@ -366,6 +417,7 @@ async def upload_video(
                     
                     # Check file size limit
                     if file_size > MAX_FILE_SIZE:
+                        await ingest.abort()
                         tmp_file.close()
                         if os.path.exists(tmp_path):
                             try:
@@ -381,6 +433,11 @@ async def upload_video(
                             detail=f"File too large: {file_size / (1024*1024):.2f}MB. Maximum size: {MAX_FILE_SIZE / (1024*1024)}MB"
                         )
                 
+                # The body has ended: commit the staged blob right away
+                if file_size > 0:
+                    streamed_video_url = await ingest.finish()
+                else:
+                    await ingest.abort()
                 tmp_file.close()
                 
                 # Log successful upload completion
@@ -396,7 +453,8 @@ async def upload_video(
                         "path": tmp_path,
                         "upload_duration": upload_duration,
                         "upload_rate_mbps": upload_rate,
-                        "chunks": chunk_count
+                        "chunks": chunk_count,
+                        "streamed_to_blob": streamed_video_url is not None
                     }
                 )
                 
@@ -421,6 +479,10 @@ async def upload_video(
                     )
             except Exception as read_error:
                 # CRITICAL: Ensure file is closed even if error occurs
+                try:
+                    await ingest.abort()
+                except Exception:
+                    pass
                 try:
                     if tmp_file and not tmp_file.closed:
                         tmp_file.close()
@@ -451,8 +513,6 @@ async def upload_video(
                     detail="Uploaded file is empty"
                 )
             
-            # Generate analysis ID (already defined above, but assign here)
-            analysis_id = str(uuid.uuid4())
             logger.info(f"[{request_id}] Generated analysis ID: {analysis_id}")
             
             # CRITICAL: Create analysis record EARLY so we can update progress during upload
@@ -509,111 +569,8 @@ async def upload_video(
             # CRITICAL: Validate video quality BEFORE uploading to blob storage
             # This allows us to provide immediate feedback to user
             # NOTE: Validation is optional - if it fails, we continue without it
-            await update_upload_progress(10, '🔍 Validating video quality for gait analysis...')
-            logger.info(f"[{request_id}] 🔍 Validating video quality for gait analysis...")
-            quality_result = None
-            if tmp_path and os.path.exists(tmp_path):
-                try:
-                    # Import with error handling - if import fails, skip validation
-                    try:
-                        from app.services.video_quality_validator import VideoQualityValidator
-                    except ImportError as import_err:
-                        logger.warning(f"[{request_id}] ⚠️ VideoQualityValidator not available (import error: {import_err}) - skipping validation")
-                        quality_result = None
-                    except Exception as import_err:
-                        logger.warning(f"[{request_id}] ⚠️ Error importing VideoQualityValidator: {import_err} - skipping validation")
-                        quality_result = None
-                    else:
-                        # Import succeeded - try to use it with timeout
-                        try:
-                            # Get gait analysis service (defined in this module)
-                            # Wrap in try-except to handle any initialization errors
-                            try:
-                                gait_service = get_gait_analysis_service()
-                            except Exception as gait_service_error:
-                                logger.warning(f"[{request_id}] ⚠️ Failed to get gait analysis service for validation: {gait_service_error} - skipping validation")
-                                quality_result = None
-                                gait_service = None
-                            
-                            if gait_service is None:
-                                logger.warning(f"[{request_id}] ⚠️ Gait analysis service is None - skipping video quality validation")
-                                quality_result = None
-                            else:
-                                try:
-                                    validator = VideoQualityValidator(
-                                        pose_landmarker=gait_service.pose_landmarker if gait_service else None
-                                    )
-                                except Exception as validator_init_error:
-                                    logger.warning(f"[{request_id}] ⚠️ Failed to initialize VideoQualityValidator: {validator_init_error} - skipping validation")
-                                    quality_result = None
-                                    validator = None
-                                
-                                if validator is not None:
-                                    # OPTIMIZED: Add timeout to prevent blocking (max 10 seconds)
-                                    # If validation takes too long, skip it to prevent 502 timeout
-                                    validation_timeout = 10.0  # 10 seconds max
-                                    validation_start = time.time()
-                                    
-                                    await update_upload_progress(15, '🔍 Analyzing video frames for quality assessment...')
-                                    try:
-                                        quality_result = await asyncio.wait_for(
-                                            asyncio.to_thread(
-                                                validator.validate_video_for_gait_analysis,
-                                                video_path=tmp_path,
-                                                view_type=str(view_type),
-                                                sample_frames=20
-                                            ),
-                                            timeout=validation_timeout
-                                        )
-                                        validation_duration = time.time() - validation_start
-                                        logger.info(f"[{request_id}] ✅ Video quality validation completed in {validation_duration:.1f}s")
-                                        
-                                        # Update progress with validation results
-                                        quality_score = quality_result.get('quality_score', 0) if quality_result else 0
-                                        if quality_result:
-                                            await update_upload_progress(25, f'✅ Video quality validated: {quality_score:.0f}% - {"Good" if quality_score >= 60 else "May affect accuracy"}')
-                                        else:
-                                            await update_upload_progress(25, '✅ Video quality validation skipped (timeout)')
-                                    except asyncio.TimeoutError:
-                                        validation_duration = time.time() - validation_start
-                                        logger.warning(f"[{request_id}] ⚠️ Video quality validation timed out after {validation_duration:.1f}s - skipping to prevent upload timeout")
-                                        await update_upload_progress(25, '⚠️ Video quality validation timed out - continuing with upload...')
-                                        quality_result = None
-                                    except Exception as validation_thread_error:
-                                        logger.warning(f"[{request_id}] ⚠️ Video quality validation error: {validation_thread_error} - skipping")
-                                        await update_upload_progress(25, '⚠️ Video quality validation error - continuing with upload...')
-                                        quality_result = None
-                                    
-                                    if quality_result:
-                                        logger.info(f"[{request_id}] 🔍 Video quality validation results:")
-                                        logger.info(f"[{request_id}] 🔍   - Quality score: {quality_result.get('quality_score', 0):.1f}%")
-                                        logger.info(f"[{request_id}] 🔍   - Is valid: {quality_result.get('is_valid', False)}")
-                                        logger.info(f"[{request_id}] 🔍   - Pose detection rate: {quality_result.get('pose_detection_rate', 0)*100:.1f}%")
-                                        logger.info(f"[{request_id}] 🔍   - Critical joints detected: {quality_result.get('critical_joints_detected', False)}")
-                                        logger.info(f"[{request_id}] 🔍   - Issues found: {len(quality_result.get('issues', []))}")
-                                        
-                                        if quality_result.get('issues'):
-                                            logger.warning(f"[{request_id}] ⚠️ Video quality issues detected:")
-                                            for issue in quality_result.get('issues', []):
-                                                logger.warning(f"[{request_id}] ⚠️   - {issue}")
-                                        
-                                        if not quality_result.get('is_valid', False):
-                                            logger.error(f"[{request_id}] ❌❌❌ VIDEO QUALITY INSUFFICIENT FOR ACCURATE GAIT ANALYSIS ❌❌❌")
-                                            logger.error(f"[{request_id}] Quality score: {quality_result.get('quality_score', 0):.1f}% (minimum: 60%)")
-                                            logger.error(f"[{request_id}] Top recommendations:")
-                                            for rec in quality_result.get('recommendations', [])[:3]:
-                                                logger.error(f"[{request_id}]   - {rec}")
-                        except Exception as validation_error:
-                            logger.warning(f"[{request_id}] Video quality validation failed (non-critical): {validation_error}", exc_info=True)
-                            logger.warning(f"[{request_id}] Processing will continue, but video quality is unknown")
-                            quality_result = None
-                except Exception as outer_error:
-                    # Catch any unexpected errors in the validation block
-                    logger.warning(f"[{request_id}] Unexpected error during video quality validation: {outer_error}", exc_info=True)
-                    logger.warning(f"[{request_id}] Processing will continue without quality validation")
-                    quality_result = None
-            else:
-                logger.warning(f"[{request_id}] ⚠️ Cannot validate video quality - temp file not accessible")
+            quality_result = await _validate_upload_quality(request_id, tmp_path, view_type, update_upload_progress,
+                                                            processing_fps)
             
             # Upload to Azure Blob Storage (or keep temp file in mock mode)
             # OPTIMIZED: Add timeout handling to prevent 502 errors
@@ -624,9 +581,9 @@ async def upload_video(
                     await update_upload_progress(50, '📁 Using local file storage (mock mode)...')
                     video_url = tmp_path  # Use temp file directly in mock mode
                 else:
-                    blob_name = f"{analysis_id}{file_ext}"
                     logger.debug(f"[{request_id}] Uploading to blob storage: {blob_name}")
-                    await update_upload_progress(35, f'☁️ Uploading video to Azure Blob Storage: {blob_name}...')
+                    if not streamed_video_url:
+                        await update_upload_progress(35, f'☁️ Uploading video to Azure Blob Storage: {blob_name}...')
                     
                     # OPTIMIZED: Add timeout for blob upload (max 60 seconds)
                     # This prevents the entire request from timing out
@@ -634,7 +591,8 @@ async def upload_video(
                     blob_upload_start = time.time()
                     
                     try:
-                        video_url = await asyncio.wait_for(
+                        # Already committed while the body was received (streaming ingestion)
+                        video_url = streamed_video_url or await asyncio.wait_for(
                             storage_service.upload_video(tmp_path, blob_name),
                             timeout=blob_upload_timeout
                         )
@@ -660,8 +618,17 @@ async def upload_video(
                         video_url = tmp_path
                         logger.info(f"[{request_id}] Mock mode: Using temp file directly")
                     elif video_url:
+                        await _store_upload_artifacts(request_id, tmp_path, None, blob_name, blob_stored=video_url != tmp_path,
+                                                      blob_upload_timeout=blob_upload_timeout)
+                        if is_proxy_enabled() and video_url != tmp_path:
+                            # The proxy job transcodes the temp file once the record exists and removes it afterwards
+                            proxy_source, tmp_path = tmp_path, None
+                    if tmp_path and video_url != tmp_path:
                         # Real storage - clean up temp file
                         try:
+                            for sidecar_path in (frame_index_path(tmp_path), sample_detections_path(tmp_path)):
+                                if os.path.exists(sidecar_path):
+                                    os.unlink(sidecar_path)
                             os.unlink(tmp_path)
                             tmp_path = None
                             logger.debug(f"[{request_id}] Cleaned up temp file after blob upload")
@@ -690,35 +657,7 @@ async def upload_video(
             try:
                 # Include quality validation results in analysis data
                 # Note: If we created the record early, this will update it
-                analysis_data = {
-                    'id': analysis_id,
-                    'patient_id': patient_id,
-                    'filename': file.filename,
-                    'video_url': video_url,
-                    'status': 'processing',
-                    'current_step': 'pose_estimation',
-                    'step_progress': 0,
-                    'step_message': 'Upload complete. Starting analysis...'
-                }
-                
-                # Add quality validation results if available
-                if quality_result:
-                    analysis_data.update({
-                        'video_quality_score': quality_result.get('quality_score', 0),
-                        'video_quality_valid': quality_result.get('is_valid', False),
-                        'video_quality_issues': quality_result.get('issues', []),
-                        'video_quality_recommendations': quality_result.get('recommendations', []),
-                        'pose_detection_rate': quality_result.get('pose_detection_rate', 0)
-                    })
-                    
-                    # Update step message with quality info
-                    quality_score = quality_result.get('quality_score', 0)
-                    if quality_score < 60:
-                        analysis_data['step_message'] = f'Upload complete. Video quality: {quality_score:.0f}% - May affect accuracy. Starting analysis...'
-                    elif quality_score < 80:
-                        analysis_data['step_message'] = f'Upload complete. Video quality: {quality_score:.0f}% - Good. Starting analysis...'
-                    else:
-                        analysis_data['step_message'] = f'Upload complete. Video quality: {quality_score:.0f}% - Excellent. Starting analysis...'
+                analysis_data = _uploaded_analysis_data(analysis_id, patient_id, file.filename, video_url, quality_result)
                 
                 await update_upload_progress(70, '💾 Saving analysis metadata to database...')
                 logger.error(f"[{request_id}] About to call db_service.create_analysis")
@@ -761,10 +700,11 @@ async def upload_video(
                 # CRITICAL: Verify the analysis is immediately readable before returning
                 # Check which database backend is being used
                 use_table_storage = hasattr(db_service, '_use_table') and db_service._use_table
-                use_sql = not use_table_storage and not db_service._use_mock
+                use_sqlite = getattr(db_service, '_use_sqlite', False)
+                use_sql = not use_table_storage and not db_service._use_mock and not use_sqlite
                 use_mock = db_service._use_mock
                 
-                logger.info(f"[{request_id}] Database backend: Table Storage={use_table_storage}, SQL={use_sql}, Mock={use_mock}")
+                logger.info(f"[{request_id}] Database backend: Table Storage={use_table_storage}, SQL={use_sql}, SQLite={use_sqlite}, Mock={use_mock}")
                 
                 # For mock storage: Verify in-memory storage (source of truth)
                 if use_mock:
@@ -964,6 +904,11 @@ async def upload_video(
                     background_tasks.add_task(wrapped_process_analysis)
                     logger.info(f"[{request_id}] ✅ Background task scheduled via background_tasks.add_task")
                 
+                # The record exists: transcode the analysis proxy off the request path
+                if proxy_source:
+                    _start_proxy_job(request_id, proxy_source, blob_name)
+                    proxy_source = None
+                
                 logger.error(f"[{request_id}] ✅✅✅ BACKGROUND TASK SCHEDULED ✅✅✅")
                 logger.info(f"[{request_id}] ✅ Background processing task scheduled for analysis {analysis_id}", extra={"analysis_id": analysis_id})
                 logger.info(f"[{request_id}] ✅ Upload complete - analysis {analysis_id} should be visible immediately")
@@ -1108,11 +1053,662 @@ async def upload_video(
                         logger.debug(f"[{request_id}] Cleaned up unused temp file")
                     except OSError as e:
                         logger.warning(f"[{request_id}] Failed to clean up temp file in finally: {e}")
+            # In mock mode the temp file is the analysis video - processing releases it when done
+            if tmp_path and video_url != tmp_path:
+                get_artifact_janitor().release(path=tmp_path)
+            # The upload failed before the proxy job took over the temp file
+            if proxy_source:
+                for local_file in (proxy_source, frame_index_path(proxy_source), sample_detections_path(proxy_source)):
+                    if os.path.exists(local_file):
+                        os.unlink(local_file)
+                get_artifact_janitor().release(path=proxy_source)
         except Exception as cleanup_error:
             # Don't let cleanup errors mask original error
             logger.warning(f"[{request_id}] Error during cleanup: {cleanup_error}")
 
 
+async def _validate_upload_quality(
+    request_id: str,
+    video_path: Optional[str],
+    view_type: str,
+    update_progress,
+    processing_fps: Optional[float] = None
+) -> Optional[dict]:
+    """
+    Check whether an uploaded video is usable for gait analysis (optional - never raises)
+    
+    Args:
+        video_path: Local video to sample (the analysis proxy when there is one)
+        update_progress: async (progress, message) callback for the upload record
+        processing_fps: Processing frame rate requested for the analysis (sample detections follow its frame grid)
+        
+    Returns:
+        Quality result of VideoQualityValidator, or None if validation was skipped or failed
+    """
+    await update_progress(10, '🔍 Validating video quality for gait analysis...')
+    logger.info(f"[{request_id}] 🔍 Validating video quality for gait analysis...")
+    quality_result = None
+    if video_path and os.path.exists(video_path):
+        try:
+            # Import with error handling - if import fails, skip validation
+            try:
+                from app.services.video_quality_validator import VideoQualityValidator
+            except ImportError as import_err:
+                logger.warning(f"[{request_id}] ⚠️ VideoQualityValidator not available (import error: {import_err}) - skipping validation")
+                quality_result = None
+            except Exception as import_err:
+                logger.warning(f"[{request_id}] ⚠️ Error importing VideoQualityValidator: {import_err} - skipping validation")
+                quality_result = None
+            else:
+                # Import succeeded - try to use it with timeout
+                try:
+                    # Get gait analysis service (defined in this module)
+                    # Wrap in try-except to handle any initialization errors
+                    try:
+                        gait_service = get_gait_analysis_service()
+                    except Exception as gait_service_error:
+                        logger.warning(f"[{request_id}] ⚠️ Failed to get gait analysis service for validation: {gait_service_error} - skipping validation")
+                        quality_result = None
+                        gait_service = None
+
+                    if gait_service is None:
+                        logger.warning(f"[{request_id}] ⚠️ Gait analysis service is None - skipping video quality validation")
+                        quality_result = None
+                    else:
+                        try:
+                            validator = VideoQualityValidator(
+                                pose_landmarker=gait_service.pose_landmarker if gait_service else None,
+                                gait_service=gait_service
+                            )
+                        except Exception as validator_init_error:
+                            logger.warning(f"[{request_id}] ⚠️ Failed to initialize VideoQualityValidator: {validator_init_error} - skipping validation")
+                            quality_result = None
+                            validator = None
+
+                        if validator is not None:
+                            # OPTIMIZED: Add timeout to prevent blocking (max 10 seconds)
+                            # If validation takes too long, skip it to prevent 502 timeout
+                            validation_timeout = 10.0  # 10 seconds max
+                            validation_start = time.time()
+
+                            await update_progress(15, '🔍 Analyzing video frames for quality assessment...')
+                            try:
+                                quality_result = await asyncio.wait_for(
+                                    asyncio.to_thread(
+                                        validator.validate_video_for_gait_analysis,
+                                        video_path=video_path,
+                                        view_type=str(view_type),
+                                        sample_frames=20,
+                                        processing_fps=processing_fps
+                                    ),
+                                    timeout=validation_timeout
+                                )
+                                validation_duration = time.time() - validation_start
+                                logger.info(f"[{request_id}] ✅ Video quality validation completed in {validation_duration:.1f}s")
+
+                                # Update progress with validation results
+                                quality_score = quality_result.get('quality_score', 0) if quality_result else 0
+                                if quality_result:
+                                    await update_progress(25, f'✅ Video quality validated: {quality_score:.0f}% - {"Good" if quality_score >= 60 else "May affect accuracy"}')
+                                else:
+                                    await update_progress(25, '✅ Video quality validation skipped (timeout)')
+                            except asyncio.TimeoutError:
+                                validation_duration = time.time() - validation_start
+                                logger.warning(f"[{request_id}] ⚠️ Video quality validation timed out after {validation_duration:.1f}s - skipping to prevent upload timeout")
+                                await update_progress(25, '⚠️ Video quality validation timed out - continuing with upload...')
+                                quality_result = None
+                            except Exception as validation_thread_error:
+                                logger.warning(f"[{request_id}] ⚠️ Video quality validation error: {validation_thread_error} - skipping")
+                                await update_progress(25, '⚠️ Video quality validation error - continuing with upload...')
+                                quality_result = None
+
+                            if quality_result:
+                                logger.info(f"[{request_id}] 🔍 Video quality validation results:")
+                                logger.info(f"[{request_id}] 🔍   - Quality score: {quality_result.get('quality_score', 0):.1f}%")
+                                logger.info(f"[{request_id}] 🔍   - Is valid: {quality_result.get('is_valid', False)}")
+                                logger.info(f"[{request_id}] 🔍   - Pose detection rate: {quality_result.get('pose_detection_rate', 0)*100:.1f}%")
+                                logger.info(f"[{request_id}] 🔍   - Critical joints detected: {quality_result.get('critical_joints_detected', False)}")
+                                logger.info(f"[{request_id}] 🔍   - Issues found: {len(quality_result.get('issues', []))}")
+
+                                if quality_result.get('issues'):
+                                    logger.warning(f"[{request_id}] ⚠️ Video quality issues detected:")
+                                    for issue in quality_result.get('issues', []):
+                                        logger.warning(f"[{request_id}] ⚠️   - {issue}")
+
+                                if not quality_result.get('is_valid', False):
+                                    logger.error(f"[{request_id}] ❌❌❌ VIDEO QUALITY INSUFFICIENT FOR ACCURATE GAIT ANALYSIS ❌❌❌")
+                                    logger.error(f"[{request_id}] Quality score: {quality_result.get('quality_score', 0):.1f}% (minimum: 60%)")
+                                    logger.error(f"[{request_id}] Top recommendations:")
+                                    for rec in quality_result.get('recommendations', [])[:3]:
+                                        logger.error(f"[{request_id}]   - {rec}")
+                except Exception as validation_error:
+                    logger.warning(f"[{request_id}] Video quality validation failed (non-critical): {validation_error}", exc_info=True)
+                    logger.warning(f"[{request_id}] Processing will continue, but video quality is unknown")
+                    quality_result = None
+        except Exception as outer_error:
+            # Catch any unexpected errors in the validation block
+            logger.warning(f"[{request_id}] Unexpected error during video quality validation: {outer_error}", exc_info=True)
+            logger.warning(f"[{request_id}] Processing will continue without quality validation")
+            quality_result = None
+    else:
+        logger.warning(f"[{request_id}] ⚠️ Cannot validate video quality - video file not accessible")
+    return quality_result
+
+
+def _uploaded_analysis_data(
+    analysis_id: str,
+    patient_id: Optional[str],
+    filename: str,
+    video_url: str,
+    quality_result: Optional[dict]
+) -> dict:
+    """Analysis record of a stored upload, ready for processing (with the quality validation results)"""
+    analysis_data = {
+        'id': analysis_id,
+        'patient_id': patient_id,
+        'filename': filename,
+        'video_url': video_url,
+        'status': 'processing',
+        'current_step': 'pose_estimation',
+        'step_progress': 0,
+        'step_message': 'Upload complete. Starting analysis...'
+    }
+
+    # Add quality validation results if available
+    if quality_result:
+        analysis_data.update({
+            'video_quality_score': quality_result.get('quality_score', 0),
+            'video_quality_valid': quality_result.get('is_valid', False),
+            'video_quality_issues': quality_result.get('issues', []),
+            'video_quality_recommendations': quality_result.get('recommendations', []),
+            'pose_detection_rate': quality_result.get('pose_detection_rate', 0)
+        })
+
+        # Update step message with quality info
+        quality_score = quality_result.get('quality_score', 0)
+        if quality_score < 60:
+            analysis_data['step_message'] = f'Upload complete. Video quality: {quality_score:.0f}% - May affect accuracy. Starting analysis...'
+        elif quality_score < 80:
+            analysis_data['step_message'] = f'Upload complete. Video quality: {quality_score:.0f}% - Good. Starting analysis...'
+        else:
+            analysis_data['step_message'] = f'Upload complete. Video quality: {quality_score:.0f}% - Excellent. Starting analysis...'
+    
+    return analysis_data
+
+
+async def _store_upload_artifacts(
+    request_id: str,
+    video_path: str,
+    proxy_path: Optional[str],
+    blob_name: str,
+    blob_stored: bool = True,
+    blob_upload_timeout: float = 60.0
+) -> None:
+    """
+    Store what the upload produced next to the video blob: the validator's sample detections
+    and, if one was created, the analysis proxy; keep local copies in the video cache
+    
+    Args:
+        video_path: Local copy of the uploaded video
+        proxy_path: Local analysis proxy (removed afterwards), or None
+        blob_name: Name of the video blob
+        blob_stored: False if the video only exists locally (blob upload failed)
+    """
+    # Keep the local copy for processing on this instance (skips downloading it again)
+    if is_video_cache_enabled() and blob_stored:
+        await get_video_cache().put(blob_name, video_path, storage_service)
+    # Store validator detections next to the blob they were decoded from, for reuse by processing
+    validated_path = proxy_path or video_path
+    detections_file = sample_detections_path(validated_path)
+    if os.path.exists(detections_file):
+        validated_blob = proxy_blob_name(blob_name) if proxy_path else blob_name
+        try:
+            await asyncio.wait_for(
+                storage_service.upload_video(detections_file, sample_detections_path(validated_blob)),
+                timeout=blob_upload_timeout
+            )
+            logger.info(f"[{request_id}] ✅ Sample detections uploaded: {sample_detections_path(validated_blob)}")
+        except Exception as detections_upload_error:
+            logger.warning(f"[{request_id}] ⚠️ Sample detections upload failed (non-critical): {detections_upload_error}")
+    if proxy_path and blob_stored:
+        await _store_analysis_proxy(request_id, proxy_path, blob_name, blob_upload_timeout)
+    elif proxy_path:
+        _remove_local_proxy(proxy_path)
+
+
+async def _store_analysis_proxy(
+    request_id: str,
+    proxy_path: str,
+    blob_name: str,
+    blob_upload_timeout: Optional[float] = 60.0
+) -> bool:
+    """
+    Upload an analysis proxy next to the original blob and remove the local proxy files
+    
+    The sidecar goes up last: processing only uses a proxy blob once its sidecar exists,
+    so it never picks up a proxy that is still being uploaded.
+    
+    Returns:
+        True if the proxy and its sidecar were uploaded
+    """
+    try:
+        await asyncio.wait_for(
+            storage_service.upload_video(proxy_path, proxy_blob_name(blob_name)),
+            timeout=blob_upload_timeout
+        )
+        if is_video_cache_enabled():
+            await get_video_cache().put(proxy_blob_name(blob_name), proxy_path, storage_service)
+        await asyncio.wait_for(
+            storage_service.upload_video(proxy_meta_path(proxy_path), proxy_meta_path(proxy_blob_name(blob_name))),
+            timeout=blob_upload_timeout
+        )
+        logger.info(f"[{request_id}] ✅ Analysis proxy uploaded: {proxy_blob_name(blob_name)}")
+        return True
+    except Exception as proxy_upload_error:
+        logger.warning(f"[{request_id}] ⚠️ Analysis proxy upload failed (non-critical): {proxy_upload_error}")
+        return False
+    finally:
+        _remove_local_proxy(proxy_path)
+
+
+def _remove_local_proxy(proxy_path: str) -> None:
+    for proxy_file in (proxy_path, proxy_meta_path(proxy_path), frame_index_path(proxy_path),
+                       sample_detections_path(proxy_path)):
+        try:
+            os.unlink(proxy_file)
+        except OSError:
+            pass
+
+
+# Running proxy jobs (asyncio only keeps weak references to tasks)
+_proxy_jobs: set = set()
+
+
+def _start_proxy_job(request_id: str, video_path: str, blob_name: str) -> None:
+    """Create and store the analysis proxy of an uploaded video without holding up the upload request"""
+    task = asyncio.create_task(_create_proxy_in_background(request_id, video_path, blob_name))
+    _proxy_jobs.add(task)
+    task.add_done_callback(_proxy_jobs.discard)
+
+
+async def _create_proxy_in_background(request_id: str, video_path: str, blob_name: str) -> None:
+    """
+    Transcode the analysis proxy (resampled, downscaled, short GOP) from the local copy of an
+    uploaded video and store it next to the blob
+    
+    Processing that starts before the proxy sidecar is stored decodes the original; later
+    passes (re-analysis, retries) use the proxy. The local copy is removed afterwards.
+    
+    Args:
+        video_path: Local copy of the uploaded video (owned by this job)
+        blob_name: Name of the video blob
+    """
+    try:
+        proxy_path = await asyncio.to_thread(create_analysis_proxy, video_path)
+        if proxy_path:
+            await _store_analysis_proxy(request_id, proxy_path, blob_name, blob_upload_timeout=None)
+    except Exception as proxy_error:
+        logger.warning(f"[{request_id}] ⚠️ Analysis proxy creation failed (non-critical): {proxy_error}")
+    finally:
+        for local_file in (video_path, frame_index_path(video_path), sample_detections_path(video_path)):
+            try:
+                os.unlink(local_file)
+            except OSError:
+                pass
+        get_artifact_janitor().release(path=video_path)
+
+
+async def _upload_session_or_404(upload_id: str) -> dict:
+    session = await asyncio.to_thread(get_upload_session_store().get, upload_id, storage_service)
+    if session is None:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "NOT_FOUND",
+                "message": f"Upload session {upload_id} not found or expired",
+                "details": {"upload_id": upload_id}
+            }
+        )
+    return session
+
+
+@router.post(
+    "/uploads",
+    response_model=UploadSessionResponse,
+    status_code=201,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid file name, size or chunk size"}
+    }
+)
+async def create_upload_session(body: UploadSessionCreateRequest) -> JSONResponse:
+    """
+    Start a resumable upload (for videos too large to send within one request)
+    
+    The client then PUTs every chunk to /uploads/{upload_id}/chunks/{index} (in parallel,
+    in any order), re-sends failed chunks, and finally POSTs /uploads/{upload_id}/commit,
+    which starts the analysis. GET /uploads/{upload_id} lists the chunks still missing
+    after an interruption. Any instance can serve any of these requests.
+    
+    Args:
+        body: File name and size, optional chunk size and the analysis parameters
+        
+    Returns:
+        UploadSessionResponse with the upload_id and chunk layout
+    """
+    store = get_upload_session_store()
+    params = body.model_dump(exclude={'filename', 'size', 'chunk_size'})
+    try:
+        session = await asyncio.to_thread(store.create, body.filename, body.size, params, body.chunk_size, storage_service)
+    except (ValidationError, StorageError) as e:
+        raise gait_error_to_http(e)
+    return FastJSONResponse(status_code=201, content=await asyncio.to_thread(store.describe, session, storage_service))
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse, responses={404: {"model": ErrorResponse}})
+async def get_upload_session(upload_id: str) -> JSONResponse:
+    """State of a resumable upload (received and missing chunks)"""
+    session = await _upload_session_or_404(upload_id)
+    describe = get_upload_session_store().describe
+    return FastJSONResponse(content=await asyncio.to_thread(describe, session, storage_service), headers={"Cache-Control": "no-store"})
+
+
+@router.put(
+    "/uploads/{upload_id}/chunks/{index}",
+    responses={
+        400: {"model": ErrorResponse, "description": "Wrong length, index or checksum"},
+        404: {"model": ErrorResponse, "description": "Upload session not found"}
+    }
+)
+async def put_upload_chunk(upload_id: str, index: int, request: Request) -> JSONResponse:
+    """
+    Upload one chunk of a resumable upload (idempotent: a retried chunk replaces the old one)
+    
+    The raw request body is the chunk. The Upload-Checksum header ('sha256 <base64 digest>';
+    sha1 and md5 are accepted too) is verified before the chunk is stored, and the chunk
+    is staged as a block of the final blob right away.
+    
+    Args:
+        upload_id: Session from POST /uploads
+        index: Zero-based chunk index
+        
+    Returns:
+        JSONResponse with the index and size of the stored chunk
+    """
+    session = await _upload_session_or_404(upload_id)
+    store = get_upload_session_store()
+    try:
+        checksum = parse_checksum(request.headers.get("upload-checksum"))
+        expected_length = store.chunk_length(session, index)
+        data = bytearray()
+        async for part in request.stream():
+            data += part
+            if len(data) > expected_length:
+                raise ValidationError(
+                    f"Chunk {index} exceeds its expected length of {expected_length} bytes",
+                    field="body",
+                    details={"index": index, "expected": expected_length}
+                )
+        marker = await store.put_chunk(session, index, bytes(data), checksum, storage_service)
+    except ValidationError as e:
+        raise gait_error_to_http(e)
+    return FastJSONResponse(content={"upload_id": upload_id, "index": index, "size": marker['length'], "staged": marker['staged']})
+
+
+@router.post(
+    "/uploads/{upload_id}/commit",
+    responses={
+        400: {"model": ErrorResponse, "description": "Chunks are missing"},
+        404: {"model": ErrorResponse, "description": "Upload session not found"},
+        409: {"model": ErrorResponse, "description": "Commit already in progress"}
+    }
+)
+async def commit_upload_session(upload_id: str, background_tasks: BackgroundTasks) -> JSONResponse:
+    """
+    Finish a resumable upload and start the analysis
+    
+    The request only commits the staged blocks as the video blob and creates the
+    analysis record. Everything slow (analysis proxy, quality validation and, if some
+    chunk could not be staged, uploading the assembled video) runs in a background
+    stage after the response, which then starts the analysis.
+    Retrying a finished commit returns the same response.
+    
+    Returns:
+        JSONResponse with analysis_id and status (as POST /upload)
+    """
+    session = await _upload_session_or_404(upload_id)
+    store = get_upload_session_store()
+    committed = await asyncio.to_thread(store.committed_response, upload_id, storage_service)
+    if committed is not None:
+        return JSONResponse(committed)
+    if db_service is None:
+        raise HTTPException(status_code=503, detail="Database service is not available")
+    try:
+        locked = await asyncio.to_thread(store.begin_commit, upload_id, storage_service)
+    except StorageError as e:
+        raise gait_error_to_http(e)
+    if not locked:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "error": "CONFLICT",
+                "message": f"Upload session {upload_id} is already being committed",
+                "details": {"upload_id": upload_id}
+            }
+        )
+    request_id = str(uuid.uuid4())[:8]
+    analysis_id = session['analysis_id']
+    params = session['params']
+    response_content = None
+    try:
+        try:
+            video_url = await store.assemble(session, storage_service)
+        except (ValidationError, StorageError) as e:
+            raise gait_error_to_http(e)
+        created = await db_service.create_analysis({
+            'id': analysis_id,
+            'patient_id': params.get('patient_id'),
+            'filename': session['filename'],
+            'video_url': video_url or 'pending',
+            'status': 'uploading',
+            'current_step': 'upload',
+            'step_progress': 5,
+            'step_message': '📤 Upload received. Preparing video for analysis...'
+        })
+        if not created:
+            raise HTTPException(status_code=500, detail="Failed to create analysis record")
+        background_tasks.add_task(_process_upload_session, session, video_url, request_id)
+        logger.info(f"[{request_id}] ✅ Upload session {upload_id} committed as analysis {analysis_id} - preparing video in background")
+        response_content = {
+            "analysis_id": analysis_id,
+            "status": "processing",
+            "message": "Video uploaded successfully. Analysis in progress.",
+            "patient_id": params.get('patient_id'),
+            "created_at": datetime.utcnow().isoformat()
+        }
+        return JSONResponse(response_content)
+    finally:
+        # A failed commit can be retried; a successful one is remembered for retries
+        await asyncio.to_thread(store.end_commit, upload_id, response_content, storage_service)
+
+
+async def _process_upload_session(session: dict, video_url: Optional[str], request_id: str) -> None:
+    """
+    Background stage of a committed upload session: store the video if commit could not,
+    create the analysis proxy, validate the video quality, then run the analysis
+    
+    The session's scratch file is used in place when this instance received every chunk;
+    otherwise the committed blob is fetched once (from the video cache if possible).
+    
+    Args:
+        session: Committed upload session
+        video_url: URL of the committed blob, or None if it still has to be uploaded
+        request_id: Request ID of the commit (for logs)
+    """
+    store = get_upload_session_store()
+    analysis_id = session['analysis_id']
+    blob_name = session['blob_name']
+    params = session['params']
+    view_type = str(params.get('view_type', 'front'))
+    scratch_path = store.data_path(session)
+    video_path = scratch_path
+    downloaded_path = None
+    
+    async def update_progress(progress: int, message: str):
+        try:
+            await db_service.update_analysis(analysis_id, {
+                'status': 'uploading',
+                'current_step': 'upload',
+                'step_progress': progress,
+                'step_message': message
+            })
+        except Exception as update_err:
+            logger.debug(f"[{request_id}] Failed to update upload progress: {update_err} (non-critical)")
+    
+    try:
+        if not await asyncio.to_thread(store.has_local_data, session):
+            # Chunks came in through several instances: the committed blob is the only complete copy
+            await update_progress(6, '📥 Fetching uploaded video...')
+            downloaded_path = os.path.join(tempfile.gettempdir(), f"{TEMP_VIDEO_PREFIX}{analysis_id}{Path(blob_name).suffix}")
+            get_artifact_janitor().track(path=downloaded_path)
+            size, download = await _start_video_download(blob_name, downloaded_path, request_id)
+            if download is not None:
+                size = await asyncio.to_thread(download.wait)
+            if not size:
+                raise StorageError(f"Could not fetch uploaded video {blob_name}")
+            video_path = downloaded_path
+        
+        if video_url is None:
+            # Some chunk could not be staged: this instance holds the complete file
+            await update_progress(7, '☁️ Uploading video to cloud storage...')
+            video_url = await storage_service.upload_video(video_path, blob_name) if storage_service else None
+            if not video_url or video_url.startswith('mock://'):
+                video_url = video_path  # Mock mode: the scratch file is the analysis video
+        
+        proxy_path = None
+        if is_proxy_enabled():
+            await update_progress(8, '🎞️ Creating analysis proxy...')
+            try:
+                proxy_path = await asyncio.to_thread(create_analysis_proxy, video_path)
+            except Exception as proxy_error:
+                logger.warning(f"[{request_id}] ⚠️ Analysis proxy creation failed (non-critical): {proxy_error}")
+        quality_result = await _validate_upload_quality(request_id, proxy_path or video_path, view_type, update_progress,
+                                                        params.get('processing_fps'))
+        if video_url != video_path:
+            await _store_upload_artifacts(request_id, video_path, proxy_path, blob_name)
+        
+        creation_success = await db_service.create_analysis(
+            _uploaded_analysis_data(analysis_id, params.get('patient_id'), session['filename'], video_url, quality_result)
+        )
+        if not creation_success:
+            raise DatabaseError("Failed to update analysis record - create_analysis returned False")
+    except Exception as e:
+        logger.error(f"[{request_id}] ❌ Preparing uploaded video of analysis {analysis_id} failed: {e}", exc_info=True)
+        try:
+            await db_service.update_analysis(analysis_id, {
+                'status': 'failed',
+                'step_message': f'Failed to store uploaded video: {str(e)[:200]}'
+            })
+        except Exception:
+            pass
+        video_url = None
+    finally:
+        # Stored in blob storage (and the video cache): the local copies are no longer needed
+        if video_url != scratch_path:
+            await asyncio.to_thread(store.release_data, session)
+        if downloaded_path:
+            get_artifact_janitor().release(path=downloaded_path)
+            if video_url != downloaded_path:
+                for local_file in (downloaded_path, frame_index_path(downloaded_path), sample_detections_path(downloaded_path)):
+                    try:
+                        os.unlink(local_file)
+                    except OSError:
+                        pass
+    if video_url is None:
+        return
+    
+    await process_analysis_azure(
+        analysis_id,
+        video_url,
+        params.get('patient_id'),
+        view_type,
+        params.get('reference_length_mm'),
+        params.get('fps', 30.0),
+        params.get('processing_fps')
+    )
+    if video_url == scratch_path:
+        await asyncio.to_thread(store.release_data, session)
+
+
+@router.delete("/uploads/{upload_id}", status_code=204, responses={404: {"model": ErrorResponse}})
+async def delete_upload_session(upload_id: str) -> Response:
+    """Abort a resumable upload and discard its chunks"""
+    await _upload_session_or_404(upload_id)
+    await asyncio.to_thread(get_upload_session_store().delete, upload_id, storage_service)
+    return Response(status_code=204)
+
+
+async def _start_video_download(
+    blob_name: str,
+    file_path: str,
+    request_id: str
+) -> Tuple[Optional[int], Optional[ProgressiveDownload]]:
+    """
+    Place a video blob at file_path: from the local video cache, progressively when its layout allows it,
+    or with a full download
+    
+    Returns:
+        (size in bytes or None if the download failed, running ProgressiveDownload or None).
+        With a ProgressiveDownload the file is still being written - decode through it.
+    """
+    # Uploaded through this instance: the video is usually still on local disk
+    if is_video_cache_enabled():
+        cached_size = await get_video_cache().fetch(blob_name, file_path, storage_service)
+        if cached_size:
+            return cached_size, None
+    if is_progressive_download_enabled():
+        download = await storage_service.start_progressive_download(blob_name, file_path)
+        if download:
+            logger.info(f"[{request_id}] 📥 Streaming {blob_name} - analysis starts while it downloads")
+            return download.size, download
+    return await storage_service.download_blob_to_file(blob_name, file_path), None
+
+
+async def _download_analysis_proxy(
+    blob_name: str,
+    video_path: str,
+    processing_fps: Optional[float],
+    request_id: str
+) -> Optional[Tuple[str, Optional[ProgressiveDownload]]]:
+    """
+    Download the analysis proxy for a blob next to video_path, together with its sidecar
+    
+    Returns:
+        (local proxy path, ProgressiveDownload if it is still arriving), or None if there is
+        no usable proxy (caller downloads the original)
+    """
+    try:
+        meta_data = await storage_service.download_blob(proxy_meta_path(proxy_blob_name(blob_name)))
+        if not meta_data:
+            return None
+        proxy_local_path = proxy_path_for(video_path)
+        meta = json.loads(meta_data)
+        if processing_fps and processing_fps > meta.get('fps', 0) + 0.01:
+            logger.info(f"[{request_id}] Requested {processing_fps} fps exceeds proxy {meta.get('fps')} fps - downloading original")
+            return None
+        # Sidecar first: decoding may start before the proxy itself has fully arrived
+        with open(proxy_meta_path(proxy_local_path), 'wb') as f:
+            f.write(meta_data)
+        proxy_size, download = await _start_video_download(proxy_blob_name(blob_name), proxy_local_path, request_id)
+        if not proxy_size:
+            os.unlink(proxy_meta_path(proxy_local_path))
+            return None
+        logger.info(f"[{request_id}] ✅ Using analysis proxy blob {proxy_blob_name(blob_name)} ({proxy_size / (1024*1024):.1f} MB)")
+        return proxy_local_path, download
+    except Exception as e:
+        logger.warning(f"[{request_id}] ⚠️ Could not fetch analysis proxy (non-critical): {e}")
+        return None
+
+
 async def process_analysis_azure(
     analysis_id: str,
     video_url: str,
@@ -1138,6 +1734,7 @@ async def process_analysis_azure(
     """
     request_id = str(uuid.uuid4())[:8]
     video_path: Optional[str] = None
+    progressive_download: Optional[ProgressiveDownload] = None
     
     # CRITICAL: Log immediately when function is called (before any try block)
     # This ensures we see if the background task actually starts
@@ -1154,6 +1751,9 @@ async def process_analysis_azure(
     logger.error(f"[{request_id}] db_service._use_mock: {db_service._use_mock if db_service else None}")
     logger.error("=" * 80)
     
+    # Keep this analysis' videos and checkpoints safe from the artifact janitor until we finish
+    get_artifact_janitor().track(analysis_id=analysis_id, path=video_url)
+    
     try:
         # Check if analysis was cancelled before starting
         if db_service:
@@ -1293,25 +1893,48 @@ async def process_analysis_azure(
                 await update_step_progress('pose_estimation', 8, f'📥 Downloading video blob: {blob_name}...')
                 
                 import tempfile
-                video_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-                blob_data = await storage_service.download_blob(blob_name)
-                await update_step_progress('pose_estimation', 10, f'✅ Video downloaded ({len(blob_data) / (1024*1024):.1f} MB)')
+                video_path = tempfile.NamedTemporaryFile(
+                    delete=False, suffix='.mp4', prefix=f"{TEMP_VIDEO_PREFIX}{analysis_id}_"
+                ).name
                 
-                if not blob_data:
+                # Prefer the analysis proxy stored next to the original (much smaller, cheaper to decode)
+                # (only once its sidecar is stored - until the upload's proxy job finishes, the original is decoded)
+                # Videos are streamed to disk with parallel ranged reads - never held in memory
+                # Faststart MP4s are decoded while they arrive (progressive_download); others are fetched first
+                downloaded_bytes = None
+                decoded_blob_name = blob_name
+                if is_proxy_enabled():
+                    proxy_download = await _download_analysis_proxy(blob_name, video_path, processing_fps, request_id)
+                    if proxy_download:
+                        decoded_blob_name = proxy_blob_name(blob_name)
+                        try:
+                            os.unlink(video_path)
+                        except OSError:
+                            pass
+                        video_path, progressive_download = proxy_download
+                        downloaded_bytes = os.path.getsize(video_path)
+                if not downloaded_bytes:
+                    downloaded_bytes, progressive_download = await _start_video_download(blob_name, video_path, request_id)
+                if progressive_download:
+                    await update_step_progress('pose_estimation', 10, f'📥 Streaming video ({(downloaded_bytes or 0) / (1024*1024):.1f} MB) - analysis starts while it downloads')
+                else:
+                    await update_step_progress('pose_estimation', 10, f'✅ Video downloaded ({(downloaded_bytes or 0) / (1024*1024):.1f} MB)')
+                
+                if not downloaded_bytes:
                     raise StorageError(
                         f"Could not download video blob: {blob_name}. Blob may not exist or storage service is unavailable.",
                         details={"blob_name": blob_name, "video_url": video_url, "analysis_id": analysis_id}
                     )
+                logger.info(f"[{request_id}] ✅ Blob downloaded and saved: {video_path} ({downloaded_bytes} bytes)")
                 
+                # Reuse detections from upload-time validation (optional - pose stage re-detects missing frames)
                 try:
-                    with open(video_path, 'wb') as f:
-                        f.write(blob_data)
-                    logger.info(f"[{request_id}] ✅ Blob downloaded and saved: {video_path} ({len(blob_data)} bytes)")
-                except OSError as e:
-                    raise StorageError(
-                        f"Failed to save downloaded blob to file: {e}",
-                        details={"video_path": video_path, "analysis_id": analysis_id}
-                    )
+                    detections_data = await storage_service.download_blob(sample_detections_path(decoded_blob_name))
+                    if detections_data:
+                        with open(sample_detections_path(video_path), 'wb') as f:
+                            f.write(detections_data)
+                except Exception as detections_error:
+                    logger.debug(f"[{request_id}] No reusable sample detections: {detections_error}")
             elif video_url.startswith('http') or video_url.startswith('https'):
                 # Fallback: Try direct HTTP download (may fail if blob requires authentication)
                 logger.warning(f"[{request_id}] Storage service not available, attempting direct HTTP download (may fail if authentication required)")
@@ -1997,7 +2620,8 @@ async def process_analysis_azure(
                 view_type=view_type,
                 progress_callback=progress_callback,
                 analysis_id=analysis_id,  # Pass analysis_id for checkpoint management
-                processing_fps=processing_fps  # Pass user-selected processing frame rate
+                processing_fps=processing_fps,  # Pass user-selected processing frame rate
+                download=progressive_download  # Decode while the video is still downloading
             )
             
             # Stop periodic monitoring
@@ -2502,13 +3126,14 @@ async def process_analysis_azure(
         # CRITICAL: Update progress to show we're saving results
         # Determine which database backend is being used
         use_table_storage = hasattr(db_service, '_use_table') and db_service._use_table
-        use_sql = not use_table_storage and not db_service._use_mock
+        use_sqlite = getattr(db_service, '_use_sqlite', False)
+        use_sql = not use_table_storage and not db_service._use_mock and not use_sqlite
         use_mock = db_service._use_mock
         
         logger.info("=" * 80)
         logger.info(f"[{request_id}] 🎯 [STEP 4] ========== DATABASE SAVE PHASE STARTING ==========")
         logger.info(f"[{request_id}] 🎯 [STEP 4] Preparing to save {len(metrics) if metrics else 0} metrics to database")
-        logger.info(f"[{request_id}] 🎯 [STEP 4] Database backend: Table Storage={use_table_storage}, SQL={use_sql}, Mock={use_mock}")
+        logger.info(f"[{request_id}] 🎯 [STEP 4] Database backend: Table Storage={use_table_storage}, SQL={use_sql}, SQLite={use_sqlite}, Mock={use_mock}")
         logger.info("=" * 80)
         
         # Update progress: Preparing to save
@@ -3228,9 +3853,19 @@ async def process_analysis_azure(
         except Exception as final_check_error:
             logger.error(f"[{request_id}] Error checking analysis in finally: {final_check_error}")
         
+        get_artifact_janitor().release(analysis_id=analysis_id, path=video_url)
+        
+        # Stop a download still running for a failed or cancelled analysis before removing its file
+        if progressive_download:
+            progressive_download.cancel()
+            progressive_download.close_stream()
+        
         # Clean up temporary video file with proper error handling
         if video_path and os.path.exists(video_path) and video_path != video_url:
             try:
+                for sidecar_path in (proxy_meta_path(video_path), frame_index_path(video_path), sample_detections_path(video_path)):
+                    if os.path.exists(sidecar_path):
+                        os.unlink(sidecar_path)
                 os.unlink(video_path)
                 logger.info(
                     f"[{request_id}] Cleaned up temporary video",
@@ -3439,6 +4074,75 @@ async def cancel_all_processing() -> JSONResponse:
         )
 
 
+# Fields that identify a version of an analysis record; every write bumps updated_at, the
+# progress fields cover writes still pending in the progress coalescer
+_ETAG_FIELDS = ('id', 'status', 'current_step', 'step_progress', 'step_message', 'updated_at')
+
+
+def _analysis_version(analysis: dict) -> list:
+    return [str(analysis.get(field)) for field in _ETAG_FIELDS] + [json.dumps(analysis.get('steps_completed') or {}, sort_keys=True, default=str)]
+
+
+def _make_etag(*parts) -> str:
+    """Strong ETag over a JSON-serializable description of a representation"""
+    digest = hashlib.sha1(json.dumps(parts, default=str).encode('utf-8')).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (a list of tags or '*'; weak tags compare by their opaque part)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+
+def _analysis_cache_headers(analysis: dict, etag: str) -> dict:
+    """ETag plus Cache-Control: running analyses revalidate on every poll, finished ones may be reused briefly"""
+    if str(analysis.get('status', '')).lower() in TERMINAL_STATUSES:
+        cache_control = f"private, max-age={ANALYSIS_TERMINAL_MAX_AGE_SECONDS}"
+    else:
+        cache_control = "private, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+# view=summary: identifying fields plus headline metrics, enough for dashboard cards
+SUMMARY_FIELDS = ('id', 'patient_id', 'filename', 'status', 'created_at', 'updated_at', 'metrics')
+# Values of each row returned by POST /status:batch
+STATUS_BATCH_FIELDS = ('status', 'current_step', 'step_progress', 'updated_at')
+
+
+def _parse_fields(fields: str) -> list:
+    """Validate a comma-separated fields= parameter"""
+    requested = [f.strip() for f in fields.split(',') if f.strip()]
+    unknown = [f for f in requested if f not in ANALYSIS_FIELDS]
+    if unknown or not requested:
+        raise ValidationError(
+            f"Unknown fields: {', '.join(unknown) or '(none given)'}",
+            field="fields",
+            details={"allowed": list(ANALYSIS_FIELDS)}
+        )
+    return list(dict.fromkeys(['id'] + requested))
+
+
+def _project_analysis(analysis: dict, fields: list) -> dict:
+    """Plain-dict projection of a record (no response model validation of unrequested structures)"""
+    record = {field: analysis.get(field) for field in fields}
+    if 'status' in record:
+        status = str(record['status'] or 'processing').lower()
+        record['status'] = {'cancelled': 'failed', 'testing': 'processing'}.get(status, status)
+    if 'step_progress' in record:
+        try:
+            record['step_progress'] = max(0, min(100, int(float(record['step_progress'] or 0))))
+        except (ValueError, TypeError):
+            record['step_progress'] = 0
+    for field in ('metrics', 'steps_completed'):
+        if field in record and not isinstance(record[field], dict):
+            record[field] = {}
+    return record
+
+
 @router.get(
     "/list",
     response_model=AnalysisListResponse,
@@ -3448,22 +4152,34 @@ async def cancel_all_processing() -> JSONResponse:
     }
 )
 async def list_analyses(
-    limit: int = Query(50, ge=1, le=1000, description="Maximum number of analyses to return")
+    request: Request,
+    limit: int = Query(50, ge=1, le=1000, description="Maximum number of analyses to return"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    include_metrics: bool = Query(True, description="Include the metrics payload of each analysis"),
+    view: str = Query("detail", pattern="^(summary|detail)$", description="summary: identifying fields and headline metrics only"),
+    fields: Optional[str] = Query(None, max_length=500, description="Comma-separated fields to return, e.g. id,status,created_at")
 ) -> AnalysisListResponse:
     """
-    List all analyses, ordered by most recent first
+    List analyses, most recently created first, one page at a time
     
     Args:
         limit: Maximum number of analyses to return (1-1000)
+        cursor: Continuation cursor returned as next_cursor by the previous page
+        include_metrics: Set to false to skip loading metrics (cheaper list views)
+        view: 'summary' returns SUMMARY_FIELDS with only the headline metrics, read from
+            the result document's summary instead of the full document
+        fields: Projection onto the given fields (overrides the view's field set); projected
+            pages are plain dicts that skip AnalysisDetailResponse validation
         
     Returns:
-        AnalysisListResponse with list of analyses
+        AnalysisListResponse with one page of analyses and the next cursor, or 304 Not
+        Modified if If-None-Match matches the page's ETag
         
     Raises:
-        HTTPException: On database errors
+        HTTPException: On invalid cursor or database errors
     """
     request_id = str(uuid.uuid4())[:8]
-    logger.info(f"[{request_id}] List analyses request", extra={"limit": limit})
+    logger.info(f"[{request_id}] List analyses request", extra={"limit": limit, "cursor": cursor})
     
     if db_service is None:
         logger.error(f"[{request_id}] Database service not available")
@@ -3477,7 +4193,41 @@ async def list_analyses(
         )
     
     try:
-        analyses = await db_service.list_analyses(limit=limit)
+        requested_fields = _parse_fields(fields) if fields else (list(SUMMARY_FIELDS) if view == "summary" else None)
+        with_metrics = include_metrics and (requested_fields is None or 'metrics' in requested_fields)
+        summary = view == "summary"
+        
+        if_none_match = request.headers.get("if-none-match")
+        page = await db_service.list_analyses_page(
+            limit=limit, cursor=cursor, include_metrics=with_metrics and not if_none_match,
+            summary=summary, fields=requested_fields
+        )
+        etag = _make_etag(
+            'list', limit, cursor, with_metrics, view, requested_fields, page['next_cursor'],
+            [_analysis_version(a) for a in page['analyses']]
+        )
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if _etag_matches(if_none_match, etag):
+            logger.info(f"[{request_id}] List unchanged (304)")
+            return Response(status_code=304, headers=cache_headers)
+        if with_metrics and if_none_match:
+            # The page was validated without metrics; load them now that it changed
+            page = await db_service.list_analyses_page(
+                limit=limit, cursor=cursor, include_metrics=True, summary=summary, fields=requested_fields
+            )
+        
+        if requested_fields is not None:
+            projected = [_project_analysis(a, requested_fields) for a in page['analyses']]
+            logger.info(f"[{request_id}] Retrieved {len(projected)} analyses (fields: {','.join(requested_fields)})")
+            body = dumps({
+                "analyses": projected,
+                "total": len(projected),
+                "limit": limit,
+                "next_cursor": page['next_cursor']
+            })
+            return payload_response(request, body, cache_headers)
+        
+        analyses = page['analyses']
         logger.info(f"[{request_id}] Retrieved {len(analyses)} analyses", extra={"count": len(analyses)})
         
         # Transform database results to match AnalysisDetailResponse model
@@ -3534,11 +4284,15 @@ async def list_analyses(
         
         logger.info(f"[{request_id}] Successfully transformed {len(transformed_analyses)} of {len(analyses)} analyses")
         
-        return AnalysisListResponse(
+        body = dumps(AnalysisListResponse(
             analyses=transformed_analyses,
             total=len(transformed_analyses),
-            limit=limit
-        )
+            limit=limit,
+            next_cursor=page['next_cursor']
+        ).model_dump())
+        return payload_response(request, body, cache_headers)
+    except ValidationError as e:
+        raise gait_error_to_http(e)
     except Exception as e:
         logger.error(
             f"[{request_id}] Error listing analyses: {e}",
@@ -3548,6 +4302,70 @@ async def list_analyses(
         raise DatabaseError("Failed to retrieve analyses list", details={"error": str(e)})
 
 
+@router.post(
+    "/status:batch",
+    response_model=AnalysisStatusBatchResponse,
+    responses={
+        400: {"model": ErrorResponse, "description": "Invalid analysis id"},
+        500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Service unavailable"}
+    }
+)
+async def get_analyses_status_batch(body: AnalysisStatusBatchRequest) -> JSONResponse:
+    """
+    Statuses of many analyses in one request (dashboards tracking several analyses)
+    
+    Args:
+        body: Up to 500 analysis ids
+        
+    Returns:
+        AnalysisStatusBatchResponse: one [status, current_step, step_progress, updated_at]
+        row per found id, plus the ids that do not exist
+        
+    Raises:
+        HTTPException: 400 on malformed ids, 500/503 on errors
+    """
+    request_id = str(uuid.uuid4())[:8]
+    
+    if db_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "SERVICE_UNAVAILABLE",
+                "message": "Database service is not available",
+                "details": {}
+            }
+        )
+    
+    try:
+        for analysis_id in body.ids:
+            try:
+                uuid.UUID(analysis_id)
+            except ValueError:
+                raise ValidationError(
+                    f"Invalid analysis ID format: {analysis_id}",
+                    field="ids",
+                    details={"provided": analysis_id, "expected_format": "UUID"}
+                )
+        
+        found = await db_service.get_analyses_status(body.ids)
+        statuses = {
+            analysis_id: list(_project_analysis(analysis, STATUS_BATCH_FIELDS).values())
+            for analysis_id, analysis in found.items()
+        }
+        not_found = [analysis_id for analysis_id in dict.fromkeys(body.ids) if analysis_id not in found]
+        logger.info(f"[{request_id}] Batch status: {len(statuses)} found, {len(not_found)} missing")
+        return FastJSONResponse(
+            content={"fields": list(STATUS_BATCH_FIELDS), "statuses": statuses, "not_found": not_found},
+            headers={"Cache-Control": "no-store"}
+        )
+    except ValidationError as e:
+        raise gait_error_to_http(e)
+    except Exception as e:
+        logger.error(f"[{request_id}] Batch status read failed: {e}", exc_info=True)
+        raise DatabaseError("Failed to retrieve analysis statuses", details={"error": str(e)})
+
+
 @router.get(
     "/{analysis_id}",
     response_model=AnalysisDetailResponse,
@@ -3558,16 +4376,21 @@ async def list_analyses(
     }
 )
 async def get_analysis(
-    analysis_id: str = PathParam(..., description="Analysis identifier", pattern="^[a-f0-9-]{36}$")
+    request: Request,
+    response: Response,
+    analysis_id: str = PathParam(..., description="Analysis identifier", pattern="^[a-f0-9-]{36}$"),
+    include_metrics: bool = Query(True, description="Include the result document (false for status polling)")
 ) -> AnalysisDetailResponse:
     """
     Get analysis status and results by ID
     
     Args:
         analysis_id: UUID of the analysis to retrieve
+        include_metrics: False returns only the status record (metrics is empty)
         
     Returns:
-        AnalysisDetailResponse with full analysis details
+        AnalysisDetailResponse with full analysis details, or 304 Not Modified if
+        If-None-Match matches the current ETag (checked without loading metrics)
         
     Raises:
         HTTPException: 404 if not found, 500/503 on errors
@@ -3598,7 +4421,23 @@ async def get_analysis(
         )
     
     try:
-        analysis = await db_service.get_analysis(analysis_id)
+        if_none_match = request.headers.get("if-none-match")
+        # Start from the status record: a 304 or a cached payload never loads the result document
+        analysis = await db_service.get_analysis(analysis_id, include_metrics=False)
+        if analysis:
+            etag = _make_etag('analysis', include_metrics, _analysis_version(analysis))
+            cache_headers = _analysis_cache_headers(analysis, etag)
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=cache_headers)
+            if include_metrics:
+                cached = cached_payload_response(request, etag, cache_headers)
+                if cached is not None:
+                    return cached
+                analysis = await db_service.get_analysis(analysis_id, include_metrics=True) or analysis
+                # The record may have changed between the two reads
+                etag = _make_etag('analysis', include_metrics, _analysis_version(analysis))
+                cache_headers = _analysis_cache_headers(analysis, etag)
+            response.headers.update(cache_headers)
         
         if not analysis:
             logger.warning(f"[{request_id}] ⚠️ Analysis not found in database", extra={"analysis_id": analysis_id})
@@ -3689,7 +4528,10 @@ async def get_analysis(
             
             logger.debug(f"[{request_id}] Normalized analysis data: id={analysis.get('id')}, filename={analysis.get('filename')}, status={analysis.get('status')}")
             
-            return AnalysisDetailResponse(**analysis)
+            body = dumps(AnalysisDetailResponse(**analysis).model_dump())
+            # Finished analyses no longer change: serialize (and compress) them once
+            cacheable = include_metrics and analysis['status'] in ('completed', 'failed')
+            return payload_response(request, body, cache_headers, cache_key=etag if cacheable else None)
             
         except Exception as validation_error:
             # If Pydantic validation fails, log detailed error and return safe response
@@ -3767,6 +4609,116 @@ async def get_analysis(
         )
 
 
+@router.get(
+    "/{analysis_id}/events",
+    responses={
+        200: {"description": "text/event-stream of progress events"},
+        404: {"model": ErrorResponse, "description": "Analysis not found"},
+        503: {"model": ErrorResponse, "description": "Service unavailable"}
+    }
+)
+async def analysis_events(
+    request: Request,
+    analysis_id: str = PathParam(..., description="Analysis identifier", pattern="^[a-f0-9-]{36}$")
+) -> StreamingResponse:
+    """
+    Server-Sent Events stream of analysis progress
+    
+    Sends a 'progress' event (status, current_step, step_progress, step_message,
+    steps_completed, updated_at) whenever the status changes and closes after a terminal
+    status. Progress of analyses running in this worker comes from the progress bus; when
+    nothing arrives for SSE_REFRESH_SECONDS the record is re-read through the status cache,
+    which picks up analyses running on other workers. Reconnects with Last-Event-ID resume
+    from the replay buffer.
+    
+    Args:
+        request: Incoming request (Last-Event-ID header, disconnect detection)
+        analysis_id: UUID of the analysis to follow
+        
+    Raises:
+        HTTPException: 404 if not found, 503 if the database is unavailable
+    """
+    try:
+        uuid.UUID(analysis_id)
+    except ValueError:
+        raise gait_error_to_http(ValidationError(
+            f"Invalid analysis ID format: {analysis_id}",
+            field="analysis_id",
+            details={"provided": analysis_id, "expected_format": "UUID"}
+        ))
+    
+    if db_service is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "SERVICE_UNAVAILABLE",
+                "message": "Database service is not available",
+                "details": {}
+            }
+        )
+    
+    analysis = await db_service.get_analysis(analysis_id, include_metrics=False)
+    if not analysis:
+        raise HTTPException(
+            status_code=404,
+            detail={
+                "error": "NOT_FOUND",
+                "message": f"Analysis with ID {analysis_id} not found",
+                "details": {"analysis_id": analysis_id}
+            }
+        )
+    
+    bus = get_progress_bus()
+    queue, replay, complete = bus.subscribe(analysis_id, request.headers.get("last-event-id"))
+    
+    def format_event(seq: int, snapshot: dict) -> str:
+        return f"id: {bus.event_id(seq)}\nevent: progress\ndata: {json.dumps(snapshot, default=str)}\n\n"
+    
+    async def event_stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            if not complete:
+                # New or unresumable subscriber: start from the current state
+                bus.publish(analysis_id, analysis)
+                latest = bus.latest(analysis_id)
+                replay[:] = [latest] if latest else []
+            last_sent = 0
+            for seq, snapshot in replay:
+                yield format_event(seq, snapshot)
+                last_sent = seq
+                if snapshot.get('status') in TERMINAL_STATUSES:
+                    return
+            last_write = time.monotonic()
+            while not await request.is_disconnected():
+                try:
+                    seq, snapshot = await asyncio.wait_for(queue.get(), timeout=SSE_REFRESH_SECONDS)
+                except asyncio.TimeoutError:
+                    # Nothing published in this worker - the analysis may be running elsewhere
+                    record = await db_service.get_analysis(analysis_id, include_metrics=False)
+                    if record is None:
+                        return
+                    bus.publish(analysis_id, record)  # Queued for us if anything changed
+                    if time.monotonic() - last_write >= SSE_HEARTBEAT_SECONDS:
+                        yield ": heartbeat\n\n"
+                        last_write = time.monotonic()
+                    continue
+                if seq <= last_sent:
+                    continue  # Already sent as part of the initial snapshot
+                yield format_event(seq, snapshot)
+                last_sent = seq
+                last_write = time.monotonic()
+                if snapshot.get('status') in TERMINAL_STATUSES:
+                    return
+        finally:
+            bus.unsubscribe(analysis_id, queue)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post(
     "/{analysis_id}/force-complete",
     responses={
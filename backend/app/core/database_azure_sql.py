@@ -2,15 +2,19 @@
 Azure SQL Database Service
 Simple relational database using Microsoft managed service
 """
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import pyodbc
 from contextlib import contextmanager
 from loguru import logger
 import os
 import json
+import tempfile
 import time
 import threading
 import asyncio
+import base64
+import binascii
+from datetime import datetime as _datetime
 
 # File locking (optional - may not be available on all systems)
 try:
@@ -24,12 +28,80 @@ try:
 except ImportError:
     settings = None
 
+try:
+    from app.core.database_sqlite import get_sqlite_store, is_network_path, SQLITE_AVAILABLE
+except ImportError:
+    SQLITE_AVAILABLE = False
+
+from app.core.progress_coalescer import get_progress_coalescer, is_progress_update
+from app.core.status_cache import get_status_cache
+from app.core.progress_bus import get_progress_bus
+from app.core.exceptions import ValidationError
+from app.core.table_layout import (
+    DEFAULT_PARTITION_COUNT, LEGACY_ANALYSIS_PARTITION, META_PARTITION, PARTITIONING_ROW_KEY,
+    TIME_INDEX_MARKER_ROW_KEY, analysis_partition, bucket_of_row_key, current_bucket,
+    previous_bucket, time_bucket, time_index_entity, time_index_partition
+)
+from app.core.db_io import AIO_TABLES_AVAILABLE, get_async_table_client, run_blocking, run_on_db_io_loop, on_db_io_thread
+from app.core.result_store import TableResultStore, summarize_metrics
+from app.core.sql_pool import get_sql_pool, is_transient_error
+
+# Status properties of an analysis entity (everything except the legacy inline metrics);
+# the result document is stored separately (see app.core.result_store)
+LIST_SELECT = [
+    'RowKey', 'patient_id', 'filename', 'video_url', 'status', 'current_step',
+    'step_progress', 'step_message', 'steps_completed', 'created_at', 'updated_at', 'has_result'
+]
+# Fields of an analysis record that list projections (fields=...) may request
+ANALYSIS_FIELDS = (
+    'id', 'patient_id', 'filename', 'video_url', 'status', 'current_step', 'step_progress',
+    'step_message', 'steps_completed', 'metrics', 'created_at', 'updated_at'
+)
+# Always read, so projected pages can still be versioned (ETag) and normalized
+VERSION_FIELDS = ('id', 'status', 'current_step', 'step_progress', 'step_message', 'steps_completed', 'updated_at')
+TABLE_LIST_READ_CONCURRENCY = int(os.getenv("TABLE_LIST_READ_CONCURRENCY", "16"))
+# Table Storage allows 15 comparisons per filter: the PartitionKey plus 14 OR-ed RowKeys
+TABLE_BATCH_READ_KEYS = 14
+SQL_BATCH_READ_KEYS = 500
+SQL_RETRY_ATTEMPTS = int(os.getenv("SQL_RETRY_ATTEMPTS", "3"))
+
+
+def encode_cursor(position: Dict) -> str:
+    """Opaque, URL-safe list cursor for a backend-specific page position"""
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Dict:
+    """Decode a list cursor produced by encode_cursor"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, binascii.Error):
+        raise ValidationError("Invalid list cursor", field="cursor")
+    if not isinstance(position, dict):
+        raise ValidationError("Invalid list cursor", field="cursor")
+    return position
+
+
+def local_db_backend(db_file: str) -> str:
+    """
+    Local database used when no Azure database is configured ('sqlite' or 'json')
+
+    LOCAL_DB_BACKEND selects it explicitly; by default SQLite is used unless db_file
+    is on a network filesystem (where WAL mode is refused).
+    """
+    backend = os.getenv("LOCAL_DB_BACKEND")
+    if backend:
+        return backend.lower()
+    return "json" if not SQLITE_AVAILABLE or is_network_path(db_file) else "sqlite"
+
 
 class AzureSQLService:
     """Azure SQL Database service"""
     
     # In-memory storage for mock mode (when Azure SQL is not configured)
     _mock_storage: Dict[str, Dict] = {}
+    # Serializes saves and janitor pruning of _mock_storage within this process
+    _mock_storage_lock = threading.RLock()
     # Use /home/site directory which is guaranteed to persist across container restarts in Azure App Service
     # IMPORTANT: Do NOT use $HOME/site - $HOME is /root in Docker containers, which is ephemeral
     # /home/site is the persistent storage location in Azure App Service (hardcoded, not using HOME)
@@ -38,6 +110,17 @@ class AzureSQLService:
         "/home/site/gait_analysis_mock_storage.json"  # Hardcoded to /home/site, not $HOME/site
     )
     
+    # Table Storage: ETag of this process' last write per analysis, and update cost counters
+    _table_etags: Dict[str, str] = {}
+    _table_update_stats: Dict[str, int] = {'updates': 0, 'round_trips': 0, 'request_bytes': 0, 'etag_conflicts': 0}
+    
+    # Oldest month bucket of the Table Storage time index (None until the index is verified)
+    _time_index_oldest_bucket: Optional[str] = None
+    
+    # Local SQLite database used instead of the JSON file (see local_db_backend).
+    # Must be node-local disk (WAL does not work on the SMB-backed /home share); refused otherwise
+    _sqlite_db_file: str = os.getenv("SQLITE_DB_FILE", os.path.join(tempfile.gettempdir(), "gait_analysis.db"))
+    
     # File watcher thread for automatic reloading in multi-worker environment
     _file_watcher_thread: Optional[threading.Thread] = None
     _file_watcher_stop_event: Optional[threading.Event] = None
@@ -58,10 +141,17 @@ class AzureSQLService:
                 self.table_name = "gaitanalyses"
                 table_service.create_table_if_not_exists(table_name=self.table_name)
                 self.table_client = table_service.get_table_client(table_name=self.table_name)
+                self._storage_conn = storage_conn
+                self.result_store = TableResultStore(storage_conn, table_service)
+                self._partition_count = self._load_partition_count()
                 self._use_table = True
                 self._use_mock = False
+                self._use_sqlite = False
                 self.connection_string = None
-                logger.info(f"✅ Using Azure Table Storage: table '{self.table_name}'")
+                logger.info(
+                    f"✅ Using Azure Table Storage: table '{self.table_name}' "
+                    f"({self._partition_count} partitions, async client: {AIO_TABLES_AVAILABLE})"
+                )
                 return
             except Exception as e:
                 logger.warning(f"Failed to initialize Table Storage: {e}, falling back to SQL/mock")
@@ -87,6 +177,7 @@ class AzureSQLService:
         if all([self.server, self.username, self.password]):
             self._use_mock = False
             self._use_table = False
+            self._use_sqlite = False
             # Build connection string
             driver = "{ODBC Driver 18 for SQL Server}"
             self.connection_string = (
@@ -100,11 +191,29 @@ class AzureSQLService:
                 f"Connection Timeout=30;"
             )
             logger.info(f"✅ Using Azure SQL Database: {self.server}/{self.database}")
+            self._sql_pool = get_sql_pool(self.connection_string)
             # Initialize database schema
             self._init_schema()
             return
         
-        # Priority 3: Fallback to file-based mock storage (unreliable in multi-worker)
+        # Priority 3: Local SQLite database (WAL mode - safe across uvicorn workers on node-local disk)
+        self._use_sqlite = False
+        if SQLITE_AVAILABLE and local_db_backend(AzureSQLService._sqlite_db_file) == "sqlite":
+            try:
+                self.sqlite_store = get_sqlite_store(AzureSQLService._sqlite_db_file)
+                if self.sqlite_store.count() == 0:
+                    # Carry over analyses from the legacy JSON mock storage file
+                    self.sqlite_store.import_json(AzureSQLService._mock_storage_file)
+                self.connection_string = None
+                self._use_sqlite = True
+                self._use_mock = False
+                self._use_table = False
+                logger.info(f"✅ Using local SQLite database: {AzureSQLService._sqlite_db_file}")
+                return
+            except Exception as e:
+                logger.warning(f"Failed to initialize SQLite database: {e}, falling back to file-based mock storage")
+        
+        # Priority 4: Fallback to file-based mock storage (unreliable in multi-worker)
         logger.warning("⚠️  No database configured - using file-based mock storage (unreliable in multi-worker environments)")
         logger.warning("⚠️  RECOMMENDED: Configure Azure Table Storage or SQL Database for reliability")
         self.connection_string = None
@@ -317,39 +426,43 @@ class AzureSQLService:
             except Exception as e:
                 logger.error(f"SAVE: Cannot write to directory {storage_dir if storage_dir else '/tmp'}: {e}")
             
-            with open(temp_file, 'w') as f:
-                logger.debug(f"SAVE: Opened temp file {temp_file} for writing")
-                if HAS_FCNTL:
-                    try:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock for writing
-                        json.dump(AzureSQLService._mock_storage, f, indent=2)
+            # One save at a time per process: concurrent saves share the temp file.
+            # The dict copy is atomic, so request handlers mutating the storage never break json.dump
+            with AzureSQLService._mock_storage_lock:
+                snapshot = dict(AzureSQLService._mock_storage)
+                with open(temp_file, 'w') as f:
+                    logger.debug(f"SAVE: Opened temp file {temp_file} for writing")
+                    if HAS_FCNTL:
+                        try:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_EX)  # Exclusive lock for writing
+                            json.dump(snapshot, f, indent=2)
+                            f.flush()
+                            os.fsync(f.fileno())  # Force write to disk
+                            logger.debug(f"SAVE: Wrote data with file locking")
+                        finally:
+                            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    else:
+                        json.dump(snapshot, f, indent=2)
                         f.flush()
-                        os.fsync(f.fileno())  # Force write to disk
-                        logger.debug(f"SAVE: Wrote data with file locking")
-                    finally:
-                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-                else:
-                    json.dump(AzureSQLService._mock_storage, f, indent=2)
-                    f.flush()
-                    os.fsync(f.fileno())
-                    logger.debug(f"SAVE: Wrote data without file locking")
-            
-            # Atomic rename - ensure temp file exists and has content
-            if not os.path.exists(temp_file):
-                logger.error(f"SAVE: Temp file does not exist before rename: {temp_file}")
-                raise FileNotFoundError(f"Temp file not found: {temp_file}")
-            
-            # CRITICAL: Verify temp file has content before renaming
-            temp_file_size = os.path.getsize(temp_file)
-            if temp_file_size == 0:
-                logger.error(f"SAVE: Temp file is empty (0 bytes): {temp_file}")
-                os.unlink(temp_file)  # Remove empty temp file
-                raise ValueError(f"Temp file is empty: {temp_file}")
-            
-            logger.info(f"SAVE: Temp file size: {temp_file_size} bytes, contains {len(AzureSQLService._mock_storage)} analyses")
-            
-            logger.debug(f"SAVE: Attempting atomic rename from {temp_file} ({temp_file_size} bytes) to {AzureSQLService._mock_storage_file}")
-            os.replace(temp_file, AzureSQLService._mock_storage_file)
+                        os.fsync(f.fileno())
+                        logger.debug(f"SAVE: Wrote data without file locking")
+                
+                # Atomic rename - ensure temp file exists and has content
+                if not os.path.exists(temp_file):
+                    logger.error(f"SAVE: Temp file does not exist before rename: {temp_file}")
+                    raise FileNotFoundError(f"Temp file not found: {temp_file}")
+                
+                # CRITICAL: Verify temp file has content before renaming
+                temp_file_size = os.path.getsize(temp_file)
+                if temp_file_size == 0:
+                    logger.error(f"SAVE: Temp file is empty (0 bytes): {temp_file}")
+                    os.unlink(temp_file)  # Remove empty temp file
+                    raise ValueError(f"Temp file is empty: {temp_file}")
+                
+                logger.info(f"SAVE: Temp file size: {temp_file_size} bytes, contains {len(snapshot)} analyses")
+                
+                logger.debug(f"SAVE: Attempting atomic rename from {temp_file} ({temp_file_size} bytes) to {AzureSQLService._mock_storage_file}")
+                os.replace(temp_file, AzureSQLService._mock_storage_file)
             
             # CRITICAL: Force filesystem sync to ensure rename is visible immediately
             # This is essential for multi-process/request scenarios
@@ -406,7 +519,65 @@ class AzureSQLService:
             logger.error(f"SAVE: OS error saving mock storage: {e}", exc_info=True)
         except Exception as e:
             logger.error(f"SAVE: Failed to save mock storage to file: {e}", exc_info=True)
-    
+
+    def prune_mock_storage(self, max_bytes: int, max_age_seconds: float, protected_ids: Optional[set] = None) -> int:
+        """
+        Drop finished analyses from local storage (JSON file or SQLite) to keep it bounded.
+        Called by the artifact janitor only when JANITOR_PRUNE_RECORDS=true: local storage may
+        hold the only copy of results. Only terminal records (completed/failed/cancelled) are removed.
+
+        Args:
+            max_bytes: Target maximum serialized size (0 disables the size limit)
+            max_age_seconds: Remove terminal records not updated for this long (0 disables)
+            protected_ids: Analysis IDs that are in flight and must be kept
+
+        Returns:
+            Number of records removed
+        """
+        if getattr(self, '_use_sqlite', False):
+            return self.sqlite_store.prune(max_bytes, max_age_seconds, protected_ids)
+        if not self._use_mock:
+            return 0
+
+        from datetime import datetime
+        protected_ids = protected_ids or set()
+        now = datetime.now()
+
+        def last_updated(record: Dict) -> float:
+            try:
+                return datetime.fromisoformat(record.get('updated_at') or record.get('created_at')).timestamp()
+            except (TypeError, ValueError):
+                return 0.0
+
+        with AzureSQLService._mock_storage_lock:
+            records = list(AzureSQLService._mock_storage.items())
+            candidates = sorted(
+                (last_updated(record), analysis_id)
+                for analysis_id, record in records
+                if analysis_id not in protected_ids
+                and record.get('status') in ('completed', 'failed', 'cancelled')
+            )
+            if not candidates:
+                return 0
+
+            # Estimate serialized size per record (same format as _save_mock_storage)
+            total_bytes = len(json.dumps(dict(records), indent=2))
+            removed = 0
+            for updated_ts, analysis_id in candidates:
+                expired = max_age_seconds > 0 and (now.timestamp() - updated_ts) > max_age_seconds
+                over_quota = max_bytes > 0 and total_bytes > max_bytes
+                if not expired and not over_quota:
+                    continue
+                record = AzureSQLService._mock_storage.pop(analysis_id, None)
+                if record is not None:
+                    total_bytes -= len(json.dumps({analysis_id: record}, indent=2))
+                    removed += 1
+
+            if removed:
+                logger.info(f"🧹 PRUNE: Removed {removed} finished analyses from mock storage ({len(AzureSQLService._mock_storage)} remaining)")
+                self._save_mock_storage()
+        return removed
+
     def _init_schema(self):
         """Initialize database schema"""
         if not self.connection_string:
@@ -440,6 +611,17 @@ class AzureSQLService:
                     CREATE INDEX idx_analyses_status ON analyses(status)
                 """)
                 
+                # Result documents live apart from the frequently updated status rows
+                # (analyses.metrics is only read for rows written before the split)
+                cursor.execute("""
+                    IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'analysis_results')
+                    CREATE TABLE analysis_results (
+                        id NVARCHAR(100) PRIMARY KEY,
+                        metrics NVARCHAR(MAX),
+                        updated_at DATETIME2 DEFAULT GETDATE()
+                    )
+                """)
+                
                 conn.commit()
                 logger.info("Database schema initialized")
         
@@ -472,19 +654,224 @@ class AzureSQLService:
             yield MockConnection()
             return
         
-        conn = None
         try:
-            conn = pyodbc.connect(self.connection_string)
-            yield conn
+            # Pooled connection: reused across operations instead of a TLS + login handshake each
+            with self._sql_pool.connection() as conn:
+                yield conn
         except Exception as e:
             logger.error(f"Database connection error: {e}")
             raise
-        finally:
-            if conn:
-                conn.close()
+    
+    def _sql_call(self, func, *args):
+        """
+        Run a blocking SQL helper, retrying transient errors (connection drops, throttling,
+        failover) on a fresh pooled connection with exponential backoff
+        """
+        for attempt in range(SQL_RETRY_ATTEMPTS):
+            try:
+                return func(*args)
+            except Exception as e:
+                if attempt == SQL_RETRY_ATTEMPTS - 1 or not is_transient_error(e):
+                    raise
+                self._sql_pool.record_retry()
+                delay = 0.2 * (2 ** attempt)
+                logger.warning(f"⚠️ SQL: Transient error in {func.__name__} (attempt {attempt + 1}/{SQL_RETRY_ATTEMPTS}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+    
+    async def _table_call(self, method: str, **kwargs):
+        """
+        Call a TableClient method without blocking the event loop
+        
+        Uses the pooled azure.data.tables.aio client of the running loop; if the aio
+        extras (aiohttp) are missing, the sync client runs on the bounded DB executor.
+        """
+        if AIO_TABLES_AVAILABLE:
+            client = get_async_table_client(self._storage_conn, self.table_name)
+            return await getattr(client, method)(**kwargs)
+        return await run_blocking(getattr(self.table_client, method), **kwargs)
+    
+    async def _table_query(self, query_filter: str, select: Optional[List[str]] = None,
+                           limit: Optional[int] = None) -> List:
+        """
+        Run a Table Storage query without blocking the event loop
+        
+        Args:
+            query_filter: OData filter
+            select: Properties to return (projection)
+            limit: Stop after this many entities (continuation pages are followed until then)
+        """
+        kwargs = {'query_filter': query_filter, 'select': select}
+        if limit:
+            kwargs['results_per_page'] = min(limit, 1000)
+        if AIO_TABLES_AVAILABLE:
+            client = get_async_table_client(self._storage_conn, self.table_name)
+            entities = []
+            async for entity in client.query_entities(**kwargs):
+                entities.append(entity)
+                if limit and len(entities) >= limit:
+                    break
+            return entities
+        
+        def query():
+            entities = []
+            for entity in self.table_client.query_entities(**kwargs):
+                entities.append(entity)
+                if limit and len(entities) >= limit:
+                    break
+            return entities
+        return await run_blocking(query)
+    
+    @staticmethod
+    def _entity_to_analysis(entity) -> Dict:
+        """Convert a Table Storage entity to the analysis dict used by the API"""
+        return {
+            'id': entity.get('RowKey'),
+            'patient_id': entity.get('patient_id'),
+            'filename': entity.get('filename'),
+            'video_url': entity.get('video_url'),
+            'status': entity.get('status'),
+            'current_step': entity.get('current_step'),
+            'step_progress': entity.get('step_progress', 0),
+            'step_message': entity.get('step_message'),
+            'metrics': json.loads(entity.get('metrics', '{}')) if isinstance(entity.get('metrics'), str) else entity.get('metrics') or {},
+            'steps_completed': json.loads(entity.get('steps_completed', '{}')) if isinstance(entity.get('steps_completed'), str) else entity.get('steps_completed') or {},
+            'created_at': entity.get('created_at'),
+            'updated_at': entity.get('updated_at')
+        }
+    
+    def _load_partition_count(self) -> int:
+        """
+        Number of analysis partitions, fixed per table in a 'meta' entity
+        
+        The bucket of an analysis is derived from its id, so the count must never change
+        once data exists: the first process to start records ANALYSIS_PARTITION_COUNT.
+        """
+        from azure.core.exceptions import ResourceNotFoundError, ResourceExistsError
+        try:
+            return int(self.table_client.get_entity(partition_key=META_PARTITION, row_key=PARTITIONING_ROW_KEY)['partition_count'])
+        except ResourceNotFoundError:
+            pass
+        try:
+            self.table_client.create_entity(entity={
+                'PartitionKey': META_PARTITION,
+                'RowKey': PARTITIONING_ROW_KEY,
+                'partition_count': DEFAULT_PARTITION_COUNT
+            })
+            return DEFAULT_PARTITION_COUNT
+        except ResourceExistsError:
+            # Another worker recorded it first
+            return int(self.table_client.get_entity(partition_key=META_PARTITION, row_key=PARTITIONING_ROW_KEY)['partition_count'])
+    
+    def _table_partitions(self, analysis_id: str) -> List[str]:
+        """Partitions an analysis may live in: its bucket, then the pre-bucketing partition"""
+        return [analysis_partition(analysis_id, self._partition_count), LEGACY_ANALYSIS_PARTITION]
+    
+    async def _get_table_entity(self, analysis_id: str, select: Optional[List[str]] = None,
+                                partition_key: Optional[str] = None):
+        """
+        Point read of an analysis entity
+        
+        Args:
+            analysis_id: Analysis to read
+            select: Properties to return (projection)
+            partition_key: Partition to try first (e.g. from a time index entry)
+            
+        Raises:
+            ResourceNotFoundError: If the analysis is in neither its bucket nor the legacy partition
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        partitions = self._table_partitions(analysis_id)
+        if partition_key:
+            partitions = [partition_key] + [pk for pk in partitions if pk != partition_key]
+        for index, pk in enumerate(partitions):
+            try:
+                return await self._table_call('get_entity', partition_key=pk, row_key=analysis_id, select=select)
+            except ResourceNotFoundError:
+                if index == len(partitions) - 1:
+                    raise
+    
+    async def _attach_table_result(self, entity, analysis: Dict, summary: bool = False) -> None:
+        """
+        Set analysis['metrics'] from the result document (entities written before the split keep metrics inline)
+        
+        Args:
+            summary: Only the headline metrics (reads the document's summary property)
+        """
+        if entity.get('has_result'):
+            if summary:
+                analysis['metrics'] = await self.result_store.load_summary(analysis['id']) or {}
+            else:
+                analysis['metrics'] = await self.result_store.load(analysis['id']) or {}
+        elif summary:
+            analysis['metrics'] = summarize_metrics(analysis['metrics'])
+    
+    async def _ensure_table_time_index(self) -> str:
+        """
+        Backfill the time index for analyses created before it existed (once per table)
+        
+        Only the legacy single partition needs indexing: bucketed analyses are indexed on
+        creation. A marker entity records completion and the oldest month bucket, which
+        bounds how far listings walk back. Concurrent backfills only upsert identical entities.
+        
+        Returns:
+            Oldest month bucket (YYYYMM) that can contain index entries
+        """
+        if AzureSQLService._time_index_oldest_bucket:
+            return AzureSQLService._time_index_oldest_bucket
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            marker = await self._table_call('get_entity', partition_key=META_PARTITION, row_key=TIME_INDEX_MARKER_ROW_KEY)
+            oldest = marker.get('oldest_bucket') or current_bucket()
+        except ResourceNotFoundError:
+            entities = await self._table_query(
+                f"PartitionKey eq '{LEGACY_ANALYSIS_PARTITION}'", select=['RowKey', 'created_at']
+            )
+            by_partition: Dict[str, List] = {}
+            for e in entities:
+                index_entity = time_index_entity(e['RowKey'], e.get('created_at'), LEGACY_ANALYSIS_PARTITION)
+                by_partition.setdefault(index_entity['PartitionKey'], []).append(('upsert', index_entity))
+            for operations in by_partition.values():
+                # Entity group transactions: one partition, at most 100 operations
+                for start in range(0, len(operations), 100):
+                    await self._table_call('submit_transaction', operations=operations[start:start + 100])
+            oldest = min([time_bucket(e.get('created_at')) for e in entities] + [current_bucket()])
+            await self._table_call('upsert_entity', entity={
+                'PartitionKey': META_PARTITION,
+                'RowKey': TIME_INDEX_MARKER_ROW_KEY,
+                'indexed': len(entities),
+                'oldest_bucket': oldest,
+                'created_at': _datetime.utcnow().isoformat()
+            })
+            logger.info(f"📇 TABLE STORAGE: Backfilled time index for {len(entities)} analyses (oldest bucket {oldest})")
+        AzureSQLService._time_index_oldest_bucket = oldest
+        return oldest
     
     async def create_analysis(self, analysis_data: Dict) -> bool:
-        """Create new analysis record"""
+        """
+        Create new analysis record
+        
+        The new record is seeded into the status cache, so this worker's first polls are
+        served without a storage read (and without the eventual-consistency retries).
+        """
+        created = await self._create_analysis_direct(analysis_data)
+        cache = get_status_cache()
+        if created and cache is not None and analysis_data.get('id'):
+            now = _datetime.utcnow().isoformat()
+            cache.seed(analysis_data['id'], {
+                'status': 'processing',
+                'current_step': 'pose_estimation',
+                'step_progress': 0,
+                'step_message': 'Initializing...',
+                'metrics': {},
+                'steps_completed': {},
+                'created_at': now,
+                'updated_at': now,
+                **analysis_data
+            })
+        return created
+    
+    async def _create_analysis_direct(self, analysis_data: Dict) -> bool:
+        """Create new analysis record in the configured backend"""
         # Priority 1: Use Table Storage if available
         if hasattr(self, '_use_table') and self._use_table:
             try:
@@ -494,8 +881,11 @@ class AzureSQLService:
                     logger.error("Analysis data missing 'id' field")
                     return False
                 
+                partition_key = analysis_partition(analysis_id, self._partition_count)
+                if analysis_data.get('metrics'):
+                    await self.result_store.save(analysis_id, analysis_data['metrics'])
                 entity = {
-                    'PartitionKey': 'analyses',
+                    'PartitionKey': partition_key,
                     'RowKey': analysis_id,
                     'patient_id': analysis_data.get('patient_id'),
                     'filename': analysis_data.get('filename', ''),
@@ -504,12 +894,25 @@ class AzureSQLService:
                     'current_step': analysis_data.get('current_step', 'pose_estimation'),
                     'step_progress': analysis_data.get('step_progress', 0),
                     'step_message': analysis_data.get('step_message', 'Initializing...'),
-                    'metrics': json.dumps(analysis_data.get('metrics', {})),
                     'created_at': datetime.utcnow().isoformat(),
-                    'updated_at': datetime.utcnow().isoformat()
+                    'updated_at': datetime.utcnow().isoformat(),
+                    'has_result': bool(analysis_data.get('metrics'))
                 }
                 
-                self.table_client.create_entity(entity=entity)
+                create_metadata = await self._table_call('create_entity', entity=entity)
+                if create_metadata and create_metadata.get('etag'):
+                    AzureSQLService._table_etags[analysis_id] = create_metadata['etag']
+                index_entity = time_index_entity(analysis_id, entity['created_at'], partition_key)
+                for index_attempt in range(2):
+                    try:
+                        await self._table_call('upsert_entity', entity=index_entity)
+                        break
+                    except Exception as index_error:
+                        # The analysis itself is stored and readable by id; it is only missing from listings
+                        if index_attempt == 1:
+                            logger.error(f"Failed to write time index entry for {analysis_id}: {index_error}")
+                        else:
+                            await asyncio.sleep(0.2)
                 logger.info(f"✅ Created analysis {analysis_id} in Table Storage")
                 
                 # CRITICAL: Verify the entity was actually created and is immediately readable
@@ -519,10 +922,7 @@ class AzureSQLService:
                 for verify_attempt in range(max_verify_attempts):
                     try:
                         await asyncio.sleep(0.1 * (verify_attempt + 1))  # Progressive delay: 0.1s, 0.2s, 0.3s, 0.4s, 0.5s
-                        verify_entity = self.table_client.get_entity(
-                            partition_key='analyses',
-                            row_key=analysis_id
-                        )
+                        verify_entity = await self._get_table_entity(analysis_id, partition_key=partition_key)
                         if verify_entity and verify_entity.get('RowKey') == analysis_id:
                             verification_passed = True
                             logger.info(f"✅ Verified analysis {analysis_id} is readable in Table Storage (attempt {verify_attempt + 1})")
@@ -542,6 +942,13 @@ class AzureSQLService:
                 logger.error(f"Failed to create analysis in Table Storage: {e}", exc_info=True)
                 return False
         
+        if getattr(self, '_use_sqlite', False):
+            try:
+                return await run_blocking(self.sqlite_store.create_analysis, analysis_data)
+            except Exception as e:
+                logger.error(f"Failed to create analysis in SQLite: {e}", exc_info=True)
+                return False
+        
         if self._use_mock:
             # CRITICAL: Reload from file first to ensure we don't overwrite existing data
             self._load_mock_storage()
@@ -717,65 +1124,67 @@ class AzureSQLService:
             return True
         
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO analyses 
-                    (id, patient_id, filename, video_url, status, current_step, step_progress, step_message)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    analysis_data.get('id'),
-                    analysis_data.get('patient_id'),
-                    analysis_data.get('filename'),
-                    analysis_data.get('video_url'),
-                    analysis_data.get('status', 'processing'),
-                    analysis_data.get('current_step', 'pose_estimation'),
-                    analysis_data.get('step_progress', 0),
-                    analysis_data.get('step_message', 'Initializing...')
-                ))
-                conn.commit()
-                return True
+            return await run_blocking(self._sql_call, self._create_analysis_sql, analysis_data)
         except Exception as e:
             logger.error(f"Failed to create analysis: {e}")
             return False
     
+    def _create_analysis_sql(self, analysis_data: Dict) -> bool:
+        """Blocking pyodbc insert (runs on the DB executor)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO analyses 
+                (id, patient_id, filename, video_url, status, current_step, step_progress, step_message)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                analysis_data.get('id'),
+                analysis_data.get('patient_id'),
+                analysis_data.get('filename'),
+                analysis_data.get('video_url'),
+                analysis_data.get('status', 'processing'),
+                analysis_data.get('current_step', 'pose_estimation'),
+                analysis_data.get('step_progress', 0),
+                analysis_data.get('step_message', 'Initializing...')
+            ))
+            conn.commit()
+            return True
+    
     async def update_analysis(self, analysis_id: str, updates: Dict) -> bool:
         """
         Update analysis record
+        
+        Progress-only updates are buffered and flushed at a bounded rate by the progress
+        coalescer; all other updates (including terminal states) are written before returning.
+        Cached reads of this process see the update immediately, and status changes are
+        published to SSE subscribers through the progress bus.
+        """
+        cache = get_status_cache()
+        if cache is not None:
+            cache.apply(analysis_id, updates)
+        coalescer = get_progress_coalescer()
+        if coalescer is None or coalescer.on_db_thread():
+            result = await self._update_analysis_direct(analysis_id, updates)
+        elif is_progress_update(updates):
+            result = coalescer.submit(analysis_id, updates, self._update_analysis_direct)
+        else:
+            result = await coalescer.write_async(analysis_id, updates, self._update_analysis_direct)
+        if not result and cache is not None:
+            cache.invalidate(analysis_id)
+        if result:
+            get_progress_bus().publish(analysis_id, updates)
+        return result
+    
+    async def _update_analysis_direct(self, analysis_id: str, updates: Dict) -> bool:
+        """
+        Write an update to the configured backend immediately
         """
         # Priority 1: Use Table Storage if available
         if hasattr(self, '_use_table') and self._use_table:
-            try:
-                from azure.core.exceptions import ResourceNotFoundError
-                from datetime import datetime
-                
-                # Get existing entity
-                entity = self.table_client.get_entity(
-                    partition_key='analyses',
-                    row_key=analysis_id
-                )
-                
-                # Update fields
-                for key, value in updates.items():
-                    if key in ['status', 'current_step', 'step_progress', 'step_message', 'video_url']:
-                        entity[key] = value
-                    elif key == 'metrics':
-                        entity['metrics'] = json.dumps(value)
-                    elif key == 'steps_completed':
-                        entity['steps_completed'] = json.dumps(value)  # Store as JSON string
-                
-                entity['updated_at'] = datetime.utcnow().isoformat()
-                
-                # Update entity
-                self.table_client.update_entity(entity=entity)
-                logger.debug(f"✅ Updated analysis {analysis_id} in Table Storage")
-                return True
-            except ResourceNotFoundError:
-                logger.warning(f"Analysis {analysis_id} not found in Table Storage for update")
-                return False
-            except Exception as e:
-                logger.error(f"Failed to update analysis in Table Storage: {e}", exc_info=True)
-                return False
+            return await self._update_analysis_table(analysis_id, updates)
+        
+        if getattr(self, '_use_sqlite', False):
+            return await run_blocking(self._update_analysis_sqlite, analysis_id, updates)
         
         logger.info(f"📝 UPDATE: Updating analysis {analysis_id} with fields: {list(updates.keys())}")
         if self._use_mock:
@@ -827,66 +1236,212 @@ class AzureSQLService:
             return False
         
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # Build update query dynamically
-                set_clauses = []
-                values = []
-                
-                for key, value in updates.items():
-                    if key in ['status', 'current_step', 'step_progress', 'step_message', 'metrics', 'video_url', 'steps_completed']:
-                        set_clauses.append(f"{key} = ?")
-                        if key == 'metrics' and isinstance(value, dict):
-                            values.append(json.dumps(value))
-                        elif key == 'steps_completed' and isinstance(value, dict):
-                            values.append(json.dumps(value))
-                        else:
-                            values.append(value)
-                
-                if set_clauses:
-                    set_clauses.append("updated_at = GETDATE()")
-                    values.append(analysis_id)
-                    
-                    query = f"UPDATE analyses SET {', '.join(set_clauses)} WHERE id = ?"
-                    cursor.execute(query, values)
-                    conn.commit()
-                    return True
-                return False
+            return await run_blocking(self._sql_call, self._update_analysis_sql, analysis_id, updates)
         except Exception as e:
             logger.error(f"Failed to update analysis {analysis_id}: {e}", exc_info=True)
             logger.error(f"Update data: {updates}")
             return False
     
+    def _update_analysis_sql(self, analysis_id: str, updates: Dict) -> bool:
+        """Blocking pyodbc update (runs on the DB executor)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Build update query dynamically
+            set_clauses = []
+            values = []
+
+            for key, value in updates.items():
+                if key in ['status', 'current_step', 'step_progress', 'step_message', 'video_url', 'steps_completed']:
+                    set_clauses.append(f"{key} = ?")
+                    if key == 'steps_completed' and isinstance(value, dict):
+                        values.append(json.dumps(value))
+                    else:
+                        values.append(value)
+
+            if 'metrics' in updates:
+                # Result document goes to analysis_results, in the same transaction as the status
+                metrics = updates['metrics']
+                metrics_json = json.dumps(metrics) if isinstance(metrics, dict) else metrics
+                cursor.execute("""
+                    UPDATE analysis_results SET metrics = ?, updated_at = GETDATE() WHERE id = ?;
+                    IF @@ROWCOUNT = 0
+                        INSERT INTO analysis_results (id, metrics, updated_at) VALUES (?, ?, GETDATE())
+                """, (metrics_json, analysis_id, analysis_id, metrics_json))
+
+            if set_clauses or 'metrics' in updates:
+                set_clauses.append("updated_at = GETDATE()")
+                values.append(analysis_id)
+
+                query = f"UPDATE analyses SET {', '.join(set_clauses)} WHERE id = ?"
+                cursor.execute(query, values)
+                conn.commit()
+                return True
+            return False
+    
+    async def _update_analysis_table(self, analysis_id: str, updates: Dict) -> bool:
+        """
+        Merge changed properties into the Table Storage entity in a single request
+        
+        Only the updated properties are sent (UpdateMode.MERGE). Metrics are written to the
+        separate result document first, so the status entity never carries the payload and
+        a 'completed' status is only visible once its result exists. Progress updates are
+        always conditional (see _merge_progress_conditionally), so they can never turn a
+        terminal status written elsewhere back into 'processing'.
+        """
+        try:
+            from azure.core.exceptions import ResourceNotFoundError
+            from azure.data.tables import UpdateMode
+            from datetime import datetime
+        except ImportError as e:
+            logger.error(f"Azure Table SDK not available: {e}")
+            return False
+        
+        entity = {'RowKey': analysis_id}
+        if 'metrics' in updates:
+            try:
+                await self.result_store.save(analysis_id, updates['metrics'])
+            except Exception as e:
+                logger.error(f"Failed to store result document for {analysis_id}: {e}", exc_info=True)
+                return False
+            entity['has_result'] = True
+        for key, value in updates.items():
+            if key in ['status', 'current_step', 'step_progress', 'step_message', 'video_url']:
+                entity[key] = value
+            elif key == 'steps_completed':
+                entity['steps_completed'] = json.dumps(value)  # Store as JSON string
+        entity['updated_at'] = datetime.utcnow().isoformat()
+        
+        progress_only = is_progress_update(updates)
+        stats = AzureSQLService._table_update_stats
+        stats['updates'] += 1
+        stats['request_bytes'] += len(json.dumps(entity))
+        partitions = self._table_partitions(analysis_id)
+        try:
+            for index, partition_key in enumerate(partitions):
+                # Analyses created before bucketing stay in the legacy partition until migrated
+                entity['PartitionKey'] = partition_key
+                try:
+                    if progress_only:
+                        metadata = await self._merge_progress_conditionally(analysis_id, entity)
+                        if metadata is None:
+                            return True  # Dropped: the analysis already finished
+                    else:
+                        stats['round_trips'] += 1
+                        metadata = await self._table_call('update_entity', entity=entity, mode=UpdateMode.MERGE)
+                    break
+                except ResourceNotFoundError:
+                    if index == len(partitions) - 1:
+                        raise
+            
+            if updates.get('status') in ('completed', 'failed', 'cancelled'):
+                AzureSQLService._table_etags.pop(analysis_id, None)
+            elif metadata and metadata.get('etag'):
+                AzureSQLService._table_etags[analysis_id] = metadata['etag']
+            logger.debug(f"✅ Updated analysis {analysis_id} in Table Storage (merge: {list(updates.keys())})")
+            return True
+        except ResourceNotFoundError:
+            logger.warning(f"Analysis {analysis_id} not found in Table Storage for update")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to update analysis in Table Storage: {e}", exc_info=True)
+            return False
+    
+    async def _merge_progress_conditionally(self, analysis_id: str, entity: Dict, max_attempts: int = 3) -> Optional[Dict]:
+        """
+        Merge a progress update only if the entity is unchanged since its status was last seen
+        
+        Uses the ETag of this process' last write; without one (first write, or the record is
+        written by another worker) the status and ETag are read first. On a conflict the entity
+        is re-read and the write retried.
+        
+        Returns:
+            Response metadata of the write, or None if the update was dropped because the
+            analysis is already completed/failed/cancelled (or kept changing under us)
+        
+        Raises:
+            ResourceNotFoundError: If the entity does not exist in entity['PartitionKey']
+        """
+        from azure.core import MatchConditions
+        from azure.core.exceptions import ResourceModifiedError
+        from azure.data.tables import UpdateMode
+        
+        stats = AzureSQLService._table_update_stats
+        etag = AzureSQLService._table_etags.get(analysis_id)
+        for _ in range(max_attempts):
+            if not etag:
+                stats['round_trips'] += 1
+                current = await self._table_call(
+                    'get_entity', partition_key=entity['PartitionKey'], row_key=analysis_id, select=['status']
+                )
+                if current.get('status') in ('completed', 'failed', 'cancelled'):
+                    logger.debug(f"Dropping progress update for {analysis_id}: already {current.get('status')}")
+                    AzureSQLService._table_etags.pop(analysis_id, None)
+                    return None
+                etag = current.metadata['etag']
+            try:
+                stats['round_trips'] += 1
+                return await self._table_call(
+                    'update_entity', entity=entity, mode=UpdateMode.MERGE,
+                    etag=etag, match_condition=MatchConditions.IfNotModified
+                )
+            except ResourceModifiedError:
+                # Another writer (e.g. another worker) updated the entity since we saw it
+                stats['etag_conflicts'] += 1
+                AzureSQLService._table_etags.pop(analysis_id, None)
+                etag = None
+        logger.debug(f"Dropping progress update for {analysis_id}: entity kept changing ({max_attempts} conflicts)")
+        return None
+    
+    def _update_analysis_sqlite(self, analysis_id: str, updates: Dict) -> bool:
+        """Row-level update in the local SQLite database (shared by async and sync callers)"""
+        try:
+            if self.sqlite_store.update_analysis(analysis_id, updates):
+                return True
+            logger.warning(f"Analysis {analysis_id} not found in SQLite for update")
+            return False
+        except Exception as e:
+            logger.error(f"Failed to update analysis {analysis_id} in SQLite: {e}", exc_info=True)
+            return False
+    
     def update_analysis_sync(self, analysis_id: str, updates: Dict) -> bool:
         """
         Synchronous version of update_analysis for use from threads (e.g., heartbeat).
-        For Table Storage, we use asyncio.run() to call the async method.
+        Writes go through the progress coalescer's DB I/O thread; without it, Table
+        Storage updates still run on the DB I/O thread's event loop.
         """
-        # Priority 1: Use Table Storage if available (via async wrapper)
+        cache = get_status_cache()
+        if cache is not None:
+            cache.apply(analysis_id, updates)
+        result = self._update_analysis_sync(analysis_id, updates)
+        if not result and cache is not None:
+            cache.invalidate(analysis_id)
+        if result:
+            get_progress_bus().publish(analysis_id, updates)
+        return result
+    
+    def _update_analysis_sync(self, analysis_id: str, updates: Dict) -> bool:
+        coalescer = get_progress_coalescer()
+        if coalescer is not None and not coalescer.on_db_thread():
+            if is_progress_update(updates):
+                return coalescer.submit(analysis_id, updates, self._update_analysis_direct)
+            return coalescer.write(analysis_id, updates, self._update_analysis_direct)
+        
+        # Priority 1: Use Table Storage if available (async client on the DB I/O thread's loop)
         if hasattr(self, '_use_table') and self._use_table:
             try:
-                import asyncio
-                # For sync operations, run async update in a new event loop
-                # This is safe because we're in a thread (heartbeat thread)
-                try:
-                    # Try to get existing loop
-                    loop = asyncio.get_event_loop()
-                    if loop.is_running():
-                        # Loop is running - create new one in thread
-                        loop = asyncio.new_event_loop()
-                        asyncio.set_event_loop(loop)
-                except RuntimeError:
-                    # No loop exists - create new one
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                
-                result = loop.run_until_complete(self.update_analysis(analysis_id, updates))
-                return result
+                if on_db_io_thread():
+                    # Cannot block the DB I/O loop on itself - queue the write behind the current one
+                    asyncio.ensure_future(self._update_analysis_direct(analysis_id, updates))
+                    return True
+                return run_on_db_io_loop(self._update_analysis_direct(analysis_id, updates))
             except Exception as e:
                 logger.error(f"Failed to update analysis in Table Storage (sync): {e}", exc_info=True)
                 return False
         
+        if getattr(self, '_use_sqlite', False):
+            return self._update_analysis_sqlite(analysis_id, updates)
+        
         if self._use_mock:
             # CRITICAL: Always ensure analysis exists in memory before updating
             # If not in memory, try to load from file first (for cross-worker scenarios)
@@ -977,9 +1532,135 @@ class AzureSQLService:
         logger.warning(f"UPDATE_SYNC: Real SQL database - sync method not available. Use async update_analysis instead.")
         return False
     
-    async def get_analysis(self, analysis_id: str) -> Optional[Dict]:
+    async def get_analysis(self, analysis_id: str, include_metrics: bool = True) -> Optional[Dict]:
         """
         Get analysis record - uses Table Storage, SQL, or mock storage based on configuration
+        
+        Reads go through the in-process status cache (short TTL, single-flight). Progress
+        still buffered in this process is overlaid so callers read their own writes.
+        
+        Args:
+            analysis_id: Analysis to read
+            include_metrics: False reads only the status record (metrics is returned empty);
+                use it for status polling, the result document is only needed by detail views
+        """
+        cache = get_status_cache()
+        if cache is not None:
+            analysis = await cache.get(
+                analysis_id, include_metrics, lambda: self._get_analysis_direct(analysis_id, include_metrics)
+            )
+        else:
+            analysis = await self._get_analysis_direct(analysis_id, include_metrics)
+        if analysis and not include_metrics:
+            analysis['metrics'] = {}
+        coalescer = get_progress_coalescer()
+        if analysis and coalescer is not None:
+            pending = coalescer.pending(analysis_id)
+            if pending:
+                analysis = {**analysis, **pending}
+        return analysis
+    
+    async def get_analyses_status(self, analysis_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Status records (no metrics) of many analyses in batched reads
+        
+        Cached records are served from the status cache; the rest is read with one query
+        per partition and 14 ids (Table Storage) or one IN query per 500 ids (SQL,
+        SQLite) instead of one round trip per analysis. Buffered progress is overlaid
+        as in get_analysis.
+        
+        Returns:
+            Dict of analysis id -> status record (unknown ids are absent)
+        """
+        analysis_ids = list(dict.fromkeys(analysis_ids))
+        cache = get_status_cache()
+        if cache is not None:
+            found = await cache.get_many(analysis_ids, self._get_analyses_status_direct)
+        else:
+            found = await self._get_analyses_status_direct(analysis_ids)
+        coalescer = get_progress_coalescer()
+        for analysis_id, analysis in found.items():
+            analysis['metrics'] = {}
+            pending = coalescer.pending(analysis_id) if coalescer is not None else None
+            if pending:
+                found[analysis_id] = {**analysis, **pending}
+        return found
+    
+    async def _get_analyses_status_direct(self, analysis_ids: List[str]) -> Dict[str, Dict]:
+        """Batched status read from the configured backend"""
+        if hasattr(self, '_use_table') and self._use_table:
+            return await self._get_analyses_status_table(analysis_ids)
+        if getattr(self, '_use_sqlite', False):
+            analyses = await run_blocking(self.sqlite_store.get_analyses, analysis_ids)
+        elif self._use_mock:
+            self._load_mock_storage()
+            analyses = [
+                {**AzureSQLService._mock_storage[analysis_id]}
+                for analysis_id in analysis_ids if analysis_id in AzureSQLService._mock_storage
+            ]
+        else:
+            analyses = await run_blocking(self._sql_call, self._get_analyses_status_sql, analysis_ids)
+        return {analysis['id']: analysis for analysis in analyses}
+    
+    async def _get_analyses_status_table(self, analysis_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Query each partition for its ids (RowKeys OR-ed in chunks), concurrently; ids not
+        found in their bucket are looked up in the legacy partition
+        """
+        found: Dict[str, Dict] = {}
+        semaphore = asyncio.Semaphore(TABLE_LIST_READ_CONCURRENCY)
+        
+        async def query(partition_key: str, ids: List[str]) -> List:
+            row_keys = " or ".join("RowKey eq '{}'".format(i.replace("'", "''")) for i in ids)
+            async with semaphore:
+                return await self._table_query(f"PartitionKey eq '{partition_key}' and ({row_keys})", select=LIST_SELECT)
+        
+        remaining = analysis_ids
+        for partition_of in (lambda i: analysis_partition(i, self._partition_count), lambda i: LEGACY_ANALYSIS_PARTITION):
+            groups: Dict[str, List[str]] = {}
+            for analysis_id in remaining:
+                groups.setdefault(partition_of(analysis_id), []).append(analysis_id)
+            results = await asyncio.gather(*(
+                query(partition_key, ids[start:start + TABLE_BATCH_READ_KEYS])
+                for partition_key, ids in groups.items()
+                for start in range(0, len(ids), TABLE_BATCH_READ_KEYS)
+            ))
+            for entity in (entity for entities in results for entity in entities):
+                analysis = self._entity_to_analysis(entity)
+                found[analysis['id']] = analysis
+            remaining = [analysis_id for analysis_id in remaining if analysis_id not in found]
+            if not remaining:
+                break
+        return found
+    
+    def _get_analyses_status_sql(self, analysis_ids: List[str]) -> List[Dict]:
+        """Blocking pyodbc IN query (runs on the DB executor)"""
+        rows = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(analysis_ids), SQL_BATCH_READ_KEYS):
+                chunk = analysis_ids[start:start + SQL_BATCH_READ_KEYS]
+                cursor.execute(f"""
+                    SELECT a.id, a.status, a.current_step, a.step_progress, a.step_message,
+                           a.created_at, a.updated_at, COALESCE(a.steps_completed, '{{}}') as steps_completed
+                    FROM analyses a
+                    WHERE a.id IN ({', '.join('?' * len(chunk))})
+                """, chunk)
+                rows += cursor.fetchall()
+        return [{
+            'id': row[0],
+            'status': row[1],
+            'current_step': row[2],
+            'step_progress': row[3],
+            'step_message': row[4],
+            'steps_completed': json.loads(row[7]) if row[7] else {},
+            'created_at': str(row[5]),
+            'updated_at': str(row[6])
+        } for row in rows]
+    
+    async def _get_analysis_direct(self, analysis_id: str, include_metrics: bool = True) -> Optional[Dict]:
+        """
+        Read an analysis record from the configured backend
         """
         # Priority 1: Use Table Storage if available (most reliable)
         if hasattr(self, '_use_table') and self._use_table:
@@ -997,25 +1678,11 @@ class AzureSQLService:
                     if retry > 0:
                         await asyncio.sleep(0.2 * retry)  # Progressive delay: 0.2s, 0.4s, 0.6s, 0.8s
                     
-                    entity = self.table_client.get_entity(
-                        partition_key='analyses',
-                        row_key=analysis_id
-                    )
+                    entity = await self._get_table_entity(analysis_id, select=None if include_metrics else LIST_SELECT)
                     
-                    analysis = {
-                        'id': entity.get('RowKey'),
-                        'patient_id': entity.get('patient_id'),
-                        'filename': entity.get('filename'),
-                        'video_url': entity.get('video_url'),
-                        'status': entity.get('status'),
-                        'current_step': entity.get('current_step'),
-                        'step_progress': entity.get('step_progress', 0),
-                        'step_message': entity.get('step_message'),
-                        'metrics': json.loads(entity.get('metrics', '{}')) if isinstance(entity.get('metrics'), str) else entity.get('metrics', {}),
-                        'steps_completed': json.loads(entity.get('steps_completed', '{}')) if isinstance(entity.get('steps_completed'), str) else entity.get('steps_completed', {}),
-                        'created_at': entity.get('created_at'),
-                        'updated_at': entity.get('updated_at')
-                    }
+                    analysis = self._entity_to_analysis(entity)
+                    if include_metrics:
+                        await self._attach_table_result(entity, analysis)
                     logger.debug(f"✅ Retrieved analysis {analysis_id} from Table Storage (attempt {retry + 1})")
                     return analysis
                 except ResourceNotFoundError:
@@ -1039,6 +1706,13 @@ class AzureSQLService:
             logger.error(f"Failed to get analysis {analysis_id} from Table Storage: {last_error}")
             return None
         
+        if getattr(self, '_use_sqlite', False):
+            try:
+                return await run_blocking(self.sqlite_store.get_analysis, analysis_id, include_metrics)
+            except Exception as e:
+                logger.error(f"Failed to get analysis from SQLite: {e}", exc_info=True)
+                return None
+        
         if self._use_mock:
             import os
             import threading
@@ -1264,79 +1938,239 @@ class AzureSQLService:
             return None
         
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute("""
-                    SELECT id, patient_id, filename, video_url, status, 
-                           current_step, step_progress, step_message, 
-                           metrics, created_at, updated_at,
-                           COALESCE(steps_completed, '{}') as steps_completed
-                    FROM analyses
-                    WHERE id = ?
-                """, (analysis_id,))
-                
-                row = cursor.fetchone()
-                if row:
-                    metrics = json.loads(row[8]) if row[8] else {}
-                    steps_completed = json.loads(row[11]) if len(row) > 11 and row[11] else {}
-                    return {
-                        'id': row[0],
-                        'patient_id': row[1],
-                        'filename': row[2],
-                        'video_url': row[3],
-                        'status': row[4],
-                        'current_step': row[5],
-                        'step_progress': row[6],
-                        'step_message': row[7],
-                        'metrics': metrics,
-                        'steps_completed': steps_completed,
-                        'created_at': str(row[9]),
-                        'updated_at': str(row[10])
-                    }
-                return None
+            return await run_blocking(self._sql_call, self._get_analysis_sql, analysis_id, include_metrics)
         except Exception as e:
             logger.error(f"Failed to get analysis: {e}")
             return None
     
+    @staticmethod
+    def _sql_analyses_source(include_metrics: bool) -> str:
+        """FROM clause for analysis reads (the result table is only joined when metrics are read)"""
+        return "analyses a LEFT JOIN analysis_results r ON r.id = a.id" if include_metrics else "analyses a"
+    
+    @staticmethod
+    def _sql_metrics_column(include_metrics: bool) -> str:
+        """Metrics column: the result document, or the inline column of rows written before the split"""
+        return "COALESCE(r.metrics, a.metrics) AS metrics" if include_metrics else "NULL AS metrics"
+    
+    def _get_analysis_sql(self, analysis_id: str, include_metrics: bool = True) -> Optional[Dict]:
+        """Blocking pyodbc read (runs on the DB executor)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT a.id, a.patient_id, a.filename, a.video_url, a.status, 
+                       a.current_step, a.step_progress, a.step_message, 
+                       {self._sql_metrics_column(include_metrics)}, a.created_at, a.updated_at,
+                       COALESCE(a.steps_completed, '{{}}') as steps_completed
+                FROM {self._sql_analyses_source(include_metrics)}
+                WHERE a.id = ?
+            """, (analysis_id,))
+
+            row = cursor.fetchone()
+            if row:
+                metrics = json.loads(row[8]) if row[8] else {}
+                steps_completed = json.loads(row[11]) if len(row) > 11 and row[11] else {}
+                return {
+                    'id': row[0],
+                    'patient_id': row[1],
+                    'filename': row[2],
+                    'video_url': row[3],
+                    'status': row[4],
+                    'current_step': row[5],
+                    'step_progress': row[6],
+                    'step_message': row[7],
+                    'metrics': metrics,
+                    'steps_completed': steps_completed,
+                    'created_at': str(row[9]),
+                    'updated_at': str(row[10])
+                }
+            return None
+    
+    async def list_analyses_page(self, limit: int = 50, cursor: Optional[str] = None,
+                                 include_metrics: bool = True, summary: bool = False,
+                                 fields: Optional[List[str]] = None) -> Dict:
+        """
+        One page of analyses, most recently created first
+        
+        Args:
+            limit: Page size
+            cursor: next_cursor of the previous page (None for the first page)
+            include_metrics: False skips reading and decoding the metrics payload
+            summary: Return only the headline metrics (see result_store.SUMMARY_METRICS)
+            fields: Status fields the caller needs (None for all); Table Storage reads only
+                these plus VERSION_FIELDS, other fields of the returned records may be empty
+            
+        Returns:
+            Dict with 'analyses' and 'next_cursor' (None on the last page)
+            
+        Raises:
+            ValidationError: If the cursor is malformed or was issued by another backend
+        """
+        position = decode_cursor(cursor) if cursor else None
+        
+        if hasattr(self, '_use_table') and self._use_table:
+            if position is not None and not isinstance(position.get('rk'), str):
+                raise ValidationError("Invalid list cursor", field="cursor")
+            analyses, next_position = await self._list_analyses_page_table(limit, position, include_metrics, summary, fields)
+        else:
+            after = None
+            if position is not None:
+                if not isinstance(position.get('created_at'), str) or not isinstance(position.get('id'), str):
+                    raise ValidationError("Invalid list cursor", field="cursor")
+                after = (position['created_at'], position['id'])
+            if getattr(self, '_use_sqlite', False):
+                analyses, next_after = await run_blocking(self.sqlite_store.list_analyses_page, limit, after, include_metrics)
+            elif self._use_mock:
+                analyses, next_after = self._list_analyses_page_mock(limit, after, include_metrics)
+            else:
+                analyses, next_after = await run_blocking(self._sql_call, self._list_analyses_page_sql, limit, after, include_metrics)
+            next_position = {'created_at': next_after[0], 'id': next_after[1]} if next_after else None
+            if include_metrics and summary:
+                for analysis in analyses:
+                    analysis['metrics'] = summarize_metrics(analysis.get('metrics'))
+        
+        return {'analyses': analyses, 'next_cursor': encode_cursor(next_position) if next_position else None}
+    
+    async def _list_analyses_page_table(self, limit: int, position: Optional[Dict], include_metrics: bool,
+                                        summary: bool = False,
+                                        fields: Optional[List[str]] = None) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Read one page through the time index: walk the monthly index partitions from
+        newest to oldest collecting the page's ids, then point-read each analysis from
+        its own partition with bounded concurrency. Result documents are only read
+        when metrics are requested, and only their summary for summary pages.
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        oldest_bucket = await self._ensure_table_time_index()
+        
+        after_row_key = position['rk'] if position else None
+        try:
+            bucket = bucket_of_row_key(after_row_key) if after_row_key else current_bucket()
+        except (ValueError, OverflowError, OSError):
+            raise ValidationError("Invalid list cursor", field="cursor")
+        
+        # One extra entry tells us whether another page exists
+        index_entries: List = []
+        while len(index_entries) <= limit and bucket >= oldest_bucket:
+            query_filter = f"PartitionKey eq '{time_index_partition(bucket)}'"
+            if after_row_key:
+                query_filter += " and RowKey gt '{}'".format(after_row_key.replace("'", "''"))
+                after_row_key = None  # Only the cursor's own bucket is partially consumed
+            index_entries += await self._table_query(
+                query_filter, select=['RowKey', 'analysis_id', 'analysis_pk'], limit=limit + 1 - len(index_entries)
+            )
+            bucket = previous_bucket(bucket)
+        page_entries = index_entries[:limit]
+        
+        if fields is not None:
+            wanted = set(fields) | set(VERSION_FIELDS)
+            select = ['RowKey'] + [p for p in LIST_SELECT if p in wanted]
+            if include_metrics:
+                select += ['has_result', 'metrics']  # 'metrics': legacy inline documents
+        else:
+            select = None if include_metrics and not summary else LIST_SELECT + (['metrics'] if include_metrics else [])
+        semaphore = asyncio.Semaphore(TABLE_LIST_READ_CONCURRENCY)
+        
+        async def read(entry) -> Optional[Dict]:
+            async with semaphore:
+                try:
+                    entity = await self._get_table_entity(
+                        entry['analysis_id'], select=select, partition_key=entry.get('analysis_pk')
+                    )
+                except ResourceNotFoundError:
+                    return None
+                try:
+                    analysis = self._entity_to_analysis(entity)
+                    if include_metrics:
+                        await self._attach_table_result(entity, analysis, summary=summary)
+                    return analysis
+                except Exception as item_error:
+                    logger.warning(f"Error processing list item from Table Storage: {item_error}")
+                    return None
+        
+        analyses = [a for a in await asyncio.gather(*(read(entry) for entry in page_entries)) if a]
+        next_position = {'rk': page_entries[-1]['RowKey']} if len(index_entries) > limit else None
+        logger.debug(f"✅ Listed {len(analyses)} analyses from Table Storage time index")
+        return analyses, next_position
+    
+    def _list_analyses_page_mock(self, limit: int, after: Optional[Tuple[str, str]],
+                                 include_metrics: bool) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """Keyset page over the file-based mock storage"""
+        self._load_mock_storage()
+        
+        def sort_key(analysis: Dict) -> Tuple[str, str]:
+            return (analysis.get('created_at') or '', analysis.get('id') or '')
+        
+        records = sorted(AzureSQLService._mock_storage.values(), key=sort_key, reverse=True)
+        if after:
+            records = [a for a in records if sort_key(a) < after]
+        page = []
+        for analysis in records[:limit]:
+            analysis_copy = analysis.copy()
+            analysis_copy.setdefault('steps_completed', {})
+            if not include_metrics:
+                analysis_copy['metrics'] = {}
+            page.append(analysis_copy)
+        next_after = sort_key(page[-1]) if len(records) > limit else None
+        return page, next_after
+    
+    def _list_analyses_page_sql(self, limit: int, after: Optional[Tuple[str, str]],
+                                include_metrics: bool) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """Blocking pyodbc keyset page (runs on the DB executor)"""
+        where_clause = ""
+        params: List = []
+        if after:
+            where_clause = "WHERE a.created_at < CAST(? AS datetime2) OR (a.created_at = CAST(? AS datetime2) AND a.id < ?)"
+            params = [after[0], after[0], after[1]]
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT a.id, a.patient_id, a.filename, a.video_url, a.status, 
+                       a.current_step, a.step_progress, a.step_message, 
+                       {self._sql_metrics_column(include_metrics)}, a.created_at, a.updated_at,
+                       COALESCE(a.steps_completed, '{{}}') as steps_completed
+                FROM {self._sql_analyses_source(include_metrics)}
+                {where_clause}
+                ORDER BY a.created_at DESC, a.id DESC
+                OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+            """, (*params, limit + 1))
+            rows = cursor.fetchall()
+        
+        page = [{
+            'id': row[0],
+            'patient_id': row[1],
+            'filename': row[2],
+            'video_url': row[3],
+            'status': row[4],
+            'current_step': row[5],
+            'step_progress': row[6],
+            'step_message': row[7],
+            'metrics': json.loads(row[8]) if row[8] else {},
+            'steps_completed': json.loads(row[11]) if row[11] else {},
+            'created_at': str(row[9]),
+            'updated_at': str(row[10])
+        } for row in rows[:limit]]
+        next_after = (page[-1]['created_at'], page[-1]['id']) if len(rows) > limit else None
+        return page, next_after
+    
     async def list_analyses(self, limit: int = 50) -> List[Dict]:
         """List all analyses, ordered by most recent first"""
         # Priority 1: Use Table Storage if available
         if hasattr(self, '_use_table') and self._use_table:
             try:
-                entities = self.table_client.query_entities(
-                    query_filter="PartitionKey eq 'analyses'"
-                )
-                
-                analyses = []
-                for entity in entities:
-                    try:
-                        analysis = {
-                            'id': entity.get('RowKey'),
-                            'patient_id': entity.get('patient_id'),
-                            'filename': entity.get('filename'),
-                            'video_url': entity.get('video_url'),
-                            'status': entity.get('status'),
-                            'current_step': entity.get('current_step'),
-                            'step_progress': entity.get('step_progress', 0),
-                            'step_message': entity.get('step_message'),
-                            'metrics': json.loads(entity.get('metrics', '{}')) if isinstance(entity.get('metrics'), str) else entity.get('metrics', {}),
-                            'steps_completed': json.loads(entity.get('steps_completed', '{}')) if isinstance(entity.get('steps_completed'), str) else entity.get('steps_completed', {}),
-                            'created_at': entity.get('created_at'),
-                            'updated_at': entity.get('updated_at')
-                        }
-                        analyses.append(analysis)
-                    except Exception as item_error:
-                        logger.warning(f"Error processing list item from Table Storage: {item_error}")
-                        continue
-                
-                # Sort by updated_at descending (most recent first)
-                analyses.sort(key=lambda x: x.get('updated_at', '') or '', reverse=True)
-                logger.debug(f"✅ Listed {len(analyses[:limit])} analyses from Table Storage")
-                return analyses[:limit]
+                analyses, _ = await self._list_analyses_page_table(limit, None, include_metrics=True)
+                return analyses
             except Exception as e:
                 logger.error(f"Failed to list analyses from Table Storage: {e}", exc_info=True)
                 return []
         
+        if getattr(self, '_use_sqlite', False):
+            try:
+                return await run_blocking(self.sqlite_store.list_analyses, limit)
+            except Exception as e:
+                logger.error(f"Failed to list analyses from SQLite: {e}", exc_info=True)
+                return []
+        
         if self._use_mock:
             # Reload from file to ensure we have latest data
             self._load_mock_storage()
@@ -1358,46 +2192,47 @@ class AzureSQLService:
             return analyses[:limit]
         
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                # Include steps_completed in query for consistency
-                cursor.execute("""
-                    SELECT id, patient_id, filename, video_url, status, 
-                           current_step, step_progress, step_message, 
-                           metrics, created_at, updated_at,
-                           COALESCE(steps_completed, '{}') as steps_completed
-                    FROM analyses
-                    ORDER BY created_at DESC
-                    OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
-                """, (limit,))
-                
-                rows = cursor.fetchall()
-                analyses = []
-                for row in rows:
-                    try:
-                        metrics = json.loads(row[8]) if row[8] else {}
-                        steps_completed = json.loads(row[11]) if len(row) > 11 and row[11] else {}
-                        analyses.append({
-                            'id': row[0],
-                            'patient_id': row[1],
-                            'filename': row[2],
-                            'video_url': row[3],
-                            'status': row[4],
-                            'current_step': row[5],
-                            'step_progress': row[6],
-                            'step_message': row[7],
-                            'metrics': metrics,
-                            'steps_completed': steps_completed,
-                            'created_at': str(row[9]),
-                            'updated_at': str(row[10])
-                        })
-                    except Exception as item_error:
-                        logger.warning(f"Error processing SQL row: {item_error}")
-                        continue
-                return analyses
+            return await run_blocking(self._sql_call, self._list_analyses_sql, limit)
         except Exception as e:
             logger.error(f"Failed to list analyses: {e}")
             return []
+    
+    def _list_analyses_sql(self, limit: int) -> List[Dict]:
+        """Blocking pyodbc listing (runs on the DB executor)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            # Include steps_completed in query for consistency
+            cursor.execute(f"""
+                SELECT a.id, a.patient_id, a.filename, a.video_url, a.status, 
+                       a.current_step, a.step_progress, a.step_message, 
+                       {self._sql_metrics_column(True)}, a.created_at, a.updated_at,
+                       COALESCE(a.steps_completed, '{{}}') as steps_completed
+                FROM {self._sql_analyses_source(True)}
+                ORDER BY a.created_at DESC
+                OFFSET 0 ROWS FETCH NEXT ? ROWS ONLY
+            """, (limit,))
 
-
-
+            rows = cursor.fetchall()
+            analyses = []
+            for row in rows:
+                try:
+                    metrics = json.loads(row[8]) if row[8] else {}
+                    steps_completed = json.loads(row[11]) if len(row) > 11 and row[11] else {}
+                    analyses.append({
+                        'id': row[0],
+                        'patient_id': row[1],
+                        'filename': row[2],
+                        'video_url': row[3],
+                        'status': row[4],
+                        'current_step': row[5],
+                        'step_progress': row[6],
+                        'step_message': row[7],
+                        'metrics': metrics,
+                        'steps_completed': steps_completed,
+                        'created_at': str(row[9]),
+                        'updated_at': str(row[10])
+                    })
+                except Exception as item_error:
+                    logger.warning(f"Error processing SQL row: {item_error}")
+                    continue
+            return analyses
@@ -0,0 +1,443 @@
+"""
+Local SQLite Analysis Store
+Embedded (WAL-mode) storage used when neither Azure Table Storage nor Azure SQL is configured
+"""
+from typing import Optional, Dict, List, Tuple
+from datetime import datetime
+from loguru import logger
+import os
+import json
+import threading
+
+from app.core.schemas import TERMINAL_STATUSES
+
+try:
+    import sqlite3
+    SQLITE_AVAILABLE = True
+except ImportError:
+    SQLITE_AVAILABLE = False
+    sqlite3 = None
+
+# Columns stored natively; any other field is kept in the 'extra' JSON column.
+# 'metrics' is read from analysis_results (analyses.metrics only holds pre-split results)
+ANALYSIS_COLUMNS = (
+    'id', 'patient_id', 'filename', 'video_url', 'status', 'current_step',
+    'step_progress', 'step_message', 'metrics', 'steps_completed', 'created_at', 'updated_at'
+)
+JSON_COLUMNS = ('metrics', 'steps_completed')
+# WAL keeps its index in shared memory next to the database, which network filesystems
+# (the SMB-mounted /home share of App Service) do not support across processes
+NETWORK_FILESYSTEMS = ('cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', '9p', 'fuse.sshfs', 'fuse.blobfuse', 'fuse.blobfuse2')
+
+
+def filesystem_type(path: str, mounts_file: str = '/proc/mounts') -> Optional[str]:
+    """
+    Filesystem type of the mount holding path (None if it cannot be determined)
+
+    Args:
+        path: File or directory (need not exist yet)
+        mounts_file: Mount table to read
+    """
+    path = os.path.realpath(os.path.abspath(path))
+    best_mount, best_type = '', None
+    try:
+        with open(mounts_file) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) >= len(best_mount):
+                    best_mount, best_type = mount_point, fields[2]
+    except OSError:
+        return None
+    return best_type
+
+
+def is_network_path(path: str) -> bool:
+    """Whether path is on a network filesystem, where the database cannot use WAL mode"""
+    return filesystem_type(path) in NETWORK_FILESYSTEMS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id TEXT PRIMARY KEY,
+    patient_id TEXT,
+    filename TEXT,
+    video_url TEXT,
+    status TEXT NOT NULL DEFAULT 'processing',
+    current_step TEXT,
+    step_progress INTEGER DEFAULT 0,
+    step_message TEXT,
+    metrics TEXT NOT NULL DEFAULT '{}',
+    steps_completed TEXT NOT NULL DEFAULT '{}',
+    extra TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_status ON analyses(status);
+CREATE INDEX IF NOT EXISTS idx_analyses_created_at_id ON analyses(created_at DESC, id DESC);
+CREATE TABLE IF NOT EXISTS analysis_results (
+    id TEXT PRIMARY KEY,
+    metrics TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+def _select_from(include_metrics: bool) -> str:
+    """Columns and source of analysis reads; the result table is only joined when metrics are read"""
+    columns = [f"a.{name}" for name in ANALYSIS_COLUMNS if name != 'metrics'] + ['a.extra']
+    if include_metrics:
+        return (f"SELECT {', '.join(columns)}, COALESCE(r.metrics, a.metrics) AS metrics "
+                f"FROM analyses a LEFT JOIN analysis_results r ON r.id = a.id")
+    return f"SELECT {', '.join(columns)}, '{{}}' AS metrics FROM analyses a"
+
+
+class SQLiteAnalysisStore:
+    """
+    Analysis records in a local SQLite database.
+
+    WAL mode lets readers in every uvicorn worker run concurrently with a writer, and
+    each update is a single row-level transaction, so workers never overwrite each
+    other's changes (unlike the JSON mock file, which is rewritten as a whole).
+    Connections are per thread; busy_timeout serializes concurrent writers.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Open (and create if needed) the database
+
+        Args:
+            db_path: Path to the SQLite database file (node-local disk)
+
+        Raises:
+            RuntimeError: If sqlite3 is missing or db_path is on a network filesystem
+        """
+        if not SQLITE_AVAILABLE:
+            raise RuntimeError("sqlite3 module not available")
+        fs_type = filesystem_type(db_path)
+        if fs_type in NETWORK_FILESYSTEMS:
+            raise RuntimeError(
+                f"{db_path} is on a network filesystem ({fs_type}); WAL mode needs node-local disk - set SQLITE_DB_FILE"
+            )
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+
+        conn = self._connection()
+        # auto_vacuum must be set before the first table is created
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.executescript(SCHEMA)
+        logger.info(f"✅ SQLite analysis store ready: {db_path}")
+
+    def _connection(self):
+        """Per-thread connection (sqlite3 connections must not be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10.0, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoint; safe against corruption in WAL mode
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _row_to_dict(row) -> Dict:
+        analysis = {key: row[key] for key in ANALYSIS_COLUMNS}
+        for key in JSON_COLUMNS:
+            analysis[key] = json.loads(row[key]) if row[key] else {}
+        extra = json.loads(row['extra']) if row['extra'] else {}
+        return {**extra, **analysis}
+
+    @staticmethod
+    def _split_fields(fields: Dict) -> Tuple[Dict, Dict]:
+        """Split a record/update into native column values and extra fields"""
+        columns, extra = {}, {}
+        for key, value in fields.items():
+            if key in ('id', 'created_at', 'updated_at'):
+                continue
+            if key in ANALYSIS_COLUMNS:
+                columns[key] = json.dumps(value or {}) if key in JSON_COLUMNS else value
+            else:
+                extra[key] = value
+        return columns, extra
+
+    def create_analysis(self, analysis_data: Dict) -> bool:
+        """Insert an analysis (replacing fields of an existing record with the same id)"""
+        analysis_id = analysis_data.get('id')
+        if not analysis_id:
+            logger.error("Analysis data missing 'id' field")
+            return False
+        now = datetime.now().isoformat()
+        record = {
+            'status': 'processing',
+            'current_step': 'pose_estimation',
+            'step_progress': 0,
+            'step_message': 'Initializing...',
+            **analysis_data
+        }
+        columns, extra = self._split_fields(record)
+        result = columns.pop('metrics', None)
+        names = list(columns.keys())
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                f"INSERT INTO analyses (id, {', '.join(names)}, extra, created_at, updated_at) "
+                f"VALUES (?, {', '.join('?' for _ in names)}, ?, ?, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET {', '.join(f'{n} = excluded.{n}' for n in names)}, "
+                f"extra = excluded.extra, updated_at = excluded.updated_at",
+                [analysis_id, *columns.values(), json.dumps(extra), now, now]
+            )
+            if result is not None:
+                self._write_result(conn, analysis_id, result, now)
+            else:
+                conn.execute("DELETE FROM analysis_results WHERE id = ?", (analysis_id,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    @staticmethod
+    def _write_result(conn, analysis_id: str, metrics_json: str, now: str) -> None:
+        """Store the result document (inside the caller's transaction)"""
+        conn.execute(
+            "INSERT INTO analysis_results (id, metrics, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET metrics = excluded.metrics, updated_at = excluded.updated_at",
+            (analysis_id, metrics_json, now)
+        )
+
+    def get_analysis(self, analysis_id: str, include_metrics: bool = True) -> Optional[Dict]:
+        """
+        Fetch one analysis by id
+
+        Args:
+            analysis_id: Analysis to read
+            include_metrics: False reads only the status row (metrics is returned empty)
+        """
+        row = self._connection().execute(
+            f"{_select_from(include_metrics)} WHERE a.id = ?", (analysis_id,)
+        ).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def get_analyses(self, analysis_ids: List[str]) -> List[Dict]:
+        """
+        Fetch the status rows of many analyses (metrics is returned empty)
+
+        Args:
+            analysis_ids: Analyses to read; unknown ids are skipped
+        """
+        rows = []
+        for start in range(0, len(analysis_ids), 500):
+            chunk = analysis_ids[start:start + 500]
+            rows += self._connection().execute(
+                f"{_select_from(False)} WHERE a.id IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def update_analysis(self, analysis_id: str, updates: Dict) -> bool:
+        """
+        Update fields of one analysis
+
+        steps_completed is merged with the stored value and unknown fields are merged into
+        'extra'; both happen inside one IMMEDIATE transaction so concurrent workers cannot
+        lose each other's updates. metrics is written to the analysis_results table in the
+        same transaction, so the status row stays small.
+
+        Returns:
+            True if the analysis exists and was updated
+        """
+        columns, extra = self._split_fields(updates)
+        result = columns.pop('metrics', None)
+        needs_merge = bool(extra) or 'steps_completed' in columns or result is not None
+        now = datetime.now().isoformat()
+        conn = self._connection()
+
+        if not needs_merge:
+            assignments = [f"{name} = ?" for name in columns] + ["updated_at = ?"]
+            cursor = conn.execute(
+                f"UPDATE analyses SET {', '.join(assignments)} WHERE id = ?",
+                [*columns.values(), now, analysis_id]
+            )
+            return cursor.rowcount > 0
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT steps_completed, extra FROM analyses WHERE id = ?", (analysis_id,)).fetchone()
+            if row is None:
+                conn.execute("ROLLBACK")
+                return False
+            if 'steps_completed' in columns:
+                steps = json.loads(row['steps_completed'] or '{}')
+                new_steps = updates.get('steps_completed') or {}
+                if isinstance(steps, dict) and isinstance(new_steps, dict):
+                    steps.update(new_steps)
+                    columns['steps_completed'] = json.dumps(steps)
+            if extra:
+                merged_extra = json.loads(row['extra'] or '{}')
+                merged_extra.update(extra)
+                columns['extra'] = json.dumps(merged_extra)
+            assignments = [f"{name} = ?" for name in columns] + ["updated_at = ?"]
+            conn.execute(
+                f"UPDATE analyses SET {', '.join(assignments)} WHERE id = ?",
+                [*columns.values(), now, analysis_id]
+            )
+            if result is not None:
+                self._write_result(conn, analysis_id, result, now)
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def list_analyses(self, limit: int = 50) -> List[Dict]:
+        """List analyses, most recently created first"""
+        rows = self._connection().execute(
+            f"{_select_from(True)} ORDER BY a.created_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def list_analyses_page(self, limit: int, after: Optional[Tuple[str, str]] = None,
+                           include_metrics: bool = True) -> Tuple[List[Dict], Optional[Tuple[str, str]]]:
+        """
+        One page of analyses, most recently created first (keyset pagination)
+
+        Args:
+            limit: Page size
+            after: (created_at, id) of the last row of the previous page
+            include_metrics: False skips reading the result documents
+
+        Returns:
+            (analyses, position of the last row if another page exists)
+        """
+        select = _select_from(include_metrics)
+        if after:
+            rows = self._connection().execute(
+                f"{select} WHERE (a.created_at, a.id) < (?, ?) "
+                f"ORDER BY a.created_at DESC, a.id DESC LIMIT ?", (after[0], after[1], limit + 1)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                f"{select} ORDER BY a.created_at DESC, a.id DESC LIMIT ?", (limit + 1,)
+            ).fetchall()
+        page = [self._row_to_dict(row) for row in rows[:limit]]
+        next_after = (page[-1]['created_at'], page[-1]['id']) if len(rows) > limit else None
+        return page, next_after
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def import_json(self, json_path: str) -> int:
+        """
+        One-time import of records from the legacy JSON mock storage file
+
+        Returns:
+            Number of records imported (existing ids are left untouched)
+        """
+        if not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                records = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️ SQLITE: Could not read legacy mock storage {json_path}: {e}")
+            return 0
+        if not isinstance(records, dict):
+            return 0
+
+        conn = self._connection()
+        imported = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for analysis_id, record in records.items():
+                if not isinstance(record, dict):
+                    continue
+                columns, extra = self._split_fields(record)
+                names = list(columns.keys())
+                created_at = record.get('created_at') or datetime.now().isoformat()
+                cursor = conn.execute(
+                    f"INSERT OR IGNORE INTO analyses (id, {', '.join(names)}, extra, created_at, updated_at) "
+                    f"VALUES (?, {', '.join('?' for _ in names)}, ?, ?, ?)",
+                    [analysis_id, *columns.values(), json.dumps(extra), created_at, record.get('updated_at') or created_at]
+                )
+                imported += cursor.rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if imported:
+            logger.info(f"📥 SQLITE: Imported {imported} analyses from legacy mock storage {json_path}")
+        return imported
+
+    def prune(self, max_bytes: int, max_age_seconds: float, protected_ids: Optional[set] = None) -> int:
+        """
+        Delete finished analyses that are too old, then oldest-first until under max_bytes
+
+        Args:
+            max_bytes: Target maximum database size (0 disables the size limit)
+            max_age_seconds: Remove terminal records not updated for this long (0 disables)
+            protected_ids: Analysis IDs that are in flight and must be kept
+
+        Returns:
+            Number of records removed
+        """
+        protected_ids = protected_ids or set()
+        conn = self._connection()
+        rows = conn.execute(
+            f"SELECT a.id, a.updated_at, LENGTH(a.metrics) + LENGTH(a.steps_completed) + LENGTH(a.extra) "
+            f"+ IFNULL(LENGTH(a.step_message), 0) + IFNULL(LENGTH(a.video_url), 0) + IFNULL(LENGTH(r.metrics), 0) AS size "
+            f"FROM analyses a LEFT JOIN analysis_results r ON r.id = a.id "
+            f"WHERE a.status IN ({', '.join('?' for _ in TERMINAL_STATUSES)}) ORDER BY a.updated_at ASC",
+            TERMINAL_STATUSES
+        ).fetchall()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        total_bytes = conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+        total_bytes -= conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+
+        now = datetime.now().timestamp()
+        to_delete = []
+        for row in rows:
+            if row['id'] in protected_ids:
+                continue
+            try:
+                updated_ts = datetime.fromisoformat(row['updated_at']).timestamp()
+            except (TypeError, ValueError):
+                updated_ts = 0.0
+            expired = max_age_seconds > 0 and (now - updated_ts) > max_age_seconds
+            over_quota = max_bytes > 0 and total_bytes > max_bytes
+            if not expired and not over_quota:
+                continue
+            to_delete.append(row['id'])
+            total_bytes -= row['size'] or 0
+
+        if not to_delete:
+            return 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany("DELETE FROM analyses WHERE id = ?", [(analysis_id,) for analysis_id in to_delete])
+            conn.executemany("DELETE FROM analysis_results WHERE id = ?", [(analysis_id,) for analysis_id in to_delete])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        # Return freed pages to the filesystem
+        conn.execute("PRAGMA incremental_vacuum")
+        logger.info(f"🧹 PRUNE: Removed {len(to_delete)} finished analyses from SQLite store")
+        return len(to_delete)
+
+
+_stores: Dict[str, SQLiteAnalysisStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_sqlite_store(db_path: str) -> SQLiteAnalysisStore:
+    """Get the process-wide store for a database path (schema is initialised once)"""
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = SQLiteAnalysisStore(db_path)
+            _stores[db_path] = store
+        return store
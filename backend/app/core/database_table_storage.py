@@ -15,6 +15,8 @@ from datetime import datetime
 from azure.data.tables import TableServiceClient, TableClient
 from azure.core.exceptions import ResourceNotFoundError, HttpResponseError
 
+from app.core.db_io import AIO_TABLES_AVAILABLE, get_async_table_client, run_blocking
+
 try:
     from app.core.config_simple import settings
 except ImportError:
@@ -63,6 +65,20 @@ class AzureTableStorageService:
                 self.table_client = None
                 self._use_table = False
     
+    async def _table_call(self, method: str, **kwargs):
+        """Call a TableClient method on the pooled async client (sync client on the DB executor as fallback)"""
+        if AIO_TABLES_AVAILABLE:
+            client = get_async_table_client(self.connection_string, self.table_name)
+            return await getattr(client, method)(**kwargs)
+        return await run_blocking(getattr(self.table_client, method), **kwargs)
+    
+    async def _table_query(self, query_filter: str) -> List:
+        """Run a query and collect all pages without blocking the event loop"""
+        if AIO_TABLES_AVAILABLE:
+            client = get_async_table_client(self.connection_string, self.table_name)
+            return [entity async for entity in client.query_entities(query_filter=query_filter)]
+        return await run_blocking(lambda: list(self.table_client.query_entities(query_filter=query_filter)))
+    
     async def create_analysis(self, analysis_data: Dict) -> bool:
         """Create new analysis record"""
         if not self._use_table or not self.table_client:
@@ -93,7 +109,7 @@ class AzureTableStorageService:
                 'updated_at': datetime.utcnow().isoformat()
             }
             
-            self.table_client.create_entity(entity=entity)
+            await self._table_call('create_entity', entity=entity)
             logger.info(f"✅ Created analysis {analysis_id} in Table Storage")
             return True
             
@@ -108,7 +124,8 @@ class AzureTableStorageService:
             return None
         
         try:
-            entity = self.table_client.get_entity(
+            entity = await self._table_call(
+                'get_entity',
                 partition_key='analyses',
                 row_key=analysis_id
             )
@@ -145,7 +162,8 @@ class AzureTableStorageService:
         
         try:
             # Get existing entity
-            entity = self.table_client.get_entity(
+            entity = await self._table_call(
+                'get_entity',
                 partition_key='analyses',
                 row_key=analysis_id
             )
@@ -163,7 +181,7 @@ class AzureTableStorageService:
             entity['updated_at'] = datetime.utcnow().isoformat()
             
             # Update entity
-            self.table_client.update_entity(entity=entity)
+            await self._table_call('update_entity', entity=entity)
             logger.debug(f"✅ Updated analysis {analysis_id} in Table Storage")
             return True
             
@@ -181,9 +199,7 @@ class AzureTableStorageService:
             return []
         
         try:
-            entities = self.table_client.query_entities(
-                query_filter="PartitionKey eq 'analyses'"
-            )
+            entities = await self._table_query("PartitionKey eq 'analyses'")
             
             analyses = []
             for entity in entities:
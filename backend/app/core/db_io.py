@@ -0,0 +1,173 @@
+"""
+Database I/O Runtime
+Async Table Storage clients, the bounded executor for blocking drivers, and the DB I/O thread
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from loguru import logger
+import os
+import asyncio
+import functools
+import threading
+import weakref
+
+try:
+    import aiohttp
+    from azure.core.pipeline.transport import AioHttpTransport
+    from azure.data.tables.aio import TableServiceClient as AsyncTableServiceClient
+    AIO_TABLES_AVAILABLE = True
+except ImportError:
+    AIO_TABLES_AVAILABLE = False
+    aiohttp = None
+    AioHttpTransport = None
+    AsyncTableServiceClient = None
+
+# aiohttp sessions are bound to the event loop that created them, so clients are cached
+# per loop (the uvicorn loop and the DB I/O thread loop each get their own pool)
+_table_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Dict]]" = weakref.WeakKeyDictionary()
+_table_clients_lock = threading.Lock()
+
+_db_executor: Optional[ThreadPoolExecutor] = None
+_db_executor_lock = threading.Lock()
+
+_db_io_loop: Optional[asyncio.AbstractEventLoop] = None
+_db_io_thread: Optional[threading.Thread] = None
+_db_io_lock = threading.Lock()
+_db_io_ready = threading.Event()
+
+
+# ----------------------------------------------------------------------
+# Async Table Storage clients
+# ----------------------------------------------------------------------
+
+def get_async_table_client(connection_string: str, table_name: str):
+    """
+    Get an azure.data.tables.aio TableClient for the running event loop
+
+    All tables of one storage account share a single service client, and therefore a
+    single aiohttp session with a connection pool of TABLE_POOL_SIZE (default 32)
+    keep-alive connections.
+
+    Args:
+        connection_string: Storage account connection string
+        table_name: Table to operate on
+
+    Returns:
+        Async TableClient bound to the current event loop
+    """
+    if not AIO_TABLES_AVAILABLE:
+        raise RuntimeError("azure.data.tables.aio / aiohttp not available")
+    loop = asyncio.get_running_loop()
+    with _table_clients_lock:
+        accounts = _table_clients.setdefault(loop, {})
+        account = accounts.get(connection_string)
+        if account is None:
+            pool_size = int(os.getenv("TABLE_POOL_SIZE", "32"))
+            session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size, keepalive_timeout=60))
+            transport = AioHttpTransport(session=session, session_owner=False)
+            account = {
+                "session": session,
+                "service": AsyncTableServiceClient.from_connection_string(connection_string, transport=transport),
+                "tables": {},
+            }
+            accounts[connection_string] = account
+            logger.info(f"🔌 TABLE STORAGE: Created async client pool (size {pool_size}) on {threading.current_thread().name}")
+        client = account["tables"].get(table_name)
+        if client is None:
+            # Table clients created from the service client share its transport
+            client = account["service"].get_table_client(table_name=table_name)
+            account["tables"][table_name] = client
+        return client
+
+
+async def close_async_table_clients() -> None:
+    """Close the async Table Storage clients of the running event loop (used at shutdown)"""
+    loop = asyncio.get_running_loop()
+    with _table_clients_lock:
+        accounts = _table_clients.pop(loop, {})
+    for account in accounts.values():
+        try:
+            for client in account["tables"].values():
+                await client.close()
+            await account["service"].close()
+            await account["session"].close()
+        except Exception as e:
+            logger.warning(f"⚠️ TABLE STORAGE: Failed to close async client: {e}")
+
+
+# ----------------------------------------------------------------------
+# Bounded executor for blocking drivers (pyodbc, sqlite3)
+# ----------------------------------------------------------------------
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get the process-wide executor for blocking DB calls (DB_EXECUTOR_MAX_WORKERS, default 8)"""
+    global _db_executor
+    if _db_executor is None:
+        with _db_executor_lock:
+            if _db_executor is None:
+                max_workers = int(os.getenv("DB_EXECUTOR_MAX_WORKERS", "8"))
+                _db_executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-exec")
+                logger.info(f"🧵 DB EXECUTOR: Started with {max_workers} workers")
+    return _db_executor
+
+
+async def run_blocking(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking DB call on the bounded executor without blocking the event loop
+
+    The executor bounds how many blocking driver calls (and connections) are in flight;
+    excess calls queue instead of starving the default executor used by the rest of the app.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown_db_executor(wait: bool = True) -> None:
+    """Stop the blocking-call executor (used at shutdown)"""
+    global _db_executor
+    with _db_executor_lock:
+        executor, _db_executor = _db_executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+# ----------------------------------------------------------------------
+# DB I/O thread (persistent event loop for writes from sync code)
+# ----------------------------------------------------------------------
+
+def get_db_io_loop() -> asyncio.AbstractEventLoop:
+    """Get the event loop of the DB I/O thread, starting the thread on first use"""
+    global _db_io_loop, _db_io_thread
+    if _db_io_thread is not None and _db_io_thread.is_alive():
+        return _db_io_loop
+    with _db_io_lock:
+        if _db_io_thread is None or not _db_io_thread.is_alive():
+            _db_io_ready.clear()
+
+            def run_loop():
+                global _db_io_loop
+                _db_io_loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(_db_io_loop)
+                _db_io_ready.set()
+                logger.info("🗄️ DB I/O THREAD: Started")
+                _db_io_loop.run_forever()
+
+            _db_io_thread = threading.Thread(target=run_loop, daemon=True, name="DBIOThread")
+            _db_io_thread.start()
+    _db_io_ready.wait()
+    return _db_io_loop
+
+
+def db_io_loop_running() -> bool:
+    return _db_io_thread is not None and _db_io_thread.is_alive()
+
+
+def on_db_io_thread() -> bool:
+    """True when called from the DB I/O thread"""
+    return _db_io_thread is not None and threading.current_thread() is _db_io_thread
+
+
+def run_on_db_io_loop(coro, timeout: float = 30.0) -> Any:
+    """Run a coroutine on the DB I/O thread and wait for its result (from a non-DB thread)"""
+    future = asyncio.run_coroutine_threadsafe(coro, get_db_io_loop())
+    return future.result(timeout=timeout)
@@ -0,0 +1,237 @@
+"""
+Fast JSON Responses
+orjson-backed serialization, negotiated compression and a cache of encoded result payloads
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from datetime import date, datetime
+from enum import Enum
+from loguru import logger
+import os
+import json
+import gzip
+import threading
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+    brotli = None
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    np = None
+
+# Bodies smaller than this are sent uncompressed (compression would not pay for itself)
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+
+def _default(value: Any) -> Any:
+    """Types neither orjson nor json handle natively (NumPy values for the stdlib path)"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if hasattr(value, 'model_dump'):
+        return value.model_dump()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if NUMPY_AVAILABLE:
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        if isinstance(value, np.generic):
+            return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize to compact JSON bytes
+
+    orjson (with native NumPy support) when installed, stdlib json otherwise. NaN and
+    infinity become null with orjson; metrics computed by NumPy can contain them.
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps() (the application's default response class)"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Content encoding to use for a client: 'br' (if brotli is installed), 'gzip' or None
+
+    Args:
+        accept_encoding: Accept-Encoding request header
+    """
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for item in accept_encoding.lower().split(','):
+        name, _, params = item.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(name.strip())
+    if BROTLI_AVAILABLE and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class EncodedPayloadCache:
+    """
+    LRU of serialized response bodies of finished analyses, keyed by ETag.
+
+    A completed analysis no longer changes, so its detail response is serialized once
+    and (per content encoding) compressed once; later reads send the stored bytes
+    without loading the result document or building the response model. The ETag
+    covers updated_at, so a rewritten analysis gets a new key and the old entry ages out.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        Args:
+            max_bytes: Total size of cached bodies (all encodings); 0 disables the cache
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, bytes]]" = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def get(self, key: str, encoding: Optional[str]) -> Optional[bytes]:
+        """Cached body in the given encoding (compressed on first use), or None"""
+        with self._lock:
+            variants = self._entries.get(key)
+            if variants is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            body = variants.get(encoding or 'identity')
+            if body is not None:
+                return body
+            identity = variants['identity']
+        body = compress(identity, encoding)
+        with self._lock:
+            if key in self._entries and encoding not in self._entries[key]:
+                self._entries[key][encoding] = body
+                self._bytes += len(body)
+                self._evict()
+        return body
+
+    def put(self, key: str, body: bytes) -> None:
+        """Store the uncompressed body of a response"""
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old:
+                self._bytes -= sum(len(b) for b in old.values())
+            self._entries[key] = {'identity': body}
+            self._bytes += len(body)
+            self.stats["stored"] += 1
+            self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, variants = self._entries.popitem(last=False)
+            self._bytes -= sum(len(b) for b in variants.values())
+            self.stats["evicted"] += 1
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+_payload_cache: Optional[EncodedPayloadCache] = None
+_payload_cache_lock = threading.Lock()
+
+
+def get_payload_cache() -> EncodedPayloadCache:
+    """Get the process-wide payload cache"""
+    global _payload_cache
+    with _payload_cache_lock:
+        if _payload_cache is None:
+            _payload_cache = EncodedPayloadCache()
+            logger.info(
+                f"📦 RESPONSES: orjson {'enabled' if ORJSON_AVAILABLE else 'not installed'}, "
+                f"brotli {'enabled' if BROTLI_AVAILABLE else 'not installed'}, "
+                f"payload cache {_payload_cache.max_bytes // (1024 * 1024)} MB"
+            )
+        return _payload_cache
+
+
+def encoded_body(request: Request, body: bytes) -> Tuple[bytes, Optional[str]]:
+    """Compress a body for the client if it is large enough and an encoding was accepted"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(body) >= COMPRESS_MIN_BYTES else None
+    return (compress(body, encoding), encoding) if encoding else (body, None)
+
+
+def payload_response(request: Request, body: bytes, headers: Optional[Dict[str, str]] = None,
+                     cache_key: Optional[str] = None) -> Response:
+    """
+    Response for an already serialized JSON body, compressed as negotiated
+
+    Args:
+        request: Incoming request (Accept-Encoding)
+        body: Serialized JSON
+        headers: Extra headers (ETag, Cache-Control)
+        cache_key: Store the body in the payload cache under this key (and serve
+            compressed variants from it)
+    """
+    if cache_key is not None:
+        get_payload_cache().put(cache_key, body)
+        cached = cached_payload_response(request, cache_key, headers)
+        if cached is not None:
+            return cached
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    body, encoding = encoded_body(request, body)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached_payload_response(request: Request, cache_key: str, headers: Optional[Dict[str, str]] = None) -> Optional[Response]:
+    """Response from the payload cache, or None on a miss"""
+    cache = get_payload_cache()
+    identity = cache.get(cache_key, None)
+    if identity is None:
+        return None
+    encoding = negotiate_encoding(request.headers.get("accept-encoding")) if len(identity) >= COMPRESS_MIN_BYTES else None
+    body = cache.get(cache_key, encoding) if encoding else identity
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding and body is not None:
+        headers["Content-Encoding"] = encoding
+    else:
+        body = identity
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,184 @@
+"""
+Analysis Progress Bus
+In-process publish/subscribe of analysis status snapshots for the SSE events endpoint
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from loguru import logger
+import os
+import time
+import uuid
+import asyncio
+import threading
+
+from app.core.schemas import TERMINAL_STATUSES
+
+# Fields carried by progress events (a small status snapshot, never the result document)
+EVENT_FIELDS = ('status', 'current_step', 'step_progress', 'step_message', 'steps_completed', 'updated_at')
+
+
+class ProgressBus:
+    """
+    Fan-out of analysis status changes to SSE subscribers of this process.
+
+    Every write of this process (update_analysis / update_analysis_sync) is published, so
+    subscribers get progress without touching storage. Analyses running on another worker
+    are observed through storage by the subscribers' refresh reads, which go through the
+    status cache (at most one read per analysis per cache TTL, however many tabs are open)
+    and are re-published here when something changed.
+
+    Event ids are '<bus id>-<sequence>'. The last PROGRESS_BUS_REPLAY_EVENTS events per
+    analysis are kept, so a reconnect with Last-Event-ID replays exactly what was missed;
+    an id from another process (or one that fell out of the buffer) gets a fresh snapshot.
+    """
+
+    def __init__(self, replay_events: Optional[int] = None, idle_seconds: float = 600.0):
+        """
+        Initialize bus
+
+        Args:
+            replay_events: Events kept per analysis for Last-Event-ID resumption
+            idle_seconds: Analyses without subscribers or events for this long are forgotten
+        """
+        self.replay_events = replay_events or int(os.getenv("PROGRESS_BUS_REPLAY_EVENTS", "64"))
+        self.idle_seconds = idle_seconds
+        self.bus_id = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._states: Dict[str, Dict] = {}
+        self._events: Dict[str, Deque[Tuple[int, Dict]]] = {}
+        self._subscribers: Dict[str, List[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._last_activity: Dict[str, float] = {}
+        self._last_prune = time.monotonic()
+        self.stats = {"published": 0, "delivered": 0, "dropped": 0, "subscribers": 0}
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.bus_id}-{seq}"
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Sequence number of an event id issued by this bus (None for foreign or malformed ids)"""
+        if not event_id or not event_id.startswith(f"{self.bus_id}-"):
+            return None
+        try:
+            return int(event_id.rsplit('-', 1)[1])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, item: Tuple[int, Dict]) -> None:
+        """Runs on the subscriber's loop; a slow subscriber loses its oldest events (snapshots supersede them)"""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(item)
+
+    def publish(self, analysis_id: str, updates: Dict) -> Optional[int]:
+        """
+        Merge status fields of an update into the analysis snapshot and notify subscribers
+
+        Safe to call from any thread.
+
+        Returns:
+            Sequence number of the event, or None if the update had no status fields or changed nothing
+        """
+        changes = {key: updates[key] for key in EVENT_FIELDS if key in updates}
+        if not changes:
+            return None
+        with self._lock:
+            state = self._states.setdefault(analysis_id, {})
+            if 'steps_completed' in changes and isinstance(changes['steps_completed'], dict):
+                changes['steps_completed'] = {**(state.get('steps_completed') or {}), **changes['steps_completed']}
+            if all(state.get(key) == value for key, value in changes.items() if key != 'updated_at'):
+                return None
+            state.update(changes)
+            self._seq += 1
+            seq = self._seq
+            snapshot = {'id': analysis_id, **state}
+            events = self._events.setdefault(analysis_id, deque(maxlen=self.replay_events))
+            events.append((seq, snapshot))
+            self._last_activity[analysis_id] = time.monotonic()
+            subscribers = list(self._subscribers.get(analysis_id, []))
+            self.stats["published"] += 1
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, (seq, snapshot))
+                self.stats["delivered"] += 1
+            except RuntimeError:
+                self.stats["dropped"] += 1  # Subscriber's loop is closed
+        self._maybe_prune()
+        return seq
+
+    def latest(self, analysis_id: str) -> Optional[Tuple[int, Dict]]:
+        """Most recent (seq, snapshot) of an analysis"""
+        with self._lock:
+            events = self._events.get(analysis_id)
+            return events[-1] if events else None
+
+    def subscribe(self, analysis_id: str, last_event_id: Optional[str] = None) -> Tuple[asyncio.Queue, List[Tuple[int, Dict]], bool]:
+        """
+        Register a subscriber on the running event loop
+
+        Args:
+            analysis_id: Analysis to follow
+            last_event_id: Last-Event-ID sent by a reconnecting client
+
+        Returns:
+            (queue of (seq, snapshot) events, events to replay, whether the replay is complete;
+            if not, the caller must start with a fresh snapshot)
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.replay_events)
+        last_seq = self._parse_event_id(last_event_id)
+        with self._lock:
+            self._subscribers.setdefault(analysis_id, []).append((asyncio.get_running_loop(), queue))
+            self._last_activity[analysis_id] = time.monotonic()
+            self.stats["subscribers"] += 1
+            events = list(self._events.get(analysis_id, ()))
+        if last_seq is None:
+            return queue, [], False
+        missed = [event for event in events if event[0] > last_seq]
+        # Complete if the buffer reaches back to the client's last event (or nothing was missed)
+        complete = bool(events) and (events[0][0] <= last_seq + 1 or not missed)
+        return queue, missed, complete
+
+    def unsubscribe(self, analysis_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = [s for s in self._subscribers.get(analysis_id, []) if s[1] is not queue]
+            if subscribers:
+                self._subscribers[analysis_id] = subscribers
+            else:
+                self._subscribers.pop(analysis_id, None)
+            self._last_activity[analysis_id] = time.monotonic()
+            self.stats["subscribers"] -= 1
+
+    def _maybe_prune(self) -> None:
+        now = time.monotonic()
+        if now - self._last_prune < 60.0:
+            return
+        with self._lock:
+            self._last_prune = now
+            idle = [
+                analysis_id for analysis_id, last in self._last_activity.items()
+                if now - last > self.idle_seconds and analysis_id not in self._subscribers
+            ]
+            for analysis_id in idle:
+                self._states.pop(analysis_id, None)
+                self._events.pop(analysis_id, None)
+                self._last_activity.pop(analysis_id, None)
+        if idle:
+            logger.debug(f"📡 PROGRESS BUS: Forgot {len(idle)} idle analyses")
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "analyses": len(self._states), "bus_id": self.bus_id}
+
+
+_progress_bus: Optional[ProgressBus] = None
+_progress_bus_lock = threading.Lock()
+
+
+def get_progress_bus() -> ProgressBus:
+    """Get the process-wide progress bus"""
+    global _progress_bus
+    with _progress_bus_lock:
+        if _progress_bus is None:
+            _progress_bus = ProgressBus()
+        return _progress_bus
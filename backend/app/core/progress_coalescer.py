@@ -0,0 +1,232 @@
+"""
+Progress Update Coalescer
+Write-behind buffer for analysis progress updates, flushed from a single DB I/O thread
+"""
+from typing import Awaitable, Callable, Dict, Optional
+from loguru import logger
+import os
+import time
+import asyncio
+import threading
+
+from app.core.db_io import get_db_io_loop, on_db_io_thread, db_io_loop_running
+from app.core.schemas import TERMINAL_STATUSES
+from app.core.status_cache import get_status_cache
+
+# Fields written by progress callbacks / heartbeats; anything else is written through immediately
+PROGRESS_FIELDS = {'status', 'current_step', 'step_progress', 'step_message'}
+
+UpdateWriter = Callable[[str, Dict], Awaitable[bool]]
+
+
+def is_progress_update(updates: Dict) -> bool:
+    """True for plain progress updates that are safe to coalesce"""
+    return bool(updates) and set(updates) <= PROGRESS_FIELDS and updates.get('status', 'processing') == 'processing'
+
+
+class ProgressCoalescer:
+    """
+    Per-analysis write-behind buffer for progress updates.
+
+    Progress updates are merged per analysis and flushed at most once per
+    PROGRESS_FLUSH_INTERVAL_SECONDS (default 0.5s, i.e. 2 writes/s), or immediately on a
+    step transition. Any other update (terminal status, metrics, ...) is merged with the
+    pending progress and written synchronously. All writes run on one DB I/O thread with
+    a persistent event loop (see app.core.db_io), so sync callers don't need a fresh event
+    loop per call.
+
+    Writes for one analysis hold that analysis' lock from taking the pending fields until
+    the write has completed, so a step-change flush never overtakes a delayed flush still
+    in flight: writes land in the order their fields were taken. A buffered update only
+    reports that it was accepted; failed flushes are counted per analysis (flush_failures)
+    and drop the analysis from the status cache so reads go back to the database.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        """
+        Initialize coalescer
+
+        Args:
+            flush_interval: Minimum seconds between progress writes per analysis
+        """
+        self.flush_interval = flush_interval if flush_interval is not None else float(
+            os.getenv("PROGRESS_FLUSH_INTERVAL_SECONDS", "0.5")
+        )
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._writers: Dict[str, UpdateWriter] = {}
+        self._last_flush: Dict[str, float] = {}
+        self._last_step: Dict[str, Optional[str]] = {}
+        self._flush_failures: Dict[str, int] = {}
+        self._scheduled: set = set()
+        # Per-analysis write locks, created and awaited on the DB I/O loop only
+        self._write_locks: Dict[str, asyncio.Lock] = {}
+        self._started = False
+        self.stats = {
+            "submitted": 0,
+            "flushes": 0,
+            "write_through": 0,
+            "failed": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # DB I/O thread
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        loop = get_db_io_loop()
+        if not self._started:
+            self._started = True
+            logger.info(f"🗄️ DB I/O THREAD: Progress coalescing enabled (flush interval: {self.flush_interval:.2f}s)")
+        return loop
+
+    def on_db_thread(self) -> bool:
+        """True when called from the DB I/O thread (writes must then go direct)"""
+        return on_db_io_thread()
+
+    def _write_lock(self, analysis_id: str) -> asyncio.Lock:
+        lock = self._write_locks.get(analysis_id)
+        if lock is None:
+            lock = self._write_locks[analysis_id] = asyncio.Lock()
+        return lock
+
+    async def _write(self, analysis_id: str, updates: Dict, writer: UpdateWriter) -> bool:
+        """Perform a write (caller holds the analysis' write lock)"""
+        try:
+            ok = await writer(analysis_id, updates)
+        except Exception as e:
+            logger.error(f"❌ DB I/O THREAD: Update for {analysis_id} failed: {e}", exc_info=True)
+            ok = False
+        if not ok:
+            self.stats["failed"] += 1
+        return ok
+
+    async def _flush(self, analysis_id: str, delay: float = 0.0) -> None:
+        if delay > 0:
+            await asyncio.sleep(delay)
+        with self._lock:
+            if delay > 0:
+                self._scheduled.discard(analysis_id)
+        async with self._write_lock(analysis_id):
+            with self._lock:
+                updates = self._pending.pop(analysis_id, None)
+                writer = self._writers.get(analysis_id)
+                if not updates or writer is None:
+                    return
+                self._last_flush[analysis_id] = time.time()
+                self._last_step[analysis_id] = updates.get('current_step', self._last_step.get(analysis_id))
+            self.stats["flushes"] += 1
+            ok = await self._write(analysis_id, updates, writer)
+        if not ok:
+            with self._lock:
+                self._flush_failures[analysis_id] = self._flush_failures.get(analysis_id, 0) + 1
+            logger.warning(f"⚠️ DB I/O THREAD: Buffered progress for {analysis_id} was not written: {list(updates)}")
+            cache = get_status_cache()
+            if cache is not None:
+                cache.invalidate(analysis_id)
+
+    async def _write_through(self, analysis_id: str, updates: Dict, writer: UpdateWriter) -> bool:
+        async with self._write_lock(analysis_id):
+            with self._lock:
+                merged = {**self._pending.pop(analysis_id, {}), **updates}
+            self.stats["write_through"] += 1
+            ok = await self._write(analysis_id, merged, writer)
+        with self._lock:
+            if updates.get('status') in TERMINAL_STATUSES:
+                # Analysis is finished - drop its coalescing state
+                for state in (self._writers, self._last_flush, self._last_step, self._flush_failures):
+                    state.pop(analysis_id, None)
+                lock = self._write_locks.get(analysis_id)
+                if lock is not None and not lock.locked():
+                    self._write_locks.pop(analysis_id, None)
+            else:
+                self._last_flush[analysis_id] = time.time()
+        return ok
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, analysis_id: str, updates: Dict, writer: UpdateWriter) -> bool:
+        """
+        Buffer a progress update (non-blocking, callable from any thread)
+
+        Args:
+            analysis_id: Analysis to update
+            updates: Progress fields (see is_progress_update)
+            writer: Coroutine function performing the actual write
+
+        Returns:
+            True once buffered (write failures are reported by flush_failures, never here:
+            a False would make callers think the record is missing)
+        """
+        loop = self._ensure_started()
+        with self._lock:
+            self.stats["submitted"] += 1
+            self._pending.setdefault(analysis_id, {}).update(updates)
+            self._writers[analysis_id] = writer
+            step_changed = 'current_step' in updates and updates['current_step'] != self._last_step.get(analysis_id)
+            wait = self.flush_interval - (time.time() - self._last_flush.get(analysis_id, 0.0))
+            if step_changed or wait <= 0:
+                delay = 0.0
+            elif analysis_id not in self._scheduled:
+                self._scheduled.add(analysis_id)
+                delay = wait
+            else:
+                delay = None  # A flush is already scheduled and will pick this update up
+        if delay is not None:
+            asyncio.run_coroutine_threadsafe(self._flush(analysis_id, delay), loop)
+        return True
+
+    def write(self, analysis_id: str, updates: Dict, writer: UpdateWriter, timeout: float = 30.0) -> bool:
+        """Write an update (plus any pending progress) synchronously from a non-DB thread"""
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._write_through(analysis_id, updates, writer), loop)
+        return future.result(timeout=timeout)
+
+    async def write_async(self, analysis_id: str, updates: Dict, writer: UpdateWriter) -> bool:
+        """Write an update (plus any pending progress) without blocking the caller's event loop"""
+        loop = self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._write_through(analysis_id, updates, writer), loop)
+        return await asyncio.wrap_future(future)
+
+    def pending(self, analysis_id: str) -> Dict:
+        """Buffered progress fields not yet written (overlaid on reads for read-your-writes)"""
+        with self._lock:
+            return dict(self._pending.get(analysis_id, {}))
+
+    def flush_failures(self, analysis_id: str) -> int:
+        """Number of buffered progress writes for an analysis that failed"""
+        with self._lock:
+            return self._flush_failures.get(analysis_id, 0)
+
+    def flush_all(self, timeout: float = 10.0) -> None:
+        """Write every buffered update now (used at shutdown)"""
+        if not db_io_loop_running():
+            return
+        with self._lock:
+            analysis_ids = list(self._pending.keys())
+        loop = get_db_io_loop()
+        futures = [asyncio.run_coroutine_threadsafe(self._flush(analysis_id), loop) for analysis_id in analysis_ids]
+        for future in futures:
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                logger.warning(f"⚠️ DB I/O THREAD: Flush failed at shutdown: {e}")
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "pending_analyses": len(self._pending), "flush_interval": self.flush_interval}
+
+
+_progress_coalescer: Optional[ProgressCoalescer] = None
+
+
+def get_progress_coalescer() -> Optional[ProgressCoalescer]:
+    """Get the process-wide coalescer (None if PROGRESS_COALESCING_ENABLED=false)"""
+    global _progress_coalescer
+    if os.getenv("PROGRESS_COALESCING_ENABLED", "true").lower() != "true":
+        return None
+    if _progress_coalescer is None:
+        _progress_coalescer = ProgressCoalescer()
+    return _progress_coalescer
@@ -0,0 +1,198 @@
+"""
+Analysis Result Documents
+Write-once result payloads (metrics) stored apart from the frequently updated status entity
+"""
+from typing import Optional, Dict, Tuple
+from loguru import logger
+import os
+import json
+import zlib
+from datetime import datetime
+
+try:
+    from azure.storage.blob import BlobServiceClient
+    BLOB_AVAILABLE = True
+except ImportError:
+    BLOB_AVAILABLE = False
+    BlobServiceClient = None
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+from app.core.db_io import AIO_TABLES_AVAILABLE, get_async_table_client, run_blocking
+
+RESULT_TABLE_NAME = os.getenv("ANALYSIS_RESULTS_TABLE", "gaitanalysisresults")
+RESULT_BLOB_CONTAINER = os.getenv("ANALYSIS_RESULTS_CONTAINER", "analysis-results")
+RESULT_ROW_KEY = 'result'
+# Table Storage limits: 64 KiB per binary property and 1 MiB per entity. Compressed documents
+# are split over numbered chunk properties; anything above RESULT_INLINE_MAX_BYTES goes to a blob
+RESULT_CHUNK_BYTES = 60000
+RESULT_INLINE_MAX_BYTES = int(os.getenv("RESULT_INLINE_MAX_BYTES", str(RESULT_CHUNK_BYTES * 15)))
+ZSTD_LEVEL = int(os.getenv("RESULT_ZSTD_LEVEL", "3"))
+# Headline metrics of list views (view=summary); dotted paths select nested values
+SUMMARY_METRICS = (
+    'cadence', 'walking_speed', 'step_length',
+    'fall_risk_assessment.risk_level', 'functional_mobility.mobility_level'
+)
+
+
+def encode_result(metrics: Dict) -> Tuple[str, bytes]:
+    """
+    Serialize a result document: compact JSON, zstd-compressed (zlib without zstandard)
+
+    Returns:
+        (codec name, encoded bytes)
+    """
+    payload = json.dumps(metrics or {}, separators=(',', ':')).encode('utf-8')
+    if ZSTD_AVAILABLE:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(payload)
+    return 'zlib', zlib.compress(payload, 6)
+
+
+def summarize_metrics(metrics: Optional[Dict]) -> Dict:
+    """Projection of a result document onto SUMMARY_METRICS (nesting is kept)"""
+    summary: Dict = {}
+    for path in SUMMARY_METRICS:
+        value = metrics or {}
+        for key in path.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        if value is None:
+            continue
+        target = summary
+        *parents, leaf = path.split('.')
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = value
+    return summary
+
+
+def decode_result(codec: str, data: bytes) -> Dict:
+    """Inverse of encode_result ('json' is the uncompressed format of older documents)"""
+    if codec == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read this result document")
+        data = zstandard.ZstdDecompressor().decompress(data)
+    elif codec == 'zlib':
+        data = zlib.decompress(data)
+    return json.loads(data)
+
+
+class TableResultStore:
+    """
+    Result documents for the Table Storage backend
+
+    One entity per analysis (PartitionKey = analysis id) in its own table, so status
+    polls, list pages and progress updates on the analyses table never carry the
+    result payload. The compressed document is stored in binary properties chunk_00,
+    chunk_01, ...; documents above RESULT_INLINE_MAX_BYTES are uploaded to a blob and
+    the entity only keeps a reference to it. A small uncompressed 'summary' property
+    (see summarize_metrics) lets list views skip the document altogether.
+    """
+
+    def __init__(self, connection_string: str, table_service):
+        """
+        Args:
+            connection_string: Storage account connection string
+            table_service: Sync TableServiceClient of the account (used to create the table)
+        """
+        self._storage_conn = connection_string
+        self.table_name = RESULT_TABLE_NAME
+        table_service.create_table_if_not_exists(table_name=self.table_name)
+        self.table_client = table_service.get_table_client(table_name=self.table_name)
+        self._container_client = None
+
+    async def _table_call(self, method: str, **kwargs):
+        if AIO_TABLES_AVAILABLE:
+            client = get_async_table_client(self._storage_conn, self.table_name)
+            return await getattr(client, method)(**kwargs)
+        return await run_blocking(getattr(self.table_client, method), **kwargs)
+
+    def _container(self):
+        """Blob container for large documents (created on first use)"""
+        if self._container_client is None:
+            if not BLOB_AVAILABLE:
+                raise RuntimeError("azure-storage-blob not available")
+            container = BlobServiceClient.from_connection_string(self._storage_conn).get_container_client(RESULT_BLOB_CONTAINER)
+            if not container.exists():
+                container.create_container()
+            self._container_client = container
+        return self._container_client
+
+    def _upload_blob(self, blob_name: str, data: bytes) -> None:
+        self._container().upload_blob(blob_name, data, overwrite=True)
+
+    def _download_blob(self, blob_name: str) -> bytes:
+        return self._container().download_blob(blob_name).readall()
+
+    async def save(self, analysis_id: str, metrics: Dict) -> int:
+        """
+        Store (or replace) the result document of an analysis
+
+        Returns:
+            Size of the encoded document in bytes
+        """
+        from azure.data.tables import UpdateMode
+        codec, data = await run_blocking(encode_result, metrics)
+        entity = {
+            'PartitionKey': analysis_id,
+            'RowKey': RESULT_ROW_KEY,
+            'codec': codec,
+            'size': len(data),
+            'summary': json.dumps(summarize_metrics(metrics), separators=(',', ':')),
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        if len(data) > RESULT_INLINE_MAX_BYTES:
+            blob_name = f"{analysis_id}.{codec}"
+            await run_blocking(self._upload_blob, blob_name, data)
+            entity['blob_name'] = blob_name
+        else:
+            chunks = [data[i:i + RESULT_CHUNK_BYTES] for i in range(0, len(data), RESULT_CHUNK_BYTES)]
+            entity['chunks'] = len(chunks)
+            for index, chunk in enumerate(chunks):
+                entity[f'chunk_{index:02d}'] = chunk
+        # REPLACE, so a smaller re-run (or one moving to a blob) leaves no stale chunks
+        await self._table_call('upsert_entity', entity=entity, mode=UpdateMode.REPLACE)
+        logger.debug(f"📄 RESULTS: Stored result document for {analysis_id} ({len(data)} bytes {codec}, blob: {'blob_name' in entity})")
+        return len(data)
+
+    async def load(self, analysis_id: str) -> Optional[Dict]:
+        """
+        Result document of an analysis
+
+        Returns:
+            The metrics dict, or None if no document was stored
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            entity = await self._table_call('get_entity', partition_key=analysis_id, row_key=RESULT_ROW_KEY)
+        except ResourceNotFoundError:
+            return None
+        codec = entity.get('codec') or 'json'
+        if entity.get('blob_name'):
+            data = await run_blocking(self._download_blob, entity['blob_name'])
+        elif entity.get('chunks') is not None:
+            data = b''.join(bytes(entity[f'chunk_{index:02d}']) for index in range(int(entity['chunks'])))
+        else:
+            data = (entity.get('metrics') or '{}').encode('utf-8')  # Uncompressed inline document
+        return await run_blocking(decode_result, codec, data)
+
+    async def load_summary(self, analysis_id: str) -> Optional[Dict]:
+        """
+        Headline metrics of an analysis (reads only the summary property)
+
+        Returns:
+            The summary dict, or None if no document was stored
+        """
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            entity = await self._table_call('get_entity', partition_key=analysis_id, row_key=RESULT_ROW_KEY, select=['summary'])
+        except ResourceNotFoundError:
+            return None
+        if entity.get('summary'):
+            return json.loads(entity['summary'])
+        # Stored before summaries existed
+        return summarize_metrics(await self.load(analysis_id))
@@ -23,6 +23,10 @@ class AnalysisStatus(str, Enum):
     FAILED = "failed"
 
 
+# Statuses after which an analysis no longer changes (progress streams end, caches keep it longer)
+TERMINAL_STATUSES = ('completed', 'failed', 'cancelled')
+
+
 class VideoUploadRequest(BaseModel):
     """Request model for video upload with validation"""
     patient_id: Optional[str] = Field(None, max_length=100, description="Patient identifier")
@@ -120,17 +124,55 @@ class AnalysisListResponse(BaseModel):
     analyses: List[AnalysisDetailResponse]
     total: int = Field(..., ge=0, description="Total number of analyses")
     limit: int = Field(..., ge=1, le=1000, description="Requested limit")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (None on the last page)")
     
     class Config:
         json_schema_extra = {
             "example": {
                 "analyses": [],
                 "total": 0,
-                "limit": 50
+                "limit": 50,
+                "next_cursor": None
             }
         }
 
 
+class AnalysisStatusBatchRequest(BaseModel):
+    """Request model for the multi-get status endpoint"""
+    ids: List[str] = Field(..., min_length=1, max_length=500, description="Analysis identifiers")
+
+
+class AnalysisStatusBatchResponse(BaseModel):
+    """Compact statuses of many analyses: one row per id, values in the order of 'fields'"""
+    fields: List[str] = Field(..., description="Names of the values in each status row")
+    statuses: Dict[str, List[Any]] = Field(..., description="Analysis id -> status row")
+    not_found: List[str] = Field(default_factory=list, description="Requested ids that do not exist")
+
+
+class UploadSessionCreateRequest(BaseModel):
+    """Request model for starting a resumable upload; analysis parameters apply on commit"""
+    filename: str = Field(..., min_length=1, max_length=255, description="Video file name")
+    size: int = Field(..., gt=0, description="Total file size in bytes")
+    chunk_size: Optional[int] = Field(None, gt=0, description="Requested chunk size in bytes (server default if omitted)")
+    patient_id: Optional[str] = Field(None, max_length=100, description="Patient identifier")
+    view_type: str = Field("front", description="Camera view type")
+    reference_length_mm: Optional[float] = Field(None, gt=0, le=10000, description="Reference length in mm")
+    fps: float = Field(30.0, gt=0, le=120, description="Video frames per second")
+    processing_fps: Optional[float] = Field(None, gt=0, le=60, description="Processing frame rate")
+
+
+class UploadSessionResponse(BaseModel):
+    """State of a resumable upload: clients (re)send the missing chunks, then commit"""
+    upload_id: str = Field(..., description="Upload session identifier")
+    filename: str
+    size: int = Field(..., description="Total file size in bytes")
+    chunk_size: int = Field(..., description="Size of every chunk but the last")
+    total_chunks: int
+    received_chunks: List[int] = Field(default_factory=list, description="Indices of verified chunks")
+    missing_chunks: List[int] = Field(default_factory=list, description="Indices still to be sent")
+    expires_at: datetime = Field(..., description="Uncommitted sessions are discarded after this time")
+
+
 class ErrorResponse(BaseModel):
     """Standard error response model"""
     error: str = Field(..., description="Error code")
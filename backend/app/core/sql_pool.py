@@ -0,0 +1,263 @@
+"""
+Azure SQL Connection Pool
+Bounded pool of pyodbc connections with health checks, max lifetime and transient-error detection
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+import os
+import time
+import threading
+
+try:
+    import pyodbc
+    PYODBC_AVAILABLE = True
+except ImportError:
+    PYODBC_AVAILABLE = False
+    pyodbc = None
+
+# SQLSTATEs of connection failures and timeouts, and Azure SQL error numbers that mean
+# "retry later" (throttling, failover, database temporarily unavailable)
+TRANSIENT_SQLSTATES = {'08001', '08004', '08S01', '40001', 'HYT00', 'HYT01'}
+TRANSIENT_ERROR_NUMBERS = ('40613', '40197', '40501', '40540', '49918', '49919', '49920', '4060', '10928', '10929', '10053', '10054', '10060', '233', '64')
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for pyodbc errors that a retry on a fresh connection can fix"""
+    if not PYODBC_AVAILABLE or not isinstance(error, pyodbc.Error):
+        return False
+    sqlstate = error.args[0] if error.args else ''
+    if sqlstate in TRANSIENT_SQLSTATES:
+        return True
+    message = str(error.args[1]) if len(error.args) > 1 else str(error)
+    return any(f"({number})" in message or f"error {number}" in message.lower() for number in TRANSIENT_ERROR_NUMBERS)
+
+
+class SQLConnectionPool:
+    """
+    Bounded pool of reusable pyodbc connections.
+
+    Every status read used to pay a TCP + TLS + login handshake. Connections are now
+    kept open and reused (most recently used first, so surplus connections age out):
+    - at most SQL_POOL_SIZE connections exist; callers wait up to
+      SQL_POOL_ACQUIRE_TIMEOUT_SECONDS for a free one
+    - connections older than SQL_POOL_MAX_LIFETIME_SECONDS are closed and replaced, so
+      gateway failovers and credential rotation are picked up
+    - connections idle for longer than SQL_POOL_HEALTH_CHECK_SECONDS are pinged
+      (SELECT 1) before reuse; broken ones are replaced transparently
+    """
+
+    def __init__(self, connection_string: str, max_size: Optional[int] = None,
+                 max_lifetime: Optional[float] = None, health_check_after: Optional[float] = None,
+                 acquire_timeout: Optional[float] = None, connect: Optional[Callable] = None):
+        """
+        Initialize pool (connections are opened lazily)
+
+        Args:
+            connection_string: ODBC connection string
+            max_size: Maximum number of open connections
+            max_lifetime: Seconds after which a connection is replaced
+            health_check_after: Idle seconds after which a connection is pinged before reuse
+            acquire_timeout: Seconds to wait for a free connection
+            connect: Connection factory (defaults to pyodbc.connect)
+        """
+        self.connection_string = connection_string
+        self.max_size = max_size or int(os.getenv("SQL_POOL_SIZE", os.getenv("DB_EXECUTOR_MAX_WORKERS", "8")))
+        self.max_lifetime = max_lifetime if max_lifetime is not None else float(os.getenv("SQL_POOL_MAX_LIFETIME_SECONDS", "1800"))
+        self.health_check_after = health_check_after if health_check_after is not None else float(
+            os.getenv("SQL_POOL_HEALTH_CHECK_SECONDS", "30")
+        )
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else float(
+            os.getenv("SQL_POOL_ACQUIRE_TIMEOUT_SECONDS", "15")
+        )
+        self._connect = connect or (lambda: pyodbc.connect(connection_string))
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[object, float, float]] = []  # (connection, created_at, last_used)
+        self._created_at: Dict[int, float] = {}
+        self._size = 0
+        self.stats = {
+            "acquired": 0,
+            "waits": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "timeouts": 0,
+            "connects": 0,
+            "connect_failures": 0,
+            "recycled": 0,
+            "health_check_failures": 0,
+            "discarded": 0,
+            "retries": 0,
+        }
+
+    def _open(self):
+        """Open a new connection for an already reserved slot"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self.stats["connect_failures"] += 1
+                self._cond.notify()
+            raise
+        now = time.monotonic()
+        with self._cond:
+            self._created_at[id(conn)] = now
+            self.stats["connects"] += 1
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.debug(f"SQL POOL: Health check failed: {e}")
+            return False
+
+    def acquire(self):
+        """
+        Take a connection from the pool (opening one if below max_size)
+
+        Raises:
+            TimeoutError: If no connection became free within acquire_timeout
+        """
+        start = time.monotonic()
+        deadline = start + self.acquire_timeout
+        waited = False
+        entry = None
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1  # Reserve the slot; connect outside the lock
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    raise TimeoutError(f"No SQL connection available within {self.acquire_timeout:.0f}s (pool size {self.max_size})")
+                waited = True
+                self._cond.wait(remaining)
+            wait_ms = (time.monotonic() - start) * 1000
+            self.stats["acquired"] += 1
+            if waited:
+                self.stats["waits"] += 1
+                self.stats["wait_ms_total"] += wait_ms
+                self.stats["wait_ms_max"] = max(self.stats["wait_ms_max"], wait_ms)
+
+        if entry is None:
+            return self._open()
+        conn, created_at, last_used = entry
+        now = time.monotonic()
+        if now - created_at > self.max_lifetime:
+            with self._cond:
+                self.stats["recycled"] += 1
+                self._created_at.pop(id(conn), None)
+            self._close_quietly(conn)
+            return self._open()
+        if now - last_used > self.health_check_after and not self._is_healthy(conn):
+            with self._cond:
+                self.stats["health_check_failures"] += 1
+                self._created_at.pop(id(conn), None)
+            self._close_quietly(conn)
+            return self._open()
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        """
+        Return a connection to the pool
+
+        Args:
+            conn: Connection from acquire()
+            discard: Close the connection instead of reusing it (e.g. after a transient error)
+        """
+        if not discard:
+            try:
+                conn.rollback()  # Never hand out a connection with an open transaction
+            except Exception:
+                discard = True
+        with self._cond:
+            created_at = self._created_at.get(id(conn), time.monotonic())
+            if discard:
+                self._created_at.pop(id(conn), None)
+                self._size -= 1
+                self.stats["discarded"] += 1
+            else:
+                self._idle.append((conn, created_at, time.monotonic()))
+            self._cond.notify()
+        if discard:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self):
+        """Context manager around acquire()/release(); connections hit by transient errors are discarded"""
+        conn = self.acquire()
+        try:
+            yield conn
+        except Exception as e:
+            self.release(conn, discard=is_transient_error(e))
+            raise
+        else:
+            self.release(conn)
+
+    def record_retry(self) -> None:
+        with self._cond:
+            self.stats["retries"] += 1
+
+    def close_all(self) -> None:
+        """Close idle connections (in-use connections are closed when released)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            for conn, _, _ in idle:
+                self._created_at.pop(id(conn), None)
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+        if idle:
+            logger.info(f"🔌 SQL POOL: Closed {len(idle)} idle connections")
+
+    def get_metrics(self) -> Dict:
+        with self._cond:
+            in_use = self._size - len(self._idle)
+            return {
+                **self.stats,
+                "size": self._size,
+                "in_use": in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "utilization": round(in_use / self.max_size, 3) if self.max_size else 0.0,
+                "wait_ms_avg": round(self.stats["wait_ms_total"] / self.stats["waits"], 2) if self.stats["waits"] else 0.0,
+            }
+
+
+_pools: Dict[str, SQLConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_sql_pool(connection_string: str) -> SQLConnectionPool:
+    """Get the process-wide pool for a connection string"""
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            pool = SQLConnectionPool(connection_string)
+            _pools[connection_string] = pool
+            logger.info(f"🔌 SQL POOL: Created connection pool (size {pool.max_size}, max lifetime {pool.max_lifetime:.0f}s)")
+        return pool
+
+
+def close_sql_pools() -> None:
+    """Close idle connections of every pool (application shutdown)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close_all()
@@ -0,0 +1,249 @@
+"""
+Analysis Status Cache
+In-process read-through cache with single-flight loads for get_analysis
+"""
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from loguru import logger
+import os
+import time
+import asyncio
+import threading
+
+from app.core.schemas import TERMINAL_STATUSES
+
+Loader = Callable[[], Awaitable[Optional[Dict]]]
+BatchLoader = Callable[[List[str]], Awaitable[Dict[str, Dict]]]
+
+
+def _copy_record(analysis: Dict) -> Dict:
+    """Copy handed to callers (they normalize records in place); nested dicts are copied one level"""
+    return {key: dict(value) if isinstance(value, dict) else value for key, value in analysis.items()}
+
+
+class StatusCache:
+    """
+    Short-lived per-process cache in front of the database reads of get_analysis.
+
+    - Entries live ANALYSIS_CACHE_TTL_SECONDS (default 1s) while an analysis is running and
+      ANALYSIS_CACHE_TERMINAL_TTL_SECONDS (default 10s) once it has finished, which bounds
+      how stale a poll served by another worker can be.
+    - Writes of this process are applied to cached entries as they are submitted and newly
+      created analyses are seeded, so a worker always reads its own writes (a fresh analysis
+      never goes through the storage not-found retry loop).
+    - Concurrent misses for the same analysis on one event loop share a single storage read.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, terminal_ttl: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds an in-progress analysis is served from cache
+            terminal_ttl: Seconds a finished analysis is served from cache
+        """
+        self.ttl = ttl if ttl is not None else float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "1.0"))
+        self.terminal_ttl = terminal_ttl if terminal_ttl is not None else float(
+            os.getenv("ANALYSIS_CACHE_TERMINAL_TTL_SECONDS", "10.0")
+        )
+        self._lock = threading.Lock()
+        # (analysis_id, include_metrics) -> (expires_at, record)
+        self._entries: Dict[Tuple[str, bool], Tuple[float, Dict]] = {}
+        # Bumped on every write/invalidation so a load that raced a write is not cached
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[Tuple[str, bool], Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._last_prune = time.monotonic()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "writes_applied": 0,
+            "invalidations": 0,
+        }
+
+    def _expiry(self, record: Dict) -> float:
+        ttl = self.terminal_ttl if record.get('status') in TERMINAL_STATUSES else self.ttl
+        return time.monotonic() + ttl
+
+    def _lookup(self, analysis_id: str, include_metrics: bool) -> Optional[Dict]:
+        """Fresh cached record (a record with metrics also serves status-only reads)"""
+        now = time.monotonic()
+        keys = [(analysis_id, include_metrics)] + ([] if include_metrics else [(analysis_id, True)])
+        for key in keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            if entry[0] <= now:
+                del self._entries[key]
+                continue
+            record = _copy_record(entry[1])
+            if not include_metrics:
+                record['metrics'] = {}
+            return record
+        return None
+
+    async def get(self, analysis_id: str, include_metrics: bool, loader: Loader) -> Optional[Dict]:
+        """
+        Cached record, or the result of loader() (shared with concurrent identical reads)
+
+        Args:
+            analysis_id: Analysis to read
+            include_metrics: Whether the caller needs the result document
+            loader: Coroutine function reading the record from storage
+        """
+        key = (analysis_id, include_metrics)
+        loop = asyncio.get_running_loop()
+        if time.monotonic() - self._last_prune > 60.0:
+            self.prune_expired()
+        with self._lock:
+            record = self._lookup(analysis_id, include_metrics)
+            if record is not None:
+                self.stats["hits"] += 1
+                return record
+            inflight = self._inflight.get(key)
+            if inflight is not None and inflight[0] is loop:
+                self.stats["coalesced"] += 1
+                future = inflight[1]
+                leader = False
+            else:
+                self.stats["misses"] += 1
+                future = loop.create_future()
+                self._inflight[key] = (loop, future)
+                generation = self._generations.get(analysis_id, 0)
+                leader = True
+
+        if not leader:
+            try:
+                record = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise  # This caller was cancelled
+                record = await loader()  # The leading request was cancelled - read on our own
+            return _copy_record(record) if record is not None else None
+
+        try:
+            record = await loader()
+        except BaseException as e:
+            with self._lock:
+                if self._inflight.get(key, (None, None))[1] is future:
+                    del self._inflight[key]
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # Followers re-raise it; avoid "exception never retrieved"
+            else:
+                future.cancel()
+            raise
+        with self._lock:
+            if self._inflight.get(key, (None, None))[1] is future:
+                del self._inflight[key]
+            if record is not None and self._generations.get(analysis_id, 0) == generation:
+                self._entries[key] = (self._expiry(record), _copy_record(record))
+        future.set_result(record)
+        return _copy_record(record) if record is not None else None
+
+    async def get_many(self, analysis_ids: List[str], loader: BatchLoader) -> Dict[str, Dict]:
+        """
+        Status-only records of many analyses: cached ones plus one batched load of the rest
+
+        Args:
+            analysis_ids: Analyses to read
+            loader: Coroutine function reading the given ids from storage (id -> record)
+        """
+        found: Dict[str, Dict] = {}
+        generations: Dict[str, int] = {}
+        with self._lock:
+            for analysis_id in analysis_ids:
+                record = self._lookup(analysis_id, False)
+                if record is not None:
+                    found[analysis_id] = record
+                else:
+                    generations[analysis_id] = self._generations.get(analysis_id, 0)
+            self.stats["hits"] += len(found)
+            self.stats["misses"] += len(generations)
+        if not generations:
+            return found
+        loaded = await loader(list(generations))
+        with self._lock:
+            for analysis_id, record in loaded.items():
+                if self._generations.get(analysis_id, 0) == generations.get(analysis_id):
+                    self._entries[(analysis_id, False)] = (self._expiry(record), _copy_record(record))
+        found.update({analysis_id: _copy_record(record) for analysis_id, record in loaded.items()})
+        return found
+
+    def seed(self, analysis_id: str, record: Dict) -> None:
+        """Cache a record this process just created"""
+        with self._lock:
+            self._generations[analysis_id] = self._generations.get(analysis_id, 0) + 1
+            self._entries.pop((analysis_id, False), None)
+            self._entries[(analysis_id, True)] = (self._expiry(record), _copy_record(record))
+
+    def apply(self, analysis_id: str, updates: Dict) -> None:
+        """Apply a write of this process to the cached records (read-your-writes)"""
+        with self._lock:
+            self._generations[analysis_id] = self._generations.get(analysis_id, 0) + 1
+            for include_metrics in (False, True):
+                entry = self._entries.get((analysis_id, include_metrics))
+                if entry is None:
+                    continue
+                record = dict(entry[1])
+                for field, value in updates.items():
+                    if field == 'steps_completed' and isinstance(value, dict) and isinstance(record.get(field), dict):
+                        record[field] = {**record[field], **value}
+                    elif field == 'metrics' and not include_metrics:
+                        continue
+                    else:
+                        record[field] = value
+                record['updated_at'] = datetime.utcnow().isoformat()
+                # Keep the original expiry: writes of other workers (e.g. a cancel) must still show up
+                self._entries[(analysis_id, include_metrics)] = (entry[0], record)
+            self.stats["writes_applied"] += 1
+
+    def invalidate(self, analysis_id: str) -> None:
+        """Drop cached records (e.g. after a failed write)"""
+        with self._lock:
+            self._generations[analysis_id] = self._generations.get(analysis_id, 0) + 1
+            self._entries.pop((analysis_id, False), None)
+            self._entries.pop((analysis_id, True), None)
+            self.stats["invalidations"] += 1
+
+    def prune_expired(self) -> int:
+        """Remove expired entries and generation counters of uncached analyses"""
+        now = time.monotonic()
+        with self._lock:
+            self._last_prune = now
+            expired = [key for key, (expires_at, _) in self._entries.items() if expires_at <= now]
+            for key in expired:
+                del self._entries[key]
+            cached_ids = {analysis_id for analysis_id, _ in self._entries} | {analysis_id for analysis_id, _ in self._inflight}
+            for analysis_id in [a for a in self._generations if a not in cached_ids]:
+                del self._generations[analysis_id]
+        return len(expired)
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"] + self.stats["coalesced"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "hit_rate": round((self.stats["hits"] + self.stats["coalesced"]) / lookups, 3) if lookups else 0.0,
+                "ttl": self.ttl,
+                "terminal_ttl": self.terminal_ttl,
+            }
+
+
+_status_cache: Optional[StatusCache] = None
+_status_cache_lock = threading.Lock()
+
+
+def get_status_cache() -> Optional[StatusCache]:
+    """Get the process-wide cache (None if ANALYSIS_CACHE_ENABLED=false)"""
+    global _status_cache
+    if os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    with _status_cache_lock:
+        if _status_cache is None:
+            _status_cache = StatusCache()
+            logger.info(
+                f"🗃️ STATUS CACHE: Enabled (ttl {_status_cache.ttl:.1f}s, terminal ttl {_status_cache.terminal_ttl:.1f}s)"
+            )
+        return _status_cache
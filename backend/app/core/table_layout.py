@@ -0,0 +1,83 @@
+"""
+Table Storage Layout
+Partition and row keys for the gaitanalyses table
+"""
+from typing import Optional, Tuple
+from datetime import datetime, timezone
+import hashlib
+import os
+
+# Analysis entities are spread over hash buckets of the analysis id, so get-by-id needs
+# no lookup and progress updates for concurrent analyses land on different partitions
+ANALYSIS_PARTITION_PREFIX = 'analyses-'
+LEGACY_ANALYSIS_PARTITION = 'analyses'  # Single partition used before bucketing (read fallback)
+DEFAULT_PARTITION_COUNT = int(os.getenv("ANALYSIS_PARTITION_COUNT", "16"))
+
+# Time index: one pointer entity per analysis in a monthly partition; the RowKey is an
+# inverted creation timestamp, so a partition query returns the newest analyses first
+TIME_INDEX_PARTITION_PREFIX = 'analyses_by_time-'
+LEGACY_TIME_INDEX_PARTITION = 'analyses_by_time'
+TIME_INDEX_MAX_MS = 9999999999999
+
+# Layout metadata entities
+META_PARTITION = 'meta'
+PARTITIONING_ROW_KEY = 'partitioning'
+TIME_INDEX_MARKER_ROW_KEY = 'time_index_v2'
+
+
+def analysis_partition(analysis_id: str, partition_count: int) -> str:
+    """Partition of an analysis entity (stable hash bucket of its id)"""
+    bucket = int(hashlib.sha1(analysis_id.encode()).hexdigest()[:8], 16) % partition_count
+    return f"{ANALYSIS_PARTITION_PREFIX}{bucket:02d}"
+
+
+def _created_utc(created_at: Optional[str]) -> datetime:
+    try:
+        created = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        return datetime.fromtimestamp(0, tz=timezone.utc)
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)  # Table Storage timestamps are UTC
+    return created
+
+
+def time_bucket(created_at: Optional[str]) -> str:
+    """Month bucket (YYYYMM) of a creation timestamp"""
+    return _created_utc(created_at).strftime('%Y%m')
+
+
+def time_index_partition(bucket: str) -> str:
+    return f"{TIME_INDEX_PARTITION_PREFIX}{bucket}"
+
+
+def time_index_row_key(created_at: Optional[str], analysis_id: str) -> str:
+    """Inverted-timestamp RowKey (lexicographic order = newest first)"""
+    created_ms = int(_created_utc(created_at).timestamp() * 1000)
+    return f"{TIME_INDEX_MAX_MS - created_ms:013d}_{analysis_id}"
+
+
+def bucket_of_row_key(row_key: str) -> str:
+    """Month bucket encoded in a time index RowKey"""
+    created_ms = TIME_INDEX_MAX_MS - int(row_key.split('_', 1)[0])
+    return datetime.fromtimestamp(created_ms / 1000, tz=timezone.utc).strftime('%Y%m')
+
+
+def previous_bucket(bucket: str) -> str:
+    year, month = int(bucket[:4]), int(bucket[4:])
+    return f"{year - 1}12" if month == 1 else f"{year}{month - 1:02d}"
+
+
+def time_index_entity(analysis_id: str, created_at: Optional[str], partition_key: str) -> dict:
+    """Time index pointer for an analysis stored in partition_key"""
+    return {
+        'PartitionKey': time_index_partition(time_bucket(created_at)),
+        'RowKey': time_index_row_key(created_at, analysis_id),
+        'analysis_id': analysis_id,
+        'analysis_pk': partition_key,
+        'created_at': created_at
+    }
+
+
+def current_bucket() -> str:
+    return datetime.now(timezone.utc).strftime('%Y%m')
+
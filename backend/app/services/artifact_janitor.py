@@ -0,0 +1,317 @@
+"""
+Artifact Janitor Service
+Keeps local disk usage bounded for temp videos, checkpoints and mock storage
+"""
+import os
+import glob
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+from loguru import logger
+
+# Prefix applied to every temp video we create so the janitor never touches foreign temp files
+TEMP_VIDEO_PREFIX = "gait_"
+VIDEO_SUFFIXES = (".mp4", ".avi", ".mov", ".mkv", ".webm")
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float environment variable, falling back to default on bad values"""
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        logger.warning(f"⚠️ JANITOR: Invalid value for {name}, using default {default}")
+        return default
+
+
+class ArtifactJanitor:
+    """
+    In-process janitor for derived artifacts on local disk.
+
+    Artifact classes:
+    - temp_videos: temp files created by upload/processing (prefixed with TEMP_VIDEO_PREFIX)
+    - checkpoints: per-analysis *.checkpoint, *_metadata.json and leftover *.tmp files in CHECKPOINT_DIR
+    - mock_storage: the local analysis store (pruned via a callback, never deleted; only registered
+      with JANITOR_PRUNE_RECORDS=true because it may hold the only copy of results)
+
+    Files are evicted when older than the class max age, then least-recently-used first
+    until the class is back under its byte quota. Anything registered as in-flight is skipped.
+    """
+
+    def __init__(
+        self,
+        temp_dir: Optional[str] = None,
+        checkpoint_dir: Optional[str] = None,
+        interval_seconds: Optional[float] = None
+    ):
+        """
+        Initialize janitor
+
+        Args:
+            temp_dir: Directory holding temp videos (defaults to tempfile.gettempdir())
+            checkpoint_dir: Directory holding checkpoints (defaults to CHECKPOINT_DIR env var)
+            interval_seconds: Seconds between sweeps (defaults to JANITOR_INTERVAL_SECONDS env var)
+        """
+        self.temp_dir = temp_dir or tempfile.gettempdir()
+        self.checkpoint_dir = checkpoint_dir or os.getenv("CHECKPOINT_DIR", "/home/site/checkpoints")
+        self.interval_seconds = interval_seconds or _env_float("JANITOR_INTERVAL_SECONDS", 300)
+
+        mb = 1024 * 1024
+        hour = 3600
+        # Per-class limits (0 disables a limit)
+        self.quotas: Dict[str, Dict] = {
+            "temp_videos": {
+                "max_bytes": int(_env_float("JANITOR_TEMP_VIDEO_QUOTA_MB", 2048) * mb),
+                "max_age_seconds": _env_float("JANITOR_TEMP_VIDEO_MAX_AGE_HOURS", 24) * hour
+            },
+            "checkpoints": {
+                "max_bytes": int(_env_float("JANITOR_CHECKPOINT_QUOTA_MB", 1024) * mb),
+                "max_age_seconds": _env_float("JANITOR_CHECKPOINT_MAX_AGE_HOURS", 72) * hour
+            },
+            "mock_storage": {
+                "max_bytes": int(_env_float("JANITOR_MOCK_STORAGE_QUOTA_MB", 50) * mb),
+                "max_age_seconds": _env_float("JANITOR_MOCK_STORAGE_MAX_AGE_HOURS", 168) * hour
+            },
+        }
+        self.stats: Dict[str, Dict] = {
+            name: {
+                "current_bytes": 0,
+                "current_files": 0,
+                "bytes_reclaimed": 0,
+                "files_evicted": 0,
+                "skipped_in_flight": 0,
+                "last_error": None
+            }
+            for name in self.quotas
+        }
+
+        # In-flight tracking: analysis IDs and explicit file paths that must never be evicted
+        self._lock = threading.Lock()
+        self._in_flight_ids: Set[str] = set()
+        self._in_flight_paths: Set[str] = set()
+
+        # Optional pruner for the mock storage file: (max_bytes, max_age_seconds, protected_ids) -> records removed
+        self._mock_storage_file: Optional[str] = None
+        self._mock_storage_pruner: Optional[Callable[[int, float, Set[str]], int]] = None
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.sweep_count = 0
+        self.last_sweep_at: Optional[float] = None
+        self.last_sweep_duration: Optional[float] = None
+
+    # ------------------------------------------------------------------
+    # In-flight registration
+    # ------------------------------------------------------------------
+
+    def track(self, analysis_id: Optional[str] = None, path: Optional[str] = None) -> None:
+        """Mark an analysis ID and/or file path as in use so it is never evicted"""
+        with self._lock:
+            if analysis_id:
+                self._in_flight_ids.add(analysis_id)
+            if path:
+                self._in_flight_paths.add(os.path.abspath(path))
+
+    def release(self, analysis_id: Optional[str] = None, path: Optional[str] = None) -> None:
+        """Release a previously tracked analysis ID and/or file path"""
+        with self._lock:
+            if analysis_id:
+                self._in_flight_ids.discard(analysis_id)
+            if path:
+                self._in_flight_paths.discard(os.path.abspath(path))
+
+    def _is_in_flight(self, path: str) -> bool:
+        """Check whether a file belongs to an in-flight analysis"""
+        abs_path = os.path.abspath(path)
+        name = os.path.basename(path)
+        with self._lock:
+            if abs_path in self._in_flight_paths:
+                return True
+            # Derived files (e.g. <video>.proxy.mp4) share the tracked video's stem
+            if any(abs_path.startswith(os.path.splitext(p)[0] + ".") for p in self._in_flight_paths):
+                return True
+            return any(analysis_id in name for analysis_id in self._in_flight_ids)
+
+    def register_mock_storage(self, storage_file: str, pruner: Callable[[int, float, Set[str]], int]) -> None:
+        """
+        Register the mock storage file and a callback that prunes it
+
+        Args:
+            storage_file: Path to the JSON storage file (used for usage metrics)
+            pruner: Callable(max_bytes, max_age_seconds, protected_ids) returning records removed
+        """
+        self._mock_storage_file = storage_file
+        self._mock_storage_pruner = pruner
+
+    # ------------------------------------------------------------------
+    # Sweeping
+    # ------------------------------------------------------------------
+
+    def _list_temp_videos(self) -> List[str]:
+        """List temp videos (and their JSON sidecars) created by this application"""
+        pattern = os.path.join(self.temp_dir, f"{TEMP_VIDEO_PREFIX}*")
+        return [p for p in glob.glob(pattern) if p.lower().endswith(VIDEO_SUFFIXES + (".json",))]
+
+    def _list_checkpoints(self) -> List[str]:
+        """List checkpoint and checkpoint metadata files"""
+        if not os.path.isdir(self.checkpoint_dir):
+            return []
+        return (
+            glob.glob(os.path.join(self.checkpoint_dir, "*.checkpoint")) +
+            glob.glob(os.path.join(self.checkpoint_dir, "*.tmp")) +
+            glob.glob(os.path.join(self.checkpoint_dir, "*_metadata.json"))
+        )
+
+    def _sweep_files(self, class_name: str, paths: List[str], now: float) -> None:
+        """Evict expired files, then LRU files until the class fits its byte quota"""
+        quota = self.quotas[class_name]
+        stats = self.stats[class_name]
+
+        entries = []
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # Removed concurrently
+            last_used = max(st.st_atime, st.st_mtime)
+            entries.append((last_used, st.st_size, path))
+
+        # Oldest first = least recently used first
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        remaining_files = len(entries)
+        skipped = 0
+
+        for last_used, size, path in entries:
+            expired = quota["max_age_seconds"] > 0 and (now - last_used) > quota["max_age_seconds"]
+            over_quota = quota["max_bytes"] > 0 and total_bytes > quota["max_bytes"]
+            if not expired and not over_quota:
+                continue
+            if self._is_in_flight(path):
+                skipped += 1
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                stats["last_error"] = f"{path}: {e}"
+                logger.warning(f"⚠️ JANITOR: Could not remove {path}: {e}")
+                continue
+            total_bytes -= size
+            remaining_files -= 1
+            stats["bytes_reclaimed"] += size
+            stats["files_evicted"] += 1
+            logger.info(f"🧹 JANITOR: Evicted {class_name} artifact {os.path.basename(path)} ({size / (1024*1024):.1f} MB, {'expired' if expired else 'over quota'})")
+
+        stats["current_bytes"] = total_bytes
+        stats["current_files"] = remaining_files
+        stats["skipped_in_flight"] = skipped
+
+    def _sweep_mock_storage(self) -> None:
+        """Prune the mock storage file through its registered pruner"""
+        stats = self.stats["mock_storage"]
+        if not self._mock_storage_file:
+            return
+        quota = self.quotas["mock_storage"]
+
+        size_before = os.path.getsize(self._mock_storage_file) if os.path.exists(self._mock_storage_file) else 0
+        if self._mock_storage_pruner:
+            with self._lock:
+                protected = set(self._in_flight_ids)
+            try:
+                removed = self._mock_storage_pruner(quota["max_bytes"], quota["max_age_seconds"], protected)
+                # Mock storage is a single file - count pruned analysis records instead of files
+                stats["files_evicted"] += removed
+            except Exception as e:
+                stats["last_error"] = str(e)
+                logger.warning(f"⚠️ JANITOR: Mock storage prune failed: {e}")
+
+        size_after = os.path.getsize(self._mock_storage_file) if os.path.exists(self._mock_storage_file) else 0
+        if size_after < size_before:
+            stats["bytes_reclaimed"] += size_before - size_after
+        stats["current_bytes"] = size_after
+        stats["current_files"] = 1 if size_after else 0
+
+    def sweep(self) -> Dict:
+        """
+        Run one janitor pass over all artifact classes
+
+        Returns:
+            Metrics snapshot after the sweep
+        """
+        start = time.time()
+        for class_name, lister in (("temp_videos", self._list_temp_videos), ("checkpoints", self._list_checkpoints)):
+            try:
+                self._sweep_files(class_name, lister(), start)
+            except Exception as e:
+                self.stats[class_name]["last_error"] = str(e)
+                logger.warning(f"⚠️ JANITOR: Sweep of {class_name} failed: {e}")
+        self._sweep_mock_storage()
+
+        self.sweep_count += 1
+        self.last_sweep_at = time.time()
+        self.last_sweep_duration = self.last_sweep_at - start
+        logger.debug(f"🧹 JANITOR: Sweep {self.sweep_count} finished in {self.last_sweep_duration:.2f}s")
+        return self.get_metrics()
+
+    def get_metrics(self) -> Dict:
+        """Return current usage and reclaimed-bytes metrics per artifact class"""
+        with self._lock:
+            in_flight = len(self._in_flight_ids)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval_seconds": self.interval_seconds,
+            "sweep_count": self.sweep_count,
+            "last_sweep_at": self.last_sweep_at,
+            "last_sweep_duration_seconds": self.last_sweep_duration,
+            "in_flight_analyses": in_flight,
+            "classes": {
+                name: {
+                    **stats,
+                    "quota_bytes": self.quotas[name]["max_bytes"],
+                    "max_age_seconds": self.quotas[name]["max_age_seconds"]
+                }
+                for name, stats in self.stats.items()
+            }
+        }
+
+    # ------------------------------------------------------------------
+    # Background thread
+    # ------------------------------------------------------------------
+
+    def start(self) -> None:
+        """Start the background sweep thread (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def janitor_loop():
+            logger.info(f"🧹 JANITOR: Starting artifact janitor (interval: {self.interval_seconds:.0f}s)")
+            while not self._stop_event.is_set():
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"❌ JANITOR: Unexpected sweep error: {e}", exc_info=True)
+                self._stop_event.wait(self.interval_seconds)
+            logger.info("🧹 JANITOR: Artifact janitor stopped")
+
+        self._thread = threading.Thread(target=janitor_loop, daemon=True, name="ArtifactJanitor")
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the background sweep thread"""
+        self._stop_event.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+
+_artifact_janitor: Optional[ArtifactJanitor] = None
+
+
+def get_artifact_janitor() -> ArtifactJanitor:
+    """Get the process-wide artifact janitor"""
+    global _artifact_janitor
+    if _artifact_janitor is None:
+        _artifact_janitor = ArtifactJanitor()
+    return _artifact_janitor
@@ -4,10 +4,17 @@ Simple file storage using Microsoft managed service
 """
 from typing import Optional
 from azure.storage.blob import BlobServiceClient, BlobClient, ContainerClient
-from azure.core.exceptions import AzureError
+from azure.core.exceptions import AzureError, ResourceNotFoundError
 from loguru import logger
 import os
+import time
 import uuid
+import asyncio
+import threading
+
+from app.services.progressive_download import (
+    ProgressiveDownload, mp4_moov_first, LAYOUT_PROBE_BYTES, PROGRESSIVE_SUPPORTED
+)
 
 try:
     from app.core.config_simple import settings
@@ -15,6 +22,11 @@ except ImportError:
     settings = None
 
 
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_BLOCK_CONCURRENCY", "4"))
+# Parallel ranged GETs per download (the SDK splits blobs larger than its first read into 4MB ranges)
+DOWNLOAD_MAX_CONCURRENCY = int(os.getenv("BLOB_DOWNLOAD_CONCURRENCY", "4"))
+
+
 class AzureStorageService:
     """Azure Blob Storage service for video file management"""
     
@@ -24,6 +36,9 @@ class AzureStorageService:
             "AZURE_STORAGE_CONNECTION_STRING",
             getattr(settings, "AZURE_STORAGE_CONNECTION_STRING", None) if settings else None
         )
+        self.connection_string = connection_string
+        self._stats_lock = threading.Lock()
+        self.download_stats = {"downloads": 0, "bytes": 0, "seconds": 0.0, "progressive": 0}
         self.container_name = os.getenv(
             "AZURE_STORAGE_CONTAINER_NAME",
             getattr(settings, "AZURE_STORAGE_CONTAINER_NAME", "videos") if settings else "videos"
@@ -74,8 +89,13 @@ class AzureStorageService:
         try:
             blob_client = self.container_client.get_blob_client(blob_name)
             
-            with open(file_path, "rb") as data:
-                blob_client.upload_blob(data, overwrite=True)
+            def _upload():
+                with open(file_path, "rb") as data:
+                    # Blocks of large files are uploaded in parallel
+                    blob_client.upload_blob(data, overwrite=True, max_concurrency=UPLOAD_MAX_CONCURRENCY)
+            
+            # Run in a thread so the event loop keeps serving requests
+            await asyncio.to_thread(_upload)
             
             blob_url = blob_client.url
             logger.info(f"Uploaded video: {blob_url}")
@@ -100,36 +120,136 @@ class AzureStorageService:
             return None
     
     async def download_blob(self, blob_name: str) -> Optional[bytes]:
-        """Download blob data asynchronously with proper error handling"""
+        """
+        Download a small blob (sidecars, metadata) into memory
+        
+        Videos should use download_blob_to_file() so they never have to fit in memory.
+        
+        Returns:
+            Blob content, or None if the blob does not exist or the download failed
+        """
         if not self.container_client:
             logger.error(f"Cannot download blob '{blob_name}': Storage service not configured")
             return None
         
+        def _download():
+            blob_client = self.container_client.get_blob_client(blob_name)
+            return blob_client.download_blob(max_concurrency=DOWNLOAD_MAX_CONCURRENCY).readall()
+        
         try:
-            import asyncio
-            loop = asyncio.get_event_loop()
+            # A missing blob surfaces as ResourceNotFoundError - no separate exists() round trip
+            blob_data = await asyncio.to_thread(_download)
+            logger.info(f"✅ Successfully downloaded blob '{blob_name}' ({len(blob_data)} bytes)")
+            return blob_data
+        except ResourceNotFoundError:
+            logger.error(f"Blob '{blob_name}' does not exist in container '{self.container_name}'")
+            return None
+        except Exception as e:
+            logger.error(f"Failed to download blob '{blob_name}': {e}", exc_info=True)
+            return None
+    
+    async def download_blob_to_file(self, blob_name: str, file_path: str) -> Optional[int]:
+        """
+        Download a blob straight to a local file with parallel ranged reads
+        
+        Memory use is bounded by the SDK's range buffers instead of the blob size.
+        A partially written file is removed on failure.
+        
+        Args:
+            blob_name: Blob to download
+            file_path: Destination (created or overwritten)
+        
+        Returns:
+            Number of bytes written, or None if the blob does not exist or the download failed
+        """
+        if not self.container_client:
+            logger.error(f"Cannot download blob '{blob_name}': Storage service not configured")
+            return None
+        
+        def _download() -> int:
+            blob_client = self.container_client.get_blob_client(blob_name)
+            downloader = blob_client.download_blob(max_concurrency=DOWNLOAD_MAX_CONCURRENCY)
+            with open(file_path, 'wb') as f:
+                return downloader.readinto(f)
+        
+        start = time.time()
+        try:
+            size = await asyncio.to_thread(_download)
+        except Exception as e:
+            try:
+                os.unlink(file_path)
+            except OSError:
+                pass
+            if isinstance(e, ResourceNotFoundError):
+                logger.error(f"Blob '{blob_name}' does not exist in container '{self.container_name}'")
+            else:
+                logger.error(f"Failed to download blob '{blob_name}' to {file_path}: {e}", exc_info=True)
+            return None
+        
+        duration = time.time() - start
+        with self._stats_lock:
+            self.download_stats["downloads"] += 1
+            self.download_stats["bytes"] += size
+            self.download_stats["seconds"] += duration
+        logger.info(
+            f"✅ Downloaded blob '{blob_name}' to disk ({size / (1024 * 1024):.1f} MB in {duration:.2f}s, "
+            f"{(size / (1024 * 1024)) / duration if duration > 0 else 0:.1f} MB/s, concurrency {DOWNLOAD_MAX_CONCURRENCY})"
+        )
+        return size
+    
+    async def start_progressive_download(self, blob_name: str, file_path: str) -> Optional[ProgressiveDownload]:
+        """
+        Start downloading a blob in the background so it can be decoded before it completes
+        
+        Only MP4/MOV files with the 'moov' box ahead of the media data (faststart) can be
+        demuxed from the partial prefix; for anything else None is returned and the caller
+        downloads the whole file instead.
+        
+        Args:
+            blob_name: Blob to download
+            file_path: Destination (created with the blob's size)
+        
+        Returns:
+            Running ProgressiveDownload, or None if the blob cannot be streamed
+        """
+        if not self.container_client or not PROGRESSIVE_SUPPORTED:
+            return None
+        
+        def _probe():
+            blob_client = self.container_client.get_blob_client(blob_name)
+            size = blob_client.get_blob_properties().size
+            head = blob_client.download_blob(offset=0, length=min(LAYOUT_PROBE_BYTES, size)).readall() if size else b''
             
-            def _download():
-                try:
-                    blob_client = self.container_client.get_blob_client(blob_name)
-                    if not blob_client.exists():
-                        logger.error(f"Blob '{blob_name}' does not exist in container '{self.container_name}'")
-                        return None
-                    
-                    logger.debug(f"Downloading blob '{blob_name}' from container '{self.container_name}'")
-                    download_stream = blob_client.download_blob()
-                    blob_data = download_stream.readall()
-                    logger.info(f"✅ Successfully downloaded blob '{blob_name}' ({len(blob_data)} bytes)")
-                    return blob_data
-                except Exception as download_error:
-                    logger.error(f"Error downloading blob '{blob_name}': {download_error}", exc_info=True)
-                    raise
+            def read_range(offset: int, length: int) -> bytes:
+                if offset + length <= len(head):
+                    return head[offset:offset + length]
+                return blob_client.download_blob(offset=offset, length=min(length, size - offset)).readall()
             
-            # Run in thread pool to avoid blocking
-            return await loop.run_in_executor(None, _download)
+            return blob_client, size, mp4_moov_first(read_range, size)
+        
+        try:
+            blob_client, size, streamable = await asyncio.to_thread(_probe)
+            if not streamable:
+                logger.info(f"ℹ️ Blob '{blob_name}' is not a faststart MP4 - downloading it completely before analysis")
+                return None
+            download = ProgressiveDownload(blob_client, file_path, size, max_concurrency=DOWNLOAD_MAX_CONCURRENCY)
+            download.start()
         except Exception as e:
-            logger.error(f"Failed to download blob '{blob_name}': {e}", exc_info=True)
+            logger.warning(f"⚠️ Progressive download of '{blob_name}' unavailable ({e}) - falling back to a full download")
             return None
+        
+        with self._stats_lock:
+            self.download_stats["progressive"] += 1
+        logger.info(f"📥 Progressive download of '{blob_name}' started ({size / (1024 * 1024):.1f} MB)")
+        return download
+    
+    def get_metrics(self) -> dict:
+        """Download throughput of video blobs since startup"""
+        with self._stats_lock:
+            stats = dict(self.download_stats)
+        stats["throughput_mbps"] = round(stats["bytes"] / (1024 * 1024) / stats["seconds"], 2) if stats["seconds"] else 0.0
+        stats["max_concurrency"] = DOWNLOAD_MAX_CONCURRENCY
+        return stats
     
     async def delete_blob(self, blob_name: str) -> bool:
         """Delete a blob"""
@@ -17,6 +17,13 @@ try:
 except ImportError:
     HAS_FCNTL = False
 
+# Step key -> checkpoint file stem
+STEP_CHECKPOINT_FILES = {
+    'step_1_pose_estimation': 'step1_2d_keypoints',
+    'step_2_3d_lifting': 'step2_3d_keypoints',
+    'step_3_metrics_calculation': 'step3_metrics',
+}
+
 
 class CheckpointManager:
     """Manages checkpoints for gait analysis processing steps"""
@@ -47,10 +54,120 @@ class CheckpointManager:
         """Get path for checkpoint metadata"""
         return self.checkpoint_dir / f"{self.analysis_id}_metadata.json"
     
+    @staticmethod
+    def _serialize_frames(frames: List) -> List:
+        """Convert keypoint frames (dicts or lists of points) to plain Python floats for pickling"""
+        serialized = []
+        for frame in frames:
+            if not frame:
+                serialized.append([] if not isinstance(frame, dict) else {})
+            elif isinstance(frame, dict):
+                serialized.append({
+                    name: {k: float(v) if isinstance(v, (int, float, np.number)) else v for k, v in kp.items()}
+                    if isinstance(kp, dict) else kp
+                    for name, kp in frame.items()
+                })
+            else:
+                serialized.append([
+                    [float(kp[0]), float(kp[1]), float(kp[2])] if len(kp) >= 3 else [float(kp[0]), float(kp[1]), 0.0]
+                    for kp in frame
+                ])
+        return serialized
+    
+    @classmethod
+    def build_step_1_data(cls, frames_2d_keypoints: List[List], frame_timestamps: List[float],
+                          total_frames: int, video_fps: float, processing_stats: Dict) -> Dict:
+        """Build the Step 1 (Pose Estimation) checkpoint payload"""
+        return {
+            'frames_2d_keypoints': cls._serialize_frames(frames_2d_keypoints),
+            'frame_timestamps': [float(ts) for ts in frame_timestamps],
+            'total_frames': total_frames,
+            'video_fps': float(video_fps),
+            'processing_stats': processing_stats,
+            'step': 'step_1_pose_estimation',
+            'completed': True
+        }
+    
+    @classmethod
+    def build_step_2_data(cls, frames_3d_keypoints: List[List], frames_2d_keypoints: List[List]) -> Dict:
+        """Build the Step 2 (3D Lifting) checkpoint payload"""
+        return {
+            'frames_3d_keypoints': cls._serialize_frames(frames_3d_keypoints),
+            'frames_2d_keypoints': cls._serialize_frames(frames_2d_keypoints),
+            'step': 'step_2_3d_lifting',
+            'completed': True
+        }
+    
+    @classmethod
+    def build_step_3_data(cls, metrics: Dict, frames_3d_keypoints: List[List]) -> Dict:
+        """Build the Step 3 (Gait Metrics) checkpoint payload"""
+        return {
+            'metrics': {k: float(v) if isinstance(v, (int, float, np.number)) else v 
+                       for k, v in metrics.items()},
+            'frames_3d_keypoints': cls._serialize_frames(frames_3d_keypoints),
+            'step': 'step_3_metrics_calculation',
+            'completed': True
+        }
+    
+    def write_step(self, step: str, checkpoint_data: Dict) -> Dict:
+        """
+        Write a step checkpoint file (without touching metadata)
+        
+        Args:
+            step: Step key (see STEP_CHECKPOINT_FILES)
+            checkpoint_data: Payload from one of the build_step_*_data methods
+            
+        Returns:
+            Metadata entry describing the written checkpoint
+        """
+        checkpoint_path = self._get_checkpoint_path(STEP_CHECKPOINT_FILES[step])
+        
+        # Save checkpoint with file locking
+        temp_path = checkpoint_path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            if HAS_FCNTL:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            pickle.dump(checkpoint_data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if HAS_FCNTL:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        
+        # Atomic rename
+        temp_path.replace(checkpoint_path)
+        
+        entry = {
+            'completed': True,
+            'checkpoint_file': str(checkpoint_path),
+            'timestamp': time.time()
+        }
+        if 'metrics' in checkpoint_data:
+            entry['metrics_count'] = len(checkpoint_data['metrics'])
+        else:
+            entry['frames_count'] = len(checkpoint_data.get('frames_3d_keypoints', checkpoint_data.get('frames_2d_keypoints', [])))
+        return entry
+    
+    def merge_metadata(self, entries: Dict[str, Dict]) -> None:
+        """Merge step entries into the metadata file with a single read-modify-write"""
+        metadata = self._load_metadata()
+        metadata.update(entries)
+        self._save_metadata(metadata)
+    
+    def _save_step(self, step: str, checkpoint_data: Dict) -> bool:
+        """Write a step checkpoint and its metadata entry synchronously"""
+        try:
+            entry = self.write_step(step, checkpoint_data)
+            self.merge_metadata({step: entry})
+            logger.info(f"✅ {step} checkpoint saved: {entry['checkpoint_file']}")
+            return True
+        except Exception as e:
+            logger.error(f"❌ Failed to save {step} checkpoint: {e}", exc_info=True)
+            return False
+    
     def save_step_1(self, frames_2d_keypoints: List[List], frame_timestamps: List[float], 
                     total_frames: int, video_fps: float, processing_stats: Dict) -> bool:
         """
-        Save Step 1 (Pose Estimation) checkpoint
+        Save Step 1 (Pose Estimation) checkpoint synchronously
+        
+        The processing pipeline uses CheckpointWriter instead, which does this off-thread.
         
         Args:
             frames_2d_keypoints: List of 2D keypoint frames
@@ -62,55 +179,13 @@ class CheckpointManager:
         Returns:
             True if saved successfully, False otherwise
         """
+        logger.info(f"💾 Saving Step 1 checkpoint: {len(frames_2d_keypoints)} 2D keypoint frames")
         try:
-            checkpoint_path = self._get_checkpoint_path("step1_2d_keypoints")
-            metadata_path = self._get_metadata_path()
-            
-            logger.info(f"💾 Saving Step 1 checkpoint: {len(frames_2d_keypoints)} 2D keypoint frames")
-            
-            # Save 2D keypoints (convert numpy arrays to lists for JSON serialization)
-            checkpoint_data = {
-                'frames_2d_keypoints': [
-                    [[float(kp[0]), float(kp[1]), float(kp[2])] if len(kp) >= 3 else [float(kp[0]), float(kp[1]), 0.0]
-                     for kp in frame] if frame else []
-                    for frame in frames_2d_keypoints
-                ],
-                'frame_timestamps': [float(ts) for ts in frame_timestamps],
-                'total_frames': total_frames,
-                'video_fps': float(video_fps),
-                'processing_stats': processing_stats,
-                'step': 'step_1_pose_estimation',
-                'completed': True
-            }
-            
-            # Save checkpoint with file locking
-            temp_path = checkpoint_path.with_suffix('.tmp')
-            with open(temp_path, 'wb') as f:
-                if HAS_FCNTL:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                pickle.dump(checkpoint_data, f)
-                if HAS_FCNTL:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            
-            # Atomic rename
-            temp_path.replace(checkpoint_path)
-            
-            # Update metadata
-            metadata = self._load_metadata()
-            metadata['step_1_pose_estimation'] = {
-                'completed': True,
-                'checkpoint_file': str(checkpoint_path),
-                'frames_count': len(frames_2d_keypoints),
-                'timestamp': time.time()
-            }
-            self._save_metadata(metadata)
-            
-            logger.info(f"✅ Step 1 checkpoint saved: {checkpoint_path} ({len(frames_2d_keypoints)} frames)")
-            return True
-            
+            data = self.build_step_1_data(frames_2d_keypoints, frame_timestamps, total_frames, video_fps, processing_stats)
         except Exception as e:
             logger.error(f"❌ Failed to save Step 1 checkpoint: {e}", exc_info=True)
             return False
+        return self._save_step('step_1_pose_estimation', data)
     
     def load_step_1(self) -> Optional[Dict]:
         """
@@ -120,6 +195,7 @@ class CheckpointManager:
             Dictionary with checkpoint data or None if not found
         """
         try:
+            self._wait_for_pending_writes()
             checkpoint_path = self._get_checkpoint_path("step1_2d_keypoints")
             
             if not checkpoint_path.exists():
@@ -144,7 +220,7 @@ class CheckpointManager:
     
     def save_step_2(self, frames_3d_keypoints: List[List], frames_2d_keypoints: List[List]) -> bool:
         """
-        Save Step 2 (3D Lifting) checkpoint
+        Save Step 2 (3D Lifting) checkpoint synchronously
         
         Args:
             frames_3d_keypoints: List of 3D keypoint frames
@@ -153,56 +229,18 @@ class CheckpointManager:
         Returns:
             True if saved successfully, False otherwise
         """
+        logger.info(f"💾 Saving Step 2 checkpoint: {len(frames_3d_keypoints)} 3D keypoint frames")
         try:
-            checkpoint_path = self._get_checkpoint_path("step2_3d_keypoints")
-            metadata_path = self._get_metadata_path()
-            
-            logger.info(f"💾 Saving Step 2 checkpoint: {len(frames_3d_keypoints)} 3D keypoint frames")
-            
-            checkpoint_data = {
-                'frames_3d_keypoints': [
-                    [[float(kp[0]), float(kp[1]), float(kp[2])] if len(kp) >= 3 else [float(kp[0]), float(kp[1]), 0.0]
-                     for kp in frame] if frame else []
-                    for frame in frames_3d_keypoints
-                ],
-                'frames_2d_keypoints': [
-                    [[float(kp[0]), float(kp[1]), float(kp[2])] if len(kp) >= 3 else [float(kp[0]), float(kp[1]), 0.0]
-                     for kp in frame] if frame else []
-                    for frame in frames_2d_keypoints
-                ],
-                'step': 'step_2_3d_lifting',
-                'completed': True
-            }
-            
-            temp_path = checkpoint_path.with_suffix('.tmp')
-            with open(temp_path, 'wb') as f:
-                if HAS_FCNTL:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                pickle.dump(checkpoint_data, f)
-                if HAS_FCNTL:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            
-            temp_path.replace(checkpoint_path)
-            
-            metadata = self._load_metadata()
-            metadata['step_2_3d_lifting'] = {
-                'completed': True,
-                'checkpoint_file': str(checkpoint_path),
-                'frames_count': len(frames_3d_keypoints),
-                'timestamp': time.time()
-            }
-            self._save_metadata(metadata)
-            
-            logger.info(f"✅ Step 2 checkpoint saved: {checkpoint_path} ({len(frames_3d_keypoints)} frames)")
-            return True
-            
+            data = self.build_step_2_data(frames_3d_keypoints, frames_2d_keypoints)
         except Exception as e:
             logger.error(f"❌ Failed to save Step 2 checkpoint: {e}", exc_info=True)
             return False
+        return self._save_step('step_2_3d_lifting', data)
     
     def load_step_2(self) -> Optional[Dict]:
         """Load Step 2 (3D Lifting) checkpoint"""
         try:
+            self._wait_for_pending_writes()
             checkpoint_path = self._get_checkpoint_path("step2_3d_keypoints")
             
             if not checkpoint_path.exists():
@@ -226,7 +264,7 @@ class CheckpointManager:
     
     def save_step_3(self, metrics: Dict, frames_3d_keypoints: List[List]) -> bool:
         """
-        Save Step 3 (Gait Metrics) checkpoint
+        Save Step 3 (Gait Metrics) checkpoint synchronously
         
         Args:
             metrics: Calculated gait metrics
@@ -235,52 +273,18 @@ class CheckpointManager:
         Returns:
             True if saved successfully, False otherwise
         """
+        logger.info(f"💾 Saving Step 3 checkpoint: {len(metrics)} metrics")
         try:
-            checkpoint_path = self._get_checkpoint_path("step3_metrics")
-            
-            logger.info(f"💾 Saving Step 3 checkpoint: {len(metrics)} metrics")
-            
-            checkpoint_data = {
-                'metrics': {k: float(v) if isinstance(v, (int, float, np.number)) else v 
-                           for k, v in metrics.items()},
-                'frames_3d_keypoints': [
-                    [[float(kp[0]), float(kp[1]), float(kp[2])] if len(kp) >= 3 else [float(kp[0]), float(kp[1]), 0.0]
-                     for kp in frame] if frame else []
-                    for frame in frames_3d_keypoints
-                ],
-                'step': 'step_3_metrics_calculation',
-                'completed': True
-            }
-            
-            temp_path = checkpoint_path.with_suffix('.tmp')
-            with open(temp_path, 'wb') as f:
-                if HAS_FCNTL:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
-                pickle.dump(checkpoint_data, f)
-                if HAS_FCNTL:
-                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
-            
-            temp_path.replace(checkpoint_path)
-            
-            metadata = self._load_metadata()
-            metadata['step_3_metrics_calculation'] = {
-                'completed': True,
-                'checkpoint_file': str(checkpoint_path),
-                'metrics_count': len(metrics),
-                'timestamp': time.time()
-            }
-            self._save_metadata(metadata)
-            
-            logger.info(f"✅ Step 3 checkpoint saved: {checkpoint_path}")
-            return True
-            
+            data = self.build_step_3_data(metrics, frames_3d_keypoints)
         except Exception as e:
             logger.error(f"❌ Failed to save Step 3 checkpoint: {e}", exc_info=True)
             return False
+        return self._save_step('step_3_metrics_calculation', data)
     
     def load_step_3(self) -> Optional[Dict]:
         """Load Step 3 (Gait Metrics) checkpoint"""
         try:
+            self._wait_for_pending_writes()
             checkpoint_path = self._get_checkpoint_path("step3_metrics")
             
             if not checkpoint_path.exists():
@@ -333,8 +337,14 @@ class CheckpointManager:
         except Exception as e:
             logger.error(f"Failed to save metadata: {e}", exc_info=True)
     
+    def _wait_for_pending_writes(self) -> None:
+        """Flush queued background writes for this analysis so reads see them"""
+        from app.services.checkpoint_writer import flush_pending_checkpoints
+        flush_pending_checkpoints(self.analysis_id)
+    
     def get_completed_steps(self) -> Dict[str, bool]:
         """Get which steps have been completed (have checkpoints)"""
+        self._wait_for_pending_writes()
         metadata = self._load_metadata()
         return {
             'step_1_pose_estimation': metadata.get('step_1_pose_estimation', {}).get('completed', False),
@@ -345,7 +355,8 @@ class CheckpointManager:
     def cleanup(self) -> None:
         """Clean up checkpoints for this analysis"""
         try:
-            for step_file in ['step1_2d_keypoints', 'step2_3d_keypoints', 'step3_metrics']:
+            self._wait_for_pending_writes()
+            for step_file in STEP_CHECKPOINT_FILES.values():
                 checkpoint_path = self._get_checkpoint_path(step_file)
                 if checkpoint_path.exists():
                     checkpoint_path.unlink()
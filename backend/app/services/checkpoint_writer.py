@@ -0,0 +1,242 @@
+"""
+Background Checkpoint Writer
+Serializes and writes step checkpoints on a dedicated thread so processing never waits on disk
+"""
+import os
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+from app.services.checkpoint_manager import CheckpointManager
+
+# Step key -> payload builder (runs on the writer thread)
+STEP_BUILDERS = {
+    'step_1_pose_estimation': CheckpointManager.build_step_1_data,
+    'step_2_3d_lifting': CheckpointManager.build_step_2_data,
+    'step_3_metrics_calculation': CheckpointManager.build_step_3_data,
+}
+
+
+class CheckpointWriter:
+    """
+    Single background thread that writes checkpoints for all analyses.
+
+    submit() takes a deep copy of the step inputs (the pipeline keeps mutating keypoint
+    frames in place after queueing) and returns immediately.
+    Pending jobs are keyed by (analysis_id, step): a newer snapshot of the same step
+    replaces one that has not been written yet. Metadata entries produced while draining
+    the queue are merged into a single metadata write per analysis. The queue is bounded;
+    submit() blocks briefly when it is full and drops the snapshot if the writer cannot
+    catch up (checkpoints are best-effort, processing must not stall).
+    """
+
+    def __init__(self, max_pending: Optional[int] = None, submit_timeout: Optional[float] = None):
+        """
+        Initialize writer
+
+        Args:
+            max_pending: Maximum queued snapshots (default CHECKPOINT_WRITER_MAX_PENDING env var, 8)
+            submit_timeout: Seconds submit() waits for queue space (default CHECKPOINT_WRITER_SUBMIT_TIMEOUT, 2)
+        """
+        self.max_pending = max_pending or int(os.getenv("CHECKPOINT_WRITER_MAX_PENDING", "8"))
+        self.submit_timeout = submit_timeout if submit_timeout is not None else float(
+            os.getenv("CHECKPOINT_WRITER_SUBMIT_TIMEOUT", "2")
+        )
+        self._pending: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._in_progress: Dict[str, int] = {}  # analysis_id -> jobs currently being written
+        self._managers: Dict[str, CheckpointManager] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.stats = {
+            "submitted": 0,
+            "written": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "failed": 0,
+            "metadata_writes": 0,
+            "last_error": None,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="CheckpointWriter")
+            self._thread.start()
+
+    def submit(self, analysis_id: str, step: str, **inputs) -> bool:
+        """
+        Queue a step checkpoint for background writing
+
+        Args:
+            analysis_id: Analysis the checkpoint belongs to
+            step: Step key (see STEP_BUILDERS)
+            **inputs: Keyword arguments for the step's build_step_*_data method
+
+        Returns:
+            True if queued (or coalesced into a queued job), False if dropped
+        """
+        snapshot = copy.deepcopy(inputs)
+        key = (analysis_id, step)
+        deadline = time.time() + self.submit_timeout
+        with self._condition:
+            self._ensure_started()
+            self.stats["submitted"] += 1
+            if key in self._pending:
+                self._pending[key]["inputs"] = snapshot
+                self.stats["coalesced"] += 1
+                return True
+            while len(self._pending) >= self.max_pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.stats["dropped"] += 1
+                    logger.warning(f"⚠️ CHECKPOINT WRITER: Queue full - dropping {step} snapshot for {analysis_id}")
+                    return False
+                self._condition.wait(remaining)
+            self._pending[key] = {"analysis_id": analysis_id, "step": step, "inputs": snapshot}
+            self._condition.notify_all()
+        return True
+
+    def flush(self, analysis_id: Optional[str] = None, timeout: float = 30.0) -> bool:
+        """
+        Block until queued checkpoints are on disk
+
+        Args:
+            analysis_id: Only wait for this analysis (default: everything)
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if all matching writes completed within the timeout
+        """
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._has_work(analysis_id):
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    logger.warning(f"⚠️ CHECKPOINT WRITER: Flush timed out after {timeout:.0f}s (analysis: {analysis_id or 'all'})")
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def discard(self, analysis_id: str) -> int:
+        """
+        Drop checkpoints of an analysis that are queued but not yet being written
+
+        Returns:
+            Number of snapshots dropped
+        """
+        with self._condition:
+            keys = [key for key in self._pending if key[0] == analysis_id]
+            for key in keys:
+                del self._pending[key]
+            if not self._in_progress.get(analysis_id):
+                self._managers.pop(analysis_id, None)
+            self._condition.notify_all()
+        if keys:
+            logger.info(f"🗑️ CHECKPOINT WRITER: Discarded {len(keys)} queued snapshot(s) for {analysis_id}")
+        return len(keys)
+
+    def _has_work(self, analysis_id: Optional[str]) -> bool:
+        if analysis_id is None:
+            return bool(self._pending) or any(self._in_progress.values())
+        return self._in_progress.get(analysis_id, 0) > 0 or any(key[0] == analysis_id for key in self._pending)
+
+    def _get_manager(self, analysis_id: str) -> CheckpointManager:
+        # One manager per analysis: avoids repeated mkdir/logging per write
+        manager = self._managers.get(analysis_id)
+        if manager is None:
+            manager = CheckpointManager(analysis_id=analysis_id)
+            self._managers[analysis_id] = manager
+        return manager
+
+    def _run(self) -> None:
+        logger.info(f"💾 CHECKPOINT WRITER: Started (max pending: {self.max_pending})")
+        while True:
+            with self._condition:
+                while not self._pending and not self._stopping:
+                    self._condition.wait()
+                if not self._pending and self._stopping:
+                    break
+                # Take everything queued so metadata updates can be merged per analysis
+                batch = list(self._pending.values())
+                self._pending.clear()
+                for job in batch:
+                    self._in_progress[job["analysis_id"]] = self._in_progress.get(job["analysis_id"], 0) + 1
+                self._condition.notify_all()
+
+            metadata_entries: Dict[str, Dict[str, Dict]] = {}
+            for job in batch:
+                analysis_id, step = job["analysis_id"], job["step"]
+                try:
+                    start = time.time()
+                    data = STEP_BUILDERS[step](**job["inputs"])
+                    entry = self._get_manager(analysis_id).write_step(step, data)
+                    metadata_entries.setdefault(analysis_id, {})[step] = entry
+                    self.stats["written"] += 1
+                    logger.info(f"✅ CHECKPOINT WRITER: {step} saved for {analysis_id} in {time.time() - start:.2f}s")
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.stats["last_error"] = str(e)
+                    logger.error(f"❌ CHECKPOINT WRITER: Failed to write {step} for {analysis_id}: {e}", exc_info=True)
+
+            for analysis_id, entries in metadata_entries.items():
+                try:
+                    self._get_manager(analysis_id).merge_metadata(entries)
+                    self.stats["metadata_writes"] += 1
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    self.stats["last_error"] = str(e)
+                    logger.error(f"❌ CHECKPOINT WRITER: Failed to update metadata for {analysis_id}: {e}", exc_info=True)
+
+            with self._condition:
+                for job in batch:
+                    analysis_id = job["analysis_id"]
+                    self._in_progress[analysis_id] -= 1
+                    if self._in_progress[analysis_id] <= 0:
+                        del self._in_progress[analysis_id]
+                        if not any(key[0] == analysis_id for key in self._pending):
+                            self._managers.pop(analysis_id, None)
+                self._condition.notify_all()
+        logger.info("💾 CHECKPOINT WRITER: Stopped")
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Write everything still queued, then stop the writer thread"""
+        self.flush(timeout=timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+
+    def get_metrics(self) -> Dict:
+        """Writer counters and current queue depth"""
+        with self._condition:
+            return {**self.stats, "pending": len(self._pending), "max_pending": self.max_pending}
+
+
+_checkpoint_writer: Optional[CheckpointWriter] = None
+
+
+def get_checkpoint_writer() -> CheckpointWriter:
+    """Get the process-wide checkpoint writer"""
+    global _checkpoint_writer
+    if _checkpoint_writer is None:
+        _checkpoint_writer = CheckpointWriter()
+    return _checkpoint_writer
+
+
+def flush_pending_checkpoints(analysis_id: Optional[str] = None, timeout: float = 30.0) -> bool:
+    """Flush barrier usable without starting a writer (no-op if none exists)"""
+    if _checkpoint_writer is None:
+        return True
+    return _checkpoint_writer.flush(analysis_id, timeout=timeout)
+
+
+def discard_pending_checkpoints(analysis_id: str) -> int:
+    """Drop queued checkpoints of an analysis (no-op if no writer exists)"""
+    if _checkpoint_writer is None:
+        return 0
+    return _checkpoint_writer.discard(analysis_id)
@@ -0,0 +1,308 @@
+"""
+Frame Index / Seek Table
+Per-video table of presentation timestamps and keyframes, built once and cached next to the video
+"""
+import os
+import json
+import bisect
+import shutil
+import subprocess
+import time
+from typing import Dict, List, Optional
+from loguru import logger
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+
+FRAME_INDEX_SUFFIX = ".frameindex.json"
+FRAME_INDEX_VERSION = 1
+# Relative spread of frame durations above which a video is treated as variable frame rate
+VFR_TOLERANCE = 0.05
+
+
+class FrameIndex:
+    """
+    Seek table for one video
+
+    Attributes:
+        pts: Presentation timestamp (seconds) of each frame, in presentation order
+        keyframes: Sorted frame indices of keyframes (empty if unknown)
+        nominal_fps: Container-reported frame rate
+        is_vfr: True if frame durations vary beyond VFR_TOLERANCE
+    """
+
+    def __init__(self, pts: List[float], keyframes: List[int], nominal_fps: float, source: str = "ffprobe"):
+        self.pts = pts
+        self.keyframes = keyframes
+        self.nominal_fps = nominal_fps
+        self.source = source
+        self.is_vfr = self._detect_vfr(pts)
+
+    @staticmethod
+    def _detect_vfr(pts: List[float]) -> bool:
+        """Detect variable frame rate from the spread of frame durations"""
+        if len(pts) < 3:
+            return False
+        deltas = sorted(b - a for a, b in zip(pts, pts[1:]) if b > a)
+        if not deltas:
+            return False
+        median = deltas[len(deltas) // 2]
+        # Ignore the extreme 2% on each side (edit-list glitches at start/end)
+        trim = len(deltas) // 50
+        trimmed = deltas[trim:len(deltas) - trim] or deltas
+        return median > 0 and (trimmed[-1] - trimmed[0]) / median > VFR_TOLERANCE
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.pts)
+
+    @property
+    def average_fps(self) -> float:
+        """Frame rate derived from timestamps (correct for VFR)"""
+        if len(self.pts) < 2 or self.pts[-1] <= self.pts[0]:
+            return self.nominal_fps
+        return (len(self.pts) - 1) / (self.pts[-1] - self.pts[0])
+
+    def timestamp(self, frame_index: int) -> float:
+        """Timestamp of a frame in seconds, relative to the first frame"""
+        if 0 <= frame_index < len(self.pts):
+            return self.pts[frame_index] - self.pts[0]
+        fps = self.nominal_fps or self.average_fps or 30.0
+        return frame_index / fps
+
+    def frame_at(self, timestamp: float) -> int:
+        """Index of the frame whose timestamp (relative to the first frame) is closest to timestamp"""
+        if not self.pts:
+            return 0
+        target = timestamp + self.pts[0]
+        i = bisect.bisect_left(self.pts, target)
+        if i == 0:
+            return 0
+        if i == len(self.pts):
+            return len(self.pts) - 1
+        return i if self.pts[i] - target < target - self.pts[i - 1] else i - 1
+
+    def nearest_keyframe(self, frame_index: int) -> int:
+        """Index of the last keyframe at or before frame_index (0 if unknown)"""
+        best = 0
+        for kf in self.keyframes:
+            if kf > frame_index:
+                break
+            best = kf
+        return best
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": FRAME_INDEX_VERSION,
+            "pts": self.pts,
+            "keyframes": self.keyframes,
+            "nominal_fps": self.nominal_fps,
+            "is_vfr": self.is_vfr,
+            "source": self.source,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "FrameIndex":
+        return cls(data["pts"], data.get("keyframes", []), data.get("nominal_fps", 0.0), data.get("source", "cache"))
+
+
+def frame_index_path(video_path: str) -> str:
+    """Path of the cached frame index for a video"""
+    return f"{video_path}{FRAME_INDEX_SUFFIX}"
+
+
+def _build_with_ffprobe(video_path: str) -> Optional[FrameIndex]:
+    """Demux-only pass: read packet timestamps and key flags without decoding"""
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return None
+    cmd = [
+        ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,dts_time,flags:stream=avg_frame_rate,r_frame_rate",
+        "-of", "json", video_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=60)
+    except subprocess.TimeoutExpired:
+        logger.warning("⚠️ FRAME INDEX: ffprobe timed out")
+        return None
+    if result.returncode != 0:
+        logger.warning(f"⚠️ FRAME INDEX: ffprobe failed: {result.stderr.decode(errors='ignore')[-300:]}")
+        return None
+
+    data = json.loads(result.stdout or b"{}")
+    packets = []
+    for order, packet in enumerate(data.get("packets", [])):
+        pts_time, dts_time = packet.get("pts_time"), packet.get("dts_time")
+        ts = pts_time if pts_time not in (None, "N/A") else dts_time
+        if ts in (None, "N/A"):
+            continue
+        decode_ts = float(dts_time) if dts_time not in (None, "N/A") else None
+        packets.append((decode_ts, order, float(ts), "K" in packet.get("flags", "")))
+    if not packets:
+        return None
+
+    # Keyframes are found in decode (dts) order, then placed at their presentation position;
+    # with B-frames a keyframe is presented after frames that are decoded before it
+    if all(p[0] is not None for p in packets):
+        packets.sort(key=lambda p: (p[0], p[1]))
+    pts = sorted(p[2] for p in packets)
+    keyframes = sorted({bisect.bisect_left(pts, ts) for _, _, ts, is_key in packets if is_key})
+
+    nominal_fps = 0.0
+    streams = data.get("streams") or [{}]
+    rate = streams[0].get("avg_frame_rate") or streams[0].get("r_frame_rate") or "0/1"
+    try:
+        num, den = rate.split("/")
+        nominal_fps = float(num) / float(den) if float(den) else 0.0
+    except (ValueError, ZeroDivisionError):
+        pass
+    return FrameIndex(pts, keyframes, nominal_fps, source="ffprobe")
+
+
+def _build_with_opencv(video_path: str) -> Optional[FrameIndex]:
+    """Fallback: grab every frame and read its position (decodes, but only once per video)"""
+    if not CV2_AVAILABLE:
+        return None
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        nominal_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+        pts = []
+        while cap.grab():
+            pts.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+        if not pts:
+            return None
+        # Keyframe positions are not exposed by OpenCV - seeks fall back to cap.set()
+        return FrameIndex(pts, [], nominal_fps, source="opencv")
+    finally:
+        cap.release()
+
+
+def get_frame_index(video_path: str, build: bool = True) -> Optional[FrameIndex]:
+    """
+    Load the cached frame index for a video, building it on first use
+
+    Args:
+        video_path: Path to the video
+        build: Build and cache the index if no valid cached copy exists
+
+    Returns:
+        FrameIndex, or None if it could not be built
+    """
+    cache_path = frame_index_path(video_path)
+    try:
+        if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(video_path):
+            with open(cache_path, 'r') as f:
+                data = json.load(f)
+            if data.get("version") == FRAME_INDEX_VERSION:
+                return FrameIndex.from_dict(data)
+    except (OSError, json.JSONDecodeError, KeyError) as e:
+        logger.debug(f"FRAME INDEX: Ignoring unreadable cache {cache_path}: {e}")
+
+    if not build or not os.path.exists(video_path):
+        return None
+
+    start = time.time()
+    index = _build_with_ffprobe(video_path) or _build_with_opencv(video_path)
+    if index is None:
+        logger.warning(f"⚠️ FRAME INDEX: Could not build frame index for {video_path}")
+        return None
+
+    try:
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(index.to_dict(), f)
+        os.replace(temp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️ FRAME INDEX: Could not cache frame index: {e}")
+
+    logger.info(
+        f"📇 FRAME INDEX: Built in {time.time() - start:.2f}s ({index.source}): "
+        f"{index.frame_count} frames, {len(index.keyframes)} keyframes, "
+        f"{'VFR' if index.is_vfr else 'CFR'} ({index.average_fps:.2f} fps avg, {index.nominal_fps:.2f} nominal)"
+    )
+    return index
+
+
+class FrameSeeker:
+    """
+    Random-access frame reader over a cv2.VideoCapture
+
+    Reading targets in ascending order decodes forward from the current position when
+    no keyframe lies in between; otherwise it seeks to the nearest keyframe at or before
+    the target and decodes forward from there.
+
+    Seeks go by presentation timestamp (CAP_PROP_POS_MSEC from the index): OpenCV maps
+    CAP_PROP_POS_FRAMES through the nominal frame rate, which lands on the wrong frame in
+    variable frame rate videos. The decoder's position after a seek is read back from the
+    decoded frame's timestamp rather than assumed.
+    """
+
+    def __init__(self, cap, index: Optional[FrameIndex] = None):
+        self.cap = cap
+        self.index = index
+        self.position = int(cap.get(cv2.CAP_PROP_POS_FRAMES)) if cap is not None else 0
+        self.frames_decoded = 0
+        self.seeks = 0
+
+    def read(self, frame_index: int):
+        """
+        Read a specific frame
+
+        Returns:
+            (ret, frame) like cv2.VideoCapture.read()
+        """
+        if self.index is None or not self.index.pts:
+            # No timestamps: let the demuxer seek
+            if frame_index != self.position:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+                self.seeks += 1
+            ret, frame = self.cap.read()
+            self.position = frame_index + 1
+            self.frames_decoded += 1
+            return ret, frame
+
+        # Without keyframe information, seek straight to the target's timestamp
+        keyframe = self.index.nearest_keyframe(frame_index) if self.index.keyframes else frame_index
+        if not (self.position <= frame_index and keyframe <= self.position):
+            # Target is behind us, or a keyframe lies between us and the target
+            if not self._seek(keyframe, frame_index):
+                return False, None
+
+        # position - 1 is the frame grabbed last
+        while self.position <= frame_index:
+            if not self.cap.grab():
+                return False, None
+            self.position += 1
+            self.frames_decoded += 1
+        return self.cap.retrieve()
+
+    def _seek(self, seek_frame: int, frame_index: int) -> bool:
+        """
+        Seek to seek_frame by timestamp and grab the frame the decoder lands on
+
+        Landing past frame_index (imprecise container seeks) retries from the previous
+        keyframe, down to the first frame.
+
+        Returns:
+            True if the decoder sits at or before frame_index
+        """
+        while True:
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, self.index.timestamp(seek_frame) * 1000.0)
+            self.seeks += 1
+            if not self.cap.grab():
+                return False
+            self.frames_decoded += 1
+            landed = self.index.frame_at(self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+            if landed <= frame_index:
+                self.position = landed + 1
+                return True
+            if seek_frame == 0:
+                return False
+            seek_frame = self.index.nearest_keyframe(seek_frame - 1) if self.index.keyframes else 0
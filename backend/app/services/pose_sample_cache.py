@@ -0,0 +1,103 @@
+"""
+Pose Sample Cache
+Per-frame detections from upload-time quality validation, reused by the main pose stage
+"""
+import os
+import json
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+SAMPLE_DETECTIONS_SUFFIX = ".detections.json"
+
+
+def sample_detections_path(video_path: str) -> str:
+    """Path of the cached sample detections for a video"""
+    return f"{video_path}{SAMPLE_DETECTIONS_SUFFIX}"
+
+
+def _video_bytes(video_path: str) -> Optional[int]:
+    try:
+        return os.path.getsize(video_path)
+    except OSError:
+        return None
+
+
+def save_sample_detections(
+    video_path: str,
+    detector: Optional[str],
+    detections: Dict[int, Dict],
+    frame_skip: int,
+    input_size: Tuple[int, int]
+) -> Optional[str]:
+    """
+    Persist validator detections next to the video
+
+    Args:
+        video_path: Video the frames were decoded from
+        detector: Detector name (detections are only reused with the same detector)
+        detections: Frame number -> keypoints in decoded-frame pixel coordinates
+        frame_skip: Sampling step of the frame grid the frames were drawn from
+        input_size: (width, height) of the frames handed to the detector
+
+    Returns:
+        Path to the cache file, or None on failure
+    """
+    if not detections:
+        return None
+    cache_path = sample_detections_path(video_path)
+    try:
+        temp_path = cache_path + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump({
+                "detector": detector,
+                "video_bytes": _video_bytes(video_path),
+                "frame_skip": frame_skip,
+                "input_size": list(input_size),
+                "frames": {str(frame_num): keypoints for frame_num, keypoints in detections.items()}
+            }, f)
+        os.replace(temp_path, cache_path)
+        logger.debug(f"💾 Saved {len(detections)} sample detections to {cache_path}")
+        return cache_path
+    except (OSError, TypeError, ValueError) as e:
+        logger.warning(f"⚠️ Could not save sample detections: {e}")
+        return None
+
+
+def load_sample_detections(
+    video_path: str,
+    detector: Optional[str],
+    frame_skip: int,
+    input_size: Tuple[int, int]
+) -> Dict[int, Dict]:
+    """
+    Load cached validator detections for a video
+
+    Detections are only reusable when they were made on this very file, on the frame
+    grid the caller processes and with the same detector input; anything else (another
+    processing frame rate, a downscaled detector input, a replaced file) is ignored.
+
+    Args:
+        video_path: Video being decoded
+        detector: Detector the caller would use
+        frame_skip: Sampling step the caller processes frames with
+        input_size: (width, height) of the frames the caller hands to the detector
+
+    Returns:
+        Frame number -> keypoints (empty if nothing reusable)
+    """
+    cache_path = sample_detections_path(video_path)
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with open(cache_path, 'r') as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        logger.debug(f"Ignoring unreadable sample detections {cache_path}: {e}")
+        return {}
+    if data.get("detector") != detector:
+        return {}
+    if (data.get("video_bytes") != _video_bytes(video_path) or data.get("frame_skip") != frame_skip
+            or data.get("input_size") != list(input_size)):
+        logger.info(f"♻️ Sample detections in {os.path.basename(cache_path)} were made with other settings - not reused")
+        return {}
+    return {int(frame_num): keypoints for frame_num, keypoints in data.get("frames", {}).items()}
@@ -0,0 +1,285 @@
+"""
+Progressive Blob Download
+Parallel ranged reads into a local file, with the completed prefix streamed to the frame decoder while the rest arrives
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from loguru import logger
+import os
+import time
+import errno
+import select
+import struct
+import threading
+
+PROGRESSIVE_RANGE_BYTES = int(os.getenv("PROGRESSIVE_RANGE_BYTES", str(4 * 1024 * 1024)))
+# Bytes fetched up front to find the top-level MP4 boxes (moov of a faststart file follows right after ftyp)
+LAYOUT_PROBE_BYTES = 64 * 1024
+# Seconds the decoder gets to open the stream before the feeder gives up (processing then falls back to the file)
+STREAM_OPEN_TIMEOUT_SECONDS = float(os.getenv("PROGRESSIVE_STREAM_OPEN_TIMEOUT_SECONDS", "60"))
+# FIFOs and positional writes are POSIX only; elsewhere videos are always downloaded completely first
+PROGRESSIVE_SUPPORTED = hasattr(os, 'mkfifo') and hasattr(os, 'pwrite')
+
+
+class StreamInterruptedError(IOError):
+    """A streaming decode ended before the last frame; the complete file has to be processed instead"""
+
+
+def is_progressive_download_enabled() -> bool:
+    """Decode videos while they download (PROGRESSIVE_DOWNLOAD_ENABLED, default on)"""
+    return PROGRESSIVE_SUPPORTED and os.getenv("PROGRESSIVE_DOWNLOAD_ENABLED", "true").lower() == "true"
+
+
+def mp4_moov_first(read_range: Callable[[int, int], bytes], size: int, max_boxes: int = 64) -> bool:
+    """
+    True if an MP4/MOV file has its 'moov' box before 'mdat' (faststart)
+
+    Only then can the demuxer read the sample tables before the media data and decode
+    from a non-seekable stream. Anything that is not a valid top-level box sequence
+    (AVI, MKV, truncated files) returns False.
+
+    Args:
+        read_range: Callable(offset, length) returning bytes of the file
+        size: File size in bytes
+    """
+    offset = 0
+    for _ in range(max_boxes):
+        if offset + 8 > size:
+            return False
+        header = read_range(offset, 16)
+        if len(header) < 8:
+            return False
+        box_size, box_type = struct.unpack('>I4s', header[:8])
+        if box_size == 1:
+            if len(header) < 16:
+                return False
+            box_size = struct.unpack('>Q', header[8:16])[0]
+        elif box_size == 0:
+            box_size = size - offset  # Box extends to the end of the file
+        if box_type == b'moov':
+            return True
+        if box_type == b'mdat' or box_size < 8:
+            return False
+        offset += box_size
+    return False
+
+
+class ProgressiveDownload:
+    """
+    Download of one blob that can be consumed before it completes.
+
+    Ranges of PROGRESSIVE_RANGE_BYTES are fetched by max_concurrency workers in file order
+    and written at their offsets into a preallocated file, so the in-order prefix grows
+    steadily while later ranges are already in flight. open_stream() returns the path of a
+    FIFO that is fed with that prefix as it grows; a decoder reading it sees one continuous
+    file and processes frames while the download is still running. The local file is
+    complete once wait() returns.
+    """
+
+    def __init__(self, blob_client, file_path: str, size: int,
+                 range_bytes: Optional[int] = None, max_concurrency: int = 4):
+        """
+        Args:
+            blob_client: Sync BlobClient of the blob
+            file_path: Local destination (created with the final size)
+            size: Blob size in bytes
+            range_bytes: Bytes per ranged read
+            max_concurrency: Ranged reads in flight
+        """
+        self.blob_client = blob_client
+        self.file_path = file_path
+        self.size = size
+        self.range_bytes = range_bytes or PROGRESSIVE_RANGE_BYTES
+        self.max_concurrency = max(1, max_concurrency)
+        self.fifo_path: Optional[str] = None
+        self._cond = threading.Condition()
+        self._done_ranges = set()
+        self._contiguous_bytes = 0
+        self._error: Optional[Exception] = None
+        self._finished = threading.Event()
+        self._cancelled = threading.Event()
+        self._stop_feeding = threading.Event()
+        self._fd: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._feeder: Optional[threading.Thread] = None
+        self.stream_complete = False
+        self.started_at = 0.0
+        self.duration: Optional[float] = None
+
+    @property
+    def contiguous_bytes(self) -> int:
+        """Bytes from the start of the file that are already on disk"""
+        with self._cond:
+            return self._contiguous_bytes
+
+    def start(self) -> None:
+        """Preallocate the local file and start downloading in the background"""
+        self._fd = os.open(self.file_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.ftruncate(self._fd, self.size)
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name="progressive-download", daemon=True)
+        self._thread.start()
+
+    def _fetch(self, index: int) -> None:
+        if self._cancelled.is_set() or self._error is not None:
+            return
+        offset = index * self.range_bytes
+        length = min(self.range_bytes, self.size - offset)
+        try:
+            data = self.blob_client.download_blob(offset=offset, length=length).readall()
+            if len(data) != length:
+                raise IOError(f"Range at {offset} returned {len(data)} of {length} bytes")
+            written = 0
+            while written < length:
+                written += os.pwrite(self._fd, data[written:], offset + written)
+        except Exception as e:
+            with self._cond:
+                self._error = self._error or e
+                self._cond.notify_all()
+            return
+        with self._cond:
+            self._done_ranges.add(index)
+            next_index = self._contiguous_bytes // self.range_bytes
+            while next_index in self._done_ranges:
+                self._done_ranges.discard(next_index)
+                next_index += 1
+                self._contiguous_bytes = min(next_index * self.range_bytes, self.size)
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        total_ranges = -(-self.size // self.range_bytes)
+        # Workers take ranges in file order, so at most max_concurrency ranges run ahead of the prefix
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="progressive-range") as pool:
+            for index in range(total_ranges):
+                pool.submit(self._fetch, index)
+        with self._cond:
+            if self._error is None and self._contiguous_bytes < self.size and not self._cancelled.is_set():
+                self._error = IOError(f"Download ended at {self._contiguous_bytes} of {self.size} bytes")
+            self.duration = time.time() - self.started_at
+            self._cond.notify_all()
+        try:
+            os.close(self._fd)
+        except OSError:
+            pass
+        self._finished.set()
+        if self._error is None and not self._cancelled.is_set():
+            logger.info(
+                f"✅ PROGRESSIVE DOWNLOAD: {os.path.basename(self.file_path)} complete "
+                f"({self.size / (1024 * 1024):.1f} MB in {self.duration:.2f}s, "
+                f"{(self.size / (1024 * 1024)) / self.duration if self.duration else 0:.1f} MB/s)"
+            )
+
+    def open_stream(self) -> str:
+        """
+        Create the FIFO the decoder reads and start feeding it
+
+        Returns:
+            FIFO path (pass it to cv2.VideoCapture instead of the file)
+        """
+        self.fifo_path = f"{self.file_path}.fifo"
+        try:
+            os.unlink(self.fifo_path)
+        except OSError:
+            pass
+        os.mkfifo(self.fifo_path, 0o600)
+        self._feeder = threading.Thread(target=self._feed, name="progressive-feed", daemon=True)
+        self._feeder.start()
+        return self.fifo_path
+
+    def _feeding_stopped(self) -> bool:
+        return self._stop_feeding.is_set() or self._cancelled.is_set()
+
+    def _open_fifo_writer(self) -> Optional[int]:
+        """Open the FIFO once the decoder has opened it for reading (without blocking forever)"""
+        deadline = time.monotonic() + STREAM_OPEN_TIMEOUT_SECONDS
+        while not self._feeding_stopped() and time.monotonic() < deadline:
+            try:
+                return os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK)
+            except OSError as e:
+                if e.errno != errno.ENXIO:  # ENXIO: no reader yet
+                    raise
+            time.sleep(0.05)
+        return None
+
+    def _feed(self) -> None:
+        fifo_fd = None
+        source_fd = None
+        position = 0
+        try:
+            fifo_fd = self._open_fifo_writer()
+            if fifo_fd is None:
+                logger.warning("⚠️ PROGRESSIVE DOWNLOAD: Decoder never opened the stream")
+                return
+            source_fd = os.open(self.file_path, os.O_RDONLY)
+            while position < self.size:
+                with self._cond:
+                    while self._contiguous_bytes <= position and self._error is None and not self._feeding_stopped():
+                        self._cond.wait(1.0)
+                    if self._error is not None or self._feeding_stopped():
+                        return
+                    available = self._contiguous_bytes
+                data = os.pread(source_fd, min(available - position, 1024 * 1024), position)
+                view = memoryview(data)
+                while view:
+                    if self._feeding_stopped():
+                        return
+                    # Non-blocking writes: a decoder that stalls or goes away can never wedge this thread
+                    _, writable, _ = select.select([], [fifo_fd], [], 1.0)
+                    if not writable:
+                        continue
+                    try:
+                        written = os.write(fifo_fd, view)
+                    except BlockingIOError:
+                        continue
+                    view = view[written:]
+                position += len(data)
+            self.stream_complete = True
+        except BrokenPipeError:
+            logger.info(f"ℹ️ PROGRESSIVE DOWNLOAD: Decoder closed the stream at {position} of {self.size} bytes")
+        except Exception as e:
+            logger.warning(f"⚠️ PROGRESSIVE DOWNLOAD: Feeding the decoder failed at {position} bytes: {e}")
+        finally:
+            for fd in (fifo_fd, source_fd):
+                if fd is not None:
+                    try:
+                        os.close(fd)  # EOF for the decoder
+                    except OSError:
+                        pass
+
+    def close_stream(self) -> None:
+        """Stop feeding the decoder and remove the FIFO (the download itself continues)"""
+        self._stop_feeding.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._feeder is not None:
+            self._feeder.join(timeout=5.0)
+        if self.fifo_path:
+            try:
+                os.unlink(self.fifo_path)
+            except OSError:
+                pass
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """
+        Block until the local file is complete
+
+        Returns:
+            Blob size in bytes
+
+        Raises:
+            IOError: If the download failed or was cancelled
+            TimeoutError: If it did not finish within timeout
+        """
+        if not self._finished.wait(timeout):
+            raise TimeoutError(f"Download of {os.path.basename(self.file_path)} did not finish within {timeout}s")
+        if self._error is not None:
+            raise IOError(f"Download of {os.path.basename(self.file_path)} failed: {self._error}")
+        if self._cancelled.is_set():
+            raise IOError(f"Download of {os.path.basename(self.file_path)} was cancelled")
+        return self.size
+
+    def cancel(self) -> None:
+        """Stop downloading and feeding (queued ranges are skipped)"""
+        self._cancelled.set()
+        with self._cond:
+            self._cond.notify_all()
@@ -0,0 +1,177 @@
+"""
+Streaming Upload Ingestion
+Writes request body chunks to local scratch off the event loop and stages them as blob blocks while the upload is still arriving
+"""
+from typing import List, Optional, Set
+from loguru import logger
+import os
+import asyncio
+import time
+
+try:
+    from azure.storage.blob.aio import BlobClient as AsyncBlobClient
+    import aiohttp  # Transport of the async blob SDK
+    BLOB_AIO_AVAILABLE = True
+except ImportError:
+    BLOB_AIO_AVAILABLE = False
+    AsyncBlobClient = None
+
+# Block size of staged uploads and number of blocks in flight per upload; memory per
+# upload is bounded by roughly UPLOAD_BLOCK_BYTES * (UPLOAD_BLOCK_CONCURRENCY + 1)
+UPLOAD_BLOCK_BYTES = int(os.getenv("UPLOAD_BLOCK_BYTES", str(4 * 1024 * 1024)))
+UPLOAD_BLOCK_CONCURRENCY = int(os.getenv("UPLOAD_BLOCK_CONCURRENCY", "4"))
+
+
+def is_streaming_upload_enabled() -> bool:
+    """Stream uploads to blob storage while they arrive (STREAMING_UPLOAD_ENABLED, default on)"""
+    return os.getenv("STREAMING_UPLOAD_ENABLED", "true").lower() == "true"
+
+
+class UploadIngest:
+    """
+    Sink for the chunks of an incoming upload.
+
+    - Every chunk is written to the local scratch file on a worker thread; the write of
+      one chunk overlaps with receiving the next.
+    - With a blob target, chunks are cut into UPLOAD_BLOCK_BYTES blocks that are staged
+      concurrently (at most UPLOAD_BLOCK_CONCURRENCY in flight, which also applies
+      backpressure to the request body). finish() commits the block list as soon as the
+      body has ended, so no second pass over the file is needed.
+    - A failing block upload never fails the request: staging stops, finish() returns
+      None and the caller falls back to uploading the scratch file.
+    """
+
+    def __init__(self, local_file, storage_service=None, blob_name: Optional[str] = None,
+                 block_size: Optional[int] = None, max_concurrency: Optional[int] = None):
+        """
+        Args:
+            local_file: Open binary file receiving the upload (closed by the caller)
+            storage_service: AzureStorageService to stream to (None: local scratch only)
+            blob_name: Blob to create
+            block_size: Bytes per staged block
+            max_concurrency: Blocks staged in parallel
+        """
+        self._file = local_file
+        self.blob_name = blob_name
+        self.block_size = block_size or UPLOAD_BLOCK_BYTES
+        self._slots = asyncio.Semaphore(max_concurrency or UPLOAD_BLOCK_CONCURRENCY)
+        self._pending_write: Optional[asyncio.Future] = None
+        self._buffer = bytearray()
+        self._block_ids: List[str] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._blob_error: Optional[Exception] = None
+        self._aio_client = None
+        self._sync_client = None
+        self.bytes_received = 0
+        self.bytes_staged = 0
+
+        if storage_service is not None and blob_name and getattr(storage_service, 'container_client', None):
+            connection_string = getattr(storage_service, 'connection_string', None)
+            if BLOB_AIO_AVAILABLE and connection_string:
+                self._aio_client = AsyncBlobClient.from_connection_string(
+                    connection_string, container_name=storage_service.container_name, blob_name=blob_name
+                )
+            else:
+                self._sync_client = storage_service.container_client.get_blob_client(blob_name)
+
+    @property
+    def streaming(self) -> bool:
+        """True while chunks are being staged to blob storage"""
+        return (self._aio_client is not None or self._sync_client is not None) and self._blob_error is None
+
+    async def write(self, chunk: bytes) -> None:
+        """Accept the next chunk of the request body"""
+        if self._pending_write is not None:
+            await self._pending_write
+        self._pending_write = asyncio.ensure_future(asyncio.to_thread(self._file.write, chunk))
+        self.bytes_received += len(chunk)
+        if not self.streaming:
+            return
+        self._buffer += chunk
+        while len(self._buffer) >= self.block_size and self.streaming:
+            data = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            await self._submit(data)
+
+    async def _submit(self, data: bytes) -> None:
+        await self._slots.acquire()  # Backpressure: wait for a free upload slot
+        block_id = f"{len(self._block_ids):08d}"  # Block ids of one blob must have equal length
+        self._block_ids.append(block_id)
+        task = asyncio.create_task(self._stage(block_id, data))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _stage(self, block_id: str, data: bytes) -> None:
+        try:
+            if self._blob_error is not None:
+                return
+            if self._aio_client is not None:
+                await self._aio_client.stage_block(block_id=block_id, data=data, length=len(data))
+            else:
+                await asyncio.to_thread(self._sync_client.stage_block, block_id, data, len(data))
+            self.bytes_staged += len(data)
+        except Exception as e:
+            if self._blob_error is None:
+                self._blob_error = e
+                logger.warning(f"⚠️ UPLOAD: Staging block {block_id} of {self.blob_name} failed, falling back to a full upload: {e}")
+        finally:
+            self._slots.release()
+
+    async def finish(self) -> Optional[str]:
+        """
+        Flush the scratch file and commit the staged blocks
+
+        Returns:
+            Blob URL, or None if nothing was streamed (no blob target, or staging failed)
+        """
+        if self._pending_write is not None:
+            await self._pending_write
+            self._pending_write = None
+        await asyncio.to_thread(self._file.flush)
+        try:
+            if not self.streaming:
+                return None
+            if self._buffer:
+                await self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            if self._tasks:
+                await asyncio.gather(*list(self._tasks))
+            if self._blob_error is not None:
+                return None
+            commit_start = time.time()
+            if self._aio_client is not None:
+                await self._aio_client.commit_block_list(self._block_ids)
+                url = self._aio_client.url
+            else:
+                await asyncio.to_thread(self._sync_client.commit_block_list, self._block_ids)
+                url = self._sync_client.url
+            logger.info(
+                f"✅ UPLOAD: Committed {self.blob_name} ({len(self._block_ids)} blocks, "
+                f"{self.bytes_staged / (1024 * 1024):.1f}MB, commit {time.time() - commit_start:.2f}s)"
+            )
+            return url
+        except Exception as e:
+            logger.warning(f"⚠️ UPLOAD: Committing {self.blob_name} failed, falling back to a full upload: {e}")
+            return None
+        finally:
+            await self._close_client()
+
+    async def abort(self) -> None:
+        """Stop staging (uncommitted blocks are discarded by the storage service)"""
+        self._blob_error = self._blob_error or RuntimeError("upload aborted")
+        for task in list(self._tasks):
+            task.cancel()
+        if self._pending_write is not None:
+            try:
+                await self._pending_write
+            except Exception:
+                pass
+            self._pending_write = None
+        await self._close_client()
+
+    async def _close_client(self) -> None:
+        if self._aio_client is not None:
+            try:
+                await self._aio_client.close()
+            except Exception:
+                pass
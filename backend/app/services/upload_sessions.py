@@ -0,0 +1,580 @@
+"""
+Resumable Upload Sessions
+Chunked uploads that survive dropped connections: chunks arrive in any order (and in parallel),
+are checksum-verified, written to local scratch and staged as blob blocks; commit assembles the blob
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from datetime import datetime
+from loguru import logger
+import os
+import json
+import time
+import uuid
+import base64
+import shutil
+import asyncio
+import hashlib
+import tempfile
+import threading
+
+from azure.core.exceptions import ResourceNotFoundError, HttpResponseError
+
+from app.core.exceptions import ValidationError, StorageError
+
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(tempfile.gettempdir(), "upload_sessions"))
+# Chunk size offered to clients (a client may ask for anything between the bounds)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(8 * 1024 * 1024)))
+MIN_CHUNK_BYTES = 256 * 1024
+MAX_CHUNK_BYTES = 64 * 1024 * 1024
+MAX_UPLOAD_BYTES = 500 * 1024 * 1024
+# Azure discards uncommitted blocks after 7 days; local scratch is reclaimed much earlier
+UPLOAD_SESSION_TTL_SECONDS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24")) * 3600
+# A commit lock older than this was left by a crashed commit and is taken over
+UPLOAD_COMMIT_LOCK_SECONDS = float(os.getenv("UPLOAD_COMMIT_LOCK_SECONDS", "60"))
+# Session documents in the video container, so every instance of a scale-out sees the session
+SHARED_SESSION_PREFIX = "upload-sessions/"
+SUPPORTED_UPLOAD_FORMATS = ('.mp4', '.avi', '.mov', '.mkv')
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+
+
+def parse_checksum(header: Optional[str]) -> Tuple[str, bytes]:
+    """
+    Parse an Upload-Checksum header ('<algorithm> <base64 digest>', as in the tus checksum extension)
+
+    Raises:
+        ValidationError: If the header is missing, malformed or names an unsupported algorithm
+    """
+    if not header:
+        raise ValidationError("Upload-Checksum header is required", field="Upload-Checksum",
+                              details={"algorithms": list(CHECKSUM_ALGORITHMS)})
+    algorithm, _, encoded = header.strip().partition(' ')
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValidationError(f"Unsupported checksum algorithm: {algorithm}", field="Upload-Checksum",
+                              details={"algorithms": list(CHECKSUM_ALGORITHMS)})
+    try:
+        digest = base64.b64decode(encoded.strip(), validate=True)
+    except (ValueError, TypeError):
+        raise ValidationError("Upload-Checksum digest must be base64", field="Upload-Checksum")
+    if len(digest) != hashlib.new(algorithm).digest_size:
+        raise ValidationError(f"Upload-Checksum digest has the wrong length for {algorithm}", field="Upload-Checksum")
+    return algorithm, digest
+
+
+class UploadSessionStore:
+    """
+    Upload sessions that any instance of a scale-out can continue.
+
+    A session is described by a small JSON document in the video container
+    (upload-sessions/<upload_id>.json), and every chunk is staged as a block of the
+    final blob (block id = chunk index) as soon as it arrives. Which chunks were
+    received is therefore read from the blob's uncommitted block list, so chunk PUTs
+    and the commit may land on different instances. Re-sending a chunk overwrites its
+    block, which makes chunk uploads idempotent: a client retries exactly the chunks
+    that failed.
+
+    Each instance also keeps a local scratch directory per session, shared by its
+    workers (and the only state when blob storage is not configured):
+    - session.json: immutable session parameters (size, chunk size, analysis id, blob name)
+    - data.<ext>: the chunks this instance received, each written at its own offset
+    - chunks/<index>.json: one marker per chunk received here (checksum, whether it was staged)
+    - commit.lock / committed.json: commit in progress / response of the finished commit
+
+    When every chunk came through one instance its scratch file is the complete video and
+    is processed in place; it also backs chunks that could not be staged.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 commit_lock_seconds: Optional[float] = None):
+        """
+        Initialize store
+
+        Args:
+            root: Directory holding session directories
+            ttl_seconds: Seconds after creation at which an uncommitted session expires
+            commit_lock_seconds: Age at which a commit lock counts as abandoned
+        """
+        self.root = root or UPLOAD_SESSION_DIR
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else UPLOAD_SESSION_TTL_SECONDS
+        self.commit_lock_seconds = commit_lock_seconds if commit_lock_seconds is not None else UPLOAD_COMMIT_LOCK_SECONDS
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._leases: Dict[str, object] = {}
+        self.stats = {
+            "sessions_created": 0,
+            "sessions_adopted": 0,
+            "chunks_received": 0,
+            "chunk_bytes": 0,
+            "checksum_failures": 0,
+            "staging_failures": 0,
+            "commits": 0,
+            "stale_commit_locks": 0,
+            "aborted": 0,
+            "expired": 0,
+        }
+
+    def _count(self, stat: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[stat] += value
+
+    def _session_dir(self, upload_id: str) -> str:
+        return os.path.join(self.root, upload_id)
+
+    def data_path(self, session: Dict) -> str:
+        """Local scratch file of a session (keeps the video's extension: it may be processed in place)"""
+        return os.path.join(self._session_dir(session['upload_id']), f"data{os.path.splitext(session['blob_name'])[1]}")
+
+    @staticmethod
+    def _write_json(path: str, content: Dict) -> None:
+        tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(content, f)
+        os.replace(tmp_path, path)  # Readers never see a partial file
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _blob_client(storage_service, blob_name: str):
+        container_client = getattr(storage_service, 'container_client', None) if storage_service else None
+        return container_client.get_blob_client(blob_name) if container_client else None
+
+    def _shared_document(self, storage_service, upload_id: str, suffix: str = ''):
+        return self._blob_client(storage_service, f"{SHARED_SESSION_PREFIX}{upload_id}{suffix}.json")
+
+    def _read_shared(self, storage_service, upload_id: str, suffix: str = '') -> Optional[Dict]:
+        document = self._shared_document(storage_service, upload_id, suffix)
+        if document is None:
+            return None
+        try:
+            return json.loads(document.download_blob().readall())
+        except ResourceNotFoundError:
+            return None
+
+    def _materialize(self, session: Dict) -> None:
+        """Create the local scratch of a session (idempotent; safe for concurrent workers)"""
+        session_dir = self._session_dir(session['upload_id'])
+        os.makedirs(os.path.join(session_dir, 'chunks'), exist_ok=True)
+        try:
+            with open(self.data_path(session), 'xb') as f:
+                f.truncate(session['size'])  # Sparse on most filesystems; chunks fill it in any order
+        except FileExistsError:
+            pass
+        self._write_json(os.path.join(session_dir, 'session.json'), session)
+
+    def create(self, filename: str, size: int, params: Dict, chunk_size: Optional[int] = None,
+               storage_service=None) -> Dict:
+        """
+        Start an upload session
+
+        Args:
+            filename: Name of the uploaded video (its extension is kept for the blob)
+            size: Total size in bytes
+            params: Analysis parameters applied on commit (patient_id, view_type, ...)
+            chunk_size: Requested chunk size (defaults to UPLOAD_CHUNK_BYTES)
+            storage_service: AzureStorageService to publish the session with (None: this instance only)
+
+        Returns:
+            Session dictionary
+
+        Raises:
+            ValidationError: On an unsupported format, size or chunk size
+            StorageError: If the session could not be published to blob storage
+        """
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in SUPPORTED_UPLOAD_FORMATS:
+            raise ValidationError(
+                f"Unsupported file format: {file_ext}. Supported formats: {', '.join(SUPPORTED_UPLOAD_FORMATS)}",
+                field="filename",
+                details={"extension": file_ext, "supported": list(SUPPORTED_UPLOAD_FORMATS)}
+            )
+        if size <= 0 or size > MAX_UPLOAD_BYTES:
+            raise ValidationError(
+                f"File size must be between 1 byte and {MAX_UPLOAD_BYTES // (1024 * 1024)}MB",
+                field="size",
+                details={"size": size, "max_size": MAX_UPLOAD_BYTES}
+            )
+        chunk_size = chunk_size or UPLOAD_CHUNK_BYTES
+        if not MIN_CHUNK_BYTES <= chunk_size <= MAX_CHUNK_BYTES:
+            raise ValidationError(
+                f"Chunk size must be between {MIN_CHUNK_BYTES} and {MAX_CHUNK_BYTES} bytes",
+                field="chunk_size",
+                details={"chunk_size": chunk_size}
+            )
+
+        self.prune_expired()
+        upload_id = uuid.uuid4().hex
+        analysis_id = str(uuid.uuid4())
+        now = time.time()
+        session = {
+            'upload_id': upload_id,
+            'analysis_id': analysis_id,
+            'blob_name': f"{analysis_id}{file_ext}",
+            'filename': filename,
+            'size': size,
+            'chunk_size': chunk_size,
+            'total_chunks': -(-size // chunk_size),
+            'params': params,
+            'created_at': now,
+            'expires_at': now + self.ttl_seconds,
+        }
+        document = self._shared_document(storage_service, upload_id)
+        if document is not None:
+            try:
+                document.upload_blob(json.dumps(session), overwrite=True)
+            except Exception as e:
+                raise StorageError(f"Could not create upload session: {e}", details={"upload_id": upload_id})
+        self._materialize(session)
+        self._count("sessions_created")
+        logger.info(f"📤 UPLOAD SESSION: Created {upload_id} for {filename} ({size / (1024 * 1024):.1f}MB, {session['total_chunks']} chunks)")
+        return session
+
+    def get(self, upload_id: str, storage_service=None) -> Optional[Dict]:
+        """Session by id (None if unknown or expired); sessions created on another instance are adopted"""
+        if not upload_id or not all(c in '0123456789abcdef' for c in upload_id):
+            return None
+        session = self._read_json(os.path.join(self._session_dir(upload_id), 'session.json'))
+        if session is None:
+            session = self._read_shared(storage_service, upload_id)
+            if session is not None and session['expires_at'] >= time.time():
+                self._materialize(session)
+                self._count("sessions_adopted")
+                logger.info(f"📤 UPLOAD SESSION: Continuing {upload_id} created on another instance")
+        if session is None or session['expires_at'] < time.time():
+            return None
+        return session
+
+    def local_chunks(self, session: Dict) -> Dict[int, Dict]:
+        """Markers of the chunks this instance received, by index"""
+        chunks_dir = os.path.join(self._session_dir(session['upload_id']), 'chunks')
+        received = {}
+        try:
+            names = os.listdir(chunks_dir)
+        except OSError:
+            return received
+        for name in names:
+            index, ext = os.path.splitext(name)
+            if ext == '.json' and index.isdigit():
+                marker = self._read_json(os.path.join(chunks_dir, name))
+                if marker is not None:
+                    received[int(index)] = marker
+        return received
+
+    def staged_chunks(self, session: Dict, storage_service=None) -> Optional[Set[int]]:
+        """
+        Chunks staged as blocks of the session's blob, by any instance
+
+        Returns:
+            Indexes of the uncommitted blocks that have their chunk's length, or None without blob storage
+        """
+        blob_client = self._blob_client(storage_service, session['blob_name'])
+        if blob_client is None:
+            return None
+        try:
+            _, uncommitted = blob_client.get_block_list('uncommitted')
+        except ResourceNotFoundError:
+            return set()  # Nothing staged yet
+        staged = set()
+        for block in uncommitted:
+            if block.id.isdigit() and int(block.id) < session['total_chunks'] \
+                    and block.size == self.chunk_length(session, int(block.id)):
+                staged.add(int(block.id))
+        return staged
+
+    def has_local_data(self, session: Dict) -> bool:
+        """Whether the local scratch file holds every chunk (the complete video)"""
+        return len(self.local_chunks(session)) == session['total_chunks']
+
+    def describe(self, session: Dict, storage_service=None) -> Dict:
+        """Public view of a session (what a resuming client needs)"""
+        received_set, _ = self.chunk_state(session, storage_service)
+        return {
+            'upload_id': session['upload_id'],
+            'filename': session['filename'],
+            'size': session['size'],
+            'chunk_size': session['chunk_size'],
+            'total_chunks': session['total_chunks'],
+            'received_chunks': sorted(received_set),
+            'missing_chunks': [i for i in range(session['total_chunks']) if i not in received_set],
+            'expires_at': datetime.utcfromtimestamp(session['expires_at']).isoformat(),
+        }
+
+    def chunk_length(self, session: Dict, index: int) -> int:
+        """Expected length of a chunk (the last one may be shorter)"""
+        if index < 0 or index >= session['total_chunks']:
+            raise ValidationError(
+                f"Chunk index must be between 0 and {session['total_chunks'] - 1}",
+                field="index",
+                details={"index": index, "total_chunks": session['total_chunks']}
+            )
+        return min(session['chunk_size'], session['size'] - index * session['chunk_size'])
+
+    async def put_chunk(self, session: Dict, index: int, data: bytes, checksum: Tuple[str, bytes],
+                        storage_service=None) -> Dict:
+        """
+        Verify a chunk, write it to scratch and stage it as a blob block
+
+        Args:
+            session: Session from create()/get()
+            index: Zero-based chunk index
+            data: Chunk body
+            checksum: (algorithm, digest) from parse_checksum()
+            storage_service: AzureStorageService to stage the block with (None: local only)
+
+        Returns:
+            The chunk marker
+
+        Raises:
+            ValidationError: On a wrong length or checksum mismatch
+        """
+        expected_length = self.chunk_length(session, index)
+        if len(data) != expected_length:
+            raise ValidationError(
+                f"Chunk {index} must be {expected_length} bytes, got {len(data)}",
+                field="body",
+                details={"index": index, "expected": expected_length, "received": len(data)}
+            )
+        algorithm, digest = checksum
+        if hashlib.new(algorithm, data).digest() != digest:
+            self._count("checksum_failures")
+            raise ValidationError(
+                f"Checksum mismatch for chunk {index}",
+                field="Upload-Checksum",
+                details={"index": index, "algorithm": algorithm}
+            )
+
+        def _write():
+            with open(self.data_path(session), 'r+b') as f:
+                f.seek(index * session['chunk_size'])
+                f.write(data)
+
+        await asyncio.to_thread(_write)
+
+        staged = False
+        blob_client = self._blob_client(storage_service, session['blob_name'])
+        if blob_client is not None:
+            try:
+                # validate_content sends a transactional MD5 the service verifies as well
+                await asyncio.to_thread(blob_client.stage_block, f"{index:08d}", data, len(data), validate_content=True)
+                staged = True
+            except Exception as e:
+                # Non-fatal: commit falls back to uploading the assembled file
+                self._count("staging_failures")
+                logger.warning(f"⚠️ UPLOAD SESSION: Staging chunk {index} of {session['upload_id']} failed: {e}")
+
+        marker = {'length': len(data), 'algorithm': algorithm,
+                  'checksum': base64.b64encode(digest).decode('ascii'), 'staged': staged}
+        self._write_json(os.path.join(self._session_dir(session['upload_id']), 'chunks', f"{index}.json"), marker)
+        self._count("chunks_received")
+        self._count("chunk_bytes", len(data))
+        return marker
+
+    def chunk_state(self, session: Dict, storage_service=None) -> Tuple[Set[int], Optional[Set[int]]]:
+        """
+        Chunks that count as received, and the chunks staged in blob storage
+
+        Staged blocks are visible to every instance. Chunks held only in local scratch
+        count as well while this instance has all of them (commit then uploads the
+        scratch file), or when there is no blob storage at all.
+
+        Returns:
+            (received chunk indexes, staged chunk indexes or None without blob storage)
+        """
+        local = set(self.local_chunks(session))
+        staged = self.staged_chunks(session, storage_service)
+        if staged is None or len(local) == session['total_chunks']:
+            return local | (staged or set()), staged
+        return staged, staged
+
+    async def assemble(self, session: Dict, storage_service=None) -> Optional[str]:
+        """
+        Check that every chunk arrived and commit the staged blob
+
+        Returns:
+            Blob URL, or None if the blob still has to be uploaded from data_path()
+            (some chunk was not staged; this instance then holds the complete file)
+
+        Raises:
+            ValidationError: If chunks are missing
+            StorageError: If committing the block list failed and there is no local copy to upload
+        """
+        received, staged = await asyncio.to_thread(self.chunk_state, session, storage_service)
+        missing = [i for i in range(session['total_chunks']) if i not in received]
+        if missing:
+            raise ValidationError(
+                f"{len(missing)} of {session['total_chunks']} chunks are missing",
+                field="chunks",
+                details={"missing_chunks": missing[:100]}
+            )
+        if staged is None or len(staged) < session['total_chunks']:
+            return None
+        blob_client = self._blob_client(storage_service, session['blob_name'])
+        block_ids = [f"{index:08d}" for index in range(session['total_chunks'])]
+        try:
+            await asyncio.to_thread(blob_client.commit_block_list, block_ids)
+        except Exception as e:
+            if not await asyncio.to_thread(self.has_local_data, session):
+                raise StorageError(f"Committing the uploaded video failed: {e}", details={"upload_id": session['upload_id']})
+            logger.warning(f"⚠️ UPLOAD SESSION: Committing blob of {session['upload_id']} failed, uploading the assembled file instead: {e}")
+            return None
+        logger.info(f"✅ UPLOAD SESSION: Committed {session['blob_name']} ({len(block_ids)} blocks)")
+        return blob_client.url
+
+    def begin_commit(self, upload_id: str, storage_service=None) -> bool:
+        """
+        Take the commit lock of a session (False if another request is committing it)
+
+        The lock is a file in the local scratch, which an abandoned commit (crashed worker)
+        only holds for commit_lock_seconds, and a lease on the shared session document,
+        which blob storage expires after the same time.
+        """
+        lock_path = os.path.join(self._session_dir(upload_id), 'commit.lock')
+        for _ in range(2):
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) < self.commit_lock_seconds:
+                        return False
+                    # Renaming is atomic: only one request takes over the abandoned lock
+                    stale_path = f"{lock_path}.{uuid.uuid4().hex[:8]}.stale"
+                    os.rename(lock_path, stale_path)
+                    os.unlink(stale_path)
+                except OSError:
+                    continue  # Released or taken over meanwhile
+                self._count("stale_commit_locks")
+                logger.warning(f"⚠️ UPLOAD SESSION: Took over abandoned commit lock of {upload_id}")
+        else:
+            return False
+
+        document = self._shared_document(storage_service, upload_id)
+        if document is not None:
+            try:
+                # Lease durations are limited to 15-60 seconds
+                lease_seconds = int(min(max(self.commit_lock_seconds, 15), 60))
+                self._leases[upload_id] = document.acquire_lease(lease_duration=lease_seconds)
+            except ResourceNotFoundError:
+                pass  # Session is not shared (created without blob storage)
+            except HttpResponseError as e:
+                os.unlink(lock_path)
+                if e.status_code == 409:
+                    return False  # Another instance is committing
+                raise StorageError(f"Could not lock upload session: {e}", details={"upload_id": upload_id})
+        return True
+
+    def end_commit(self, upload_id: str, response: Optional[Dict] = None, storage_service=None) -> None:
+        """
+        Release the commit lock
+
+        Args:
+            upload_id: Session id
+            response: Response of a successful commit; it is kept (locally and in blob
+                storage) for retried commit requests
+            storage_service: AzureStorageService the session is shared through
+        """
+        session_dir = self._session_dir(upload_id)
+        if response is not None:
+            self._write_json(os.path.join(session_dir, 'committed.json'), response)
+            document = self._shared_document(storage_service, upload_id, '.committed')
+            if document is not None:
+                try:
+                    document.upload_blob(json.dumps(response), overwrite=True)
+                except Exception as e:
+                    logger.warning(f"⚠️ UPLOAD SESSION: Could not share commit of {upload_id}: {e}")
+            self._count("commits")
+        lease = self._leases.pop(upload_id, None)
+        if lease is not None:
+            try:
+                lease.release()
+            except Exception:
+                pass  # Expires on its own
+        try:
+            os.unlink(os.path.join(session_dir, 'commit.lock'))
+        except OSError:
+            pass
+
+    def committed_response(self, upload_id: str, storage_service=None) -> Optional[Dict]:
+        """Response of an already committed session (committed on any instance)"""
+        response = self._read_json(os.path.join(self._session_dir(upload_id), 'committed.json'))
+        if response is None:
+            response = self._read_shared(storage_service, upload_id, '.committed')
+        return response
+
+    def release_data(self, session: Dict) -> None:
+        """Free the scratch data (and files derived from it) once the committed video is no longer needed locally"""
+        session_dir = self._session_dir(session['upload_id'])
+        shutil.rmtree(os.path.join(session_dir, 'chunks'), ignore_errors=True)
+        try:
+            names = os.listdir(session_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith('data'):
+                try:
+                    os.unlink(os.path.join(session_dir, name))
+                except OSError:
+                    pass
+
+    def delete(self, upload_id: str, storage_service=None) -> None:
+        """Abort a session and free its scratch data (staged blocks expire on their own)"""
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+        document = self._shared_document(storage_service, upload_id)
+        if document is not None:
+            try:
+                document.delete_blob()
+            except Exception:
+                pass
+        self._count("aborted")
+        logger.info(f"🗑️ UPLOAD SESSION: Deleted {upload_id}")
+
+    def prune_expired(self) -> int:
+        """Remove expired sessions (at most once a minute)"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < 60.0:
+                return 0
+            self._last_prune = now
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return 0
+        removed = 0
+        for name in names:
+            session = self._read_json(os.path.join(self._session_dir(name), 'session.json'))
+            if session is not None and session['expires_at'] >= now:
+                continue
+            try:
+                if session is None and now - os.path.getmtime(self._session_dir(name)) < 60.0:
+                    continue  # Being created right now
+            except OSError:
+                continue
+            shutil.rmtree(self._session_dir(name), ignore_errors=True)
+            removed += 1
+        if removed:
+            self._count("expired", removed)
+            logger.info(f"🧹 UPLOAD SESSION: Removed {removed} expired sessions")
+        return removed
+
+    def get_metrics(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "root": self.root, "ttl_seconds": self.ttl_seconds}
+
+
+_upload_session_store: Optional[UploadSessionStore] = None
+_upload_session_store_lock = threading.Lock()
+
+
+def get_upload_session_store() -> UploadSessionStore:
+    """Get the process-wide upload session store"""
+    global _upload_session_store
+    with _upload_session_store_lock:
+        if _upload_session_store is None:
+            _upload_session_store = UploadSessionStore()
+        return _upload_session_store
@@ -0,0 +1,256 @@
+"""
+Node-local Video Cache
+Keeps recently uploaded videos on this instance so processing does not download them again from blob storage
+"""
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+from loguru import logger
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import tempfile
+import threading
+
+VIDEO_CACHE_DIR = os.getenv("VIDEO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "video_cache"))
+VIDEO_CACHE_MAX_BYTES = int(float(os.getenv("VIDEO_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+# Uploads are normally processed within minutes; older entries only hold disk space
+VIDEO_CACHE_MAX_AGE_SECONDS = float(os.getenv("VIDEO_CACHE_MAX_AGE_HOURS", "6")) * 3600
+
+
+def is_video_cache_enabled() -> bool:
+    """Check whether uploaded videos are kept for processing on this instance (VIDEO_CACHE_ENABLED, default on)"""
+    return os.getenv("VIDEO_CACHE_ENABLED", "true").lower() == "true"
+
+
+class VideoCache:
+    """
+    Size-bounded LRU cache of video blobs on local disk, shared by all workers of an instance.
+
+    Entries are keyed by blob name: <blob name> holds the video and <blob name>.json the
+    blob's ETag and size at the time it was cached. A lookup compares that ETag with the
+    blob's current one (a single HEAD request), so an overwritten blob is never served
+    from a stale copy. Processing that lands on another instance simply misses and
+    downloads the blob as before.
+
+    Files are added and served as hard links when the cache shares a filesystem with
+    the temp files (a copy otherwise), so neither side pays for a second copy and
+    evicting an entry never disturbs a file already handed to processing. A hit refreshes
+    the entry's mtime, which is the LRU order used for eviction.
+    """
+
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None):
+        """
+        Initialize cache
+
+        Args:
+            root: Directory holding cached videos
+            max_bytes: Total size of cached videos (least recently used are evicted beyond it)
+            max_age_seconds: Entries unused for longer are evicted (0 disables)
+        """
+        self.root = root or VIDEO_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else VIDEO_CACHE_MAX_BYTES
+        self.max_age_seconds = max_age_seconds if max_age_seconds is not None else VIDEO_CACHE_MAX_AGE_SECONDS
+        self._lock = threading.Lock()
+        self.stats = {
+            "puts": 0,
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "evictions": 0,
+            "bytes_served": 0,
+        }
+
+    def _count(self, stat: str, value: int = 1) -> None:
+        with self._lock:
+            self.stats[stat] += value
+
+    def _entry_path(self, blob_name: str) -> str:
+        return os.path.join(self.root, os.path.basename(blob_name))
+
+    @staticmethod
+    def _blob_client(storage_service, blob_name: str):
+        container_client = getattr(storage_service, 'container_client', None) if storage_service else None
+        return container_client.get_blob_client(blob_name) if container_client else None
+
+    @staticmethod
+    def _link_or_copy(source: str, target: str) -> None:
+        """Place source at target atomically (hard link when possible)"""
+        tmp_path = f"{target}.{uuid.uuid4().hex[:8]}.tmp"
+        try:
+            os.link(source, tmp_path)
+        except OSError:
+            shutil.copyfile(source, tmp_path)  # Different filesystem
+        os.replace(tmp_path, target)
+
+    def _remove(self, path: str) -> None:
+        for entry_file in (path, f"{path}.json"):
+            try:
+                os.unlink(entry_file)
+            except OSError:
+                pass
+
+    async def put(self, blob_name: str, source_path: str, storage_service) -> bool:
+        """
+        Cache a local copy of a blob that was just uploaded
+
+        Args:
+            blob_name: Blob the file was uploaded as
+            source_path: Local file with the same content (may be deleted right after)
+            storage_service: Storage service holding the blob (to record its ETag)
+
+        Returns:
+            True if the file was cached
+        """
+        blob_client = self._blob_client(storage_service, blob_name)
+        if blob_client is None or not os.path.exists(source_path):
+            return False
+        size = os.path.getsize(source_path)
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return False
+
+        def _put() -> None:
+            properties = blob_client.get_blob_properties()
+            if properties.size != size:
+                raise IOError(f"blob has {properties.size} bytes, local file {size}")
+            os.makedirs(self.root, exist_ok=True)
+            path = self._entry_path(blob_name)
+            self._link_or_copy(source_path, path)
+            os.utime(path)
+            meta_tmp = f"{path}.json.{uuid.uuid4().hex[:8]}.tmp"
+            with open(meta_tmp, 'w') as f:
+                json.dump({"blob_name": blob_name, "etag": properties.etag, "size": size,
+                           "cached_at": datetime.utcnow().isoformat()}, f)
+            os.replace(meta_tmp, f"{path}.json")
+            self.evict()
+
+        try:
+            await asyncio.to_thread(_put)
+        except Exception as e:
+            logger.warning(f"⚠️ VIDEO CACHE: Could not cache {blob_name} (non-critical): {e}")
+            return False
+        self._count("puts")
+        logger.info(f"💾 VIDEO CACHE: Cached {blob_name} ({size / (1024 * 1024):.1f} MB)")
+        return True
+
+    async def fetch(self, blob_name: str, dest_path: str, storage_service) -> Optional[int]:
+        """
+        Place the cached copy of a blob at dest_path if it is still current
+
+        Args:
+            blob_name: Blob to look up
+            dest_path: Where processing expects the video (overwritten)
+            storage_service: Storage service holding the blob (to check its ETag)
+
+        Returns:
+            Size in bytes on a hit, None on a miss (caller downloads the blob)
+        """
+        path = self._entry_path(blob_name)
+        blob_client = self._blob_client(storage_service, blob_name)
+
+        def _fetch() -> Optional[int]:
+            try:
+                with open(f"{path}.json") as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                return None
+            if meta.get("blob_name") != blob_name:
+                return None
+            # The blob may have been overwritten since it was cached (e.g. by another instance)
+            if blob_client is None or blob_client.get_blob_properties().etag != meta.get("etag"):
+                self._remove(path)
+                self._count("stale")
+                logger.info(f"♻️ VIDEO CACHE: Dropped stale copy of {blob_name}")
+                return None
+            try:
+                self._link_or_copy(path, dest_path)
+                os.utime(path)  # Most recently used
+            except FileNotFoundError:
+                return None  # Evicted concurrently
+            return os.path.getsize(dest_path)
+
+        try:
+            size = await asyncio.to_thread(_fetch)
+        except Exception as e:
+            logger.warning(f"⚠️ VIDEO CACHE: Lookup of {blob_name} failed (non-critical): {e}")
+            size = None
+        if size is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        self._count("bytes_served", size)
+        logger.info(f"⚡ VIDEO CACHE: Hit for {blob_name} ({size / (1024 * 1024):.1f} MB) - skipped the download")
+        return size
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(last used, size, path) of every cached video, least recently used first"""
+        entries = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        for name in names:
+            if name.endswith((".json", ".tmp")):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self) -> int:
+        """
+        Remove expired entries, then least recently used ones until the cache fits max_bytes
+
+        Returns:
+            Number of entries removed
+        """
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        now = time.time()
+        removed = 0
+        for last_used, size, path in entries:
+            expired = self.max_age_seconds > 0 and now - last_used > self.max_age_seconds
+            if not expired and total_bytes <= self.max_bytes:
+                continue
+            self._remove(path)
+            total_bytes -= size
+            removed += 1
+            logger.info(f"🧹 VIDEO CACHE: Evicted {os.path.basename(path)} ({size / (1024 * 1024):.1f} MB, "
+                        f"{'expired' if expired else 'over quota'})")
+        if removed:
+            self._count("evictions", removed)
+        return removed
+
+    def get_metrics(self) -> Dict:
+        entries = self._entries()
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": round(stats["hits"] / lookups, 3) if lookups else 0.0,
+            "entries": len(entries),
+            "current_bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "root": self.root,
+        }
+
+
+_video_cache: Optional[VideoCache] = None
+_video_cache_lock = threading.Lock()
+
+
+def get_video_cache() -> VideoCache:
+    """Get the process-wide video cache"""
+    global _video_cache
+    with _video_cache_lock:
+        if _video_cache is None:
+            _video_cache = VideoCache()
+        return _video_cache
@@ -0,0 +1,249 @@
+"""
+Analysis Proxy Transcoding
+Creates a normalised, cheap-to-decode copy of an uploaded video for repeat processing
+"""
+import os
+import json
+import shutil
+import subprocess
+import time
+from typing import Dict, Optional, Tuple
+from loguru import logger
+
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+    cv2 = None
+
+PROXY_SUFFIX = ".proxy.mp4"
+PROXY_META_SUFFIX = ".json"
+
+
+def is_proxy_enabled() -> bool:
+    """Analysis proxies are opt-in (ANALYSIS_PROXY_ENABLED=true)"""
+    return os.getenv("ANALYSIS_PROXY_ENABLED", "false").lower() == "true"
+
+
+def _proxy_settings() -> Dict:
+    """Read proxy encoding settings from environment"""
+    target_fps = float(os.getenv("ANALYSIS_PROXY_FPS", "15"))
+    return {
+        "target_fps": min(max(target_fps, 6.0), 15.0),  # Pipeline samples at 6-15 fps
+        "max_height": int(os.getenv("ANALYSIS_PROXY_MAX_HEIGHT", "720")),
+        # Short GOP without B-frames keeps random access cheap (one keyframe per second by default)
+        "gop_frames": int(os.getenv("ANALYSIS_PROXY_GOP", "0")) or int(round(target_fps)),
+        "timeout_seconds": float(os.getenv("ANALYSIS_PROXY_TIMEOUT_SECONDS", "90")),
+    }
+
+
+def proxy_path_for(video_path: str) -> str:
+    """Path of the analysis proxy stored next to the original video"""
+    return f"{os.path.splitext(video_path)[0]}{PROXY_SUFFIX}"
+
+
+def proxy_meta_path(proxy_path: str) -> str:
+    """Path of the sidecar describing a proxy's source video"""
+    return f"{proxy_path}{PROXY_META_SUFFIX}"
+
+
+def proxy_blob_name(blob_name: str) -> str:
+    """Blob name of the analysis proxy stored next to the original blob"""
+    return f"{os.path.splitext(blob_name)[0]}{PROXY_SUFFIX}"
+
+
+def load_proxy_meta(proxy_path: str) -> Optional[Dict]:
+    """
+    Load proxy sidecar metadata
+
+    Returns:
+        Dict with source_* and proxy properties, or None if path is not a valid proxy
+    """
+    meta_path = proxy_meta_path(proxy_path)
+    if not (os.path.exists(proxy_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta.get("width") and meta.get("source_width"):
+            return meta
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"⚠️ PROXY: Invalid proxy metadata {meta_path}: {e}")
+    return None
+
+
+def _probe(video_path: str) -> Optional[Dict]:
+    """Read basic video properties with OpenCV"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        return {
+            "fps": cap.get(cv2.CAP_PROP_FPS) or 0.0,
+            "frame_count": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+    finally:
+        cap.release()
+
+
+def _transcode_ffmpeg(video_path: str, proxy_path: str, settings: Dict) -> bool:
+    """Transcode with ffmpeg: constant frame rate, capped height, short closed GOP, no audio"""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return False
+    gop = settings["gop_frames"]
+    cmd = [
+        ffmpeg, "-y", "-v", "error",
+        "-i", video_path,
+        "-an",
+        "-vf", f"fps={settings['target_fps']},scale=-2:'min({settings['max_height']},ih)'",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
+        "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0", "-bf", "0",
+        "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+        proxy_path
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, timeout=settings["timeout_seconds"])
+    except subprocess.TimeoutExpired:
+        logger.warning(f"⚠️ PROXY: ffmpeg timed out after {settings['timeout_seconds']:.0f}s")
+        return False
+    if result.returncode != 0:
+        logger.warning(f"⚠️ PROXY: ffmpeg failed: {result.stderr.decode(errors='ignore')[-500:]}")
+        return False
+    return True
+
+
+def _transcode_opencv(video_path: str, proxy_path: str, source: Dict, settings: Dict) -> bool:
+    """Fallback transcode with OpenCV (GOP is encoder-controlled, so seeks are less cheap)"""
+    step = max(1, int(round(source["fps"] / settings["target_fps"]))) if source["fps"] > 0 else 1
+    out_fps = source["fps"] / step if source["fps"] > 0 else settings["target_fps"]
+    scale = min(1.0, settings["max_height"] / source["height"]) if source["height"] else 1.0
+    out_w = int(source["width"] * scale) // 2 * 2
+    out_h = int(source["height"] * scale) // 2 * 2
+
+    cap = cv2.VideoCapture(video_path)
+    writer = cv2.VideoWriter(proxy_path, cv2.VideoWriter_fourcc(*'mp4v'), out_fps, (out_w, out_h))
+    deadline = time.time() + settings["timeout_seconds"]
+    try:
+        if not cap.isOpened() or not writer.isOpened():
+            return False
+        frame_index = 0
+        while True:
+            # grab() skips decoding work for frames we drop
+            if not cap.grab():
+                break
+            if frame_index % step == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                if scale < 1.0:
+                    frame = cv2.resize(frame, (out_w, out_h), interpolation=cv2.INTER_AREA)
+                writer.write(frame)
+            frame_index += 1
+            if time.time() > deadline:
+                logger.warning(f"⚠️ PROXY: OpenCV transcode timed out after {settings['timeout_seconds']:.0f}s")
+                return False
+        return True
+    finally:
+        cap.release()
+        writer.release()
+
+
+def create_analysis_proxy(video_path: str) -> Optional[str]:
+    """
+    Create an analysis proxy next to the original video.
+
+    The proxy is resampled to ANALYSIS_PROXY_FPS (6-15 fps), capped at
+    ANALYSIS_PROXY_MAX_HEIGHT and encoded with a short GOP. A JSON sidecar records
+    the source properties so consumers can report source fps/resolution and map
+    keypoints back to source pixel coordinates.
+
+    Args:
+        video_path: Path to the original uploaded video
+
+    Returns:
+        Path to the proxy, or None if it could not be created (callers use the original)
+    """
+    if not CV2_AVAILABLE:
+        logger.warning("⚠️ PROXY: OpenCV not available - skipping analysis proxy")
+        return None
+
+    settings = _proxy_settings()
+    start = time.time()
+    source = _probe(video_path)
+    if not source or not source["width"] or not source["height"]:
+        logger.warning(f"⚠️ PROXY: Could not read source video properties: {video_path}")
+        return None
+
+    proxy_path = proxy_path_for(video_path)
+    encoder = "ffmpeg"
+    ok = _transcode_ffmpeg(video_path, proxy_path, settings)
+    if not ok:
+        encoder = "opencv"
+        ok = _transcode_opencv(video_path, proxy_path, source, settings)
+
+    proxy = _probe(proxy_path) if ok and os.path.exists(proxy_path) else None
+    if not proxy or proxy["frame_count"] == 0:
+        logger.warning(f"⚠️ PROXY: Proxy transcode failed ({encoder}) - original video will be used")
+        for path in (proxy_path, proxy_meta_path(proxy_path)):
+            if os.path.exists(path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+        return None
+
+    meta = {
+        **proxy,
+        "source_fps": source["fps"],
+        "source_frame_count": source["frame_count"],
+        "source_width": source["width"],
+        "source_height": source["height"],
+        "gop_frames": settings["gop_frames"] if encoder == "ffmpeg" else None,
+        "encoder": encoder,
+        "created_at": time.time(),
+    }
+    # The sidecar marks the proxy as complete, so it appears last and in one step
+    meta_tmp = f"{proxy_meta_path(proxy_path)}.tmp"
+    with open(meta_tmp, 'w') as f:
+        json.dump(meta, f)
+    os.replace(meta_tmp, proxy_meta_path(proxy_path))
+
+    source_size = os.path.getsize(video_path)
+    proxy_size = os.path.getsize(proxy_path)
+    logger.info(
+        f"🎞️ PROXY: Created analysis proxy in {time.time() - start:.1f}s ({encoder}): "
+        f"{source['width']}x{source['height']}@{source['fps']:.1f}fps -> {proxy['width']}x{proxy['height']}@{proxy['fps']:.1f}fps, "
+        f"{source_size / (1024*1024):.1f}MB -> {proxy_size / (1024*1024):.1f}MB"
+    )
+    return proxy_path
+
+
+def resolve_analysis_source(video_path: str, processing_fps: Optional[float] = None) -> Tuple[str, float, Optional[Dict]]:
+    """
+    Pick the file to decode for analysis.
+
+    Uses the proxy when video_path is itself a proxy or has one next to it, unless the
+    requested processing rate exceeds the proxy frame rate.
+
+    Args:
+        video_path: Original video (or proxy) path
+        processing_fps: Requested processing frame rate, if any
+
+    Returns:
+        (path_to_decode, coord_scale, proxy_meta) where coord_scale maps proxy pixel
+        coordinates back to source pixel coordinates (1.0 when decoding the original)
+    """
+    for candidate in (video_path, proxy_path_for(video_path)):
+        meta = load_proxy_meta(candidate)
+        if not meta:
+            continue
+        if processing_fps and meta.get("fps") and processing_fps > meta["fps"] + 0.01 and candidate != video_path:
+            logger.info(f"🎞️ PROXY: Requested {processing_fps} fps exceeds proxy {meta['fps']:.1f} fps - using original")
+            break
+        coord_scale = meta["source_width"] / meta["width"]
+        return candidate, coord_scale, meta
+    return video_path, 1.0, None
@@ -3,10 +3,52 @@ Video Quality Validator for Gait Analysis
 Validates that videos are suitable for AI vision models and provides user guidance
 """
 from typing import Dict, List, Optional, Tuple
+import math
 import numpy as np
 from loguru import logger
 import os
 
+from app.services.video_proxy import load_proxy_meta
+from app.services.frame_index import get_frame_index, FrameSeeker
+from app.services.pose_sample_cache import save_sample_detections
+
+# Decision thresholds used by scoring - sampling stops once the estimates are clearly on one side
+DETECTION_RATE_THRESHOLDS = (0.3, 0.6, 0.8)
+CRITICAL_JOINTS_THRESHOLD = 0.5
+MIN_SEQUENTIAL_SAMPLES = 8
+SAMPLE_MAX_SIDE = 640  # Landmarker input size - larger frames are downscaled before detection
+
+
+def _wilson_interval(successes: int, n: int, z: float = 1.96) -> Tuple[float, float]:
+    """Wilson score interval for a binomial proportion"""
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _interval_is_clear(successes: int, n: int, thresholds) -> bool:
+    """True when no decision threshold falls inside the proportion's confidence interval"""
+    low, high = _wilson_interval(successes, n)
+    return not any(low <= t <= high for t in thresholds)
+
+
+def _progressive_order(items: List[int]) -> List[int]:
+    """Van der Corput ordering: every prefix is spread evenly across the video"""
+    n = len(items)
+    if n <= 2:
+        return list(items)
+    bits = max(1, (n - 1).bit_length())
+    order = []
+    for i in range(1 << bits):
+        j = int(format(i, f"0{bits}b")[::-1], 2)
+        if j < n:
+            order.append(items[j])
+    return order
+
 try:
     import cv2
     CV2_AVAILABLE = True
@@ -58,8 +100,15 @@ class VideoQualityValidator:
     Based on geriatric care gold standards for functional mobility assessment
     """
     
-    def __init__(self, pose_landmarker=None):
+    def __init__(self, pose_landmarker=None, gait_service=None):
+        """
+        Args:
+            pose_landmarker: MediaPipe landmarker (legacy detection path)
+            gait_service: Shared GaitAnalysisService - when its primary detector is available,
+                validation uses it and persists detections for reuse by the main pose stage
+        """
         self.pose_landmarker = pose_landmarker
+        self.gait_service = gait_service
         self.quality_issues = []
         self.recommendations = []
     
@@ -67,11 +116,16 @@ class VideoQualityValidator:
         self,
         video_path: str,
         view_type: str = "front",
-        sample_frames: int = 20
+        sample_frames: int = 20,
+        processing_fps: Optional[float] = None
     ) -> Dict:
         """
         Comprehensive video quality validation for gait analysis
         
+        Args:
+            processing_fps: Frame rate the analysis will process at (None: auto), so that
+                sample detections are made on the analysis' own frame grid
+        
         Returns:
             Dict with:
                 - is_valid: bool
@@ -121,6 +175,15 @@ class VideoQualityValidator:
             width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
             height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
             duration = total_frames / fps if fps > 0 else 0
+            decode_fps = fps
+            
+            # Analysis proxies are resampled/downscaled copies - judge the recording by its source properties
+            proxy_meta = load_proxy_meta(video_path)
+            if proxy_meta:
+                fps = proxy_meta.get("source_fps") or fps
+                width = proxy_meta.get("source_width") or width
+                height = proxy_meta.get("source_height") or height
+                logger.info(f"🔍 Validating analysis proxy ({proxy_meta['width']}x{proxy_meta['height']} @ {proxy_meta['fps']:.1f} fps)")
             
             validation_result["video_properties"] = {
                 "total_frames": total_frames,
@@ -193,8 +256,18 @@ class VideoQualityValidator:
                 )
             
             # Step 3: Sample frames and test pose detection
-            if MEDIAPIPE_AVAILABLE and self.pose_landmarker:
-                pose_detection_results = self._test_pose_detection(cap, total_frames, sample_frames, view_type)
+            shared_detector_available = bool(self.gait_service and getattr(self.gait_service, 'yolo_model', None))
+            if shared_detector_available or (MEDIAPIPE_AVAILABLE and self.pose_landmarker):
+                try:
+                    frame_index = get_frame_index(video_path)
+                except Exception as e:
+                    logger.debug(f"Frame index unavailable for validation: {e}")
+                    frame_index = None
+                pose_detection_results = self._test_pose_detection(
+                    cap, total_frames, sample_frames, view_type,
+                    frame_index=frame_index, video_path=video_path, decode_fps=decode_fps,
+                    processing_fps=processing_fps
+                )
                 validation_result["pose_detection_rate"] = pose_detection_results["detection_rate"]
                 validation_result["critical_joints_detected"] = pose_detection_results["critical_joints_detected"]
                 validation_result["sample_analysis"] = pose_detection_results["sample_analysis"]
@@ -338,130 +411,207 @@ class VideoQualityValidator:
         cap: cv2.VideoCapture,
         total_frames: int,
         sample_frames: int,
-        view_type: str
+        view_type: str,
+        frame_index=None,
+        video_path: Optional[str] = None,
+        decode_fps: float = 0.0,
+        processing_fps: Optional[float] = None
     ) -> Dict:
-        """Test pose detection on sample frames"""
-        logger.info(f"🔍 Testing pose detection on {sample_frames} sample frames...")
+        """
+        Test pose detection with sequential early-stopping sampling
+        
+        Frames are drawn from the main pipeline's processing grid in an order that spreads
+        every prefix across the video. Sampling stops once the detection rate and critical
+        joint rate are clearly on one side of every scoring threshold (95% Wilson interval),
+        or after sample_frames samples. Detections from the shared detector are made on the
+        full decoded frame and persisted with the grid and input size, so the main pose
+        stage can reuse them when it processes the same frames the same way.
+        """
+        if frame_index and frame_index.frame_count > 0:
+            total_frames = frame_index.frame_count
+            if frame_index.is_vfr:
+                decode_fps = frame_index.average_fps
+        seeker = FrameSeeker(cap, frame_index)
+        
+        use_shared_detector = bool(self.gait_service and getattr(self.gait_service, 'yolo_model', None))
+        detector_name = getattr(self.gait_service, 'yolo_model_name', None) if use_shared_detector else None
+        
+        # Sample only frames the main pose stage will process, so detections can be reused
+        frame_skip = 1
+        if self.gait_service and decode_fps > 0:
+            frame_skip = self.gait_service.compute_frame_skip(total_frames, decode_fps, processing_fps)
+        grid = list(range(0, max(total_frames, 1), frame_skip))
+        if len(grid) > sample_frames:
+            grid = [grid[i] for i in np.linspace(0, len(grid) - 1, sample_frames, dtype=int)]
+        candidates = _progressive_order(grid)
+        logger.info(f"🔍 Testing pose detection on up to {len(candidates)} sample frames (sequential early stopping)...")
         
         detections = 0
         critical_joints_detected_count = 0
         ankle_visibilities = []
         knee_visibilities = []
+        persisted = {}
+        input_size = None
+        frames_tested = 0
+        stopped_early = False
         
-        # Sample frames evenly throughout video
-        frame_indices = np.linspace(0, total_frames - 1, sample_frames, dtype=int)
-        
-        for sample_idx, frame_num in enumerate(frame_indices):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_num)
-            ret, frame = cap.read()
-            
+        for frame_num in candidates:
+            ret, frame = seeker.read(frame_num)
             if not ret or frame is None:
                 continue
+            frames_tested += 1
             
-            # Convert to RGB for MediaPipe
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Detect pose
             try:
-                # Create MediaPipe Image object (same pattern as gait_analysis.py)
-                mp_image = None
-                vision_image_created = False
-                
-                if VisionImage:
-                    # Method 1: Try with ImageFormat enum
-                    if ImageFormat:
-                        try:
-                            if hasattr(ImageFormat, 'SRGB'):
-                                image_format_enum = ImageFormat.SRGB
-                            elif hasattr(ImageFormat, 'sRGB'):
-                                image_format_enum = ImageFormat.sRGB
-                            else:
-                                image_format_enum = 1  # SRGB is typically 1
-                            
-                            mp_image = VisionImage(
-                                image_format=image_format_enum,
-                                data=rgb_frame
-                            )
-                            vision_image_created = True
-                        except Exception:
-                            pass
-                    
-                    # Method 2: Try with integer format value
-                    if not vision_image_created:
-                        try:
-                            mp_image = VisionImage(
-                                image_format=1,  # SRGB
-                                data=rgb_frame
-                            )
-                            vision_image_created = True
-                        except Exception:
-                            pass
-                
-                # Method 3: Use numpy array directly (fallback)
-                if not vision_image_created:
-                    mp_image = rgb_frame
-                
-                detection_result = self.pose_landmarker.detect(mp_image)
-                
-                if detection_result and detection_result.pose_landmarks:
-                    detections += 1
-                    
-                    # Check for critical joints
-                    pose_landmarks = detection_result.pose_landmarks[0]
-                    
-                    # MediaPipe landmark indices for critical joints
-                    # Left: 27 (ankle), 25 (knee), 23 (hip)
-                    # Right: 28 (ankle), 26 (knee), 24 (hip)
-                    left_ankle_idx = 27
-                    right_ankle_idx = 28
-                    left_knee_idx = 25
-                    right_knee_idx = 26
-                    
-                    has_critical_joints = (
-                        len(pose_landmarks) > max(left_ankle_idx, right_ankle_idx, left_knee_idx, right_knee_idx)
-                    )
-                    
-                    if has_critical_joints:
-                        # Check visibility of critical joints
-                        left_ankle = pose_landmarks[left_ankle_idx] if len(pose_landmarks) > left_ankle_idx else None
-                        right_ankle = pose_landmarks[right_ankle_idx] if len(pose_landmarks) > right_ankle_idx else None
-                        left_knee = pose_landmarks[left_knee_idx] if len(pose_landmarks) > left_knee_idx else None
-                        right_knee = pose_landmarks[right_knee_idx] if len(pose_landmarks) > right_knee_idx else None
-                        
-                        if left_ankle and right_ankle:
-                            ankle_visibilities.append((left_ankle.visibility + right_ankle.visibility) / 2)
-                        if left_knee and right_knee:
-                            knee_visibilities.append((left_knee.visibility + right_knee.visibility) / 2)
-                        
-                        # Consider critical joints detected if visibility is reasonable
-                        if (left_ankle and left_ankle.visibility > 0.3 and
-                            right_ankle and right_ankle.visibility > 0.3):
-                            critical_joints_detected_count += 1
-                
+                if use_shared_detector:
+                    sample = self._detect_with_shared_detector(frame)
+                    input_size = (frame.shape[1], frame.shape[0])
+                    if sample.get("keypoints"):
+                        persisted[frame_num] = sample["keypoints"]
+                else:
+                    sample = self._detect_with_landmarker(frame)
             except Exception as e:
                 logger.debug(f"Error detecting pose in sample frame {frame_num}: {e}")
-                continue
+                sample = {"detected": False}
+            
+            if sample.get("detected"):
+                detections += 1
+                if sample.get("ankle_visibility") is not None:
+                    ankle_visibilities.append(sample["ankle_visibility"])
+                if sample.get("knee_visibility") is not None:
+                    knee_visibilities.append(sample["knee_visibility"])
+                if sample.get("critical_joints"):
+                    critical_joints_detected_count += 1
+            
+            if frames_tested >= MIN_SEQUENTIAL_SAMPLES:
+                detection_clear = _interval_is_clear(detections, frames_tested, DETECTION_RATE_THRESHOLDS)
+                critical_clear = detections == 0 or _interval_is_clear(
+                    critical_joints_detected_count, detections, (CRITICAL_JOINTS_THRESHOLD,)
+                )
+                if detection_clear and critical_clear:
+                    stopped_early = frames_tested < len(candidates)
+                    break
         
-        detection_rate = detections / len(frame_indices) if frame_indices else 0
+        if persisted and video_path:
+            save_sample_detections(video_path, detector_name, persisted, frame_skip, input_size)
+        
+        detection_rate = detections / frames_tested if frames_tested else 0
         critical_joints_rate = critical_joints_detected_count / detections if detections > 0 else 0
         
-        logger.info(f"🔍 Pose detection test results: {detections}/{len(frame_indices)} frames detected "
+        logger.info(f"🔍 Pose detection test results: {detections}/{frames_tested} frames detected "
                    f"({detection_rate*100:.1f}%), "
                    f"critical joints in {critical_joints_detected_count}/{detections} detections "
-                   f"({critical_joints_rate*100:.1f}%)")
+                   f"({critical_joints_rate*100:.1f}%)"
+                   f"{' - stopped early' if stopped_early else ''}, "
+                   f"{seeker.frames_decoded} frames decoded, {seeker.seeks} seeks")
         
         return {
             "detection_rate": detection_rate,
-            "critical_joints_detected": critical_joints_rate >= 0.5,
+            "critical_joints_detected": critical_joints_rate >= CRITICAL_JOINTS_THRESHOLD,
             "sample_analysis": {
-                "frames_tested": len(frame_indices),
+                "frames_tested": frames_tested,
                 "poses_detected": detections,
                 "ankle_visibility_avg": np.mean(ankle_visibilities) if ankle_visibilities else 0,
                 "knee_visibility_avg": np.mean(knee_visibilities) if knee_visibilities else 0,
-                "critical_joints_rate": critical_joints_rate
+                "critical_joints_rate": critical_joints_rate,
+                "stopped_early": stopped_early,
+                "detections_persisted": len(persisted)
             }
         }
     
+    def _detect_with_shared_detector(self, frame) -> Dict:
+        """Detect pose with the main pipeline's primary detector, exactly as the pose stage does"""
+        keypoints = self.gait_service.detect_frame_keypoints(frame)
+        if not keypoints:
+            return {"detected": False}
+        left_ankle, right_ankle = keypoints.get('left_ankle'), keypoints.get('right_ankle')
+        left_knee, right_knee = keypoints.get('left_knee'), keypoints.get('right_knee')
+        return {
+            "detected": True,
+            "keypoints": keypoints,
+            "ankle_visibility": (left_ankle['visibility'] + right_ankle['visibility']) / 2 if left_ankle and right_ankle else None,
+            "knee_visibility": (left_knee['visibility'] + right_knee['visibility']) / 2 if left_knee and right_knee else None,
+            "critical_joints": bool(
+                left_ankle and left_ankle['visibility'] > 0.3 and
+                right_ankle and right_ankle['visibility'] > 0.3
+            )
+        }
+    
+    def _detect_with_landmarker(self, frame) -> Dict:
+        """Detect pose with the MediaPipe landmarker (legacy path, detections are not persisted)"""
+        height, width = frame.shape[:2]
+        scale = min(1.0, SAMPLE_MAX_SIDE / max(width, height))
+        if scale < 1.0:
+            frame = cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        
+        # Convert to RGB for MediaPipe
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        
+        # Create MediaPipe Image object (same pattern as gait_analysis.py)
+        mp_image = None
+        vision_image_created = False
+        
+        if VisionImage:
+            # Method 1: Try with ImageFormat enum
+            if ImageFormat:
+                try:
+                    if hasattr(ImageFormat, 'SRGB'):
+                        image_format_enum = ImageFormat.SRGB
+                    elif hasattr(ImageFormat, 'sRGB'):
+                        image_format_enum = ImageFormat.sRGB
+                    else:
+                        image_format_enum = 1  # SRGB is typically 1
+                    
+                    mp_image = VisionImage(
+                        image_format=image_format_enum,
+                        data=rgb_frame
+                    )
+                    vision_image_created = True
+                except Exception:
+                    pass
+            
+            # Method 2: Try with integer format value
+            if not vision_image_created:
+                try:
+                    mp_image = VisionImage(
+                        image_format=1,  # SRGB
+                        data=rgb_frame
+                    )
+                    vision_image_created = True
+                except Exception:
+                    pass
+        
+        # Method 3: Use numpy array directly (fallback)
+        if not vision_image_created:
+            mp_image = rgb_frame
+        
+        detection_result = self.pose_landmarker.detect(mp_image)
+        if not (detection_result and detection_result.pose_landmarks):
+            return {"detected": False}
+        
+        sample = {"detected": True, "ankle_visibility": None, "knee_visibility": None, "critical_joints": False}
+        pose_landmarks = detection_result.pose_landmarks[0]
+        
+        # MediaPipe landmark indices for critical joints
+        # Left: 27 (ankle), 25 (knee), 23 (hip)
+        # Right: 28 (ankle), 26 (knee), 24 (hip)
+        left_ankle_idx = 27
+        right_ankle_idx = 28
+        left_knee_idx = 25
+        right_knee_idx = 26
+        
+        if len(pose_landmarks) > max(left_ankle_idx, right_ankle_idx, left_knee_idx, right_knee_idx):
+            left_ankle = pose_landmarks[left_ankle_idx]
+            right_ankle = pose_landmarks[right_ankle_idx]
+            left_knee = pose_landmarks[left_knee_idx]
+            right_knee = pose_landmarks[right_knee_idx]
+            
+            sample["ankle_visibility"] = (left_ankle.visibility + right_ankle.visibility) / 2
+            sample["knee_visibility"] = (left_knee.visibility + right_knee.visibility) / 2
+            # Consider critical joints detected if visibility is reasonable
+            sample["critical_joints"] = left_ankle.visibility > 0.3 and right_ankle.visibility > 0.3
+        
+        return sample
+    
     def _calculate_quality_score(self, validation_result: Dict) -> float:
         """Calculate overall quality score (0-100)"""
         score = 100.0
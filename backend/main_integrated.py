@@ -42,6 +42,8 @@ except ImportError:
     SPARoutingMiddleware = None
     logger.warning("Request logging middleware not available")
 
+from app.core.json_response import FastJSONResponse
+
 # Import app modules with error handling
 # CRITICAL: Don't raise on import errors - allow app to start even if modules fail
 # This prevents 502 errors during deployment
@@ -197,12 +199,55 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Failed to start cancellation task: {e} - continuing startup")
     
+    # Start artifact janitor (bounds temp videos and checkpoints on local disk; analysis records only with JANITOR_PRUNE_RECORDS=true)
+    artifact_janitor = None
+    if os.getenv("JANITOR_ENABLED", "true").lower() == "true":
+        try:
+            from app.services.artifact_janitor import get_artifact_janitor
+            from app.core.database_azure_sql import AzureSQLService
+            artifact_janitor = get_artifact_janitor()
+            janitor_db = AzureSQLService()
+            # Finished analyses (with their results) are only pruned on explicit opt-in
+            prune_records = os.getenv("JANITOR_PRUNE_RECORDS", "false").lower() == "true"
+            if prune_records and (janitor_db._use_mock or janitor_db._use_sqlite):
+                artifact_janitor.register_mock_storage(
+                    AzureSQLService._sqlite_db_file if janitor_db._use_sqlite else AzureSQLService._mock_storage_file,
+                    janitor_db.prune_mock_storage
+                )
+            artifact_janitor.start()
+            logger.info("Started artifact janitor")
+        except Exception as e:
+            logger.warning(f"Failed to start artifact janitor: {e} - continuing startup")
+    
     logger.info("Service ready and accepting requests")
     
     yield
     
     # Shutdown
     logger.info("Shutting down Gait Analysis Service...")
+    if artifact_janitor:
+        artifact_janitor.stop()
+    # Write buffered progress and any checkpoints still queued before the process exits
+    try:
+        from app.core.progress_coalescer import get_progress_coalescer
+        progress_coalescer = get_progress_coalescer()
+        if progress_coalescer:
+            await asyncio.to_thread(progress_coalescer.flush_all)
+    except Exception as e:
+        logger.warning(f"Failed to flush buffered progress updates: {e}")
+    try:
+        from app.services.checkpoint_writer import flush_pending_checkpoints
+        await asyncio.to_thread(flush_pending_checkpoints, None, 10.0)
+    except Exception as e:
+        logger.warning(f"Failed to flush checkpoint writer: {e}")
+    try:
+        from app.core.db_io import close_async_table_clients, shutdown_db_executor
+        from app.core.sql_pool import close_sql_pools
+        await close_async_table_clients()
+        await asyncio.to_thread(shutdown_db_executor)
+        close_sql_pools()
+    except Exception as e:
+        logger.warning(f"Failed to close database clients: {e}")
 
 
 # CRITICAL: Create app with error handling to prevent silent failures
@@ -212,6 +257,7 @@ try:
         description="Integrated clinical-grade gait analysis (API + Frontend)",
         version="3.0.0",
         lifespan=lifespan,
+        default_response_class=FastJSONResponse,  # orjson with NumPy support
         # CRITICAL: Increase request timeout for large file uploads
         # This allows large video files to be uploaded without timing out
         # Note: Azure App Service also has request timeout settings that may need adjustment
@@ -785,7 +831,7 @@ async def health_check():
         components = {
             "azure_storage": "configured" if storage_service else "mock",
             "azure_vision": "configured" if vision_service else "mock",
-            "azure_sql": "configured" if db_service and not db_service._use_mock else "mock"
+            "azure_sql": "configured" if db_service and not db_service._use_mock and not db_service._use_sqlite else ("sqlite" if db_service and db_service._use_sqlite else "mock")
         }
         
         return {
@@ -0,0 +1,120 @@
+"""
+Endpoint tests for conditional GETs (ETag / If-None-Match) of analyses
+"""
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import analysis_azure
+
+
+class _Db:
+    """Status record plus metrics; on_metrics_read simulates a write landing between the two reads"""
+
+    def __init__(self, analysis_id):
+        self.record = {
+            'id': analysis_id, 'patient_id': 'p1', 'filename': 'walk.mp4', 'video_url': 'blob://walk.mp4',
+            'status': 'processing', 'current_step': 'pose_estimation', 'step_progress': 40,
+            'step_message': 'Frame 40', 'steps_completed': {}, 'created_at': '2024-01-08T12:00:00',
+            'updated_at': '2024-01-08T12:00:40',
+        }
+        self.metrics = {'cadence': 110.5}
+        self.reads = []
+        self.on_metrics_read = None
+
+    async def get_analysis(self, analysis_id, include_metrics=True):
+        self.reads.append(include_metrics)
+        if include_metrics and self.on_metrics_read:
+            self.on_metrics_read(self.record)
+        return {**self.record, 'metrics': dict(self.metrics) if include_metrics else {}}
+
+    async def list_analyses_page(self, limit=50, cursor=None, include_metrics=True, summary=False, fields=None):
+        self.reads.append(include_metrics)
+        return {'analyses': [await self.get_analysis(self.record['id'], include_metrics)], 'next_cursor': None}
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = _Db(str(uuid.uuid4()))
+    monkeypatch.setattr(analysis_azure, "db_service", db)
+    return db
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(analysis_azure.router, prefix="/api/v1/analysis")
+    return TestClient(app)
+
+
+def test_unchanged_analysis_is_not_modified(db, client):
+    """A matching If-None-Match returns 304 after reading only the status record"""
+    url = f"/api/v1/analysis/{db.record['id']}"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.json()['metrics'] == {'cadence': 110.5}
+    etag = first.headers['etag']
+
+    db.reads.clear()
+    second = client.get(url, headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.headers['etag'] == etag
+    assert db.reads == [False]
+
+    db.record['step_progress'] = 45
+    third = client.get(url, headers={'If-None-Match': etag})
+    assert third.status_code == 200
+    assert third.headers['etag'] != etag
+
+
+def test_etag_differs_with_include_metrics(db, client):
+    """The status-only representation never validates a cached full one (or vice versa)"""
+    url = f"/api/v1/analysis/{db.record['id']}"
+    status_only = client.get(url, params={'include_metrics': 'false'})
+    assert status_only.json()['metrics'] == {}
+    full = client.get(url, headers={'If-None-Match': status_only.headers['etag']})
+    assert full.status_code == 200
+    assert full.json()['metrics'] == {'cadence': 110.5}
+    assert full.headers['etag'] != status_only.headers['etag']
+
+
+def test_etag_follows_record_changed_between_reads(db, client):
+    """The analysis finishes between the status read and the metrics read: the ETag describes the body sent"""
+    url = f"/api/v1/analysis/{db.record['id']}"
+    db.on_metrics_read = lambda record: record.update(
+        status='completed', step_progress=100, updated_at='2024-01-08T12:01:00'
+    )
+    response = client.get(url)
+    assert response.json()['status'] == 'completed'
+    etag = response.headers['etag']
+    assert 'max-age' in response.headers['cache-control']
+
+    db.on_metrics_read = None
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_unchanged_list_page_is_not_modified(db, client):
+    """The list is validated without metrics; metrics are only loaded once the page changed"""
+    first = client.get("/api/v1/analysis/list")
+    assert first.status_code == 200
+    etag = first.headers['etag']
+
+    db.reads.clear()
+    second = client.get("/api/v1/analysis/list", headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert False in db.reads and True not in db.reads
+
+    db.record['status'] = 'completed'
+    db.reads.clear()
+    third = client.get("/api/v1/analysis/list", headers={'If-None-Match': etag})
+    assert third.status_code == 200
+    assert third.headers['etag'] != etag
+    assert third.json()['analyses'][0]['metrics'] == {'cadence': 110.5}
+    assert True in db.reads
@@ -0,0 +1,72 @@
+"""
+Unit tests for blob downloads of the storage service
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from azure.core.exceptions import ResourceNotFoundError
+from app.services.azure_storage import AzureStorageService
+
+
+class _Downloader:
+    def __init__(self, data, fail_after=None):
+        self.data = data
+        self.fail_after = fail_after
+
+    def readinto(self, stream):
+        if self.fail_after is not None:
+            stream.write(self.data[:self.fail_after])
+            raise IOError("connection reset")
+        stream.write(self.data)
+        return len(self.data)
+
+
+class _Container:
+    def __init__(self, blobs):
+        self.blobs = blobs
+        self.concurrency = None
+
+    def get_blob_client(self, blob_name):
+        return self if blob_name in self.blobs else _MissingBlob()
+
+    def download_blob(self, max_concurrency=1):
+        self.concurrency = max_concurrency
+        return self.blobs['video.mp4']
+
+
+class _MissingBlob:
+    def download_blob(self, **kwargs):
+        raise ResourceNotFoundError("BlobNotFound")
+
+
+def _service(blobs):
+    service = AzureStorageService()  # No connection string: mock mode
+    service.container_client = _Container(blobs)
+    return service
+
+
+def test_download_to_file_streams_and_reports(tmp_path, monkeypatch):
+    """The blob is written to disk with parallel ranged reads and counted in the metrics"""
+    monkeypatch.delenv("AZURE_STORAGE_CONNECTION_STRING", raising=False)
+    data = b'frame' * 1000
+    service = _service({'video.mp4': _Downloader(data)})
+    target = tmp_path / "video.mp4"
+    assert asyncio.run(service.download_blob_to_file('video.mp4', str(target))) == len(data)
+    assert target.read_bytes() == data
+    assert service.container_client.concurrency > 1
+    assert service.get_metrics()["bytes"] == len(data)
+
+
+def test_failed_download_leaves_no_partial_file(tmp_path, monkeypatch):
+    """Missing blobs and broken transfers return None and remove the partial file"""
+    monkeypatch.delenv("AZURE_STORAGE_CONNECTION_STRING", raising=False)
+    service = _service({'video.mp4': _Downloader(b'x' * 100, fail_after=10)})
+    target = tmp_path / "video.mp4"
+    assert asyncio.run(service.download_blob_to_file('video.mp4', str(target))) is None
+    assert not target.exists()
+    assert asyncio.run(service.download_blob_to_file('missing.mp4', str(target))) is None
+    assert not target.exists()
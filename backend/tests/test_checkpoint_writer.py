@@ -0,0 +1,90 @@
+"""
+Unit tests for the background checkpoint writer
+"""
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import checkpoint_writer
+from app.services.checkpoint_manager import CheckpointManager
+from app.services.checkpoint_writer import CheckpointWriter
+
+
+def _step_1(frames):
+    return dict(frames_2d_keypoints=frames, frame_timestamps=[0.1 * i for i in range(len(frames))],
+                total_frames=len(frames), video_fps=30.0, processing_stats={})
+
+
+@pytest.fixture
+def writer(tmp_path, monkeypatch):
+    """Writer whose thread only starts when start() is called, so jobs stay queued until then"""
+    monkeypatch.setenv("CHECKPOINT_DIR", str(tmp_path))
+    writer = CheckpointWriter()
+    start = writer._ensure_started
+    monkeypatch.setattr(writer, "_ensure_started", lambda: None)
+    writer.start = start
+    yield writer
+    writer.stop()
+
+
+def test_snapshot_is_isolated_from_later_mutation(writer):
+    """The pipeline keeps correcting keypoints in place after queueing: the checkpoint holds the queued state"""
+    frames = [{'left_ankle': {'x': 1.0, 'y': 2.0}}, {'left_ankle': {'x': 3.0, 'y': 4.0}}]
+    assert writer.submit("a1", "step_1_pose_estimation", **_step_1(frames))
+    frames[0]['left_ankle']['x'] = 99.0
+    frames.append({'left_ankle': {'x': 5.0, 'y': 6.0}})
+
+    writer.start()
+    assert writer.flush("a1", timeout=5)
+    saved = CheckpointManager("a1").load_step_1()
+    assert saved['frames_2d_keypoints'] == [{'left_ankle': {'x': 1.0, 'y': 2.0}}, {'left_ankle': {'x': 3.0, 'y': 4.0}}]
+
+
+def test_newer_snapshot_replaces_queued_one(writer):
+    """Snapshots of the same step coalesce while queued; only the newest is written"""
+    assert writer.submit("a1", "step_1_pose_estimation", **_step_1([{'x': 1.0}]))
+    assert writer.submit("a1", "step_1_pose_estimation", **_step_1([{'x': 2.0}, {'x': 3.0}]))
+    writer.start()
+    assert writer.flush(timeout=5)
+    metrics = writer.get_metrics()
+    assert (metrics["submitted"], metrics["coalesced"], metrics["written"], metrics["pending"]) == (2, 1, 1, 0)
+    assert CheckpointManager("a1").load_step_1()['frames_2d_keypoints'] == [{'x': 2.0}, {'x': 3.0}]
+
+
+def test_flush_waits_for_write_in_flight(writer, monkeypatch):
+    """The flush barrier covers a job the writer thread already took off the queue"""
+    release = threading.Event()
+    build = checkpoint_writer.STEP_BUILDERS['step_1_pose_estimation']
+
+    def _slow_build(**inputs):
+        release.wait(5)
+        return build(**inputs)
+
+    monkeypatch.setitem(checkpoint_writer.STEP_BUILDERS, 'step_1_pose_estimation', _slow_build)
+    writer.start()
+    assert writer.submit("a1", "step_1_pose_estimation", **_step_1([{'x': 1.0}]))
+    assert not writer.flush("a1", timeout=0.2)
+    assert writer.get_metrics()["pending"] == 0  # Being written, not queued
+    assert writer.flush("a2", timeout=0.2)  # Other analyses do not wait for it
+    release.set()
+    assert writer.flush("a1", timeout=5)
+    assert CheckpointManager("a1").get_completed_steps()['step_1_pose_estimation'] is True
+
+
+def test_discard_drops_queued_snapshots_of_one_analysis(writer):
+    """An aborted pass leaves nothing queued for its analysis; other analyses are untouched"""
+    assert writer.submit("a1", "step_1_pose_estimation", **_step_1([{'x': 1.0}]))
+    assert writer.submit("a2", "step_1_pose_estimation", **_step_1([{'x': 2.0}]))
+    assert writer.discard("a1") == 1
+    assert writer.flush("a1", timeout=0.1)
+    assert not writer.flush("a2", timeout=0.1)
+
+    writer.start()
+    assert writer.flush(timeout=5)
+    assert CheckpointManager("a1").get_completed_steps()['step_1_pose_estimation'] is False
+    assert CheckpointManager("a2").get_completed_steps()['step_1_pose_estimation'] is True
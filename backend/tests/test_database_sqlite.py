@@ -0,0 +1,113 @@
+"""
+Unit tests for the local SQLite analysis store
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.database_sqlite import SQLiteAnalysisStore, filesystem_type
+
+
+def test_create_update_get_list(tmp_path):
+    """Updates merge steps_completed and extra fields; list is newest first"""
+    store = SQLiteAnalysisStore(str(tmp_path / "analyses.db"))
+    assert store.create_analysis({'id': 'a1', 'filename': 'walk.mp4', 'video_quality_score': 80})
+    assert store.create_analysis({'id': 'a2', 'filename': 'run.mp4'})
+
+    assert store.update_analysis('a1', {'step_progress': 40, 'steps_completed': {'step_1_pose_estimation': True}})
+    assert store.update_analysis('a1', {'steps_completed': {'step_2_3d_lifting': True}, 'error': 'none'})
+    assert not store.update_analysis('missing', {'status': 'failed'})
+
+    analysis = store.get_analysis('a1')
+    assert analysis['step_progress'] == 40
+    assert analysis['steps_completed'] == {'step_1_pose_estimation': True, 'step_2_3d_lifting': True}
+    assert analysis['video_quality_score'] == 80
+    assert analysis['error'] == 'none'
+    assert [a['id'] for a in store.list_analyses(limit=10)] == ['a2', 'a1']
+    assert sorted(a['id'] for a in store.get_analyses(['a1', 'a2', 'missing'])) == ['a1', 'a2']
+
+
+def test_import_json_and_prune(tmp_path):
+    """Legacy JSON records are imported once; prune keeps in-flight and non-terminal records"""
+    legacy = tmp_path / "mock.json"
+    old = '2000-01-01T00:00:00'
+    legacy.write_text(json.dumps({
+        'done': {'id': 'done', 'status': 'completed', 'created_at': old, 'updated_at': old},
+        'live': {'id': 'live', 'status': 'completed', 'created_at': old, 'updated_at': old},
+        'running': {'id': 'running', 'status': 'processing', 'created_at': old, 'updated_at': old},
+    }))
+    store = SQLiteAnalysisStore(str(tmp_path / "analyses.db"))
+    assert store.import_json(str(legacy)) == 3
+    assert store.import_json(str(legacy)) == 0
+
+    assert store.prune(max_bytes=0, max_age_seconds=3600, protected_ids={'live'}) == 1
+    assert store.get_analysis('done') is None
+    assert store.get_analysis('live') is not None
+    assert store.get_analysis('running') is not None
+
+
+def test_list_analyses_page_keyset(tmp_path):
+    """Pages are newest first, disjoint, and can skip the metrics column"""
+    store = SQLiteAnalysisStore(str(tmp_path / "analyses.db"))
+    for i in range(5):
+        store.create_analysis({'id': f'a{i}', 'filename': f'{i}.mp4', 'metrics': {'cadence': 100 + i}})
+
+    first, after = store.list_analyses_page(limit=2)
+    second, after2 = store.list_analyses_page(limit=2, after=after)
+    last, end = store.list_analyses_page(limit=2, after=after2)
+    ids = [a['id'] for a in first + second + last]
+    assert ids == [a['id'] for a in store.list_analyses(limit=10)]
+    assert len(set(ids)) == 5 and end is None
+    assert 'cadence' in first[0]['metrics']
+
+    slim, _ = store.list_analyses_page(limit=5, include_metrics=False)
+    assert all(a['metrics'] == {} for a in slim)
+    assert [a['id'] for a in slim] == ids
+
+
+def test_result_document_split(tmp_path):
+    """Metrics are stored apart from the status row and only read when requested"""
+    store = SQLiteAnalysisStore(str(tmp_path / "analyses.db"))
+    store.create_analysis({'id': 'a1', 'filename': 'walk.mp4'})
+    assert store.update_analysis('a1', {'status': 'completed', 'metrics': {'cadence': 112}})
+
+    conn = store._connection()
+    assert conn.execute("SELECT metrics FROM analyses WHERE id = 'a1'").fetchone()[0] == '{}'
+    assert store.get_analysis('a1')['metrics'] == {'cadence': 112}
+    status = store.get_analysis('a1', include_metrics=False)
+    assert status['status'] == 'completed' and status['metrics'] == {}
+
+    # Rows written before the split keep their inline metrics
+    conn.execute("UPDATE analyses SET metrics = '{\"cadence\": 90}' WHERE id = 'a1'")
+    conn.execute("DELETE FROM analysis_results")
+    assert store.get_analysis('a1')['metrics'] == {'cadence': 90}
+
+
+def test_network_filesystem_is_refused(tmp_path, monkeypatch):
+    """WAL needs node-local disk: a database on an SMB/NFS mount is rejected"""
+    mounts = tmp_path / "mounts"
+    mounts.write_text(
+        "overlay / overlay rw 0 0\n"
+        "//account.file.core.windows.net/share /home cifs rw 0 0\n"
+    )
+    assert filesystem_type("/home/site/gait_analysis.db", str(mounts)) == "cifs"
+    assert filesystem_type("/tmp/gait_analysis.db", str(mounts)) == "overlay"
+    monkeypatch.setattr("app.core.database_sqlite.filesystem_type", lambda path: "cifs")
+    with pytest.raises(RuntimeError):
+        SQLiteAnalysisStore(str(tmp_path / "analyses.db"))
+
+
+def test_sqlite_is_the_default_local_backend_on_local_disk(tmp_path, monkeypatch):
+    """Without LOCAL_DB_BACKEND the JSON file is only used when the database would sit on a network share"""
+    from app.core import database_azure_sql
+    monkeypatch.delenv("LOCAL_DB_BACKEND", raising=False)
+    monkeypatch.setattr(database_azure_sql, "is_network_path", lambda path: path.startswith("/home/"))
+    assert database_azure_sql.local_db_backend(str(tmp_path / "gait_analysis.db")) == "sqlite"
+    assert database_azure_sql.local_db_backend("/home/site/gait_analysis.db") == "json"
+    monkeypatch.setenv("LOCAL_DB_BACKEND", "JSON")
+    assert database_azure_sql.local_db_backend(str(tmp_path / "gait_analysis.db")) == "json"
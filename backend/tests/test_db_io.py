@@ -0,0 +1,73 @@
+"""
+Event-loop lag tests for the DB I/O runtime
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.db_io import run_blocking, run_on_db_io_loop, on_db_io_thread
+
+DB_CALL_SECONDS = 0.2
+CONCURRENT_REQUESTS = 4
+
+
+def slow_db_call() -> bool:
+    """Stands in for a blocking driver round trip (pyodbc / sync TableClient)"""
+    time.sleep(DB_CALL_SECONDS)
+    return True
+
+
+async def measure(handler) -> dict:
+    """Run concurrent requests while a ticker records the worst event-loop lag"""
+    max_lag = 0.0
+    done = asyncio.Event()
+
+    async def ticker():
+        nonlocal max_lag
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(handler() for _ in range(CONCURRENT_REQUESTS)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+    return {"results": results, "elapsed": elapsed, "max_lag": max_lag}
+
+
+def test_blocking_call_in_async_handler_serializes_requests():
+    """Baseline: a sync DB call inside async def stalls the loop and serializes requests"""
+    async def handler():
+        return slow_db_call()
+
+    stats = asyncio.run(measure(handler))
+    assert stats["elapsed"] >= CONCURRENT_REQUESTS * DB_CALL_SECONDS * 0.9
+    assert stats["max_lag"] >= DB_CALL_SECONDS * 0.9
+
+
+def test_run_blocking_keeps_event_loop_responsive():
+    """DB calls on the bounded executor overlap and the loop keeps ticking"""
+    async def handler():
+        return await run_blocking(slow_db_call)
+
+    stats = asyncio.run(measure(handler))
+    assert stats["results"] == [True] * CONCURRENT_REQUESTS
+    assert stats["elapsed"] < 2 * DB_CALL_SECONDS
+    assert stats["max_lag"] < DB_CALL_SECONDS / 2
+
+
+def test_run_on_db_io_loop_from_sync_thread():
+    """Sync callers run coroutines on the persistent DB I/O thread"""
+    async def write():
+        return on_db_io_thread()
+
+    assert run_on_db_io_loop(write()) is True
+    assert not on_db_io_thread()
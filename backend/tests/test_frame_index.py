@@ -0,0 +1,113 @@
+"""
+Unit tests for the frame index and keyframe-aware seeking
+"""
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import cv2
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import frame_index as frame_index_module
+from app.services.frame_index import FrameIndex, FrameSeeker
+
+# Variable frame rate: one second at 30 fps, then one second at 60 fps (nominal 45 fps)
+VFR_PTS = [i / 30 for i in range(30)] + [1 + i / 60 for i in range(60)]
+NOMINAL_FPS = 45.0
+
+
+class _Capture:
+    """
+    Decoder over a fixed timeline, seeking like OpenCV's FFmpeg backend: a frame number
+    is turned into a time through the nominal frame rate, and the decoder lands on the
+    frame presented at that time (late_by frames later, to model imprecise seeks)
+    """
+
+    def __init__(self, pts, late_by=0):
+        self.pts = pts
+        self.late_by = late_by
+        self.next = 0
+        self.current = None
+
+    def set(self, prop, value):
+        seconds = value / NOMINAL_FPS if prop == cv2.CAP_PROP_POS_FRAMES else value / 1000.0
+        landing = min(range(len(self.pts)), key=lambda i: abs(self.pts[i] - seconds))
+        self.next = min(landing + self.late_by, len(self.pts))
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.pts[self.current] * 1000.0
+        return self.next
+
+    def grab(self):
+        if self.next >= len(self.pts):
+            return False
+        self.current, self.next = self.next, self.next + 1
+        return True
+
+    def retrieve(self):
+        return True, f"frame {self.current}"
+
+    def read(self):
+        return self.retrieve() if self.grab() else (False, None)
+
+
+def test_seeks_land_on_the_requested_frame_of_a_vfr_video():
+    """Frame numbers are not times in a VFR video: every read returns exactly the frame asked for"""
+    index = FrameIndex(VFR_PTS, list(range(0, 90, 15)), NOMINAL_FPS)
+    assert index.is_vfr
+    seeker = FrameSeeker(_Capture(VFR_PTS), index)
+    for target in (50, 10, 70, 20, 85, 86, 31):
+        assert seeker.read(target) == (True, f"frame {target}")
+    assert seeker.seeks <= 6  # 85 -> 86 decodes forward
+
+
+def test_late_landing_seek_retries_from_the_previous_keyframe():
+    index = FrameIndex(VFR_PTS, list(range(0, 90, 15)), NOMINAL_FPS)
+    seeker = FrameSeeker(_Capture(VFR_PTS, late_by=1), index)
+    assert seeker.read(45) == (True, "frame 45")  # Keyframe 45 lands on 46, keyframe 30 on 31
+    assert seeker.read(3) == (True, "frame 3")
+    assert seeker.read(0) == (False, None)  # Even the first frame cannot be reached
+
+
+def test_index_without_keyframes_seeks_by_timestamp():
+    """OpenCV-built indexes have timestamps but no keyframes"""
+    seeker = FrameSeeker(_Capture(VFR_PTS), FrameIndex(VFR_PTS, [], NOMINAL_FPS, source="opencv"))
+    assert seeker.read(60) == (True, "frame 60")
+    assert seeker.read(61) == (True, "frame 61")
+    assert seeker.read(12) == (True, "frame 12")
+
+
+def test_frame_at_maps_timestamps_to_nearest_frame():
+    index = FrameIndex([0.5 + ts for ts in VFR_PTS], [0], NOMINAL_FPS)
+    assert index.frame_at(0.0) == 0
+    assert index.frame_at(1 + 1 / 60 + 0.001) == 31
+    assert index.frame_at(99.0) == 89
+
+
+def test_ffprobe_keyframes_follow_decode_order(tmp_path, monkeypatch):
+    """B-frames: packets are decoded out of presentation order, and a keyframe may be presented after
+    frames that are decoded behind it (open GOP)"""
+    fps = 30
+    # (pts frame, dts frame, keyframe) in the order ffprobe might print them
+    packets = [(3, 1, False), (0, 0, True), (2, 3, False), (1, 2, False), (5, 4, True), (4, 5, False)]
+    output = {
+        "packets": [
+            {"pts_time": f"{pts / fps:.6f}", "dts_time": f"{dts / fps:.6f}", "flags": "K__" if key else "___"}
+            for pts, dts, key in packets
+        ] + [{"pts_time": "N/A", "dts_time": f"{6 / fps:.6f}", "flags": "___"}],
+        "streams": [{"avg_frame_rate": "30/1"}],
+    }
+    monkeypatch.setattr(frame_index_module.shutil, "which", lambda name: f"/usr/bin/{name}")
+    monkeypatch.setattr(frame_index_module.subprocess, "run", lambda *args, **kwargs: SimpleNamespace(
+        returncode=0, stdout=json.dumps(output).encode(), stderr=b""
+    ))
+    index = frame_index_module._build_with_ffprobe(str(tmp_path / "video.mp4"))
+    assert [round(ts * fps) for ts in index.pts] == [0, 1, 2, 3, 4, 5, 6]
+    assert index.keyframes == [0, 5]
+    assert index.nearest_keyframe(4) == 0  # Presented before the second keyframe
+    assert index.nominal_fps == 30.0 and not index.is_vfr
@@ -0,0 +1,120 @@
+"""
+Pose stage tests for the gait analysis pipeline (proxy decoding, frame timestamps, reused detections, streaming)
+"""
+import json
+import shutil
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import checkpoint_writer, gait_analysis
+from app.services.frame_index import FRAME_INDEX_VERSION, frame_index_path
+from app.services.gait_analysis import GaitAnalysisService
+from app.services.pose_sample_cache import save_sample_detections
+from app.services.video_proxy import proxy_meta_path, proxy_path_for
+
+DETECTOR = "YOLO26-medium (RLE precision)"
+WIDTH, HEIGHT = 160, 120
+# Variable frame rate timeline that the decoder (nominal 30 fps) does not report: 1.5s at 30 fps, 1s at 60 fps
+VFR_PTS = [i / 30 for i in range(45)] + [1.5 + i / 60 for i in range(60)]
+FRAMES = len(VFR_PTS)
+# 15 fps processing samples every other frame at both the nominal and the measured (~42 fps) rate
+PROCESSING_FPS = 15.0
+PROCESSED = list(range(0, FRAMES, 2))
+KEYPOINTS = {'left_ankle': {'x': 10.0, 'y': 20.0, 'z': 0.0, 'visibility': 0.9}}
+
+
+class _StopAfterPoseStage(BaseException):
+    """Raised from the Step 1 checkpoint: later steps need a real gait to produce metrics"""
+
+
+class _Checkpoints:
+    def __init__(self):
+        self.step_1 = None
+
+    def submit(self, analysis_id, step, **inputs):
+        self.step_1 = inputs
+        raise _StopAfterPoseStage()
+
+
+def _write_video(path):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'mp4v'), 30.0, (WIDTH, HEIGHT))
+    for i in range(FRAMES):
+        # Frame number in the pixels, in steps coarse enough to survive compression
+        writer.write(np.full((HEIGHT, WIDTH, 3), ((i % 16) * 16 + 8, (i // 16) * 16 + 8, 0), dtype=np.uint8))
+    writer.release()
+
+
+@pytest.fixture
+def video(tmp_path):
+    """Original plus its analysis proxy (half resolution per the sidecar) with a VFR frame index"""
+    original = tmp_path / "gait_a1.mov"
+    proxy = Path(proxy_path_for(str(original)))
+    _write_video(proxy)
+    shutil.copyfile(proxy, original)
+    Path(proxy_meta_path(str(proxy))).write_text(json.dumps({
+        "fps": 30.0, "frame_count": FRAMES, "width": WIDTH, "height": HEIGHT,
+        "source_fps": 30.0, "source_frame_count": FRAMES, "source_width": 2 * WIDTH, "source_height": 2 * HEIGHT,
+    }))
+    Path(frame_index_path(str(proxy))).write_text(json.dumps({
+        "version": FRAME_INDEX_VERSION, "pts": VFR_PTS, "keyframes": [0], "nominal_fps": 30.0,
+    }))
+    return original, proxy
+
+
+@pytest.fixture
+def service(monkeypatch):
+    checkpoints = _Checkpoints()
+    monkeypatch.setattr(checkpoint_writer, "get_checkpoint_writer", lambda: checkpoints)
+    monkeypatch.setattr(gait_analysis, "YOLO_AVAILABLE", True)
+    svc = GaitAnalysisService()
+    svc.pose_landmarker = None
+    svc.yolo_model = object()
+    svc.yolo_model_name = DETECTOR
+    svc.detected_frames = []
+
+    def _detect(frame, width, height):
+        svc.detected_frames.append(int(frame[0, 0, 1]) // 16 * 16 + int(frame[0, 0, 0]) // 16)
+        return dict(KEYPOINTS)
+
+    monkeypatch.setattr(svc, "_detect_with_yolo", _detect)
+    monkeypatch.setattr(svc, "_validate_keypoint_quality", lambda keypoints: True)
+    svc.checkpoints = checkpoints
+    return svc
+
+
+def _pose_stage(service, video_path, **kwargs):
+    with pytest.raises(_StopAfterPoseStage):
+        service._process_video_sync(str(video_path), 30.0, None, "side", None, PROCESSING_FPS, **kwargs)
+    return service.checkpoints.step_1
+
+
+def test_proxy_frames_are_timed_by_the_frame_index_and_mapped_to_source_pixels(service, video):
+    original, _ = video
+    step_1 = _pose_stage(service, original)
+    assert service.detected_frames == PROCESSED
+    assert step_1['frame_timestamps'] == pytest.approx([VFR_PTS[i] for i in PROCESSED])
+    assert step_1['video_fps'] == pytest.approx((FRAMES - 1) / VFR_PTS[-1])
+    assert step_1['frames_2d_keypoints'][0]['left_ankle']['x'] == pytest.approx(20.0, abs=1.0)
+
+
+def test_upload_time_detections_are_reused(service, video):
+    original, proxy = video
+    assert save_sample_detections(str(proxy), DETECTOR, {0: KEYPOINTS, 10: KEYPOINTS}, 2, (WIDTH, HEIGHT))
+    step_1 = _pose_stage(service, original)
+    assert len(step_1['frames_2d_keypoints']) == len(PROCESSED)
+    assert service.detected_frames == [i for i in PROCESSED if i not in (0, 10)]
+
+
+def test_streamed_frames_get_the_same_timestamps(service, video):
+    """Decoding from a stream of the download ends with the frame index timeline, like a file decode"""
+    original, proxy = video
+    step_1 = _pose_stage(service, original, stream_path=str(proxy))
+    assert service.detected_frames == PROCESSED
+    assert step_1['frame_timestamps'] == pytest.approx([VFR_PTS[i] for i in PROCESSED])
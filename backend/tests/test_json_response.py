@@ -0,0 +1,38 @@
+"""
+Unit tests for JSON response serialization and the payload cache
+"""
+import gzip
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.json_response import EncodedPayloadCache, dumps, negotiate_encoding
+
+
+def test_dumps_numpy_and_datetimes():
+    """NumPy scalars/arrays and datetimes serialize without a custom encoder at the call site"""
+    payload = {'cadence': np.float32(110.5), 'steps': np.arange(3), 'at': datetime(2024, 1, 8, 12, 0)}
+    assert json.loads(dumps(payload)) == {'cadence': 110.5, 'steps': [0, 1, 2], 'at': '2024-01-08T12:00:00'}
+
+
+def test_negotiation_and_payload_cache():
+    """gzip is negotiated from Accept-Encoding; cached bodies are compressed once and evicted by size"""
+    assert negotiate_encoding('gzip, deflate') == 'gzip'
+    assert negotiate_encoding('gzip;q=0, identity') is None
+    assert negotiate_encoding(None) is None
+
+    body = dumps({'values': list(range(500))})
+    cache = EncodedPayloadCache(max_bytes=2 * len(body))
+    cache.put('"a"', body)
+    compressed = cache.get('"a"', 'gzip')
+    assert gzip.decompress(compressed) == body
+    assert cache.get('"a"', 'gzip') is compressed
+    cache.put('"b"', body)
+    assert cache.get('"a"', None) is None  # Least recently used entry evicted
+    assert cache.get_metrics()['evicted'] == 1
@@ -0,0 +1,38 @@
+"""
+Unit tests for reusing upload-time sample detections
+"""
+import os
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.pose_sample_cache import save_sample_detections, load_sample_detections
+
+DETECTOR = "YOLO26-medium (RLE precision)"
+KEYPOINTS = {'left_ankle': {'x': 100.0, 'y': 200.0, 'z': 0.0, 'visibility': 0.9}}
+
+
+def _video(tmp_path):
+    video = tmp_path / "gait_upload.mp4"
+    video.write_bytes(os.urandom(4096))
+    return str(video)
+
+
+def test_detections_reused_only_with_matching_settings(tmp_path):
+    """Same file, frame grid and detector input reuse the detections; anything else re-detects"""
+    video = _video(tmp_path)
+    assert save_sample_detections(video, DETECTOR, {0: KEYPOINTS, 10: KEYPOINTS}, 5, (1920, 1080))
+    assert load_sample_detections(video, DETECTOR, 5, (1920, 1080)) == {0: KEYPOINTS, 10: KEYPOINTS}
+    assert load_sample_detections(video, DETECTOR, 2, (1920, 1080)) == {}  # Other processing_fps
+    assert load_sample_detections(video, DETECTOR, 5, (640, 360)) == {}  # Downscaled detector input
+    assert load_sample_detections(video, "MediaPipe", 5, (1920, 1080)) == {}
+
+
+def test_detections_of_a_replaced_file_are_ignored(tmp_path):
+    """Detections follow the file they were made on, not just its path"""
+    video = _video(tmp_path)
+    save_sample_detections(video, DETECTOR, {0: KEYPOINTS}, 5, (1920, 1080))
+    Path(video).write_bytes(os.urandom(8192))
+    assert load_sample_detections(video, DETECTOR, 5, (1920, 1080)) == {}
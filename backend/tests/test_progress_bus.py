@@ -0,0 +1,43 @@
+"""
+Unit tests for the analysis progress bus
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.progress_bus import ProgressBus
+
+
+def test_publish_subscribe_and_resume():
+    """Subscribers receive changes only; Last-Event-ID replays missed events or asks for a snapshot"""
+    bus = ProgressBus(replay_events=3)
+
+    async def scenario():
+        queue, replay, complete = bus.subscribe('a1')
+        assert replay == [] and not complete  # New subscriber starts from a snapshot
+
+        first = bus.publish('a1', {'status': 'processing', 'step_progress': 10, 'steps_completed': {'step_1': True}})
+        assert bus.publish('a1', {'step_progress': 10, 'metrics': {'cadence': 1}}) is None  # Nothing changed
+        bus.publish('a1', {'step_progress': 20, 'steps_completed': {'step_2': True}})
+        await asyncio.sleep(0)
+        seq, snapshot = await queue.get()
+        assert seq == first
+        seq, snapshot = await queue.get()
+        assert snapshot['step_progress'] == 20 and snapshot['steps_completed'] == {'step_1': True, 'step_2': True}
+        assert 'metrics' not in snapshot
+        bus.unsubscribe('a1', queue)
+
+        # Resume from the first event: the second one is replayed
+        _, replay, complete = bus.subscribe('a1', bus.event_id(first))
+        assert complete and [event[0] for event in replay] == [seq]
+
+        # Events that fell out of the buffer, or ids of another process, need a fresh snapshot
+        for progress in (30, 40, 50):
+            bus.publish('a1', {'step_progress': progress})
+        assert not bus.subscribe('a1', bus.event_id(first))[2]
+        assert not bus.subscribe('a1', f"other-{seq}")[2]
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+"""
+Unit tests for the progress update coalescer
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.progress_coalescer import ProgressCoalescer
+
+
+class _Writer:
+    """Records writes; the first one is slow, like a table write still in flight"""
+
+    def __init__(self, first_delay=0.0, result=True):
+        self.first_delay = first_delay
+        self.result = result
+        self.writes = []
+        self.active = 0
+        self.overlapped = False
+
+    async def __call__(self, analysis_id, updates):
+        self.active += 1
+        self.overlapped = self.overlapped or self.active > 1
+        if not self.writes and self.first_delay:
+            await asyncio.sleep(self.first_delay)
+        self.writes.append(dict(updates))
+        self.active -= 1
+        return self.result
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def test_step_change_never_overtakes_flush_in_flight():
+    """A zero-delay flush waits for the slow delayed flush, so the newest step is written last"""
+    coalescer = ProgressCoalescer(flush_interval=0.05)
+    writer = _Writer(first_delay=0.2)
+    assert coalescer.submit('a1', {'current_step': 'pose_estimation', 'step_progress': 5}, writer)
+    time.sleep(0.02)  # First write is in flight
+    assert coalescer.submit('a1', {'step_progress': 9}, writer)
+    assert coalescer.submit('a1', {'current_step': '3d_lifting', 'step_progress': 60}, writer)
+    _wait_for(lambda: len(writer.writes) == 2)
+    assert not writer.overlapped
+    assert writer.writes[0]['current_step'] == 'pose_estimation'
+    assert writer.writes[-1] == {'current_step': '3d_lifting', 'step_progress': 60}
+    assert coalescer.pending('a1') == {}
+
+
+def test_failed_flush_is_reported_separately():
+    """Buffered submits report acceptance; a failed flush is counted instead of returned"""
+    coalescer = ProgressCoalescer(flush_interval=0.05)
+    writer = _Writer(result=False)
+    assert coalescer.submit('a2', {'current_step': 'pose_estimation', 'step_progress': 1}, writer) is True
+    _wait_for(lambda: coalescer.flush_failures('a2') == 1)
+    assert coalescer.submit('a2', {'step_progress': 2}, writer) is True
+    assert coalescer.get_metrics()['failed'] >= 1
+
+
+def test_write_through_includes_pending_progress():
+    """A terminal write carries the buffered progress along and clears the analysis state"""
+    coalescer = ProgressCoalescer(flush_interval=60)
+    writer = _Writer()
+    coalescer.submit('a3', {'current_step': 'pose_estimation'}, writer)
+    _wait_for(lambda: len(writer.writes) == 1)
+    coalescer.submit('a3', {'step_progress': 40, 'step_message': 'Frame 40'}, writer)  # Buffered for 60s
+    assert coalescer.write('a3', {'status': 'completed'}, writer)
+    assert writer.writes[-1] == {'step_progress': 40, 'step_message': 'Frame 40', 'status': 'completed'}
+    assert coalescer.pending('a3') == {}
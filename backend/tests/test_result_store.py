@@ -0,0 +1,31 @@
+"""
+Unit tests for result document encoding
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.result_store import encode_result, decode_result, summarize_metrics
+
+
+def test_encode_decode_roundtrip():
+    """Documents are compressed and decode to the original metrics (including the legacy JSON format)"""
+    metrics = {'cadence': 112.5, 'step_lengths': [0.71] * 2000, 'notes': 'ü'}
+    codec, data = encode_result(metrics)
+    assert codec in ('zstd', 'zlib')
+    assert len(data) < 1000
+    assert decode_result(codec, data) == metrics
+    assert decode_result('json', b'{"cadence": 90}') == {'cadence': 90}
+
+
+def test_summarize_metrics():
+    """Summaries keep only the headline metrics, with their nesting"""
+    metrics = {
+        'cadence': 110, 'step_lengths': [0.7] * 100,
+        'fall_risk_assessment': {'risk_level': 'low', 'factors': ['a'] * 50},
+        'functional_mobility': {'score': 3}
+    }
+    assert summarize_metrics(metrics) == {'cadence': 110, 'fall_risk_assessment': {'risk_level': 'low'}}
+    assert summarize_metrics(None) == {}
@@ -0,0 +1,76 @@
+"""
+Unit tests for the Azure SQL connection pool
+"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.sql_pool import SQLConnectionPool
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def cursor(self):
+        if not self.healthy:
+            raise RuntimeError("connection is broken")
+        return self
+
+    def execute(self, *args):
+        pass
+
+    def fetchone(self):
+        return (1,)
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_pool_reuses_bounds_and_replaces_connections():
+    """Connections are reused, the pool is bounded, and expired or broken connections are replaced"""
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = SQLConnectionPool("test", max_size=2, max_lifetime=60, health_check_after=0, acquire_timeout=0.2, connect=connect)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert len(opened) == 1
+
+    # Bounded: a third concurrent caller waits, then times out
+    a, b = pool.acquire(), pool.acquire()
+    with pytest.raises(TimeoutError):
+        pool.acquire()
+    threading.Timer(0.05, pool.release, args=(a,)).start()
+    assert pool.acquire() is a
+    pool.release(a)
+    pool.release(b)
+    metrics = pool.get_metrics()
+    assert metrics["size"] == 2 and metrics["in_use"] == 0 and metrics["timeouts"] == 1 and metrics["waits"] == 1
+
+    # A connection that fails its health check is closed and replaced
+    b.healthy = False
+    time.sleep(0.01)
+    replacement = pool.acquire()
+    assert b.closed and replacement is not b
+    pool.release(replacement)
+
+    pool.max_lifetime = 0
+    recycled = pool.acquire()
+    assert recycled not in (a, b, replacement)
+    assert pool.get_metrics()["recycled"] == 1
@@ -0,0 +1,65 @@
+"""
+Unit tests for the analysis status cache
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.status_cache import StatusCache
+
+
+def test_single_flight_and_read_your_writes():
+    """Concurrent misses share one read; writes are visible; a read that raced a write is not cached"""
+    cache = StatusCache(ttl=60, terminal_ttl=60)
+    reads = []
+
+    async def load():
+        reads.append(1)
+        await asyncio.sleep(0.05)
+        return {'id': 'a1', 'status': 'processing', 'step_progress': 10, 'metrics': {'cadence': 1}, 'steps_completed': {}}
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get('a1', True, load) for _ in range(5)))
+        assert len(reads) == 1 and all(r['step_progress'] == 10 for r in results)
+
+        cache.apply('a1', {'step_progress': 50, 'steps_completed': {'step_1': True}})
+        status = await cache.get('a1', False, load)
+        assert len(reads) == 1
+        assert status['step_progress'] == 50 and status['steps_completed'] == {'step_1': True} and status['metrics'] == {}
+
+        # Callers get copies
+        status['steps_completed']['step_2'] = True
+        assert 'step_2' not in (await cache.get('a1', True, load))['steps_completed']
+
+        cache.invalidate('a1')
+        racing = asyncio.ensure_future(cache.get('a1', True, load))
+        await asyncio.sleep(0.01)
+        cache.apply('a1', {'status': 'completed'})
+        await racing
+        await cache.get('a1', True, load)
+        assert len(reads) == 3
+
+    asyncio.run(scenario())
+
+
+def test_get_many_reads_only_uncached():
+    """Batched reads use cached records and load the rest in one call"""
+    cache = StatusCache(ttl=60, terminal_ttl=60)
+    batches = []
+
+    async def load_many(ids):
+        batches.append(ids)
+        return {i: {'id': i, 'status': 'processing'} for i in ids if i != 'missing'}
+
+    async def scenario():
+        cache.seed('a1', {'id': 'a1', 'status': 'completed', 'metrics': {'cadence': 1}})
+        found = await cache.get_many(['a1', 'a2', 'missing'], load_many)
+        assert batches == [['a2', 'missing']]
+        assert set(found) == {'a1', 'a2'} and found['a1']['metrics'] == {}
+        await cache.get_many(['a1', 'a2'], load_many)
+        assert len(batches) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+"""
+Unit tests for the Table Storage partition and time index keys
+"""
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.table_layout import (
+    analysis_partition, bucket_of_row_key, previous_bucket, time_index_entity, time_index_row_key
+)
+
+
+def test_analysis_partition_is_stable_and_spread():
+    """Bucket depends only on the id and uses every partition"""
+    ids = [f"00000000-0000-0000-0000-{i:012d}" for i in range(400)]
+    buckets = {analysis_partition(analysis_id, 16) for analysis_id in ids}
+    assert analysis_partition(ids[0], 16) == analysis_partition(ids[0], 16)
+    assert buckets == {f"analyses-{i:02d}" for i in range(16)}
+
+
+def test_time_index_orders_newest_first_across_buckets():
+    """RowKeys sort newest first and encode the month bucket of their partition"""
+    newer = time_index_entity('b', '2026-03-01T00:00:00', 'analyses-01')
+    older = time_index_entity('a', '2026-02-28T23:59:59.999', 'analyses-02')
+    assert newer['RowKey'] < older['RowKey']
+    assert newer['PartitionKey'] == 'analyses_by_time-202603'
+    assert bucket_of_row_key(older['RowKey']) == '202602'
+    assert previous_bucket('202603') == '202602' and previous_bucket('202601') == '202512'
+    assert time_index_row_key(None, 'x').endswith('_x')
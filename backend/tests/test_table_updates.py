@@ -0,0 +1,97 @@
+"""
+Unit tests for conditional progress updates in Table Storage
+"""
+import asyncio
+import itertools
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from azure.core.exceptions import ResourceModifiedError, ResourceNotFoundError
+from app.core.database_azure_sql import AzureSQLService
+
+
+class _Entity(dict):
+    pass
+
+
+class _Table:
+    """In-memory table honouring If-Match; 'interfere' simulates writes by other workers"""
+
+    def __init__(self):
+        self.rows = {}
+        self.etags = itertools.count(1)
+        self.interfere = []
+
+    def _store(self, key, values):
+        self.rows[key] = {**self.rows.get(key, {}), **values, '_etag': f'"{next(self.etags)}"'}
+        return {'etag': self.rows[key]['_etag']}
+
+    def get_entity(self, partition_key, row_key, select=None):
+        row = self.rows.get((partition_key, row_key))
+        if row is None:
+            raise ResourceNotFoundError("not found")
+        entity = _Entity({k: v for k, v in row.items() if k != '_etag' and (not select or k in select)})
+        entity.metadata = {'etag': row['_etag']}
+        return entity
+
+    def update_entity(self, entity, mode=None, etag=None, match_condition=None):
+        key = (entity['PartitionKey'], entity['RowKey'])
+        if key not in self.rows:
+            raise ResourceNotFoundError("not found")
+        if self.interfere:
+            self._store(key, self.interfere.pop(0))
+        if etag and self.rows[key]['_etag'] != etag:
+            raise ResourceModifiedError("etag mismatch")
+        return self._store(key, entity)
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr("app.core.database_azure_sql.AIO_TABLES_AVAILABLE", False)
+    monkeypatch.setattr(AzureSQLService, "_table_etags", {})
+    monkeypatch.setattr(AzureSQLService, "_table_update_stats",
+                        {'updates': 0, 'round_trips': 0, 'request_bytes': 0, 'etag_conflicts': 0})
+    svc = AzureSQLService.__new__(AzureSQLService)
+    svc._use_table, svc._use_mock, svc._use_sqlite = True, False, False
+    svc.table_client = _Table()
+    svc.table_name = "gaitanalyses"
+    svc._partition_count = 1
+    svc.partition = svc._table_partitions("a1")[0]
+    svc.table_client._store((svc.partition, "a1"), {'PartitionKey': svc.partition, 'RowKey': 'a1', 'status': 'processing'})
+    return svc
+
+
+def _status(svc):
+    return svc.table_client.rows[(svc.partition, "a1")]['status']
+
+
+def test_progress_without_cached_etag_never_reopens_finished_analysis(service):
+    """Another worker completed the analysis: a first progress write from here is dropped, not applied"""
+    service.table_client._store((service.partition, "a1"), {'status': 'completed'})
+    assert asyncio.run(service._update_analysis_table("a1", {'status': 'processing', 'step_progress': 40}))
+    assert _status(service) == 'completed'
+
+
+def test_conflict_on_terminal_record_is_a_successful_drop(service):
+    """The entity turns terminal between our read and our write: the conflict drops the update"""
+    assert asyncio.run(service._update_analysis_table("a1", {'step_progress': 10}))
+    service.table_client.interfere = [{'status': 'failed'}]
+    assert asyncio.run(service._update_analysis_table("a1", {'step_progress': 20}))
+    assert _status(service) == 'failed'
+    assert service.table_client.rows[(service.partition, "a1")]['step_progress'] == 10
+
+
+def test_repeated_conflicts_on_running_analysis_retry_then_drop(service):
+    """Conflicts from non-terminal writers are retried; persistent contention drops the update without failing"""
+    service.table_client.interfere = [{'step_message': 'other worker'}]
+    assert asyncio.run(service._update_analysis_table("a1", {'step_progress': 30}))
+    assert service.table_client.rows[(service.partition, "a1")]['step_progress'] == 30
+    service.table_client.interfere = [{'step_message': f'other {i}'} for i in range(5)]
+    assert asyncio.run(service._update_analysis_table("a1", {'step_progress': 50}))
+    assert service.table_client.rows[(service.partition, "a1")]['step_progress'] == 30
+    assert AzureSQLService._table_update_stats['etag_conflicts'] == 4
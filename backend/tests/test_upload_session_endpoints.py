@@ -0,0 +1,156 @@
+"""
+Endpoint tests for resumable uploads (create, chunk PUTs, commit and the background stage after it)
+"""
+import base64
+import hashlib
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.v1 import analysis_azure
+from app.services.upload_sessions import UploadSessionStore, MIN_CHUNK_BYTES
+from tests.test_upload_sessions import _Storage
+
+BODY = os.urandom(MIN_CHUNK_BYTES * 2 + 99)
+
+
+class _VideoStorage(_Storage):
+    """Shared container plus whole-file uploads; stage_failures lists chunks whose block cannot be staged"""
+
+    def __init__(self):
+        super().__init__()
+        self.stage_failures = set()
+        self.uploads = []
+
+    def get_blob_client(self, blob_name):
+        blob_client = super().get_blob_client(blob_name)
+        stage_block = blob_client.stage_block
+
+        def _stage_block(block_id, data, length=None, **kwargs):
+            if int(block_id) in self.stage_failures:
+                raise ConnectionError("Connection reset by peer")
+            stage_block(block_id, data, length, **kwargs)
+
+        blob_client.stage_block = _stage_block
+        return blob_client
+
+    async def upload_video(self, file_path, blob_name):
+        self.uploads.append((blob_name, Path(file_path).read_bytes()))
+        return f"https://account.blob.core.windows.net/videos/{blob_name}"
+
+
+class _Db:
+    def __init__(self):
+        self.created = []
+
+    async def create_analysis(self, analysis_data):
+        self.created.append(analysis_data)
+        return True
+
+    async def update_analysis(self, analysis_id, updates):
+        return True
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    """Endpoints with a fresh session store and fake services; the analysis itself is only recorded"""
+    storage = _VideoStorage()
+    db = _Db()
+    store = UploadSessionStore(root=str(tmp_path))
+    analyses = []
+
+    async def _process_analysis(analysis_id, video_url, *args):
+        analyses.append((analysis_id, video_url))
+
+    async def _no_quality_check(*args, **kwargs):
+        return None
+
+    async def _no_artifacts(*args, **kwargs):
+        pass
+
+    monkeypatch.setattr(analysis_azure, "storage_service", storage)
+    monkeypatch.setattr(analysis_azure, "db_service", db)
+    monkeypatch.setattr(analysis_azure, "get_upload_session_store", lambda: store)
+    monkeypatch.setattr(analysis_azure, "is_proxy_enabled", lambda: False)
+    monkeypatch.setattr(analysis_azure, "_validate_upload_quality", _no_quality_check)
+    monkeypatch.setattr(analysis_azure, "_store_upload_artifacts", _no_artifacts)
+    monkeypatch.setattr(analysis_azure, "process_analysis_azure", _process_analysis)
+
+    app = FastAPI()
+    app.include_router(analysis_azure.router, prefix="/api/v1/analysis")
+    return TestClient(app), store, storage, db, analyses
+
+
+def _upload_chunks(client):
+    created = client.post("/api/v1/analysis/uploads", json={
+        "filename": "walk.mp4", "size": len(BODY), "chunk_size": MIN_CHUNK_BYTES, "patient_id": "p1"
+    })
+    assert created.status_code == 201
+    upload_id = created.json()['upload_id']
+    for index in range(created.json()['total_chunks']):
+        chunk = BODY[index * MIN_CHUNK_BYTES:(index + 1) * MIN_CHUNK_BYTES]
+        checksum = base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+        response = client.put(f"/api/v1/analysis/uploads/{upload_id}/chunks/{index}", content=chunk,
+                              headers={"Upload-Checksum": f"sha256 {checksum}"})
+        assert response.status_code == 200
+    return upload_id
+
+
+def test_concurrent_commit_is_rejected(env):
+    """A commit arriving while another request holds the commit lock gets 409 and changes nothing"""
+    client, store, storage, db, analyses = env
+    upload_id = _upload_chunks(client)
+    assert store.begin_commit(upload_id, storage)  # The other request
+
+    response = client.post(f"/api/v1/analysis/uploads/{upload_id}/commit")
+    assert response.status_code == 409
+    assert response.json()['detail']['error'] == "CONFLICT"
+    assert db.created == [] and analyses == []
+
+    store.end_commit(upload_id, storage_service=storage)
+    assert client.post(f"/api/v1/analysis/uploads/{upload_id}/commit").status_code == 200
+
+
+def test_retried_commit_returns_the_stored_response(env):
+    """A retried commit (e.g. the client lost the first response) starts no second analysis"""
+    client, store, storage, db, analyses = env
+    upload_id = _upload_chunks(client)
+
+    first = client.post(f"/api/v1/analysis/uploads/{upload_id}/commit")
+    assert first.status_code == 200
+    analysis_id = first.json()['analysis_id']
+    blob_client = storage.get_blob_client(f"{analysis_id}.mp4")
+    assert blob_client.committed == BODY
+    assert analyses == [(analysis_id, blob_client.url)]
+    assert [record['status'] for record in db.created] == ['uploading', 'processing']
+
+    retried = client.post(f"/api/v1/analysis/uploads/{upload_id}/commit")
+    assert retried.status_code == 200
+    assert retried.json() == first.json()
+    assert len(db.created) == 2 and len(analyses) == 1
+    assert storage.uploads == []
+
+
+def test_unstaged_chunk_falls_back_to_uploading_the_file(env):
+    """A chunk whose block could not be staged: the background stage uploads the assembled scratch file"""
+    client, store, storage, db, analyses = env
+    storage.stage_failures = {1}
+    upload_id = _upload_chunks(client)
+
+    response = client.post(f"/api/v1/analysis/uploads/{upload_id}/commit")
+    assert response.status_code == 200
+    analysis_id = response.json()['analysis_id']
+    assert db.created[0]['video_url'] == 'pending'
+    assert storage.get_blob_client(f"{analysis_id}.mp4").committed is None
+    assert storage.uploads == [(f"{analysis_id}.mp4", BODY)]
+    video_url = f"https://account.blob.core.windows.net/videos/{analysis_id}.mp4"
+    assert db.created[-1]['video_url'] == video_url
+    assert analyses == [(analysis_id, video_url)]
+    assert store.get_metrics()['staging_failures'] == 1
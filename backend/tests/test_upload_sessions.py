@@ -0,0 +1,182 @@
+"""
+Unit tests for resumable upload sessions
+"""
+import asyncio
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from azure.core.exceptions import HttpResponseError, ResourceNotFoundError
+from app.core.exceptions import ValidationError
+from app.services.upload_sessions import UploadSessionStore, MIN_CHUNK_BYTES
+
+
+class _BlobClient:
+    """Block blob with staged (uncommitted) blocks, whole-blob uploads and leases"""
+
+    def __init__(self, container, name):
+        self.container = container
+        self.name = name
+        self.url = f"https://account.blob.core.windows.net/videos/{name}"
+        self.blocks = {}
+        self.committed = None
+        self.leased = False
+
+    def stage_block(self, block_id, data, length=None, **kwargs):
+        self.blocks[block_id] = data
+
+    def get_block_list(self, block_list_type):
+        if not self.blocks and self.committed is None:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        return [], [SimpleNamespace(id=block_id, size=len(data)) for block_id, data in self.blocks.items()]
+
+    def commit_block_list(self, block_list):
+        self.committed = b''.join(self.blocks[block_id] for block_id in block_list)
+        self.blocks = {}
+
+    def upload_blob(self, data, overwrite=False):
+        self.committed = data.encode() if isinstance(data, str) else data
+
+    def download_blob(self):
+        if self.committed is None:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        return SimpleNamespace(readall=lambda: self.committed)
+
+    def acquire_lease(self, lease_duration=-1):
+        if self.committed is None:
+            raise ResourceNotFoundError("The specified blob does not exist.")
+        if self.leased:
+            error = HttpResponseError("There is already a lease present.")
+            error.status_code = 409
+            raise error
+        self.leased = True
+        return SimpleNamespace(release=lambda: setattr(self, 'leased', False))
+
+
+class _Storage:
+    """Video container shared by all instances"""
+
+    def __init__(self):
+        self.blobs = {}
+        self.container_client = self
+
+    def get_blob_client(self, blob_name):
+        return self.blobs.setdefault(blob_name, _BlobClient(self, blob_name))
+
+
+def _checksum(data):
+    return 'sha256', hashlib.sha256(data).digest()
+
+
+def _upload(store, storage, body, order):
+    session = store.create("walk.MP4", len(body), {"fps": 30.0}, chunk_size=MIN_CHUNK_BYTES, storage_service=storage)
+    chunk_size = session['chunk_size']
+
+    async def scenario():
+        await asyncio.gather(*(
+            store.put_chunk(session, i, body[i * chunk_size:(i + 1) * chunk_size],
+                            _checksum(body[i * chunk_size:(i + 1) * chunk_size]), storage)
+            for i in order(session['total_chunks'])
+        ))
+        return await store.assemble(session, storage)
+    return session, scenario
+
+
+def test_chunks_in_any_order_assemble_blob_and_scratch(tmp_path):
+    """Chunks sent out of order (and one twice) yield the original file locally and as the blob"""
+    store = UploadSessionStore(root=str(tmp_path))
+    storage = _Storage()
+    body = os.urandom(MIN_CHUNK_BYTES * 3 + 1234)
+    session, scenario = _upload(store, storage, body, lambda n: [3, 1, 0, 2, 1])
+    assert session['blob_name'].endswith(".mp4") and session['total_chunks'] == 4
+    blob_client = storage.get_blob_client(session['blob_name'])
+    assert asyncio.run(scenario()) == blob_client.url
+    assert blob_client.committed == body
+    assert Path(store.data_path(session)).read_bytes() == body
+    assert store.has_local_data(session)
+
+
+def test_chunks_and_commit_on_different_instances(tmp_path):
+    """With scale-out, chunk state comes from the staged blocks, so any instance can commit"""
+    storage = _Storage()
+    instance_a = UploadSessionStore(root=str(tmp_path / "a"))
+    instance_b = UploadSessionStore(root=str(tmp_path / "b"))
+    body = os.urandom(MIN_CHUNK_BYTES * 2 + 99)
+    session = instance_a.create("walk.mp4", len(body), {}, chunk_size=MIN_CHUNK_BYTES, storage_service=storage)
+    chunks = [body[i:i + MIN_CHUNK_BYTES] for i in range(0, len(body), MIN_CHUNK_BYTES)]
+    asyncio.run(instance_a.put_chunk(session, 0, chunks[0], _checksum(chunks[0]), storage))
+
+    adopted = instance_b.get(session['upload_id'], storage)
+    assert adopted == session
+    assert instance_b.describe(adopted, storage)['missing_chunks'] == [1, 2]
+    for index in (1, 2):
+        asyncio.run(instance_b.put_chunk(adopted, index, chunks[index], _checksum(chunks[index]), storage))
+    assert instance_a.describe(session, storage)['missing_chunks'] == []
+    assert not instance_b.has_local_data(adopted)
+
+    assert instance_b.begin_commit(session['upload_id'], storage)
+    assert not instance_a.begin_commit(session['upload_id'], storage)  # Leased by instance b
+    assert asyncio.run(instance_b.assemble(adopted, storage))
+    instance_b.end_commit(session['upload_id'], {"analysis_id": session['analysis_id']}, storage)
+    assert storage.get_blob_client(session['blob_name']).committed == body
+    assert instance_a.committed_response(session['upload_id'], storage) == {"analysis_id": session['analysis_id']}
+
+
+def test_abandoned_commit_lock_is_taken_over(tmp_path):
+    """A commit lock left by a crashed commit only blocks commits until it ages out"""
+    store = UploadSessionStore(root=str(tmp_path), commit_lock_seconds=30)
+    session = store.create("walk.mp4", MIN_CHUNK_BYTES, {}, chunk_size=MIN_CHUNK_BYTES)
+    assert store.begin_commit(session['upload_id'])
+    assert not store.begin_commit(session['upload_id'])
+    lock_path = os.path.join(str(tmp_path), session['upload_id'], 'commit.lock')
+    os.utime(lock_path, (time.time() - 60, time.time() - 60))
+    assert store.begin_commit(session['upload_id'])
+    assert store.get_metrics()['stale_commit_locks'] == 1
+    store.end_commit(session['upload_id'])
+    assert not os.path.exists(lock_path)
+
+
+def test_bad_checksum_and_missing_chunks_are_rejected(tmp_path):
+    """A corrupted chunk is refused and commit lists what is still missing"""
+    store = UploadSessionStore(root=str(tmp_path))
+    body = os.urandom(MIN_CHUNK_BYTES * 2)
+    session = store.create("walk.mp4", len(body), {}, chunk_size=MIN_CHUNK_BYTES)
+    first, second = body[:MIN_CHUNK_BYTES], body[MIN_CHUNK_BYTES:]
+    asyncio.run(store.put_chunk(session, 0, first, _checksum(first)))
+    with pytest.raises(ValidationError):
+        asyncio.run(store.put_chunk(session, 1, second, _checksum(first)))
+    with pytest.raises(ValidationError) as missing:
+        asyncio.run(store.assemble(session))
+    assert missing.value.details['missing_chunks'] == [1]
+    assert store.describe(session)['received_chunks'] == [0]
+
+
+@pytest.mark.integration
+@pytest.mark.skipif(not os.getenv("AZURITE_CONNECTION_STRING"), reason="set AZURITE_CONNECTION_STRING to run against Azurite")
+def test_staged_blocks_commit_on_azurite(tmp_path):
+    """End to end against Azurite (e.g. AZURITE_CONNECTION_STRING=UseDevelopmentStorage=true)"""
+    from azure.storage.blob import BlobServiceClient
+    container_client = BlobServiceClient.from_connection_string(
+        os.environ["AZURITE_CONNECTION_STRING"]
+    ).get_container_client("upload-session-test")
+    if not container_client.exists():
+        container_client.create_container()
+
+    class _AzuriteStorage:
+        pass
+    storage = _AzuriteStorage()
+    storage.container_client = container_client
+
+    store = UploadSessionStore(root=str(tmp_path))
+    body = os.urandom(MIN_CHUNK_BYTES * 2 + 99)
+    session, scenario = _upload(store, storage, body, lambda n: reversed(range(n)))
+    assert asyncio.run(scenario())
+    assert container_client.get_blob_client(session['blob_name']).download_blob().readall() == body
@@ -0,0 +1,72 @@
+"""
+Unit tests for the node-local video cache
+"""
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.video_cache import VideoCache
+
+
+class _Storage:
+    """Blob properties only - the cache never downloads"""
+
+    def __init__(self):
+        self.blobs = {}
+        self.container_client = self
+
+    def get_blob_client(self, blob_name):
+        return SimpleNamespace(get_blob_properties=lambda: self.blobs[blob_name])
+
+    def upload(self, blob_name, path, etag):
+        self.blobs[blob_name] = SimpleNamespace(size=os.path.getsize(path), etag=etag)
+
+
+def _video(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return path
+
+
+def test_uploaded_video_is_served_until_blob_changes(tmp_path):
+    """A cached upload skips the download; an overwritten blob is a miss and drops the stale copy"""
+    cache = VideoCache(root=str(tmp_path / "cache"), max_bytes=10_000)
+    storage = _Storage()
+    upload = _video(tmp_path, "gait_upload.mp4", 1000)
+    storage.upload("a.mp4", upload, etag='"1"')
+    content = upload.read_bytes()
+    assert asyncio.run(cache.put("a.mp4", str(upload), storage))
+    upload.unlink()  # The upload handler removes its temp file
+
+    target = tmp_path / "gait_processing.mp4"
+    assert asyncio.run(cache.fetch("a.mp4", str(target), storage)) == 1000
+    assert target.read_bytes() == content
+    assert asyncio.run(cache.fetch("b.mp4", str(tmp_path / "other.mp4"), storage)) is None
+
+    storage.blobs["a.mp4"].etag = '"2"'
+    assert asyncio.run(cache.fetch("a.mp4", str(tmp_path / "again.mp4"), storage)) is None
+    metrics = cache.get_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["stale"], metrics["entries"]) == (1, 2, 1, 0)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    """Beyond max_bytes the entry used longest ago goes first"""
+    cache = VideoCache(root=str(tmp_path / "cache"), max_bytes=2500)
+    storage = _Storage()
+    for index, name in enumerate(("a.mp4", "b.mp4", "c.mp4")):
+        video = _video(tmp_path, name, 1000)
+        storage.upload(name, video, etag=f'"{index}"')
+        assert asyncio.run(cache.put(name, str(video), storage))
+        used_at = time.time() - 100 + index
+        os.utime(cache._entry_path(name), (used_at, used_at))  # a is oldest
+        if name == "b.mp4":
+            assert asyncio.run(cache.fetch("a.mp4", str(tmp_path / "used.mp4"), storage)) == 1000  # a is now newest
+    assert not os.path.exists(cache._entry_path("b.mp4"))
+    assert os.path.exists(cache._entry_path("a.mp4")) and os.path.exists(cache._entry_path("c.mp4"))
+    assert cache.get_metrics()["evictions"] == 1
@@ -0,0 +1,86 @@
+"""
+Unit tests for analysis proxies
+"""
+import json
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services import video_proxy
+from app.services.video_proxy import (
+    create_analysis_proxy, load_proxy_meta, proxy_blob_name, proxy_meta_path, proxy_path_for,
+    resolve_analysis_source
+)
+
+SOURCE = {"fps": 30.0, "frame_count": 300, "width": 1920, "height": 1080}
+PROXY = {"fps": 15.0, "frame_count": 150, "width": 1280, "height": 720}
+
+
+def _video(tmp_path):
+    video = tmp_path / "gait_upload.mov"
+    video.write_bytes(b"original")
+    return str(video)
+
+
+def _fake_transcoder(monkeypatch, proxy_probe):
+    """Stand in for OpenCV/ffmpeg: the transcode writes a file, probing returns fixed properties"""
+    def _transcode(video_path, proxy_path, *args):
+        Path(proxy_path).write_bytes(b"proxy")
+        return True
+
+    monkeypatch.setattr(video_proxy, "CV2_AVAILABLE", True)
+    monkeypatch.setattr(video_proxy, "_transcode_ffmpeg", _transcode)
+    monkeypatch.setattr(video_proxy, "_transcode_opencv", _transcode)
+    monkeypatch.setattr(video_proxy, "_probe", lambda path: proxy_probe if path.endswith(".proxy.mp4") else SOURCE)
+
+
+def test_proxy_names_sit_next_to_the_original():
+    assert proxy_path_for("/tmp/gait_a1.mov") == "/tmp/gait_a1.proxy.mp4"
+    assert proxy_meta_path("/tmp/gait_a1.proxy.mp4") == "/tmp/gait_a1.proxy.mp4.json"
+    assert proxy_blob_name("a1.mov") == "a1.proxy.mp4"
+
+
+def test_created_proxy_records_source_properties(tmp_path, monkeypatch):
+    """The sidecar maps proxy pixels back to source pixels; decoding switches to the proxy"""
+    _fake_transcoder(monkeypatch, PROXY)
+    video = _video(tmp_path)
+    proxy_path = create_analysis_proxy(video)
+    assert proxy_path == proxy_path_for(video)
+    meta = load_proxy_meta(proxy_path)
+    assert (meta["source_width"], meta["source_fps"], meta["width"], meta["fps"]) == (1920, 30.0, 1280, 15.0)
+
+    assert resolve_analysis_source(video) == (proxy_path, 1.5, meta)
+    assert resolve_analysis_source(video, processing_fps=10) == (proxy_path, 1.5, meta)
+    assert resolve_analysis_source(video, processing_fps=30) == (video, 1.0, None)  # Above the proxy rate
+
+
+def test_failed_transcode_leaves_no_proxy(tmp_path, monkeypatch):
+    """An unreadable proxy is removed and callers keep using the original"""
+    _fake_transcoder(monkeypatch, {**PROXY, "frame_count": 0})
+    video = _video(tmp_path)
+    assert create_analysis_proxy(video) is None
+    assert not Path(proxy_path_for(video)).exists()
+    assert resolve_analysis_source(video) == (video, 1.0, None)
+
+
+def test_proxy_without_sidecar_is_not_used(tmp_path):
+    """A proxy whose sidecar is missing or unreadable may still be arriving: decode the original"""
+    video = _video(tmp_path)
+    proxy_path = Path(proxy_path_for(video))
+    proxy_path.write_bytes(b"partial proxy")
+    assert load_proxy_meta(str(proxy_path)) is None
+    assert resolve_analysis_source(video) == (video, 1.0, None)
+
+    Path(proxy_meta_path(str(proxy_path))).write_text('{"width": 1280, "source_wid')
+    assert resolve_analysis_source(video) == (video, 1.0, None)
+    Path(proxy_meta_path(str(proxy_path))).write_text(json.dumps({**PROXY, "source_width": 1920}))
+    assert resolve_analysis_source(video)[0] == str(proxy_path)
+
+
+def test_without_opencv_no_proxy_is_created(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_proxy, "CV2_AVAILABLE", False)
+    video = _video(tmp_path)
+    assert create_analysis_proxy(video) is None
+    assert not Path(proxy_path_for(video)).exists()
@@ -29,6 +29,104 @@ const getApiUrl = () => {
 const API_URL = getApiUrl()
 console.log(`[API URL] Final API_URL: "${API_URL}" (empty = relative, non-empty = absolute)`)
 
+// Files above this size use the resumable chunked upload API: a single request of this size
+// risks the 230s gateway timeout, while chunks are sent in parallel and retried individually
+const CHUNKED_UPLOAD_THRESHOLD = 50 * 1024 * 1024
+const CHUNK_CONCURRENCY = 4
+const CHUNK_MAX_ATTEMPTS = 4
+
+const sha256Base64 = async (data: ArrayBuffer): Promise<string> => {
+  const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', data))
+  let binary = ''
+  digest.forEach((byte) => { binary += String.fromCharCode(byte) })
+  return btoa(binary)
+}
+
+// Remembers the session of a file so a retry after a dropped connection or reload only sends missing chunks
+const uploadSessionKey = (file: File) => `uploadSession:${file.name}:${file.size}:${file.lastModified}`
+
+const uploadInChunks = async (
+  file: File,
+  onProgress: (fraction: number) => void,
+  signal: AbortSignal
+): Promise<string> => {
+  const base = `${API_URL}/api/v1/analysis/uploads`
+
+  let session: any = null
+  const savedUploadId = localStorage.getItem(uploadSessionKey(file))
+  if (savedUploadId) {
+    const existing = await fetch(`${base}/${savedUploadId}`, { signal })
+    if (existing.ok) {
+      session = await existing.json()
+      console.log(`Resuming upload session ${savedUploadId}: ${session.missing_chunks.length} chunks missing`)
+    }
+  }
+  if (!session) {
+    const created = await fetch(base, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'Accept': 'application/json' },
+      body: JSON.stringify({ filename: file.name, size: file.size, view_type: 'front', fps: 30.0 }),
+      signal
+    })
+    if (!created.ok) {
+      throw new Error(`Upload failed: ${created.status} - ${await created.text()}`)
+    }
+    session = await created.json()
+    localStorage.setItem(uploadSessionKey(file), session.upload_id)
+  }
+
+  const chunkSize: number = session.chunk_size
+  const chunkLength = (index: number) => Math.min(chunkSize, file.size - index * chunkSize)
+  const pending: number[] = [...session.missing_chunks]
+  let uploadedBytes = file.size - pending.reduce((sum, index) => sum + chunkLength(index), 0)
+  onProgress(uploadedBytes / file.size)
+
+  const sendChunk = async (index: number) => {
+    const data = await file.slice(index * chunkSize, index * chunkSize + chunkLength(index)).arrayBuffer()
+    const checksum = await sha256Base64(data)
+    for (let attempt = 1; ; attempt++) {
+      try {
+        const response = await fetch(`${base}/${session.upload_id}/chunks/${index}`, {
+          method: 'PUT',
+          headers: { 'Content-Type': 'application/octet-stream', 'Upload-Checksum': `sha256 ${checksum}` },
+          body: data,
+          signal
+        })
+        if (response.ok) break
+        // Client errors (other than timeouts/throttling) will not succeed on retry
+        if (response.status < 500 && response.status !== 408 && response.status !== 429) {
+          throw Object.assign(new Error(`Chunk ${index} rejected: ${response.status} - ${await response.text()}`), { permanent: true })
+        }
+        throw new Error(`Chunk ${index} failed: ${response.status}`)
+      } catch (chunkError: any) {
+        if (signal.aborted || chunkError.permanent || attempt >= CHUNK_MAX_ATTEMPTS) throw chunkError
+        console.warn(`Retrying chunk ${index} (attempt ${attempt + 1}/${CHUNK_MAX_ATTEMPTS}):`, chunkError.message)
+      }
+      await new Promise((resolve) => setTimeout(resolve, 500 * 2 ** attempt))
+    }
+    uploadedBytes += data.byteLength
+    onProgress(uploadedBytes / file.size)
+  }
+
+  const worker = async () => {
+    for (let index = pending.shift(); index !== undefined; index = pending.shift()) {
+      await sendChunk(index)
+    }
+  }
+  await Promise.all(Array.from({ length: CHUNK_CONCURRENCY }, () => worker()))
+
+  const committed = await fetch(`${base}/${session.upload_id}/commit`, {
+    method: 'POST',
+    headers: { 'Accept': 'application/json' },
+    signal
+  })
+  if (!committed.ok) {
+    throw new Error(`Upload failed: ${committed.status} - ${await committed.text()}`)
+  }
+  localStorage.removeItem(uploadSessionKey(file))
+  return (await committed.json()).analysis_id
+}
+
 type UploadStatus = 'idle' | 'uploading' | 'processing' | 'completed' | 'failed'
 
 type ProcessingStep = 'pose_estimation' | '3d_lifting' | 'metrics_calculation' | 'report_generation'
@@ -52,7 +150,9 @@ export default function AnalysisUpload() {
   // Frame rate is now auto-detected by backend for optimal performance
   const navigate = useNavigate()
   const xhrRef = useRef<XMLHttpRequest | null>(null)
+  const chunkAbortRef = useRef<AbortController | null>(null) // Chunked upload of large files
   const pollTimeoutRef = useRef<number | null>(null) // setTimeout ID for any scheduled poll (including retries)
+  const eventSourceRef = useRef<EventSource | null>(null) // Progress stream (replaces polling when available)
   const progressRef = useRef<number>(0)
   const lastIndeterminateProgressRef = useRef<number>(0) // throttle indeterminate updates
   const [startTime] = useState<number>(Date.now())
@@ -62,6 +162,10 @@ export default function AnalysisUpload() {
       window.clearTimeout(pollTimeoutRef.current)
       pollTimeoutRef.current = null
     }
+    if (eventSourceRef.current) {
+      eventSourceRef.current.close()
+      eventSourceRef.current = null
+    }
   }
 
   const handleFileChange = async (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -161,7 +265,13 @@ export default function AnalysisUpload() {
         lastIndeterminateProgressRef.current = Date.now()
       })
 
-      const uploadPromise = new Promise<string>((resolve, reject) => {
+      const onChunkProgress = (fraction: number) => {
+        const newProgress = Math.max(fraction * 100, 1)
+        progressRef.current = newProgress
+        setProgress(newProgress)
+      }
+      chunkAbortRef.current = file.size >= CHUNKED_UPLOAD_THRESHOLD ? new AbortController() : null
+      const uploadPromise = chunkAbortRef.current ? uploadInChunks(file, onChunkProgress, chunkAbortRef.current.signal) : new Promise<string>((resolve, reject) => {
         xhr.onload = () => {
           console.log('Upload response received. Status:', xhr.status)
           if (xhr.status === 200) {
@@ -380,6 +490,7 @@ export default function AnalysisUpload() {
       })
 
       const id = await uploadPromise
+      chunkAbortRef.current = null
       console.log('Upload complete. Analysis ID:', id)
       setAnalysisId(id)
       progressRef.current = 100 // Update ref
@@ -534,9 +645,119 @@ export default function AnalysisUpload() {
       pollTimeoutRef.current = window.setTimeout(poll, delayMs)
     }
     
+    // Apply a status snapshot (poll response or SSE event); returns the next poll delay, or null to stop
+    const applyStatus = (data: any): number | null => {
+      const analysisStatus = data.status
+
+      // Update video quality info if available
+      if (data.video_quality_score !== undefined || data.video_quality_issues) {
+        setVideoQuality({
+          score: data.video_quality_score ?? null,
+          isValid: data.video_quality_valid ?? null,
+          issues: data.video_quality_issues || [],
+          recommendations: data.video_quality_recommendations || [],
+          poseDetectionRate: data.pose_detection_rate ?? null
+        })
+      }
+      
+      // Use real progress data from backend
+      if (analysisStatus === 'completed') {
+        // Backend has marked analysis as completed - this is the natural completion
+        // Trust the backend's status and display completion
+        // CRITICAL: Keep screen showing with View Report button - don't clear
+        setStatus('completed')
+        setCurrentStep('report_generation')
+        setStepProgress(100)
+        setStepMessage(data.step_message || 'Analysis complete! Report ready.')
+        
+        // Ensure video quality is set if available
+        if (data.video_quality_score !== undefined || data.video_quality_issues) {
+          setVideoQuality({
+            score: data.video_quality_score ?? null,
+            isValid: data.video_quality_valid ?? null,
+            issues: data.video_quality_issues || [],
+            recommendations: data.video_quality_recommendations || [],
+            poseDetectionRate: data.pose_detection_rate ?? null
+          })
+        }
+        
+        clearPollTimeout()
+        console.log('✅ Analysis completed naturally - backend set status to completed')
+        // DON'T clear state - keep showing completion screen with View Report button
+      } else if (analysisStatus === 'uploading') {
+        // Handle upload progress - show messages from backend
+        setStatus('uploading')
+        setStepProgress(data.step_progress || 0)
+        setStepMessage(data.step_message || 'Processing upload...')
+        // Keep polling to get updates
+        return 500 // Poll every 500ms during upload
+      } else if (analysisStatus === 'processing') {
+        // CRITICAL: Handle case where stepProgress=100 but status is still 'processing'
+        // This happens when backend says "complete" but database update hasn't finished
+        const backendStep = data.current_step || 'pose_estimation'
+        const backendProgress = data.step_progress || 0
+        const backendMessage = data.step_message || 'Processing...'
+        
+        // Map backend step names to frontend step types
+        const stepMapping: Record<string, ProcessingStep> = {
+          'pose_estimation': 'pose_estimation',
+          '3d_lifting': '3d_lifting',
+          'metrics_calculation': 'metrics_calculation',
+          'report_generation': 'report_generation'
+        }
+        
+        const mappedStep = stepMapping[backendStep] || 'pose_estimation'
+        setCurrentStep(mappedStep)
+        setStepProgress(backendProgress)
+        setStepMessage(backendMessage)
+        
+        // CRITICAL: Do NOT force completion - wait for backend to set status='completed'
+        // Step 4 should complete naturally when backend finishes saving to database
+        // Only update UI state, don't force status change
+        // The backend will set status='completed' when Step 4 is truly done
+        
+        console.log(`Progress update: ${backendStep} - ${backendProgress}% - ${backendMessage}`)
+        
+        // For Step 4, poll more frequently to show detailed progress
+        if (mappedStep === 'report_generation') {
+          // Poll every 500ms when finalizing (98-100%), every 1s during Step 4 (95-98%)
+          return backendProgress >= 98 ? 500 : 1000
+        }
+        return 2000
+      } else if (analysisStatus === 'cancelled') {
+        // Handle cancelled status explicitly
+        setStatus('failed')
+        setError('Analysis was cancelled by the server (likely due to a restart or timeout). Please try uploading again.')
+        setAnalysisId(null)
+        clearPollTimeout()
+        return null
+      } else if (analysisStatus === 'failed') {
+        setStatus('failed')
+        
+        // Build detailed error message with step information
+        const failedStep = data.current_step || 'unknown'
+        const stepNames: Record<string, string> = {
+          'pose_estimation': 'Step 1: Pose Estimation',
+          '3d_lifting': 'Step 2: 3D Lifting',
+          'metrics_calculation': 'Step 3: Metrics Calculation',
+          'report_generation': 'Step 4: Report Generation'
+        }
+        const stepName = stepNames[failedStep] || `Step: ${failedStep}`
+        
+        const errorMsg = data.step_message || data.error || 'Analysis failed'
+        const detailedError = `❌ Analysis Failed at ${stepName}\n\n${errorMsg}\n\nPlease try:\n• Uploading the video again\n• Using a smaller file (<50 MB)\n• Ensuring good lighting and clear visibility of the person\n• Recording 5-10 seconds of continuous walking`
+        
+        setError(detailedError)
+        setCurrentStep(failedStep as ProcessingStep || 'pose_estimation')
+        setStepProgress(data.step_progress || 0)
+        setStepMessage(data.step_message || 'Analysis failed')
+      }
+      return null
+    }
+    
     const poll = async () => {
       try {
-        const pollUrl = `${API_URL}/api/v1/analysis/${id}`
+        const pollUrl = `${API_URL}/api/v1/analysis/${id}?include_metrics=false`
         const response = await fetch(pollUrl)
         
         if (response.status === 404) {
@@ -590,114 +811,9 @@ export default function AnalysisUpload() {
         consecutiveErrors = 0
         
         const data = await response.json()
-        const analysisStatus = data.status
-
-        // Update video quality info if available
-        if (data.video_quality_score !== undefined || data.video_quality_issues) {
-          setVideoQuality({
-            score: data.video_quality_score ?? null,
-            isValid: data.video_quality_valid ?? null,
-            issues: data.video_quality_issues || [],
-            recommendations: data.video_quality_recommendations || [],
-            poseDetectionRate: data.pose_detection_rate ?? null
-          })
-        }
-        
-        // Use real progress data from backend
-        if (analysisStatus === 'completed') {
-          // Backend has marked analysis as completed - this is the natural completion
-          // Trust the backend's status and display completion
-          // CRITICAL: Keep screen showing with View Report button - don't clear
-          setStatus('completed')
-          setCurrentStep('report_generation')
-          setStepProgress(100)
-          setStepMessage(data.step_message || 'Analysis complete! Report ready.')
-          
-          // Ensure video quality is set if available
-          if (data.video_quality_score !== undefined || data.video_quality_issues) {
-            setVideoQuality({
-              score: data.video_quality_score ?? null,
-              isValid: data.video_quality_valid ?? null,
-              issues: data.video_quality_issues || [],
-              recommendations: data.video_quality_recommendations || [],
-              poseDetectionRate: data.pose_detection_rate ?? null
-            })
-          }
-          
-          clearPollTimeout()
-          console.log('✅ Analysis completed naturally - backend set status to completed')
-          // DON'T clear state - keep showing completion screen with View Report button
-        } else if (analysisStatus === 'uploading') {
-          // Handle upload progress - show messages from backend
-          setStatus('uploading')
-          setStepProgress(data.step_progress || 0)
-          setStepMessage(data.step_message || 'Processing upload...')
-          // Keep polling to get updates
-          schedulePoll(500) // Poll every 500ms during upload
-        } else if (analysisStatus === 'processing') {
-          // CRITICAL: Handle case where stepProgress=100 but status is still 'processing'
-          // This happens when backend says "complete" but database update hasn't finished
-          const backendStep = data.current_step || 'pose_estimation'
-          const backendProgress = data.step_progress || 0
-          const backendMessage = data.step_message || 'Processing...'
-          
-          // Map backend step names to frontend step types
-          const stepMapping: Record<string, ProcessingStep> = {
-            'pose_estimation': 'pose_estimation',
-            '3d_lifting': '3d_lifting',
-            'metrics_calculation': 'metrics_calculation',
-            'report_generation': 'report_generation'
-          }
-          
-          const mappedStep = stepMapping[backendStep] || 'pose_estimation'
-          setCurrentStep(mappedStep)
-          setStepProgress(backendProgress)
-          setStepMessage(backendMessage)
-          
-          // CRITICAL: Do NOT force completion - wait for backend to set status='completed'
-          // Step 4 should complete naturally when backend finishes saving to database
-          // Only update UI state, don't force status change
-          // The backend will set status='completed' when Step 4 is truly done
-          
-          console.log(`Progress update: ${backendStep} - ${backendProgress}% - ${backendMessage}`)
-          
-          // For Step 4, poll more frequently to show detailed progress
-          if (mappedStep === 'report_generation') {
-            if (backendProgress >= 98) {
-              schedulePoll(500) // Poll every 500ms when finalizing (98-100%)
-            } else {
-              schedulePoll(1000) // Poll every 1s during Step 4 (95-98%)
-            }
-          } else {
-            schedulePoll(2000)
-          }
-        } else if (analysisStatus === 'cancelled') {
-          // Handle cancelled status explicitly
-          setStatus('failed')
-          setError('Analysis was cancelled by the server (likely due to a restart or timeout). Please try uploading again.')
-          setAnalysisId(null)
-          clearPollTimeout()
-          return
-        } else if (analysisStatus === 'failed') {
-          setStatus('failed')
-          
-          // Build detailed error message with step information
-          const failedStep = data.current_step || 'unknown'
-          const stepNames: Record<string, string> = {
-            'pose_estimation': 'Step 1: Pose Estimation',
-            '3d_lifting': 'Step 2: 3D Lifting',
-            'metrics_calculation': 'Step 3: Metrics Calculation',
-            'report_generation': 'Step 4: Report Generation'
-          }
-          const stepName = stepNames[failedStep] || `Step: ${failedStep}`
-          
-          const errorMsg = data.step_message || data.error || 'Analysis failed'
-          const detailedError = `❌ Analysis Failed at ${stepName}\n\n${errorMsg}\n\nPlease try:\n• Uploading the video again\n• Using a smaller file (<50 MB)\n• Ensuring good lighting and clear visibility of the person\n• Recording 5-10 seconds of continuous walking`
-          
-          setError(detailedError)
-          setCurrentStep(failedStep as ProcessingStep || 'pose_estimation')
-          setStepProgress(data.step_progress || 0)
-          setStepMessage(data.step_message || 'Analysis failed')
+        const nextPollDelay = applyStatus(data)
+        if (nextPollDelay !== null) {
+          schedulePoll(nextPollDelay)
         }
       } catch (err: any) {
         console.error('Polling error:', err)
@@ -724,6 +840,25 @@ export default function AnalysisUpload() {
       }
     }
 
+    // Prefer the server-sent progress stream; fall back to polling if it is unavailable
+    if (typeof EventSource !== 'undefined') {
+      const source = new EventSource(`${API_URL}/api/v1/analysis/${id}/events`)
+      eventSourceRef.current = source
+      source.addEventListener('progress', (event) => {
+        if (applyStatus(JSON.parse((event as MessageEvent).data)) === null) {
+          source.close()
+        }
+      })
+      source.onerror = () => {
+        // The browser reconnects by itself (resuming from Last-Event-ID) unless the stream was rejected
+        if (source.readyState === EventSource.CLOSED && eventSourceRef.current === source) {
+          eventSourceRef.current = null
+          poll()
+        }
+      }
+      return
+    }
+
     // Start polling
     poll()
   }
@@ -734,6 +869,10 @@ export default function AnalysisUpload() {
       xhrRef.current.abort()
       xhrRef.current = null
     }
+    if (chunkAbortRef.current) {
+      chunkAbortRef.current.abort()
+      chunkAbortRef.current = null
+    }
     clearPollTimeout()
     
     // Cancel backend processing if analysis is running
@@ -37,7 +37,7 @@ export default function ViewGait() {
   useEffect(() => {
     const fetchAnalyses = async () => {
       try {
-        const response = await fetch(`${API_URL}/api/v1/analysis/list`)
+        const response = await fetch(`${API_URL}/api/v1/analysis/list?fields=id,status,filename,video_url,created_at,updated_at`)
         
         if (!response.ok) {
           throw new Error(`Failed to fetch analyses: ${response.statusText}`)
@@ -112,7 +112,7 @@ export default function ViewGait() {
   const handleRefresh = () => {
     setLoading(true)
     setError(null)
-    fetch(`${API_URL}/api/v1/analysis/list`)
+    fetch(`${API_URL}/api/v1/analysis/list?fields=id,status,filename,video_url,created_at,updated_at`)
       .then(response => {
         if (!response.ok) {
           throw new Error(`Failed to fetch analyses: ${response.statusText}`)
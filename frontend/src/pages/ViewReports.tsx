@@ -48,7 +48,7 @@ export default function ViewReports() {
   useEffect(() => {
     const fetchAnalyses = async () => {
       try {
-        const response = await fetch(`${API_URL}/api/v1/analysis/list`)
+        const response = await fetch(`${API_URL}/api/v1/analysis/list?view=summary`)
         
         if (!response.ok) {
           throw new Error(`Failed to fetch analyses: ${response.statusText}`)
@@ -164,7 +164,7 @@ export default function ViewReports() {
   const handleRefresh = () => {
     setLoading(true)
     setError(null)
-    fetch(`${API_URL}/api/v1/analysis/list`)
+    fetch(`${API_URL}/api/v1/analysis/list?view=summary`)
       .then(response => {
         if (!response.ok) {
           throw new Error(`Failed to fetch analyses: ${response.statusText}`)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Table Storage Partitioning Load Test
+Concurrent progress updates with every analysis in one partition vs hash-bucket partitions
+
+Run against a local Azurite instance (or a real storage account via AZURE_STORAGE_CONNECTION_STRING):
+    docker run -p 10002:10002 mcr.microsoft.com/azure-storage/azurite azurite-table --tableHost 0.0.0.0
+    python scripts/bench_table_partitions.py
+
+Azurite does not enforce the per-partition throughput target of Azure Table Storage
+(~2,000 entities/s), so run against a real account to see the single-partition ceiling.
+"""
+
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from azure.data.tables import TableServiceClient, UpdateMode
+
+from app.core.table_layout import LEGACY_ANALYSIS_PARTITION, analysis_partition
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "TableEndpoint=http://127.0.0.1:10002/devstoreaccount1;"
+)
+CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING)
+PARTITION_COUNT = int(os.getenv("BENCH_PARTITIONS", "16"))
+UPDATES_PER_ANALYSIS = int(os.getenv("BENCH_UPDATES", "100"))
+CONCURRENCY_LEVELS = [int(c) for c in os.getenv("BENCH_CONCURRENCY", "4,16,64").split(",")]
+
+
+def run(table_client, concurrency: int, partition_for) -> float:
+    """Each worker drives one analysis through UPDATES_PER_ANALYSIS MERGE updates; returns updates/s"""
+    analysis_ids = [str(uuid.uuid4()) for _ in range(concurrency)]
+    for analysis_id in analysis_ids:
+        table_client.upsert_entity({
+            'PartitionKey': partition_for(analysis_id),
+            'RowKey': analysis_id,
+            'status': 'processing',
+            'created_at': datetime.utcnow().isoformat(),
+        })
+
+    def worker(analysis_id: str) -> None:
+        for i in range(UPDATES_PER_ANALYSIS):
+            table_client.update_entity({
+                'PartitionKey': partition_for(analysis_id),
+                'RowKey': analysis_id,
+                'current_step': 'pose_estimation',
+                'step_progress': i % 100,
+                'updated_at': datetime.utcnow().isoformat(),
+            }, mode=UpdateMode.MERGE)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, analysis_ids))
+    elapsed = time.time() - start
+    return concurrency * UPDATES_PER_ANALYSIS / elapsed if elapsed else 0.0
+
+
+def main() -> int:
+    service = TableServiceClient.from_connection_string(CONNECTION_STRING)
+    table_client = service.create_table_if_not_exists(table_name="gaitanalysespartbench")
+    layouts = [
+        ("single partition", lambda analysis_id: LEGACY_ANALYSIS_PARTITION),
+        (f"{PARTITION_COUNT} buckets", lambda analysis_id: analysis_partition(analysis_id, PARTITION_COUNT)),
+    ]
+    try:
+        print(f"{UPDATES_PER_ANALYSIS} progress updates per analysis")
+        for concurrency in CONCURRENCY_LEVELS:
+            for name, partition_for in layouts:
+                rate = run(table_client, concurrency, partition_for)
+                print(f"  concurrency {concurrency:>3}  {name:<16} {rate:8.0f} updates/s")
+    finally:
+        service.delete_table("gaitanalysespartbench")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
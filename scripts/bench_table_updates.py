@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Table Storage Update Benchmark
+Compares the legacy read-modify-write update with the MERGE update used by AzureSQLService
+
+Run against a local Azurite instance:
+    docker run -p 10002:10002 mcr.microsoft.com/azure-storage/azurite azurite-table --tableHost 0.0.0.0
+    python scripts/bench_table_updates.py
+"""
+
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+from azure.data.tables import TableServiceClient, UpdateMode
+
+AZURITE_CONNECTION_STRING = (
+    "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;"
+    "AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;"
+    "TableEndpoint=http://127.0.0.1:10002/devstoreaccount1;"
+)
+CONNECTION_STRING = os.getenv("AZURE_STORAGE_CONNECTION_STRING", AZURITE_CONNECTION_STRING)
+UPDATES = int(os.getenv("BENCH_UPDATES", "200"))
+METRICS_KB = int(os.getenv("BENCH_METRICS_KB", "24"))  # Size of a typical completed metrics payload
+
+
+class RequestCounter:
+    """Counts HTTP requests and request body bytes via the SDK's raw_request_hook"""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+
+    def __call__(self, request):
+        self.requests += 1
+        body = request.http_request.body
+        self.bytes += len(body) if body else 0
+
+
+def progress_update(i: int) -> dict:
+    return {'current_step': 'pose_estimation', 'step_progress': i % 100, 'step_message': f'Processing frame {i}...'}
+
+
+def legacy_update(table_client, row_key: str, updates: dict, counter: RequestCounter) -> None:
+    """Previous behaviour: GET the entity, then replace it with every property"""
+    entity = table_client.get_entity(partition_key='analyses', row_key=row_key, raw_request_hook=counter)
+    for key, value in updates.items():
+        entity[key] = value
+    entity['updated_at'] = datetime.utcnow().isoformat()
+    table_client.update_entity(entity=entity, raw_request_hook=counter)
+
+
+def merge_update(table_client, row_key: str, updates: dict, counter: RequestCounter) -> None:
+    """Current behaviour: MERGE only the changed properties"""
+    entity = {'PartitionKey': 'analyses', 'RowKey': row_key, **updates, 'updated_at': datetime.utcnow().isoformat()}
+    table_client.update_entity(entity=entity, mode=UpdateMode.MERGE, raw_request_hook=counter)
+
+
+def run(name, update_fn, table_client) -> dict:
+    row_key = f"bench-{uuid.uuid4()}"
+    table_client.create_entity(entity={
+        'PartitionKey': 'analyses',
+        'RowKey': row_key,
+        'status': 'processing',
+        'metrics': json.dumps({'samples': 'x' * (METRICS_KB * 1024)}),
+        'created_at': datetime.utcnow().isoformat(),
+    })
+    counter = RequestCounter()
+    start = time.time()
+    for i in range(UPDATES):
+        update_fn(table_client, row_key, progress_update(i), counter)
+    elapsed = time.time() - start
+    table_client.delete_entity(partition_key='analyses', row_key=row_key)
+    return {
+        "name": name,
+        "round_trips_per_update": counter.requests / UPDATES,
+        "request_bytes_per_update": counter.bytes / UPDATES,
+        "updates_per_second": UPDATES / elapsed if elapsed else 0,
+    }
+
+
+def main() -> int:
+    service = TableServiceClient.from_connection_string(CONNECTION_STRING)
+    table_client = service.create_table_if_not_exists(table_name="gaitanalysesbench")
+    try:
+        results = [
+            run("read-modify-write", legacy_update, table_client),
+            run("merge", merge_update, table_client),
+        ]
+    finally:
+        service.delete_table("gaitanalysesbench")
+
+    print(f"{UPDATES} progress updates, {METRICS_KB} KB metrics property")
+    for result in results:
+        print(
+            f"  {result['name']:<18} {result['round_trips_per_update']:.1f} round trips/update, "
+            f"{result['request_bytes_per_update']:.0f} request bytes/update, "
+            f"{result['updates_per_second']:.0f} updates/s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Table Storage Partition Migration
+Moves analyses from the legacy single 'analyses' partition into their hash-bucket partitions
+
+Usage:
+    AZURE_STORAGE_CONNECTION_STRING=... python scripts/migrate_table_partitions.py [--dry-run]
+
+Safe to run while the service is live, and safe to re-run. The service reads and writes an
+analysis in its bucket before falling back to the legacy partition, so once the bucket copy
+exists it receives all new writes. Each copy is conditional (create, or replace If-Match),
+and the legacy entity is deleted only if its ETag is unchanged; any concurrent update simply
+restarts that entity's migration. Time index entries are repointed to the new partition and
+the pre-bucketing time index partition is removed.
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from azure.core import MatchConditions
+from azure.core.exceptions import ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.data.tables import TableServiceClient, UpdateMode
+
+from app.core.table_layout import (
+    DEFAULT_PARTITION_COUNT, LEGACY_ANALYSIS_PARTITION, LEGACY_TIME_INDEX_PARTITION,
+    META_PARTITION, PARTITIONING_ROW_KEY, TIME_INDEX_MARKER_ROW_KEY,
+    analysis_partition, current_bucket, time_bucket, time_index_entity
+)
+
+MAX_ATTEMPTS = 5
+
+
+def load_partition_count(table_client) -> int:
+    """Same rule as the service: the first writer fixes the count for the table"""
+    try:
+        return int(table_client.get_entity(META_PARTITION, PARTITIONING_ROW_KEY)['partition_count'])
+    except ResourceNotFoundError:
+        pass
+    try:
+        table_client.create_entity({
+            'PartitionKey': META_PARTITION,
+            'RowKey': PARTITIONING_ROW_KEY,
+            'partition_count': DEFAULT_PARTITION_COUNT
+        })
+        return DEFAULT_PARTITION_COUNT
+    except ResourceExistsError:
+        return int(table_client.get_entity(META_PARTITION, PARTITIONING_ROW_KEY)['partition_count'])
+
+
+def migrate_analysis(table_client, analysis_id: str, partition_count: int) -> bool:
+    """
+    Move one analysis into its bucket
+
+    Returns:
+        True if the analysis now lives only in its bucket partition
+    """
+    target = analysis_partition(analysis_id, partition_count)
+    for _ in range(MAX_ATTEMPTS):
+        try:
+            legacy = table_client.get_entity(LEGACY_ANALYSIS_PARTITION, analysis_id)
+        except ResourceNotFoundError:
+            return True  # Already migrated (e.g. by a concurrent run)
+        try:
+            current = table_client.get_entity(target, analysis_id)
+        except ResourceNotFoundError:
+            current = None
+
+        try:
+            copy = {**legacy, 'PartitionKey': target}
+            if current is None:
+                table_client.create_entity(copy)
+            elif (current.get('updated_at') or '') < (legacy.get('updated_at') or ''):
+                table_client.update_entity(
+                    copy, mode=UpdateMode.REPLACE,
+                    etag=current.metadata['etag'], match_condition=MatchConditions.IfNotModified
+                )
+            # else: the bucket copy already has newer writes from the live service
+            table_client.delete_entity(
+                LEGACY_ANALYSIS_PARTITION, analysis_id,
+                etag=legacy.metadata['etag'], match_condition=MatchConditions.IfNotModified
+            )
+        except (ResourceExistsError, ResourceModifiedError):
+            continue  # A live writer got in between - start over with fresh copies
+
+        table_client.upsert_entity(time_index_entity(analysis_id, legacy.get('created_at'), target))
+        return True
+    return False
+
+
+def record_oldest_bucket(table_client, oldest: str) -> None:
+    """Make listings walk back far enough to reach the migrated analyses"""
+    try:
+        marker = table_client.get_entity(META_PARTITION, TIME_INDEX_MARKER_ROW_KEY)
+        oldest = min(oldest, marker.get('oldest_bucket') or oldest)
+    except ResourceNotFoundError:
+        pass
+    table_client.upsert_entity({
+        'PartitionKey': META_PARTITION,
+        'RowKey': TIME_INDEX_MARKER_ROW_KEY,
+        'oldest_bucket': oldest
+    }, mode=UpdateMode.MERGE)
+
+
+def remove_partition(table_client, partition_key: str) -> int:
+    """Delete every entity of a partition in batches of 100"""
+    entities = list(table_client.query_entities(f"PartitionKey eq '{partition_key}'", select=['PartitionKey', 'RowKey']))
+    for start in range(0, len(entities), 100):
+        table_client.submit_transaction([('delete', e) for e in entities[start:start + 100]])
+    return len(entities)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument("--table", default="gaitanalyses", help="Table name (default: gaitanalyses)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be moved")
+    args = parser.parse_args()
+
+    connection_string = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
+    if not connection_string:
+        print("❌ AZURE_STORAGE_CONNECTION_STRING is not set")
+        return 1
+
+    table_client = TableServiceClient.from_connection_string(connection_string).get_table_client(args.table)
+    partition_count = load_partition_count(table_client)
+    legacy_entities = list(table_client.query_entities(
+        f"PartitionKey eq '{LEGACY_ANALYSIS_PARTITION}'", select=['RowKey', 'created_at']
+    ))
+    analysis_ids = [e['RowKey'] for e in legacy_entities]
+    print(f"📦 {len(analysis_ids)} analyses in legacy partition '{LEGACY_ANALYSIS_PARTITION}' ({partition_count} buckets)")
+
+    if args.dry_run:
+        buckets = {}
+        for analysis_id in analysis_ids:
+            bucket = analysis_partition(analysis_id, partition_count)
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+        for bucket in sorted(buckets):
+            print(f"  {bucket}: {buckets[bucket]}")
+        return 0
+
+    # Record the index range first: listings must reach migrated analyses as soon as they move
+    record_oldest_bucket(table_client, min([time_bucket(e.get('created_at')) for e in legacy_entities] + [current_bucket()]))
+    failed = [analysis_id for analysis_id in analysis_ids if not migrate_analysis(table_client, analysis_id, partition_count)]
+    removed = remove_partition(table_client, LEGACY_TIME_INDEX_PARTITION)
+    table_client.delete_entity(META_PARTITION, 'time_index_v1')  # Marker of the pre-bucketing index
+
+    print(f"✅ Migrated {len(analysis_ids) - len(failed)} analyses, removed {removed} legacy time index entries")
+    if failed:
+        print(f"⚠️ {len(failed)} analyses kept changing during migration - re-run to finish: {failed[:10]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())